@@ -17,6 +17,7 @@ import json
 import logging
 import os
 import re
+import threading
 import time
 from datetime import datetime, timezone
 from enum import Enum
@@ -52,9 +53,23 @@ TTS_MODEL = os.getenv("AI_TTS_MODEL", "tts-1")
 TTS_VOICE_EN = os.getenv("AI_TTS_VOICE", "nova")
 TTS_VOICE_ES = os.getenv("AI_TTS_VOICE_ES", "nova")
 
+# Imported after load_dotenv so AI_TTS_CACHE_DIR / AI_TTS_CACHE_MAX_MB apply.
+from backend.ai.speech_cache import (  # noqa: E402
+    audio_url as speech_audio_url, speech_cache, speech_key as make_speech_key,
+)
+from backend.ai.reply_cache import public_reply_cache, reply_key  # noqa: E402
+from backend.rate_limits import RateLimiter  # noqa: E402
+from backend.ai.context import (  # noqa: E402
+    HISTORY_FETCH_LIMIT, SUMMARY_KEEP_RECENT, SUMMARY_MAX_FOLD, SUMMARY_MAX_TOKENS, ContextBuilder,
+    rows_to_fold, summary_request,
+)
+
 MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "2"))
 TIMEOUT_SECONDS = int(os.getenv("AI_TIMEOUT", "30"))
 
+# Seconds a read-only tool may run before its result is replaced by an error.
+TOOL_TIMEOUT_SECONDS = float(os.getenv("AI_TOOL_TIMEOUT", "20"))
+
 RATE_LIMIT_DEFAULT = int(os.getenv("AI_RATE_LIMIT", "50"))
 RATE_LIMIT_WINDOW = 60
 
@@ -185,66 +200,34 @@ def get_canned_response(error_type: str, lang: str = "en") -> str:
 
 
 # ---------------------------------------------------------------------------
-# Rate limiter (per-IP, in-memory)
+# Rate limits (per-IP and per-user)
 #
-# In-memory + per-process — fine for the current single-worker uvicorn
-# deployment. For multi-worker / horizontal scaling, swap for Redis.
-# The store is bounded (LRU-style eviction at MAX_RATE_KEYS) so it can't
-# leak memory from a long tail of unique IPs / user_ids over weeks.
+# Sliding-window counters from backend.rate_limits: O(1) per check, bounded
+# per-process by default, shared across workers with
+# RATE_LIMIT_BACKEND=database.
 # ---------------------------------------------------------------------------
 
-_rate_store: dict[str, list[float]] = {}
-_user_rate_store: dict[int, list[float]] = {}
-# Cap unique keys so attackers can't OOM us by spraying random IPs.
-_MAX_RATE_KEYS = 10_000
 # Per-user hourly cap on heavy AI calls (chat + voice). Cost cap that
 # survives even when an attacker has stolen a single account's token.
 _USER_RATE_LIMIT = int(os.getenv("AI_USER_RATE_LIMIT", "200"))
 _USER_RATE_WINDOW = int(os.getenv("AI_USER_RATE_WINDOW", "3600"))
 
-
-def _evict_oldest(store: dict) -> None:
-    """Drop the single key with the oldest most-recent timestamp."""
-    if not store:
-        return
-    try:
-        oldest_key = min(store, key=lambda k: store[k][-1] if store[k] else 0)
-        store.pop(oldest_key, None)
-    except ValueError:
-        pass
+ip_rate_limiter = RateLimiter("ai_ip", RATE_LIMIT_DEFAULT, RATE_LIMIT_WINDOW)
+user_rate_limiter = RateLimiter("ai_user", _USER_RATE_LIMIT, _USER_RATE_WINDOW)
 
 
 def check_rate_limit(client_ip: str, limit: int = RATE_LIMIT_DEFAULT) -> bool:
-    now = time.time()
-    # Evict BEFORE inserting a brand-new key so the store cannot exceed
-    # the cap even by one. setdefault below would otherwise add the new
-    # key first and check the cap after.
-    if client_ip not in _rate_store and len(_rate_store) >= _MAX_RATE_KEYS:
-        _evict_oldest(_rate_store)
-    timestamps = _rate_store.setdefault(client_ip, [])
-    _rate_store[client_ip] = [t for t in timestamps if now - t < RATE_LIMIT_WINDOW]
-    if len(_rate_store[client_ip]) >= limit:
-        return False
-    _rate_store[client_ip].append(now)
-    return True
+    return ip_rate_limiter.allow(client_ip, limit)
 
 
 def check_user_rate_limit(user_id: int, limit: int = _USER_RATE_LIMIT) -> bool:
     """Per-user hourly cap on chat/voice calls.
 
-    Bounded in-memory — ok at our current scale. Resets on restart, which
-    is acceptable for a cost cap (the goal is to stop runaway loops, not
-    to be a billing system).
+    With the in-memory backend it resets on restart, which is acceptable
+    for a cost cap (the goal is to stop runaway loops, not to be a billing
+    system).
     """
-    now = time.time()
-    if user_id not in _user_rate_store and len(_user_rate_store) >= _MAX_RATE_KEYS:
-        _evict_oldest(_user_rate_store)
-    timestamps = _user_rate_store.setdefault(user_id, [])
-    _user_rate_store[user_id] = [t for t in timestamps if now - t < _USER_RATE_WINDOW]
-    if len(_user_rate_store[user_id]) >= limit:
-        return False
-    _user_rate_store[user_id].append(now)
-    return True
+    return user_rate_limiter.allow(user_id, limit)
 
 
 # ---------------------------------------------------------------------------
@@ -419,16 +402,17 @@ async def legacy_ai_request(endpoint: str, payload: dict) -> dict:
 # Training data + system prompt builder
 # ---------------------------------------------------------------------------
 
-def _load_training_data() -> dict:
+def _load_training_data(path: str = TRAINING_DATA_PATH) -> dict:
     try:
-        with open(TRAINING_DATA_PATH, "r", encoding="utf-8") as f:
+        with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
     except FileNotFoundError:
-        logger.warning("Training data not found: %s", TRAINING_DATA_PATH)
+        logger.warning("Training data not found: %s", path)
         return {}
 
 
-def _build_system_prompt(training_data: dict) -> str:
+def _system_prompt_parts(training_data: dict) -> tuple[str, str]:
+    """The system prompt around its timestamp line: ``(head, body)``."""
     sections: list[str] = []
 
     if "platform_overview" in training_data:
@@ -459,8 +443,6 @@ def _build_system_prompt(training_data: dict) -> str:
         "system_base",
         "You are the FoodMaps AI Assistant, a warm and helpful community food sharing assistant for the FoodMaps platform. Always refer to the product as FoodMaps.",
     )
-    now_str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
-
     # Hard rule: when the user asks the assistant to *do* something, the
     # assistant must call the matching tool instead of describing how the
     # user could do it themselves. Several user reports traced back to the
@@ -1241,13 +1223,144 @@ def _build_system_prompt(training_data: dict) -> str:
         "If the user is ambiguous ('help me with my food'), ASK what "
         "they want before opening anything."
     )
-    return (
-        f"{base}\n\nCurrent date and time: {now_str}\n\n"
-        + action_policy
-        + "\n\n"
-        + "\n\n".join(sections)
-    )
+    return base, action_policy + "\n\n" + "\n\n".join(sections)
+
 
+def _stamp_system_prompt(head: str, body: str, now: Optional[datetime] = None) -> str:
+    now_str = (now or datetime.now(timezone.utc)).strftime("%Y-%m-%d %H:%M UTC")
+    return f"{head}\n\nCurrent date and time: {now_str}\n\n{body}"
+
+
+def _build_system_prompt(training_data: dict) -> str:
+    return _stamp_system_prompt(*_system_prompt_parts(training_data))
+
+
+# ---------------------------------------------------------------------------
+# Static per-turn system blocks
+# ---------------------------------------------------------------------------
+
+# Language lock, keyed by detected language.
+_LANGUAGE_LOCK_PROMPTS: dict[str, str] = {
+    "es": (
+        "The user is communicating in Spanish. You MUST respond "
+        "ENTIRELY in Spanish for this turn and every following "
+        "turn unless the user explicitly switches to another "
+        "language. This includes: your reply text, any natural-"
+        "language summaries of tool results, error explanations, "
+        "confirmation prompts, and follow-up questions. Do NOT "
+        "slip into English even for short phrases (e.g. say "
+        "'¡Listo!' not 'Done!', 'Reclamado' not 'Claimed', "
+        "'Publicado' not 'Posted'). Maintain a warm, helpful "
+        "personality."
+    ),
+    # Symmetric English lock. Without this, if any prior assistant
+    # turn in history was Spanish, the model copies that style and
+    # keeps replying in Spanish even though the user just wrote in
+    # English. This system message overrides that drift.
+    "en": (
+        "The user is communicating in English. You MUST respond "
+        "ENTIRELY in English for this turn, even if earlier turns "
+        "in the conversation history were in Spanish or another "
+        "language. The user has switched (or always was) writing "
+        "in English — match them. This applies to your reply "
+        "text, tool-result summaries, confirmation prompts, "
+        "follow-up questions, and error explanations. Do not "
+        "include Spanish phrases or translations. Only switch "
+        "back to Spanish if the user explicitly writes in Spanish "
+        "again."
+    ),
+}
+
+# Conversation-awareness reminder. Without this the model treats
+# every turn as fresh and re-asks for things the user already
+# answered earlier in the same chat.
+_CONVERSATION_AWARENESS_PROMPT = (
+    "CONVERSATION AWARENESS (critical):\n"
+    "• Read the prior turns BEFORE responding. If the user "
+    "already gave you a fact (qty, address, title, food type, "
+    "a chosen listing #), don't ask for it again — use it.\n"
+    "• Resolve pronouns ('it', 'that one', 'the bread', "
+    "'#42') from earlier messages and tool results in this "
+    "thread.\n"
+    "• If you just searched listings and the user replies "
+    "with a number or 'the bread', match it to that search "
+    "result — don't search again.\n"
+    "• If a tool just returned an error, acknowledge what went "
+    "wrong and ask only for the missing piece, not the whole "
+    "form again.\n"
+    "• NEVER ask for fields already shown in the user-profile "
+    "context above (address, phone, dietary_restrictions, "
+    "allergens). Use them silently."
+)
+
+# Action policy: let the AI actually DO things on the user's behalf.
+# Always inject for authenticated users — gating on keyword match
+# caused the model to silently fall back to text-only replies
+# whenever the user phrased a donation in an unfamiliar way (e.g.
+# 'I have a few cans of soup spare'), making listings 'sometimes
+# work, sometimes not'.
+_ACTION_POLICY_PROMPTS: dict[str, str] = {
+    "en": (
+        "You can take actions for the user through tool calls. Use the ACTION "
+        "tools (claim_listing, cancel_claim, update_user_profile, post_food_request, "
+        "post_food_listing, send_user_message) whenever the user asks — you do not "
+        "need to ask them to click buttons. "
+        "Rules: "
+        "(1) The server enforces the authenticated user_id; still pass the id shown above. "
+        "(2) For destructive / irreversible actions (cancel_claim, post_food_listing, "
+        "post_food_request), confirm briefly once before calling. "
+        "(3) For small updates (e.g. adding an allergy, opting into SMS), act immediately and report what changed. "
+        "(4) When the user says things like 'I'll take it', 'reserve that', 'grab #42', "
+        "call claim_listing. Then tell them to watch for the SMS code. "
+        "(5) If a tool returns an error, explain it plainly and suggest the next step. "
+        "(6) ALWAYS CONFIRM COMPLETION: after a tool returns success, lead your reply "
+        "with an explicit completion phrase ('Done!', 'Posted!', 'Sent!', 'Updated.', "
+        "'Released.', 'Confirmed!', 'Saved.', 'Reminder set.') so the user clearly hears "
+        "the action FINISHED. Never leave the turn open-ended after a write tool — the "
+        "user must know the work is complete before any follow-up question or next step. "
+        "(7) STAY FOCUSED: if a multi-step flow is in progress (e.g. listing apples) and "
+        "the user mentions a different food (e.g. 'ice cream'), DO NOT silently swap "
+        "items. Ask one disambiguator: 'Add ice cream as a second listing after the "
+        "apples, or switch to ice cream instead?' Default assumption is ADD, not "
+        "replace. Carry captured fields (title, qty, address, etc.) across turns; never "
+        "quietly drop them. "
+        "(8) IGNORE-AND-STEER: if the user asks something off-topic mid-flow (weather, "
+        "trivia, jokes, unrelated chat), briefly decline and steer back to the open "
+        "task. If they persist, ask once whether to pause the flow. "
+        "(9) FOOD ONLY: FoodMaps lists FOOD. If a user tries to list non-food items "
+        "(furniture, electronics, clothes), decline warmly and suggest Buy Nothing / "
+        "Freecycle. If a recipient asks for cash/cars/gift cards, decline and offer to "
+        "search for available food instead. Stay scoped to food sharing, food safety, "
+        "pickups, recipes, storage, and community impact."
+    ),
+    "es": (
+        "Puedes realizar acciones por el usuario mediante tool calls. Usa las herramientas "
+        "de ACCIÓN (claim_listing, cancel_claim, update_user_profile, post_food_request, "
+        "post_food_listing, send_user_message) cuando el usuario lo pida — no le digas que "
+        "haga clic en botones. Reglas: (1) El servidor impone el user_id autenticado. "
+        "(2) Confirma brevemente antes de acciones destructivas. (3) Para cambios pequeños, "
+        "actúa de inmediato y reporta el resultado. (4) Frases como 'lo tomo', 'resérvalo' "
+        "deben disparar claim_listing. (5) Si una herramienta falla, explícalo y sugiere el "
+        "siguiente paso. (6) CONFIRMA SIEMPRE QUE TERMINASTE: después de un éxito, comienza "
+        "tu respuesta con una frase clara de finalización ('¡Listo!', '¡Publicado!', "
+        "'¡Enviado!', 'Actualizado.', 'Liberado.', '¡Confirmado!', 'Guardado.', "
+        "'Recordatorio creado.') para que el usuario sepa que la acción YA TERMINÓ antes "
+        "de cualquier siguiente paso. "
+        "(7) MANTÉN EL FOCO: si hay un flujo en curso (p.ej. publicando manzanas) y el "
+        "usuario menciona otra comida (p.ej. 'helado'), NO cambies en silencio. Pregunta "
+        "una sola vez: '¿Agrego el helado como un SEGUNDO anuncio después de las "
+        "manzanas, o cambias a helado?' Por defecto: AGREGAR, no reemplazar. Conserva "
+        "los campos ya capturados (título, cantidad, dirección) entre turnos. "
+        "(8) IGNORAR Y REDIRIGIR: si en medio del flujo el usuario pregunta algo fuera "
+        "de tema (clima, chistes, trivia), declina brevemente y vuelve a la tarea. Si "
+        "insiste, pregunta una vez si pausamos el flujo. "
+        "(9) SOLO COMIDA: FoodMaps es para comida. Si intenta publicar objetos no "
+        "alimenticios (muebles, ropa, electrónicos), declina con amabilidad y sugiere "
+        "Buy Nothing o Freecycle. Si pide dinero/coches/tarjetas de regalo, declina y "
+        "ofrece buscar comida disponible. Mantente en el ámbito de comida, seguridad "
+        "alimentaria, recogidas, recetas, almacenamiento e impacto comunitario."
+    ),
+}
 
 # ---------------------------------------------------------------------------
 # Role-specific behaviour
@@ -1383,6 +1496,129 @@ async def _profile_gap_prompt(user_id: int, lang: str = "en") -> Optional[str]:
     return f"{header}\n{bullets}"
 
 
+# ---------------------------------------------------------------------------
+# Prompt cache
+#
+# The system prompt is assembled from ai_training_data.json plus several
+# long static blocks. Building it used to happen on every chat turn; now each
+# static segment is built once per (lang, role) and rebuilt only when the
+# training file's mtime changes. Token counts are computed with the segment,
+# so per-request prompt size is visible without re-tokenizing.
+# ---------------------------------------------------------------------------
+
+try:
+    import tiktoken  # type: ignore
+except ImportError:  # optional; fall back to a character estimate
+    tiktoken = None
+
+# Log a warning when one request's prompt is estimated above this size.
+PROMPT_TOKEN_WARN = int(os.getenv("AI_PROMPT_TOKEN_WARN", "16000"))
+
+_token_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count for ``text``: exact with tiktoken, else ~4 chars per token."""
+    global _token_encoding
+    if not text:
+        return 0
+    if tiktoken is not None:
+        try:
+            if _token_encoding is None:
+                try:
+                    _token_encoding = tiktoken.encoding_for_model(CHAT_MODEL)
+                except KeyError:
+                    _token_encoding = tiktoken.get_encoding("o200k_base")
+            return len(_token_encoding.encode(text))
+        except Exception:
+            pass
+    return (len(text) + 3) // 4
+
+
+class PromptCache:
+    """Static prompt segments, rebuilt when the training file changes."""
+
+    # Stands in for the timestamp line when counting the system prompt.
+    _STAMP_SAMPLE = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+    def __init__(self, path: str = TRAINING_DATA_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = -1.0  # never loaded; None = file missing
+        self._training_data: dict = {}
+        self._parts: tuple[str, str] = ("", "")
+        self._system_tokens = 0
+        self._segments: dict[tuple[str, str], dict[str, tuple[str, int]]] = {}
+
+    def _mtime_now(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def _refresh(self) -> None:
+        mtime = self._mtime_now()
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            data = _load_training_data(self.path)
+            parts = _system_prompt_parts(data)
+            self._training_data = data
+            self._parts = parts
+            self._system_tokens = count_tokens(_stamp_system_prompt(*parts, now=self._STAMP_SAMPLE))
+            self._segments = {}
+            self._mtime = mtime
+            if mtime is not None:
+                logger.info("System prompt loaded: ~%d tokens", self._system_tokens)
+
+    @property
+    def training_data(self) -> dict:
+        self._refresh()
+        return self._training_data
+
+    def system_prompt(self, now: Optional[datetime] = None) -> str:
+        """Full system prompt; only the timestamp line is formatted per call."""
+        self._refresh()
+        return _stamp_system_prompt(*self._parts, now=now)
+
+    def static_blocks(self, lang: str, role: Optional[str]) -> dict[str, str]:
+        """Per-turn static system blocks for ``lang`` / ``role`` by segment name."""
+        return {name: text for name, (text, _) in self._static(lang, role).items()}
+
+    def token_counts(self, lang: str = "en", role: Optional[str] = None) -> dict[str, int]:
+        """Tokens per static segment, the system prompt included."""
+        self._refresh()
+        counts = {"system": self._system_tokens}
+        counts.update({name: tokens for name, (_, tokens) in self._static(lang, role).items()})
+        return counts
+
+    def _static(self, lang: str, role: Optional[str]) -> dict[str, tuple[str, int]]:
+        self._refresh()
+        lang = "es" if lang == "es" else "en"
+        role_key = str(role or "").lower().strip()
+        key = (lang, role_key)
+        segments = self._segments.get(key)
+        if segments is None:
+            texts = {
+                "language_lock": _LANGUAGE_LOCK_PROMPTS[lang],
+                "conversation_awareness": _CONVERSATION_AWARENESS_PROMPT,
+                "action_policy": _ACTION_POLICY_PROMPTS[lang],
+            }
+            # Role-specific behaviour is best-effort; without it the turn
+            # falls back to the default prompt.
+            try:
+                role_prompt = _role_behavior_prompt(role_key, lang=lang)
+                if role_prompt:
+                    texts["role_behavior"] = role_prompt
+            except Exception as exc:
+                logger.debug("role prompt build failed: %s", exc)
+            segments = {name: (text, count_tokens(text)) for name, text in texts.items()}
+            self._segments[key] = segments
+        return segments
+
+
 # ---------------------------------------------------------------------------
 # Privacy guard for run_safe_query
 # ---------------------------------------------------------------------------
@@ -1463,10 +1699,61 @@ class ConversationEngine:
     """MySQL-backed conversation engine."""
 
     def __init__(self) -> None:
-        self.training_data = _load_training_data()
-        from backend.ai.tools import TOOL_DEFINITIONS, execute_tool
+        self.prompts = PromptCache()
+        from backend.ai.tools import TOOL_DEFINITIONS, execute_tool, is_read_only_tool
         self.tool_definitions = TOOL_DEFINITIONS
         self._execute_tool = execute_tool
+        self._is_read_only_tool = is_read_only_tool
+        # Background summary folds, one per user at a time.
+        self._summary_tasks: dict[int, asyncio.Task] = {}
+        # Saves of streams the client abandoned; held so they are not
+        # garbage-collected before they finish.
+        self._persist_tasks: set[asyncio.Task] = set()
+
+    async def _run_tool_calls(self, calls: list) -> list:
+        """Execute one round of ``(name, args)`` tool calls.
+
+        Consecutive read-only calls run concurrently, each under
+        ``TOOL_TIMEOUT_SECONDS``. A mutating call waits for everything
+        before it and runs alone, so writes keep the model's order and
+        reads requested after a write see it. Entries whose args are
+        ``None`` (unparseable) are skipped. Returns ``(result, latency_ms)``
+        per call, in input order.
+        """
+        out: list = [None] * len(calls)
+
+        async def _one(i: int, name: str, args: dict, timeout: Optional[float]) -> None:
+            started = time.monotonic()
+            try:
+                if timeout:
+                    result = await asyncio.wait_for(self._execute_tool(name, args), timeout)
+                else:
+                    result = await self._execute_tool(name, args)
+            except asyncio.TimeoutError:
+                logger.warning("Tool %s timed out after %.0fs", name, timeout)
+                result = {"error": True, "message": f"{name} timed out. Please try again."}
+            except Exception:
+                # Log full traceback server-side; surface a generic
+                # message so internal exception text doesn't reach
+                # the user via the AI's reply.
+                logger.exception("Tool %s failed", name)
+                result = {"error": True, "message": f"{name} failed. Please try again."}
+            out[i] = (result, int((time.monotonic() - started) * 1000))
+
+        pending: list = []
+        for i, (name, args) in enumerate(calls):
+            if args is None:
+                continue
+            if self._is_read_only_tool(name):
+                pending.append(_one(i, name, args, TOOL_TIMEOUT_SECONDS))
+                continue
+            if pending:
+                await asyncio.gather(*pending)
+                pending = []
+            await _one(i, name, args, None)
+        if pending:
+            await asyncio.gather(*pending)
+        return out
 
     # Tools that only make sense for one role. The model never gets to
     # *see* tools that don't apply to the current user — this is the
@@ -1517,9 +1804,13 @@ class ConversationEngine:
             if t.get("function", {}).get("name") not in hide
         ]
 
+    @property
+    def training_data(self) -> dict:
+        return self.prompts.training_data
+
     @property
     def system_prompt(self) -> str:
-        return _build_system_prompt(self.training_data)
+        return self.prompts.system_prompt()
 
     def _detect_lang(self, text: str) -> str:
         return "es" if detect_spanish(text) else "en"
@@ -1645,6 +1936,7 @@ class ConversationEngine:
                 rows.reverse()
                 return [
                     {
+                        "id": r.id,
                         "role": r.role,
                         "message": r.message,
                         "created_at": r.created_at.isoformat() if r.created_at else "",
@@ -1656,6 +1948,140 @@ class ConversationEngine:
 
         return await asyncio.get_event_loop().run_in_executor(None, _sync)
 
+    async def get_context_history(
+        self, user_id: int, limit: int = HISTORY_FETCH_LIMIT,
+    ) -> tuple[Optional[str], list[dict]]:
+        """Rolling summary (or None) and the newest rows it does not cover."""
+        from backend.app import SessionLocal
+        from backend.ai.models import AIConversation, AIConversationSummary
+
+        def _sync() -> tuple[Optional[str], list[dict]]:
+            db = SessionLocal()
+            try:
+                summary = db.get(AIConversationSummary, user_id)
+                query = db.query(AIConversation).filter(AIConversation.user_id == user_id)
+                if summary is not None:
+                    query = query.filter(AIConversation.id > summary.through_id)
+                # Same ordering as get_conversation_history: created_at has
+                # 1-second resolution, id breaks the tie.
+                rows = (
+                    query.order_by(AIConversation.created_at.desc(), AIConversation.id.desc())
+                    .limit(limit)
+                    .all()
+                )
+                rows.reverse()
+                return (
+                    summary.summary if summary is not None else None,
+                    [{"id": r.id, "role": r.role, "message": r.message} for r in rows],
+                )
+            finally:
+                db.close()
+
+        return await asyncio.get_event_loop().run_in_executor(None, _sync)
+
+    def _schedule_summary(self, user_id: int) -> None:
+        """Fold older turns into the rolling summary in the background."""
+        if not OPENAI_API_KEY:
+            return
+        task = self._summary_tasks.get(user_id)
+        if task is not None and not task.done():
+            return
+        task = asyncio.create_task(self.refresh_summary(user_id))
+        self._summary_tasks[user_id] = task
+        task.add_done_callback(lambda _t, uid=user_id: self._summary_tasks.pop(uid, None))
+
+    async def refresh_summary(self, user_id: int) -> bool:
+        """Fold due rows into the user's summary; True if it was updated."""
+        from backend.app import SessionLocal
+        from backend.ai.models import AIConversation, AIConversationSummary
+
+        def _load() -> tuple[Optional[str], int, list[dict]]:
+            db = SessionLocal()
+            try:
+                summary = db.get(AIConversationSummary, user_id)
+                through_id = summary.through_id if summary is not None else 0
+                rows = (
+                    db.query(AIConversation.id, AIConversation.role, AIConversation.message)
+                    .filter(AIConversation.user_id == user_id, AIConversation.id > through_id)
+                    .order_by(AIConversation.id)
+                    # Enough for one pass; anything past it is folded later.
+                    .limit(SUMMARY_MAX_FOLD + SUMMARY_KEEP_RECENT)
+                    .all()
+                )
+                return (
+                    summary.summary if summary is not None else None,
+                    through_id,
+                    [{"id": r.id, "role": r.role, "message": r.message} for r in rows],
+                )
+            finally:
+                db.close()
+
+        def _store(text: str, previous_through: int, rows: list[dict]) -> bool:
+            db = SessionLocal()
+            try:
+                summary = db.get(AIConversationSummary, user_id)
+                if summary is None:
+                    if previous_through:
+                        return False
+                    # clear_history may have run since _load; don't bring
+                    # back a summary of rows that are gone.
+                    still_there = (
+                        db.query(AIConversation.id)
+                        .filter(AIConversation.user_id == user_id, AIConversation.id == rows[-1]["id"])
+                        .first()
+                    )
+                    if still_there is None:
+                        return False
+                    db.add(AIConversationSummary(
+                        user_id=user_id, summary=text,
+                        through_id=rows[-1]["id"], message_count=len(rows),
+                    ))
+                elif summary.through_id != previous_through:
+                    return False  # another worker folded these rows first
+                else:
+                    summary.summary = text
+                    summary.through_id = rows[-1]["id"]
+                    summary.message_count = (summary.message_count or 0) + len(rows)
+                db.commit()
+                return True
+            except Exception as exc:
+                logger.error("Summary store failed for user %s: %s", user_id, exc)
+                db.rollback()
+                return False
+            finally:
+                db.close()
+
+        loop = asyncio.get_event_loop()
+        try:
+            previous, through_id, rows = await loop.run_in_executor(None, _load)
+            due = rows_to_fold(rows)
+            if not due or not OPENAI_API_KEY:
+                return False
+            resp = await _openai_with_retry(
+                "POST",
+                f"{OPENAI_BASE_URL}/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {OPENAI_API_KEY}",
+                    "Content-Type": "application/json",
+                },
+                json_payload={
+                    "model": FOLLOWUP_MODEL,
+                    "messages": summary_request(previous, due),
+                    "temperature": 0.2,
+                    "max_tokens": SUMMARY_MAX_TOKENS,
+                },
+            )
+            text = (resp.json()["choices"][0]["message"].get("content") or "").strip()
+            if not text:
+                return False
+            stored = await loop.run_in_executor(None, _store, text, through_id, due)
+            if stored:
+                logger.info("Folded %d messages into the summary for user %s", len(due), user_id)
+            return stored
+        except Exception as exc:
+            logger.warning("Summary refresh failed for user %s: %s", user_id, exc)
+            return False
+
     async def store_message(
         self,
         user_id: int,
@@ -1690,12 +2116,13 @@ class ConversationEngine:
 
     async def clear_history(self, user_id: int) -> int:
         from backend.app import SessionLocal
-        from backend.ai.models import AIConversation
+        from backend.ai.models import AIConversation, AIConversationSummary
 
         def _sync() -> int:
             db = SessionLocal()
             try:
                 n = db.query(AIConversation).filter(AIConversation.user_id == user_id).delete()
+                db.query(AIConversationSummary).filter(AIConversationSummary.user_id == user_id).delete()
                 db.commit()
                 return n
             except Exception as exc:
@@ -1716,9 +2143,20 @@ class ConversationEngine:
         include_audio: bool = False,
         lang_hint: Optional[str] = None,
     ) -> dict:
+        messages, lang, profile = await self._build_turn(user_id, message, lang_hint)
+        response_text, actions = await self._call_with_fallbacks(
+            messages, lang, auth_user_id=user_id,
+            user_role=(profile or {}).get("role"),
+        )
+        return await self._finish_turn(user_id, message, response_text, actions, lang, include_audio)
+
+    async def _build_turn(
+        self, user_id: int, message: str, lang_hint: Optional[str] = None,
+    ) -> tuple[list[dict], str, Optional[dict]]:
+        """Prompt messages, reply language and profile for one chat turn."""
         profile_task = asyncio.create_task(self.get_user_profile(user_id))
-        history_task = asyncio.create_task(self.get_conversation_history(user_id, limit=12))
-        profile, history = await asyncio.gather(profile_task, history_task)
+        history_task = asyncio.create_task(self.get_context_history(user_id))
+        profile, (summary, history) = await asyncio.gather(profile_task, history_task)
 
         # Sticky language: explicit client hint > message > profile > history.
         # The hint lets the UI's language switcher win over short messages
@@ -1728,44 +2166,12 @@ class ConversationEngine:
         else:
             lang = self._detect_lang_sticky(message, history=history, profile=profile)
 
-        messages: list[dict] = [{"role": "system", "content": self.system_prompt}]
-
-        if lang == "es":
-            messages.append({
-                "role": "system",
-                "content": (
-                    "The user is communicating in Spanish. You MUST respond "
-                    "ENTIRELY in Spanish for this turn and every following "
-                    "turn unless the user explicitly switches to another "
-                    "language. This includes: your reply text, any natural-"
-                    "language summaries of tool results, error explanations, "
-                    "confirmation prompts, and follow-up questions. Do NOT "
-                    "slip into English even for short phrases (e.g. say "
-                    "'¡Listo!' not 'Done!', 'Reclamado' not 'Claimed', "
-                    "'Publicado' not 'Posted'). Maintain a warm, helpful "
-                    "personality."
-                ),
-            })
-        else:
-            # Symmetric English lock. Without this, if any prior assistant
-            # turn in history was Spanish, the model copies that style and
-            # keeps replying in Spanish even though the user just wrote in
-            # English. This system message overrides that drift.
-            messages.append({
-                "role": "system",
-                "content": (
-                    "The user is communicating in English. You MUST respond "
-                    "ENTIRELY in English for this turn, even if earlier turns "
-                    "in the conversation history were in Spanish or another "
-                    "language. The user has switched (or always was) writing "
-                    "in English — match them. This applies to your reply "
-                    "text, tool-result summaries, confirmation prompts, "
-                    "follow-up questions, and error explanations. Do not "
-                    "include Spanish phrases or translations. Only switch "
-                    "back to Spanish if the user explicitly writes in Spanish "
-                    "again."
-                ),
-            })
+        role = (profile or {}).get("role")
+        static = self.prompts.static_blocks(lang, role)
+        static_tokens = self.prompts.token_counts(lang, role)
+        ctx = ContextBuilder(count_tokens)
+        ctx.add("system", self.system_prompt, static_tokens["system"])
+        ctx.add("language_lock", static["language_lock"], static_tokens["language_lock"])
 
         if profile:
             # Build a rich, conversational context block so the model has
@@ -1874,150 +2280,42 @@ class ConversationEngine:
                 f"Current user ID: {user_id}. "
                 f"When calling tools that require user_id, always use \"{user_id}\"."
             )
-        messages.append({"role": "system", "content": context})
-
-        # Conversation-awareness reminder. Without this the model treats
-        # every turn as fresh and re-asks for things the user already
-        # answered earlier in the same chat.
-        messages.append({
-            "role": "system",
-            "content": (
-                "CONVERSATION AWARENESS (critical):\n"
-                "• Read the prior turns BEFORE responding. If the user "
-                "already gave you a fact (qty, address, title, food type, "
-                "a chosen listing #), don't ask for it again — use it.\n"
-                "• Resolve pronouns ('it', 'that one', 'the bread', "
-                "'#42') from earlier messages and tool results in this "
-                "thread.\n"
-                "• If you just searched listings and the user replies "
-                "with a number or 'the bread', match it to that search "
-                "result — don't search again.\n"
-                "• If a tool just returned an error, acknowledge what went "
-                "wrong and ask only for the missing piece, not the whole "
-                "form again.\n"
-                "• NEVER ask for fields already shown in the user-profile "
-                "context above (address, phone, dietary_restrictions, "
-                "allergens). Use them silently."
-            ),
-        })
-
-        # Action policy: let the AI actually DO things on the user's behalf.
-        # Always inject for authenticated users — gating on keyword match
-        # caused the model to silently fall back to text-only replies
-        # whenever the user phrased a donation in an unfamiliar way (e.g.
-        # 'I have a few cans of soup spare'), making listings 'sometimes
-        # work, sometimes not'.
-        if True:
-            action_policy_en = (
-                "You can take actions for the user through tool calls. Use the ACTION "
-                "tools (claim_listing, cancel_claim, update_user_profile, post_food_request, "
-                "post_food_listing, send_user_message) whenever the user asks — you do not "
-                "need to ask them to click buttons. "
-                "Rules: "
-                "(1) The server enforces the authenticated user_id; still pass the id shown above. "
-                "(2) For destructive / irreversible actions (cancel_claim, post_food_listing, "
-                "post_food_request), confirm briefly once before calling. "
-                "(3) For small updates (e.g. adding an allergy, opting into SMS), act immediately and report what changed. "
-                "(4) When the user says things like 'I'll take it', 'reserve that', 'grab #42', "
-                "call claim_listing. Then tell them to watch for the SMS code. "
-                "(5) If a tool returns an error, explain it plainly and suggest the next step. "
-                "(6) ALWAYS CONFIRM COMPLETION: after a tool returns success, lead your reply "
-                "with an explicit completion phrase ('Done!', 'Posted!', 'Sent!', 'Updated.', "
-                "'Released.', 'Confirmed!', 'Saved.', 'Reminder set.') so the user clearly hears "
-                "the action FINISHED. Never leave the turn open-ended after a write tool — the "
-                "user must know the work is complete before any follow-up question or next step. "
-                "(7) STAY FOCUSED: if a multi-step flow is in progress (e.g. listing apples) and "
-                "the user mentions a different food (e.g. 'ice cream'), DO NOT silently swap "
-                "items. Ask one disambiguator: 'Add ice cream as a second listing after the "
-                "apples, or switch to ice cream instead?' Default assumption is ADD, not "
-                "replace. Carry captured fields (title, qty, address, etc.) across turns; never "
-                "quietly drop them. "
-                "(8) IGNORE-AND-STEER: if the user asks something off-topic mid-flow (weather, "
-                "trivia, jokes, unrelated chat), briefly decline and steer back to the open "
-                "task. If they persist, ask once whether to pause the flow. "
-                "(9) FOOD ONLY: FoodMaps lists FOOD. If a user tries to list non-food items "
-                "(furniture, electronics, clothes), decline warmly and suggest Buy Nothing / "
-                "Freecycle. If a recipient asks for cash/cars/gift cards, decline and offer to "
-                "search for available food instead. Stay scoped to food sharing, food safety, "
-                "pickups, recipes, storage, and community impact."
-            )
-            action_policy_es = (
-                "Puedes realizar acciones por el usuario mediante tool calls. Usa las herramientas "
-                "de ACCIÓN (claim_listing, cancel_claim, update_user_profile, post_food_request, "
-                "post_food_listing, send_user_message) cuando el usuario lo pida — no le digas que "
-                "haga clic en botones. Reglas: (1) El servidor impone el user_id autenticado. "
-                "(2) Confirma brevemente antes de acciones destructivas. (3) Para cambios pequeños, "
-                "actúa de inmediato y reporta el resultado. (4) Frases como 'lo tomo', 'resérvalo' "
-                "deben disparar claim_listing. (5) Si una herramienta falla, explícalo y sugiere el "
-                "siguiente paso. (6) CONFIRMA SIEMPRE QUE TERMINASTE: después de un éxito, comienza "
-                "tu respuesta con una frase clara de finalización ('¡Listo!', '¡Publicado!', "
-                "'¡Enviado!', 'Actualizado.', 'Liberado.', '¡Confirmado!', 'Guardado.', "
-                "'Recordatorio creado.') para que el usuario sepa que la acción YA TERMINÓ antes "
-                "de cualquier siguiente paso. "
-                "(7) MANTÉN EL FOCO: si hay un flujo en curso (p.ej. publicando manzanas) y el "
-                "usuario menciona otra comida (p.ej. 'helado'), NO cambies en silencio. Pregunta "
-                "una sola vez: '¿Agrego el helado como un SEGUNDO anuncio después de las "
-                "manzanas, o cambias a helado?' Por defecto: AGREGAR, no reemplazar. Conserva "
-                "los campos ya capturados (título, cantidad, dirección) entre turnos. "
-                "(8) IGNORAR Y REDIRIGIR: si en medio del flujo el usuario pregunta algo fuera "
-                "de tema (clima, chistes, trivia), declina brevemente y vuelve a la tarea. Si "
-                "insiste, pregunta una vez si pausamos el flujo. "
-                "(9) SOLO COMIDA: FoodMaps es para comida. Si intenta publicar objetos no "
-                "alimenticios (muebles, ropa, electrónicos), declina con amabilidad y sugiere "
-                "Buy Nothing o Freecycle. Si pide dinero/coches/tarjetas de regalo, declina y "
-                "ofrece buscar comida disponible. Mantente en el ámbito de comida, seguridad "
-                "alimentaria, recogidas, recetas, almacenamiento e impacto comunitario."
-            )
-            messages.append({
-                "role": "system",
-                "content": action_policy_es if lang == "es" else action_policy_en,
-            })
+        ctx.add("profile", context)
 
-        # Role-specific behaviour + profile-gap nudges (best-effort; non-fatal)
-        try:
-            role_prompt = _role_behavior_prompt(
-                (profile or {}).get("role"), lang=lang
-            )
-            if role_prompt:
-                messages.append({"role": "system", "content": role_prompt})
-        except Exception as exc:  # pragma: no cover
-            logger.debug("role prompt build failed: %s", exc)
+        for name in ("conversation_awareness", "action_policy", "role_behavior"):
+            # Role-specific behaviour is absent for roles without one.
+            if static.get(name):
+                ctx.add(name, static[name], static_tokens[name])
 
+        # Profile-gap nudges (best-effort; non-fatal)
         try:
             gap_prompt = await _profile_gap_prompt(user_id, lang=lang)
             if gap_prompt:
-                messages.append({"role": "system", "content": gap_prompt})
+                ctx.add("profile_gaps", gap_prompt)
         except Exception as exc:  # pragma: no cover
             logger.debug("profile gap prompt failed: %s", exc)
 
-        for msg in history:
-            # message column is NOT NULL at the DB layer but be defensive:
-            # a stray None (legacy row, manual SQL) would crash len() and
-            # tank the whole turn.
-            content = msg.get("message") or ""
-            # 4000 chars is comfortably enough room for a bulk-import
-            # success summary (with listing IDs the next turn needs to
-            # reference) without bloating the context window. The previous
-            # 800-char cap was dropping listing IDs and tool-result refs
-            # the model needed to act on follow-up requests.
-            if len(content) > 4000:
-                content = content[:4000] + "... [truncated]"
-            messages.append({"role": msg["role"], "content": content})
-
-        messages.append({"role": "user", "content": message})
-
-        response_text, actions = await self._call_with_fallbacks(
-            messages, lang, auth_user_id=user_id,
-            user_role=(profile or {}).get("role"),
-        )
+        # Older turns beyond the budget are covered by the rolling summary;
+        # the 4000-char cap per message lives in context.clip_message.
+        messages, breakdown = ctx.build(history, message, summary=summary)
+        if breakdown["total"] > min(ctx.budget, PROMPT_TOKEN_WARN):
+            logger.warning("Prompt for user %s is ~%d tokens: %s", user_id, breakdown["total"], breakdown)
+        else:
+            logger.debug("Prompt for user %s is ~%d tokens: %s", user_id, breakdown["total"], breakdown)
+        return messages, lang, profile
 
+    async def _finish_turn(
+        self, user_id: int, message: str, response_text: str, actions: list[dict],
+        lang: str, include_audio: bool = False,
+    ) -> dict:
+        """Persist the exchange and build the response payload."""
         conversation_id = await self._persist_conversation(
             user_id, message, response_text, lang
         )
 
-        audio_b64 = None
+        reply_audio = None
         if include_audio:
-            audio_b64 = await self._generate_audio_b64(response_text, lang=lang)
+            reply_audio = await self._generate_audio_url(response_text, lang=lang)
 
         # Quick-reply chips must reflect the LANGUAGE OF THE AI'S REPLY,
         # not the user's last message. Sticky-lang already handles short
@@ -2032,7 +2330,7 @@ class ConversationEngine:
 
         return {
             "text": response_text,
-            "audio_url": audio_b64,  # data URL, or None
+            "audio_url": reply_audio,  # /api/ai/audio/<key>.mp3, or None
             "user_id": str(user_id),
             "lang": lang,
             "conversation_id": str(conversation_id) if conversation_id else None,
@@ -2054,6 +2352,7 @@ class ConversationEngine:
             row_id = await self.store_message(
                 user_id, "assistant", assistant_msg, metadata={"lang": lang}
             )
+            self._schedule_summary(user_id)
             return row_id
         except Exception as exc:
             logger.error("Persistence failed: %s", exc)
@@ -2066,24 +2365,48 @@ class ConversationEngine:
         try:
             text = await self._call_openai_chat(messages, lang=lang, auth_user_id=auth_user_id, actions_out=actions, user_role=user_role)
             return text, actions
-        except httpx.TimeoutException:
-            return get_canned_response("timeout", lang), actions
-        except httpx.HTTPStatusError:
-            return get_canned_response("api_down", lang), actions
-        except RuntimeError as exc:
-            logger.error("GPT runtime error: %s", exc)
-            return get_canned_response("api_down", lang), actions
         except Exception as exc:
-            logger.error("GPT unexpected error: %s", exc)
-            return get_canned_response("general_error", lang), actions
+            return self._fallback_reply(exc, lang), actions
 
-    async def public_chat_reply(self, messages: list[dict], lang: str = "en") -> str:
-        """Stateless OpenAI call with NO tools and NO persistence.
-
-        Used by the anonymous landing-page chat. Safe to expose without auth.
-        """
-        if not OPENAI_API_KEY:
+    @staticmethod
+    def _fallback_reply(exc: Exception, lang: str) -> str:
+        """Canned reply for a failed model call."""
+        if isinstance(exc, httpx.TimeoutException):
+            return get_canned_response("timeout", lang)
+        if isinstance(exc, httpx.HTTPStatusError):
+            return get_canned_response("api_down", lang)
+        if isinstance(exc, RuntimeError):
+            logger.error("GPT runtime error: %s", exc)
             return get_canned_response("api_down", lang)
+        logger.error("GPT unexpected error: %s", exc)
+        return get_canned_response("general_error", lang)
+
+    # Instructions for the anonymous landing-page chat (/api/ai/public_chat).
+    _PUBLIC_CHAT_PROMPT = (
+        "You are talking to an anonymous visitor on the FoodMaps landing page. "
+        "They are not signed in. Do NOT call any tools. Do NOT ask for or reference "
+        "their account, pickups, listings, or reminders. Answer general questions about "
+        "how FoodMaps works, food sharing, food safety, and community impact. "
+        "Keep replies concise (2-4 sentences) and friendly. If they need account-specific "
+        "help, politely suggest they sign up or sign in."
+    )
+
+    def public_chat_messages(self, message: str, lang: str) -> list[dict]:
+        """Prompt for one anonymous landing-page question."""
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "system", "content": self._PUBLIC_CHAT_PROMPT},
+            {"role": "user", "content": message},
+        ]
+        if lang == "es":
+            messages.insert(1, {
+                "role": "system",
+                "content": "The user wrote in Spanish. Respond entirely in Spanish.",
+            })
+        return messages
+
+    async def _public_completion(self, messages: list[dict]) -> str:
+        """One tool-free completion; raises on failure or an empty reply."""
         payload = {
             "model": CHAT_MODEL,
             "messages": messages,
@@ -2094,22 +2417,77 @@ class ConversationEngine:
             "Authorization": f"Bearer {OPENAI_API_KEY}",
             "Content-Type": "application/json",
         }
-        try:
-            resp = await _openai_with_retry(
-                "POST",
-                f"{OPENAI_BASE_URL}/chat/completions",
-                headers=headers,
-                json_payload=payload,
-            )
-            data = resp.json()
-            return data["choices"][0]["message"].get("content", "").strip() or get_canned_response("general_error", lang)
-        except httpx.TimeoutException:
+        resp = await _openai_with_retry(
+            "POST",
+            f"{OPENAI_BASE_URL}/chat/completions",
+            headers=headers,
+            json_payload=payload,
+        )
+        data = resp.json()
+        text = (data["choices"][0]["message"].get("content") or "").strip()
+        if not text:
+            raise ValueError("empty completion")
+        return text
+
+    @staticmethod
+    def _public_fallback(exc: Exception, lang: str) -> str:
+        if isinstance(exc, httpx.TimeoutException):
             return get_canned_response("timeout", lang)
-        except httpx.HTTPStatusError:
+        if isinstance(exc, httpx.HTTPStatusError):
+            return get_canned_response("api_down", lang)
+        logger.error("public_chat_reply error: %s", exc)
+        return get_canned_response("general_error", lang)
+
+    async def public_chat_reply(self, messages: list[dict], lang: str = "en") -> str:
+        """Stateless OpenAI call with NO tools and NO persistence.
+
+        Used by the anonymous landing-page chat. Safe to expose without auth.
+        """
+        if not OPENAI_API_KEY:
             return get_canned_response("api_down", lang)
+        try:
+            return await self._public_completion(messages)
+        except Exception as exc:
+            return self._public_fallback(exc, lang)
+
+    async def cached_public_reply(self, messages: list[dict], lang: str = "en") -> str:
+        """``public_chat_reply`` through ``public_reply_cache``.
+
+        Canned error replies are returned but never cached, so the next
+        visitor retries upstream.
+        """
+        if not OPENAI_API_KEY:
+            return get_canned_response("api_down", lang)
+        try:
+            return await public_reply_cache.get_or_create(
+                reply_key(messages, lang), lambda: self._public_completion(messages),
+            )
         except Exception as exc:
-            logger.error("public_chat_reply error: %s", exc)
-            return get_canned_response("general_error", lang)
+            return self._public_fallback(exc, lang)
+
+    async def prewarm_public_replies(self) -> int:
+        """Answer the ``faq`` questions from the training data ahead of visitors.
+
+        Runs one question at a time so a cold start does not burst the
+        OpenAI quota. Returns how many replies were cached.
+        """
+        warmed = 0
+        for question in self.training_data.get("faq") or []:
+            question = str(question or "").strip()
+            if not question or not OPENAI_API_KEY:
+                continue
+            lang = self._detect_lang(question)
+            messages = self.public_chat_messages(question, lang)
+            key = reply_key(messages, lang)
+            if public_reply_cache.get(key) is not None:
+                continue
+            try:
+                await public_reply_cache.get_or_create(key, lambda: self._public_completion(messages))
+                warmed += 1
+            except Exception as exc:
+                logger.warning("Public reply prewarm stopped at %r: %s", question, exc)
+                break
+        return warmed
 
     @staticmethod
     def _needs_tools(_message: str) -> bool:
@@ -2138,6 +2516,9 @@ class ConversationEngine:
         "create_reminder",
     })
 
+    # Tool rounds per turn; see _call_openai_chat.
+    MAX_TOOL_ROUNDS = 3
+
     async def _call_openai_chat(self, messages: list[dict], lang: str = "en", auth_user_id: Optional[int] = None, actions_out: Optional[list] = None, user_role: Optional[str] = None) -> str:
         if not OPENAI_API_KEY:
             raise RuntimeError("OPENAI_API_KEY not configured")
@@ -2186,150 +2567,11 @@ class ConversationEngine:
         # attached and could only apologize in text — the listing would
         # silently fail. With up to 3 rounds the model can self-correct
         # once or twice (e.g. retry post_food_listing with a fuller
-        # address) before giving up.
-        MAX_TOOL_ROUNDS = 3
+        # address) before giving up (MAX_TOOL_ROUNDS).
         round_idx = 0
-        while msg.get("tool_calls") and round_idx < MAX_TOOL_ROUNDS:
+        while msg.get("tool_calls") and round_idx < self.MAX_TOOL_ROUNDS:
             round_idx += 1
-            tool_messages = list(messages)
-            tool_messages.append(msg)
-            for tool_call in msg["tool_calls"]:
-                fn_name = tool_call["function"]["name"]
-                try:
-                    fn_args = json.loads(tool_call["function"]["arguments"])
-                except (json.JSONDecodeError, TypeError) as parse_err:
-                    tool_messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call["id"],
-                        "content": json.dumps({"error": f"Invalid arguments: {parse_err}"}),
-                    })
-                    continue
-                # Security: the AI must never operate on another user's
-                # behalf. Whenever a tool call carries a `user_id` argument,
-                # force it to the authenticated user so prompt-injection
-                # (or a hallucinated id) cannot pivot to another account.
-                # This covers BOTH read tools (profile, dashboard, history,
-                # pickups) and write tools (claim, cancel, update, post).
-                if not isinstance(fn_args, dict):
-                    fn_args = {}
-                if auth_user_id is not None and "user_id" in fn_args:
-                    fn_args["user_id"] = str(auth_user_id)
-                # run_safe_query: force a caller-scoped filter on any entity
-                # that has a user column, so the model can't enumerate other
-                # users' listings/requests or read the users table freely.
-                if fn_name == "run_safe_query" and auth_user_id is not None:
-                    fn_args = _scope_safe_query(fn_args, auth_user_id)
-                try:
-                    result = await self._execute_tool(fn_name, fn_args)
-                except Exception:
-                    # Log full traceback server-side; surface a generic
-                    # message so internal exception text doesn't reach
-                    # the user via the AI's reply.
-                    logger.exception("Tool %s failed", fn_name)
-                    result = {"error": True, "message": f"{fn_name} failed. Please try again."}
-
-                # Trace tool calls so we can debug why the model picked a tool.
-                # PII scrub: address / phone / allergen / dietary fields can
-                # contain personal data. Only log a hash + the non-PII keys.
-                try:
-                    _PII_KEYS = {
-                        "address", "phone", "phone_number", "email",
-                        "allergens", "dietary_tags", "dietary_restrictions",
-                        "name", "message", "comment", "description",
-                    }
-                    safe_args = {
-                        k: ("<redacted>" if k in _PII_KEYS else v)
-                        for k, v in fn_args.items()
-                        if k != "user_id"
-                    }
-                    logger.info(
-                        "AI tool call: %s args=%s ok=%s",
-                        fn_name,
-                        safe_args,
-                        not (isinstance(result, dict) and result.get("error")),
-                    )
-                except Exception:
-                    pass
-
-                # Record this tool call so the UI can surface progress /
-                # done indicators (claiming, listing posted, etc.).
-                if actions_out is not None and isinstance(result, dict):
-                    err_val = result.get("error")
-                    ok = not err_val
-                    # Previously we suppressed "Listing not found" chips on
-                    # claim_listing/confirm_claim/cancel_claim assuming the
-                    # chat reply would explain. In practice the model
-                    # sometimes stays silent, leaving the user with zero
-                    # feedback after a failed claim. Always surface the
-                    # chip — even a "✗ Listing not found" chip is better
-                    # than total silence.
-                    if True:
-                        summary_val = result.get("summary")
-                        if not summary_val and err_val:
-                            summary_val = err_val if isinstance(err_val, str) else None
-                        entry = {
-                            "tool": fn_name,
-                            "ok": bool(ok),
-                            "summary": summary_val,
-                            "listing_id": result.get("listing_id"),
-                        }
-                        # Forward extra UI-control fields (navigate_ui / show_map)
-                        # so the frontend can act on them without another roundtrip.
-                        for extra_key in ("action", "target", "view", "focus"):
-                            if extra_key in result and result[extra_key] is not None:
-                                entry[extra_key] = result[extra_key]
-                        # show_route_to_listing returns a `route` envelope
-                        # (origin/destination/geometry) that the frontend
-                        # draws on the map. Forward it as-is.
-                        if isinstance(result.get("route"), dict):
-                            entry["route"] = result["route"]
-                        # Forward coords + verification status from
-                        # post_food_listing so app.js can fly the map to the
-                        # new pin even if a follow-up refreshForUser() fetch
-                        # fails (network blip, slow DB, expired token). We
-                        # don't want a transient fetch failure to leave the
-                        # donor staring at an unmoved map after a successful
-                        # post.
-                        for extra_key in ("coords_lat", "coords_lng", "address", "verified", "verify_issues", "duplicate_of_recent"):
-                            if extra_key in result and result[extra_key] is not None:
-                                entry[extra_key] = result[extra_key]
-                        actions_out.append(entry)
-
-                result_str = json.dumps(result, default=str)
-                if len(result_str) > 4000:
-                    # For bulk operations, the per-row `results` array can be
-                    # huge. Drop it and keep the summary so the AI can still
-                    # report success/failure counts without blowing the
-                    # context window. For other tools, return a clean,
-                    # structured stub (valid JSON) instead of a mid-string
-                    # truncation that would corrupt the model's view of the
-                    # tool result.
-                    if isinstance(result, dict) and isinstance(result.get("results"), list):
-                        trimmed = {k: v for k, v in result.items() if k != "results"}
-                        trimmed["results_omitted"] = len(result["results"])
-                        result_str = json.dumps(trimmed, default=str)
-                    if len(result_str) > 4000:
-                        stub: dict = {"truncated": True, "original_size": len(result_str)}
-                        if isinstance(result, dict):
-                            for k in ("success", "error", "summary", "listing_id", "count"):
-                                if k in result:
-                                    val = result[k]
-                                    # Carry-over fields like `error` /
-                                    # `summary` can themselves be huge;
-                                    # clip each to keep the stub bounded.
-                                    if isinstance(val, str) and len(val) > 500:
-                                        val = val[:500] + "..."
-                                    stub[k] = val
-                        result_str = json.dumps(stub, default=str)
-                        # Final hard cap — even with the per-field clip
-                        # above, an exotic payload could still exceed 4k.
-                        if len(result_str) > 4000:
-                            result_str = result_str[:4000]
-                tool_messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call["id"],
-                    "content": result_str,
-                })
+            tool_messages = await self._execute_tool_round(msg, messages, auth_user_id, actions_out)
 
             followup_payload = {
                 "model": FOLLOWUP_MODEL,
@@ -2361,6 +2603,337 @@ class ConversationEngine:
 
         return msg.get("content") or ""
 
+    async def _openai_chat_stream(self, payload: dict, headers: dict):
+        """Yield ``("delta", text)`` per content chunk, then ``("message", msg)``.
+
+        ``msg`` is the assembled assistant message, streamed ``tool_calls``
+        included, in the same shape as a non-streamed response. If the
+        stream can't be opened (429, 5xx, connection error) the request is
+        retried without streaming through ``_openai_with_retry`` and its
+        content arrives as a single delta.
+        """
+        if not _circuit.allow_request():
+            raise RuntimeError(
+                "OpenAI circuit breaker is open — too many recent failures, refusing to call upstream"
+            )
+        url = f"{OPENAI_BASE_URL}/chat/completions"
+        content: list[str] = []
+        tool_calls: dict[int, dict] = {}
+        fallback = False
+        try:
+            async with _get_http_client(TIMEOUT_SECONDS).stream(
+                "POST", url, headers=headers, json={**payload, "stream": True},
+            ) as resp:
+                if resp.status_code == 429 or resp.status_code >= 500:
+                    _circuit.record_failure()
+                    fallback = True
+                else:
+                    if resp.status_code >= 400:
+                        await resp.aread()
+                        resp.raise_for_status()
+                    async for line in resp.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            chunk = json.loads(data)
+                        except ValueError:
+                            continue
+                        for choice in chunk.get("choices") or []:
+                            delta = choice.get("delta") or {}
+                            if delta.get("content"):
+                                content.append(delta["content"])
+                                yield "delta", delta["content"]
+                            for tc in delta.get("tool_calls") or []:
+                                slot = tool_calls.setdefault(tc.get("index", 0), {
+                                    "id": None, "type": "function",
+                                    "function": {"name": "", "arguments": ""},
+                                })
+                                if tc.get("id"):
+                                    slot["id"] = tc["id"]
+                                fn = tc.get("function") or {}
+                                slot["function"]["name"] += fn.get("name") or ""
+                                slot["function"]["arguments"] += fn.get("arguments") or ""
+        except (httpx.TimeoutException, httpx.RequestError) as exc:
+            _circuit.record_failure()
+            if content or tool_calls:
+                raise
+            logger.warning("Chat stream failed to open (%s); retrying without streaming", exc)
+            fallback = True
+
+        if fallback:
+            resp = await _openai_with_retry("POST", url, headers=headers, json_payload=payload)
+            try:
+                msg = resp.json()["choices"][0]["message"]
+            except (ValueError, KeyError, IndexError, TypeError) as exc:
+                raise RuntimeError(f"Malformed OpenAI chat response: {exc}") from exc
+            if msg.get("content"):
+                yield "delta", msg["content"]
+            yield "message", msg
+            return
+
+        _circuit.record_success()
+        msg: dict = {"role": "assistant", "content": "".join(content) or None}
+        if tool_calls:
+            msg["tool_calls"] = [tool_calls[i] for i in sorted(tool_calls)]
+        yield "message", msg
+
+    async def _stream_openai_turn(
+        self, messages: list[dict], lang: str, auth_user_id: Optional[int],
+        actions_out: list, user_role: Optional[str] = None,
+    ):
+        """Streaming counterpart of ``_call_openai_chat``.
+
+        Yields ``("delta", text)`` as the model writes, ``("tool", {...})``
+        when a tool call starts and ``("action", entry)`` when it finishes.
+        """
+        if not OPENAI_API_KEY:
+            raise RuntimeError("OPENAI_API_KEY not configured")
+        tools_for_call = self._tools_for_role(user_role)
+        headers = {
+            "Authorization": f"Bearer {OPENAI_API_KEY}",
+            "Content-Type": "application/json",
+        }
+        model = CHAT_MODEL
+        wrote = False
+        for round_idx in range(self.MAX_TOOL_ROUNDS + 1):
+            payload = {
+                "model": model,
+                "messages": messages,
+                "temperature": 0.7,
+                "max_tokens": 1024,
+                "tools": tools_for_call,
+            }
+            msg: dict = {}
+            separate = wrote
+            try:
+                async for kind, value in self._openai_chat_stream(payload, headers):
+                    if kind == "message":
+                        msg = value
+                        continue
+                    if separate:
+                        # Text from an earlier round is already on screen.
+                        yield "delta", "\n\n"
+                        separate = False
+                    wrote = True
+                    yield "delta", value
+            except Exception as exc:
+                if round_idx == 0:
+                    raise
+                logger.error("Follow-up failed: %s", exc)
+                yield "delta", ("\n\n" if wrote else "") + get_canned_response("tool_error", lang)
+                return
+            if not msg.get("tool_calls") or round_idx == self.MAX_TOOL_ROUNDS:
+                return
+            for tool_call in msg["tool_calls"]:
+                yield "tool", {"tool": tool_call["function"]["name"]}
+            before = len(actions_out)
+            messages = await self._execute_tool_round(msg, messages, auth_user_id, actions_out)
+            for entry in actions_out[before:]:
+                yield "action", entry
+            model = FOLLOWUP_MODEL
+
+    async def chat_stream(
+        self,
+        user_id: int,
+        message: str,
+        include_audio: bool = False,
+        lang_hint: Optional[str] = None,
+    ):
+        """Streaming ``chat()``: yields ``(event, data)`` pairs for SSE.
+
+        ``start`` (reply language), ``delta`` (a chunk of reply text),
+        ``tool`` / ``action`` (a tool call starting / finished, the latter
+        shaped like an ``actions`` entry) and finally ``done`` carrying the
+        same payload ``chat()`` returns. The exchange is persisted after the
+        reply is complete; if the client disconnects first, whatever was
+        written so far is still stored.
+        """
+        messages, lang, profile = await self._build_turn(user_id, message, lang_hint)
+        yield "start", {"lang": lang}
+        actions: list[dict] = []
+        parts: list[str] = []
+        persisting = False
+        try:
+            try:
+                async for event, data in self._stream_openai_turn(
+                    messages, lang, user_id, actions, (profile or {}).get("role"),
+                ):
+                    if event == "delta":
+                        parts.append(data)
+                    yield event, data
+            except Exception as exc:
+                fallback = self._fallback_reply(exc, lang)
+                if parts:
+                    fallback = "\n\n" + fallback
+                parts.append(fallback)
+                yield "delta", fallback
+            persisting = True
+            payload = await self._finish_turn(user_id, message, "".join(parts), actions, lang, include_audio)
+            yield "done", payload
+        finally:
+            if not persisting and parts:
+                task = asyncio.create_task(self._persist_conversation(user_id, message, "".join(parts), lang))
+                self._persist_tasks.add(task)
+                task.add_done_callback(self._persist_task_done)
+
+    def _persist_task_done(self, task: asyncio.Task) -> None:
+        self._persist_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Saving an interrupted stream failed: %s", task.exception())
+
+    async def _execute_tool_round(
+        self, msg: dict, messages: list[dict], auth_user_id: Optional[int], actions_out: Optional[list],
+    ) -> list[dict]:
+        """Run one round of ``msg``'s tool calls; returns ``messages`` plus the results."""
+        tool_messages = list(messages)
+        tool_messages.append(msg)
+        # Parse and scope every call first, then run the round: read-only
+        # tools concurrently, mutating ones in order (see _run_tool_calls).
+        calls = []
+        for tool_call in msg["tool_calls"]:
+            fn_name = tool_call["function"]["name"]
+            try:
+                fn_args = json.loads(tool_call["function"]["arguments"])
+            except (json.JSONDecodeError, TypeError) as parse_err:
+                calls.append((tool_call, fn_name, None, parse_err))
+                continue
+            # Security: the AI must never operate on another user's
+            # behalf. Whenever a tool call carries a `user_id` argument,
+            # force it to the authenticated user so prompt-injection
+            # (or a hallucinated id) cannot pivot to another account.
+            # This covers BOTH read tools (profile, dashboard, history,
+            # pickups) and write tools (claim, cancel, update, post).
+            if not isinstance(fn_args, dict):
+                fn_args = {}
+            if auth_user_id is not None and "user_id" in fn_args:
+                fn_args["user_id"] = str(auth_user_id)
+            # run_safe_query: force a caller-scoped filter on any entity
+            # that has a user column, so the model can't enumerate other
+            # users' listings/requests or read the users table freely.
+            if fn_name == "run_safe_query" and auth_user_id is not None:
+                fn_args = _scope_safe_query(fn_args, auth_user_id)
+            calls.append((tool_call, fn_name, fn_args, None))
+
+        outcomes = await self._run_tool_calls([(name, args) for _, name, args, _ in calls])
+        for (tool_call, fn_name, fn_args, parse_err), outcome in zip(calls, outcomes):
+            if parse_err is not None:
+                tool_messages.append({
+                    "role": "tool",
+                    "tool_call_id": tool_call["id"],
+                    "content": json.dumps({"error": f"Invalid arguments: {parse_err}"}),
+                })
+                continue
+            result, latency_ms = outcome
+
+            # Trace tool calls so we can debug why the model picked a tool.
+            # PII scrub: address / phone / allergen / dietary fields can
+            # contain personal data. Only log a hash + the non-PII keys.
+            try:
+                _PII_KEYS = {
+                    "address", "phone", "phone_number", "email",
+                    "allergens", "dietary_tags", "dietary_restrictions",
+                    "name", "message", "comment", "description",
+                }
+                safe_args = {
+                    k: ("<redacted>" if k in _PII_KEYS else v)
+                    for k, v in fn_args.items()
+                    if k != "user_id"
+                }
+                logger.info(
+                    "AI tool call: %s args=%s ok=%s latency_ms=%d",
+                    fn_name,
+                    safe_args,
+                    not (isinstance(result, dict) and result.get("error")),
+                    latency_ms,
+                )
+            except Exception:
+                pass
+
+            # Record this tool call so the UI can surface progress /
+            # done indicators (claiming, listing posted, etc.).
+            if actions_out is not None and isinstance(result, dict):
+                err_val = result.get("error")
+                ok = not err_val
+                # Previously we suppressed "Listing not found" chips on
+                # claim_listing/confirm_claim/cancel_claim assuming the
+                # chat reply would explain. In practice the model
+                # sometimes stays silent, leaving the user with zero
+                # feedback after a failed claim. Always surface the
+                # chip — even a "✗ Listing not found" chip is better
+                # than total silence.
+                if True:
+                    summary_val = result.get("summary")
+                    if not summary_val and err_val:
+                        summary_val = err_val if isinstance(err_val, str) else None
+                    entry = {
+                        "tool": fn_name,
+                        "ok": bool(ok),
+                        "summary": summary_val,
+                        "listing_id": result.get("listing_id"),
+                        "latency_ms": latency_ms,
+                    }
+                    # Forward extra UI-control fields (navigate_ui / show_map)
+                    # so the frontend can act on them without another roundtrip.
+                    for extra_key in ("action", "target", "view", "focus"):
+                        if extra_key in result and result[extra_key] is not None:
+                            entry[extra_key] = result[extra_key]
+                    # show_route_to_listing returns a `route` envelope
+                    # (origin/destination/geometry) that the frontend
+                    # draws on the map. Forward it as-is.
+                    if isinstance(result.get("route"), dict):
+                        entry["route"] = result["route"]
+                    # Forward coords + verification status from
+                    # post_food_listing so app.js can fly the map to the
+                    # new pin even if a follow-up refreshForUser() fetch
+                    # fails (network blip, slow DB, expired token). We
+                    # don't want a transient fetch failure to leave the
+                    # donor staring at an unmoved map after a successful
+                    # post.
+                    for extra_key in ("coords_lat", "coords_lng", "address", "verified", "verify_issues", "duplicate_of_recent"):
+                        if extra_key in result and result[extra_key] is not None:
+                            entry[extra_key] = result[extra_key]
+                    actions_out.append(entry)
+
+            result_str = json.dumps(result, default=str)
+            if len(result_str) > 4000:
+                # For bulk operations, the per-row `results` array can be
+                # huge. Drop it and keep the summary so the AI can still
+                # report success/failure counts without blowing the
+                # context window. For other tools, return a clean,
+                # structured stub (valid JSON) instead of a mid-string
+                # truncation that would corrupt the model's view of the
+                # tool result.
+                if isinstance(result, dict) and isinstance(result.get("results"), list):
+                    trimmed = {k: v for k, v in result.items() if k != "results"}
+                    trimmed["results_omitted"] = len(result["results"])
+                    result_str = json.dumps(trimmed, default=str)
+                if len(result_str) > 4000:
+                    stub: dict = {"truncated": True, "original_size": len(result_str)}
+                    if isinstance(result, dict):
+                        for k in ("success", "error", "summary", "listing_id", "count"):
+                            if k in result:
+                                val = result[k]
+                                # Carry-over fields like `error` /
+                                # `summary` can themselves be huge;
+                                # clip each to keep the stub bounded.
+                                if isinstance(val, str) and len(val) > 500:
+                                    val = val[:500] + "..."
+                                stub[k] = val
+                    result_str = json.dumps(stub, default=str)
+                    # Final hard cap — even with the per-field clip
+                    # above, an exotic payload could still exceed 4k.
+                    if len(result_str) > 4000:
+                        result_str = result_str[:4000]
+            tool_messages.append({
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "content": result_str,
+            })
+        return tool_messages
+
     # ---- Whisper + TTS ---------------------------------------------------
 
     async def transcribe_audio(self, audio_bytes: bytes, filename: str = "audio.webm") -> str:
@@ -2377,11 +2950,15 @@ class ConversationEngine:
         )
         return resp.json()["text"]
 
+    @staticmethod
+    def _speech_request(text: str, lang: str) -> tuple[str, str]:
+        """``(input, voice)`` exactly as sent to the TTS endpoint."""
+        return text[:4096], TTS_VOICE_ES if lang == "es" else TTS_VOICE_EN
+
     async def generate_speech(self, text: str, lang: str = "en") -> bytes:
         if not OPENAI_API_KEY:
             raise RuntimeError("OPENAI_API_KEY not configured")
-        truncated = text[:4096]
-        voice = TTS_VOICE_ES if lang == "es" else TTS_VOICE_EN
+        truncated, voice = self._speech_request(text, lang)
         headers = {
             "Authorization": f"Bearer {OPENAI_API_KEY}",
             "Content-Type": "application/json",
@@ -2395,13 +2972,70 @@ class ConversationEngine:
         )
         return resp.content
 
-    async def _generate_audio_b64(self, text: str, lang: str = "en") -> Optional[str]:
-        """Return the TTS audio as a base64 data URL (no external storage needed)."""
+    def speech_key(self, text: str, lang: str = "en") -> str:
+        truncated, voice = self._speech_request(text, lang)
+        return make_speech_key(truncated, voice, TTS_MODEL)
+
+    async def speech_url(self, text: str, lang: str = "en") -> str:
+        """URL of the cached clip for ``text``; synthesizes it on a miss."""
+        key = self.speech_key(text, lang)
+        await speech_cache.get_or_create(key, lambda: self.generate_speech(text, lang=lang))
+        return speech_audio_url(key)
+
+    async def stream_speech(self, text: str, lang: str = "en", chunk_size: int = 16384):
+        """Yield MP3 bytes as OpenAI produces them, caching the finished clip.
+
+        A cached clip is read straight from disk. Otherwise the upstream
+        response is relayed chunk by chunk, so playback can start before
+        synthesis finishes, and the clip is stored once it arrives complete.
+        """
+        key = self.speech_key(text, lang)
+        loop = asyncio.get_running_loop()
+        path = await loop.run_in_executor(None, speech_cache.get, key)
+        if path is not None:
+            with open(path, "rb") as fh:
+                while True:
+                    chunk = await loop.run_in_executor(None, fh.read, chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+        if not OPENAI_API_KEY:
+            raise RuntimeError("OPENAI_API_KEY not configured")
+        if not _circuit.allow_request():
+            raise RuntimeError("OpenAI circuit breaker is open — refusing to call upstream")
+        truncated, voice = self._speech_request(text, lang)
+        headers = {
+            "Authorization": f"Bearer {OPENAI_API_KEY}",
+            "Content-Type": "application/json",
+        }
+        parts: list[bytes] = []
+        try:
+            async with _get_http_client(30).stream(
+                "POST",
+                f"{OPENAI_BASE_URL}/audio/speech",
+                headers=headers,
+                json={"model": TTS_MODEL, "input": truncated, "voice": voice},
+            ) as resp:
+                if resp.status_code == 429:
+                    raise OpenAIRateLimitError("OpenAI 429 rate limit on TTS stream")
+                resp.raise_for_status()
+                async for chunk in resp.aiter_bytes(chunk_size):
+                    parts.append(chunk)
+                    yield chunk
+        except (httpx.TimeoutException, httpx.RequestError, OpenAIRateLimitError):
+            _circuit.record_failure()
+            raise
+        _circuit.record_success()
+        if parts:
+            try:
+                await loop.run_in_executor(None, speech_cache.put, key, b"".join(parts))
+            except OSError as exc:
+                logger.warning("Could not cache streamed speech: %s", exc)
+
+    async def _generate_audio_url(self, text: str, lang: str = "en") -> Optional[str]:
+        """URL of the reply's TTS audio, or None when synthesis fails."""
         try:
-            audio_bytes = await self.generate_speech(text, lang=lang)
-            import base64
-            b64 = base64.b64encode(audio_bytes).decode("ascii")
-            return f"data:audio/mpeg;base64,{b64}"
+            return await self.speech_url(text, lang=lang)
         except Exception as exc:
             logger.warning("Audio generation failed: %s", exc)
             return None
@@ -0,0 +1,155 @@
+"""
+Token-budgeted prompt assembly for chat turns.
+
+A chat prompt is the system prompt, a handful of static and per-user system
+blocks, the replayed conversation and the new message. The replay used to
+be the last 12 ``AIConversation`` rows, 4000 characters each, whatever that
+added up to. Long bulk-import summaries could push a turn far past the
+model's useful context.
+
+``ContextBuilder`` counts every segment and gives the conversation only what
+is left of ``AI_CONTEXT_TOKEN_BUDGET`` after the fixed segments. Recent
+turns are kept newest-first until the budget runs out. Older turns are not
+replayed verbatim: ``ConversationEngine.refresh_summary`` folds them into one
+stored ``AIConversationSummary`` per user. That runs as a background task
+after a turn is persisted, never on the request path. The summary is replayed
+as a single system message in place of the rows it covers.
+
+Rows newer than the summary's ``through_id`` are replayed as usual. The
+newest ``AI_SUMMARY_KEEP_RECENT`` rows are never folded, and folding waits
+until ``AI_SUMMARY_BATCH`` older rows have piled up, so the summarizer runs
+once every few turns rather than on every turn. One pass folds at most
+``AI_SUMMARY_MAX_FOLD`` rows, oldest first: a long history that predates
+summaries is caught up over the next few turns instead of being sent to the
+summarizer in one request.
+"""
+from __future__ import annotations
+
+import os
+from typing import Callable, Optional, Sequence
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "12000"))
+HISTORY_FETCH_LIMIT = int(os.getenv("AI_HISTORY_LIMIT", "24"))
+SUMMARY_KEEP_RECENT = int(os.getenv("AI_SUMMARY_KEEP_RECENT", "8"))
+SUMMARY_BATCH = int(os.getenv("AI_SUMMARY_BATCH", "8"))
+SUMMARY_MAX_TOKENS = int(os.getenv("AI_SUMMARY_MAX_TOKENS", "400"))
+SUMMARY_MAX_FOLD = int(os.getenv("AI_SUMMARY_MAX_FOLD", "40"))
+
+# A replayed message is cut here even when the budget would allow more;
+# enough for a bulk-import summary with the listing IDs the next turn needs.
+HISTORY_MESSAGE_MAX_CHARS = 4000
+# Rows are cut harder when shown to the summarizer.
+SUMMARY_INPUT_MAX_CHARS = 1500
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a FoodMaps user "
+    "and the FoodMaps assistant. Merge the new messages into the previous "
+    "summary. Keep every concrete fact the assistant may need later: listing, "
+    "request and reminder IDs, what was claimed, posted or scheduled, "
+    "addresses and times, dietary needs, stated preferences and unresolved "
+    "questions. Drop greetings and small talk. Write plain sentences in "
+    "English, at most 200 words, and respond ONLY with the summary."
+)
+
+
+def clip_message(text: Optional[str], limit: int = HISTORY_MESSAGE_MAX_CHARS) -> str:
+    # message is NOT NULL at the DB layer, but a stray None (legacy row,
+    # manual SQL) must not tank the whole turn.
+    text = text or ""
+    if len(text) > limit:
+        return text[:limit] + "... [truncated]"
+    return text
+
+
+def summary_message(summary: str) -> dict:
+    return {
+        "role": "system",
+        "content": f"Summary of the earlier conversation with this user:\n{summary}",
+    }
+
+
+def rows_to_fold(rows: Sequence[dict]) -> list[dict]:
+    """Unsummarized rows (oldest first) that are due to be folded, or [].
+
+    At most ``SUMMARY_MAX_FOLD`` rows are returned; the rest wait for the
+    next pass.
+    """
+    foldable = list(rows[:max(0, len(rows) - SUMMARY_KEEP_RECENT)])
+    return foldable[:SUMMARY_MAX_FOLD] if len(foldable) >= SUMMARY_BATCH else []
+
+
+def summary_request(previous: Optional[str], rows: Sequence[dict]) -> list[dict]:
+    """Messages asking the model to fold ``rows`` into ``previous``."""
+    lines = [
+        f"{r['role']}: {clip_message(r.get('message'), SUMMARY_INPUT_MAX_CHARS)}"
+        for r in rows
+    ]
+    body = (
+        f"Previous summary:\n{previous or '(none)'}\n\n"
+        "New messages:\n" + "\n".join(lines)
+    )
+    return [
+        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": body},
+    ]
+
+
+class ContextBuilder:
+    """Collects prompt segments and fits the conversation under a budget."""
+
+    def __init__(self, count: Callable[[str], int], budget: int = CONTEXT_TOKEN_BUDGET):
+        self.count = count
+        self.budget = budget
+        self._head: list[tuple[str, dict, int]] = []
+
+    def add(self, name: str, content: str, tokens: Optional[int] = None, role: str = "system") -> None:
+        """Append a fixed segment; ``tokens`` skips counting a cached block."""
+        if tokens is None:
+            tokens = self.count(content)
+        self._head.append((name, {"role": role, "content": content}, tokens))
+
+    def build(
+        self, history: Sequence[dict], message: str, summary: Optional[str] = None,
+    ) -> tuple[list[dict], dict[str, int]]:
+        """Prompt messages and a per-segment token breakdown.
+
+        ``history`` is oldest first, with ``role`` and ``message`` keys.
+        Fixed segments and the new message are always included. The summary
+        goes in next if it fits, then the newest history rows that fit.
+        """
+        breakdown: dict[str, int] = {}
+        for name, _, tokens in self._head:
+            breakdown[name] = breakdown.get(name, 0) + tokens
+        message_tokens = self.count(message)
+        remaining = self.budget - sum(breakdown.values()) - message_tokens
+
+        middle: list[dict] = []
+        if summary:
+            summary_msg = summary_message(summary)
+            tokens = self.count(summary_msg["content"])
+            if tokens <= remaining:
+                middle.append(summary_msg)
+                remaining -= tokens
+                breakdown["summary"] = tokens
+
+        kept: list[dict] = []
+        history_tokens = 0
+        for row in reversed(history):
+            content = clip_message(row.get("message"))
+            tokens = self.count(content)
+            if tokens > remaining:
+                break
+            kept.append({"role": row["role"], "content": content})
+            remaining -= tokens
+            history_tokens += tokens
+        kept.reverse()
+
+        breakdown["history"] = history_tokens
+        breakdown["history_dropped"] = len(history) - len(kept)
+        breakdown["message"] = message_tokens
+        messages = [m for _, m, _ in self._head] + middle + kept
+        messages.append({"role": "user", "content": message})
+        breakdown["total"] = sum(
+            v for k, v in breakdown.items() if k != "history_dropped"
+        )
+        return messages, breakdown
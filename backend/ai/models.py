@@ -3,6 +3,7 @@ AI-specific SQLAlchemy models, added to the main MySQL database.
 
 These replace the Supabase tables used by the original AI backend:
   - ai_conversations   -> AIConversation
+  - ai_conversation_summaries -> AIConversationSummary (rolling summary of older turns)
   - ai_reminders       -> AIReminder
   - ai_feedback        -> AIFeedback
 """
@@ -31,6 +32,21 @@ class AIConversation(Base):
     user = relationship("User", foreign_keys=[user_id])
 
 
+class AIConversationSummary(Base):
+    """Rolling summary of a user's older AIConversation rows.
+
+    Chat turns replay it in place of every row up to ``through_id``; it is
+    folded forward off the request path (see backend/ai/context.py).
+    """
+    __tablename__ = "ai_conversation_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    summary = Column(Text, nullable=False)
+    through_id = Column(Integer, nullable=False, default=0)  # last ai_conversations.id folded in
+    message_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class AIReminder(Base):
     """Reminders scheduled by the AI (SMS + in-app)."""
     __tablename__ = "ai_reminders"
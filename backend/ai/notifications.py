@@ -22,9 +22,11 @@ import asyncio
 import json
 import logging
 import os
+import time
 import uuid
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Iterable, Optional
 
 logger = logging.getLogger("ai_notifications")
 
@@ -35,6 +37,10 @@ BROADCAST_INTERVAL = int(os.getenv("AI_BROADCAST_INTERVAL", "3600"))
 BROADCAST_LOOKBACK_MIN = int(os.getenv("AI_BROADCAST_LOOKBACK_MIN", "75"))
 # Safety cap so a runaway job can't spam thousands of rows.
 BROADCAST_MAX_PER_RUN = int(os.getenv("AI_BROADCAST_MAX_PER_RUN", "500"))
+# Drafts personalised by the LLM at once, and the LLM token budget for one
+# run. Once the budget is spent the remaining drafts use the plain template.
+BROADCAST_DRAFT_CONCURRENCY = int(os.getenv("AI_BROADCAST_DRAFT_CONCURRENCY", "8"))
+BROADCAST_TOKEN_BUDGET = int(os.getenv("AI_BROADCAST_TOKEN_BUDGET", "150000"))
 # If True, approved broadcasts auto-send without a human click.  Default False
 # (per product spec: "Admin approves broadcasts").
 AI_BROADCAST_AUTO_APPROVE = os.getenv("AI_BROADCAST_AUTO_APPROVE", "0") in ("1", "true", "yes")
@@ -65,7 +71,9 @@ def _as_lower_set(value) -> set[str]:
         return set()
     if isinstance(value, str):
         value = _safe_json_loads(value) or [v.strip() for v in value.split(",")]
-    if isinstance(value, (list, tuple, set)):
+    # Any non-mapping collection: JSON lists from the columns, and the
+    # frozensets RecipientProfile already holds.
+    if isinstance(value, Iterable) and not isinstance(value, (dict, bytes)):
         return {str(v).strip().lower() for v in value if str(v).strip()}
     return set()
 
@@ -105,6 +113,12 @@ def _allergen_conflict(user, food) -> bool:
     return bool(user_allergies & food_allergens)
 
 
+# Restrictions a listing must carry as a dietary tag to be sent to the user.
+_ENFORCED_RESTRICTIONS = frozenset({
+    "vegetarian", "vegan", "halal", "kosher", "gluten-free", "dairy-free", "nut-free",
+})
+
+
 def _dietary_conflict(user, food) -> bool:
     """A listing conflicts when the user has a restriction the listing does not satisfy.
 
@@ -114,25 +128,101 @@ def _dietary_conflict(user, food) -> bool:
     if not user_restrictions:
         return False
     food_tags = _as_lower_set(getattr(food, "dietary_tags", None))
-    for req in user_restrictions:
-        if req in {"vegetarian", "vegan", "halal", "kosher", "gluten-free",
-                   "dairy-free", "nut-free"}:
-            if req not in food_tags:
-                return True
-    return False
+    return bool((user_restrictions & _ENFORCED_RESTRICTIONS) - food_tags)
+
+
+def _food_category(food) -> Optional[str]:
+    food_cat = getattr(food, "category", None)
+    if food_cat is None:
+        return None
+    return (food_cat.value if hasattr(food_cat, "value") else str(food_cat)).lower()
 
 
 def _category_match(user, food) -> bool:
     prefs = _as_lower_set(getattr(user, "preferred_categories", None))
     if not prefs:
         return True  # user didn't narrow it down -> match everything
-    food_cat = getattr(food, "category", None)
-    if food_cat is None:
+    food_cat_str = _food_category(food)
+    if food_cat_str is None:
         return True
-    food_cat_str = (food_cat.value if hasattr(food_cat, "value") else str(food_cat)).lower()
     return food_cat_str in prefs
 
 
+# ---------------------------------------------------------------------------
+# Recipient matching
+#
+# The per-pair helpers above re-parse a user's JSON columns for every
+# listing. A run instead parses each user once into a RecipientProfile and
+# builds inverted indexes over them, so matching one listing is a handful
+# of set operations instead of a pass over every user.
+# ---------------------------------------------------------------------------
+
+class RecipientProfile:
+    """A user's notification preferences, parsed once per run."""
+
+    __slots__ = (
+        "id", "name", "language", "sms_ok", "allergies", "dietary_restrictions",
+        "categories", "household_size",
+    )
+
+    def __init__(self, user) -> None:
+        self.id = user.id
+        self.name = getattr(user, "name", None)
+        self.language = _user_prefers_language(user)
+        self.sms_ok = _user_sms_ok(user)
+        self.allergies = frozenset(_as_lower_set(getattr(user, "allergies", None)))
+        self.dietary_restrictions = frozenset(_as_lower_set(getattr(user, "dietary_restrictions", None)))
+        self.categories = frozenset(_as_lower_set(getattr(user, "preferred_categories", None)))
+        self.household_size = getattr(user, "household_size", None)
+
+
+class RecipientIndex:
+    """Opted-in recipients, indexed by category, allergen and required diet tag.
+
+    ``match(food)`` returns the same users, in id order, as checking
+    ``_allergen_conflict`` / ``_dietary_conflict`` / ``_category_match``
+    against every profile.
+    """
+
+    def __init__(self, profiles: Iterable[RecipientProfile]) -> None:
+        self.profiles: dict[int, RecipientProfile] = {}
+        self._all: set[int] = set()
+        self._any_category: set[int] = set()
+        self._by_category: dict[str, set[int]] = defaultdict(set)
+        self._by_allergen: dict[str, set[int]] = defaultdict(set)
+        self._by_required_tag: dict[str, set[int]] = defaultdict(set)
+        for p in profiles:
+            self.profiles[p.id] = p
+            self._all.add(p.id)
+            if p.categories:
+                for cat in p.categories:
+                    self._by_category[cat].add(p.id)
+            else:
+                self._any_category.add(p.id)
+            for allergen in p.allergies:
+                self._by_allergen[allergen].add(p.id)
+            for tag in p.dietary_restrictions & _ENFORCED_RESTRICTIONS:
+                self._by_required_tag[tag].add(p.id)
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    def match(self, food) -> list[int]:
+        category = _food_category(food)
+        if category is None:
+            ids = set(self._all)
+        else:
+            ids = self._any_category | self._by_category.get(category, set())
+        for allergen in _as_lower_set(getattr(food, "allergens", None)):
+            ids -= self._by_allergen.get(allergen, set())
+        food_tags = _as_lower_set(getattr(food, "dietary_tags", None))
+        for tag, users in self._by_required_tag.items():
+            if tag not in food_tags:
+                ids -= users
+        ids.discard(getattr(food, "donor_id", None))
+        return sorted(ids)
+
+
 # ---------------------------------------------------------------------------
 # Template drafting (fallback when OpenAI is unavailable / disabled)
 # ---------------------------------------------------------------------------
@@ -167,10 +257,33 @@ def _template_es(user_name: str, food, donor_name: str) -> str:
     )
 
 
-async def _ai_personalize(base_text: str, user, food, lang: str) -> str:
-    """Ask the LLM to lightly personalise the template. Falls back on error."""
+class _TokenBudget:
+    """LLM tokens one drafting run may still spend."""
+
+    # Reply allowance per draft: the prompt asks for <= 320 characters.
+    REPLY_TOKENS = 120
+
+    def __init__(self, tokens: int) -> None:
+        self.remaining = tokens
+        self.spent = 0
+        self.calls = 0
+
+    def spend(self, prompt_tokens: int) -> bool:
+        cost = prompt_tokens + self.REPLY_TOKENS
+        if cost > self.remaining:
+            return False
+        self.remaining -= cost
+        self.spent += cost
+        self.calls += 1
+        return True
+
+
+async def _ai_personalize(base_text: str, user, food, lang: str,
+                          budget: Optional[_TokenBudget] = None) -> str:
+    """Ask the LLM to lightly personalise the template. Falls back on error
+    or once the run's token ``budget`` is spent."""
     try:
-        from backend.ai.ai_engine import conversation_engine, OPENAI_API_KEY
+        from backend.ai.ai_engine import conversation_engine, count_tokens, OPENAI_API_KEY
     except Exception:
         return base_text
     if not OPENAI_API_KEY:
@@ -197,6 +310,8 @@ async def _ai_personalize(base_text: str, user, food, lang: str) -> str:
         f"Listing title: {getattr(food, 'title', '')}\n"
         f"User hints: {'; '.join(hints) if hints else 'none'}"
     )
+    if budget is not None and not budget.spend(count_tokens(system) + count_tokens(user_msg)):
+        return base_text
     try:
         reply = await conversation_engine.public_chat_reply(
             [{"role": "system", "content": system},
@@ -211,11 +326,12 @@ async def _ai_personalize(base_text: str, user, food, lang: str) -> str:
     return base_text
 
 
-async def _draft_message(user, food, donor_name: str) -> tuple[str, str]:
-    lang = _user_prefers_language(user)
+async def _draft_message(user, food, donor_name: str,
+                         budget: Optional[_TokenBudget] = None) -> tuple[str, str]:
+    lang = user.language if isinstance(user, RecipientProfile) else _user_prefers_language(user)
     base = _template_es(user.name, food, donor_name) if lang == "es" \
         else _template_en(user.name, food, donor_name)
-    refined = await _ai_personalize(base, user, food, lang)
+    refined = await _ai_personalize(base, user, food, lang, budget)
     return refined, lang
 
 
@@ -223,10 +339,30 @@ async def _draft_message(user, food, donor_name: str) -> tuple[str, str]:
 # Core job
 # ---------------------------------------------------------------------------
 
+def _load_recipient_index(db) -> RecipientIndex:
+    """Opted-in recipients and drivers, parsed once for the whole run."""
+    from backend.models import User, UserRole
+
+    # Candidate recipients: recipients + drivers who opted in.
+    # (Donors get notified via existing favourite-location path already.)
+    rows = (
+        db.query(
+            User.id, User.name, User.phone, User.sms_consent_given, User.sms_opt_out_date,
+            User.notification_preferences, User.sms_notification_types,
+            User.allergies, User.dietary_restrictions, User.preferred_categories,
+            User.household_size,
+        )
+        .filter(User.role.in_([UserRole.RECIPIENT, UserRole.DRIVER]))
+        .order_by(User.id)
+        .all()
+    )
+    return RecipientIndex(RecipientProfile(u) for u in rows if _user_wants_new_listings(u))
+
+
 def _collect_candidates() -> list[dict]:
     """DB work: find new listings + matching users. Returns plain dicts."""
     from backend.app import SessionLocal
-    from backend.models import User, FoodResource, UserRole
+    from backend.models import User, FoodResource
     from backend.ai.models import AIBroadcast
 
     out: list[dict] = []
@@ -252,18 +388,11 @@ def _collect_candidates() -> list[dict]:
             .all()
             if row[0] is not None
         }
+        listings = [l for l in listings if l.id not in already]
+        if not listings:
+            return []
 
-        # Candidate recipients: recipients + drivers + admins who opted in.
-        # (Donors get notified via existing favourite-location path already.)
-        try:
-            candidate_roles = [UserRole.RECIPIENT, UserRole.DRIVER]
-        except AttributeError:
-            candidate_roles = None  # if enum differs, fall through to 'all non-admin'
-
-        q = db.query(User)
-        if candidate_roles:
-            q = q.filter(User.role.in_(candidate_roles))
-        users = q.all()
+        index = _load_recipient_index(db)
 
         # Prefetch donors in one query instead of one-per-listing (N+1).
         donor_ids = {l.donor_id for l in listings if l.donor_id is not None}
@@ -277,32 +406,19 @@ def _collect_candidates() -> list[dict]:
                 donor_name_by_id[did] = dname or ""
 
         for food in listings:
-            if food.id in already:
-                continue
             donor_name = donor_name_by_id.get(food.donor_id, "")
-            for u in users:
-                if u.id == food.donor_id:
-                    continue
-                if not _user_wants_new_listings(u):
-                    continue
-                if _allergen_conflict(u, food):
-                    continue
-                if _dietary_conflict(u, food):
-                    continue
-                if not _category_match(u, food):
-                    continue
-                sms_ok = _user_sms_ok(u)
-                # If SMS not allowed AND user has no app channel, skip (still
-                # keep in-app chat as a fallback - every user has an inbox).
-                channel = "sms" if sms_ok else "chat"
+            for user_id in index.match(food):
+                profile = index.profiles[user_id]
+                # If SMS not allowed, fall back to in-app chat - every user
+                # has an inbox.
                 out.append({
                     "food_id": food.id,
-                    "user_id": u.id,
-                    "user_name": u.name,
+                    "user_id": user_id,
+                    "user_name": profile.name,
                     "donor_name": donor_name,
-                    "channel": channel,
+                    "channel": "sms" if profile.sms_ok else "chat",
                     "_food": food,    # detached-but-usable within this session
-                    "_user": u,
+                    "_user": profile,
                 })
                 if len(out) >= BROADCAST_MAX_PER_RUN:
                     return out
@@ -312,31 +428,62 @@ def _collect_candidates() -> list[dict]:
 
 
 def _persist_drafts(batch_id: str, drafts: list[dict]) -> int:
+    from sqlalchemy import insert
     from backend.app import SessionLocal
     from backend.ai.models import AIBroadcast
 
+    if not drafts:
+        return 0
+    now = datetime.utcnow()
+    rows = [
+        {
+            "food_resource_id": d["food_id"],
+            "user_id": d["user_id"],
+            "channel": d["channel"],
+            "language": d["language"],
+            "message": d["message"],
+            "status": "pending",
+            "batch_id": batch_id,
+            "created_at": now,
+        }
+        for d in drafts
+    ]
     db = SessionLocal()
-    inserted = 0
     try:
-        for d in drafts:
-            row = AIBroadcast(
-                food_resource_id=d["food_id"],
-                user_id=d["user_id"],
-                channel=d["channel"],
-                language=d["language"],
-                message=d["message"],
-                status="pending",
-                batch_id=batch_id,
-            )
-            db.add(row)
-            inserted += 1
+        # One executemany instead of a flush per ORM object.
+        db.execute(insert(AIBroadcast), rows)
         db.commit()
+        return len(rows)
     except Exception as exc:
         logger.error("Failed to persist broadcast drafts: %s", exc)
         db.rollback()
+        return 0
     finally:
         db.close()
-    return inserted
+
+
+async def _draft_all(candidates: list[dict]) -> tuple[list[dict], _TokenBudget]:
+    """Draft every candidate, at most BROADCAST_DRAFT_CONCURRENCY at a time.
+
+    Results keep candidate order. LLM personalisation stops once the run's
+    token budget is spent; the rest go out as plain templates.
+    """
+    semaphore = asyncio.Semaphore(max(1, BROADCAST_DRAFT_CONCURRENCY))
+    budget = _TokenBudget(BROADCAST_TOKEN_BUDGET)
+
+    async def _one(c: dict) -> dict:
+        async with semaphore:
+            message, lang = await _draft_message(c["_user"], c["_food"], c["donor_name"], budget)
+        return {
+            "food_id": c["food_id"],
+            "user_id": c["user_id"],
+            "channel": c["channel"],
+            "language": lang,
+            "message": message,
+        }
+
+    drafts = await asyncio.gather(*(_one(c) for c in candidates))
+    return list(drafts), budget
 
 
 async def scan_and_draft_new_listings() -> dict:
@@ -348,16 +495,7 @@ async def scan_and_draft_new_listings() -> dict:
         return {"listings": 0, "drafts": 0, "batch_id": None}
 
     batch_id = uuid.uuid4().hex[:16]
-    drafts: list[dict] = []
-    for c in candidates:
-        message, lang = await _draft_message(c["_user"], c["_food"], c["donor_name"])
-        drafts.append({
-            "food_id": c["food_id"],
-            "user_id": c["user_id"],
-            "channel": c["channel"],
-            "language": lang,
-            "message": message,
-        })
+    drafts, budget = await _draft_all(candidates)
 
     inserted = await loop.run_in_executor(None, _persist_drafts, batch_id, drafts)
 
@@ -365,13 +503,16 @@ async def scan_and_draft_new_listings() -> dict:
         await auto_send_pending(batch_id=batch_id)
 
     logger.info(
-        "Broadcast job: %d draft(s) created for %d candidate match(es) (batch=%s)",
-        inserted, len(candidates), batch_id,
+        "Broadcast job: %d draft(s) created for %d candidate match(es) (batch=%s, "
+        "%d personalised, ~%d tokens)",
+        inserted, len(candidates), batch_id, budget.calls, budget.spent,
     )
     return {
         "listings": len({c["food_id"] for c in candidates}),
         "drafts": inserted,
         "batch_id": batch_id,
+        "personalised": budget.calls,
+        "llm_tokens": budget.spent,
     }
 
 
@@ -394,97 +535,286 @@ async def _deliver_sms(phone: str, text: str) -> bool:
         return False
 
 
-def _deliver_chat(user_id: int, text: str) -> bool:
-    """Insert an in-app chat message from 'the system' to the user."""
+def _chat_payload(msg) -> dict:
+    return {
+        "conversation_id": msg.conversation_id,
+        "message": {
+            "id": msg.id,
+            "sender_id": msg.sender_id,
+            "conversation_id": msg.conversation_id,
+            "content": msg.content,
+            "is_from_admin": True,
+            "is_read": False,
+            "created_at": msg.created_at.isoformat() if msg.created_at else None,
+        },
+    }
+
+
+def _deliver_chat_bulk(items: list[dict]) -> set[int]:
+    """Insert in-app chat messages from 'the system', BROADCAST_CHAT_BATCH per commit.
+
+    ``items`` are delivery dicts (``id``, ``user_id``, ``message``). Returns
+    the broadcast ids whose message was stored.
+    """
     from backend.app import SessionLocal
     from backend.models import Message
+    from backend.realtime import hub as push_hub
+
+    delivered: set[int] = set()
     db = SessionLocal()
     try:
-        msg = Message(
-            sender_id=user_id,             # single-user conversation convention
-            conversation_id=f"user_{user_id}",
-            content=text,
-            is_from_admin=True,
-            is_read=False,
-        )
-        db.add(msg)
-        db.commit()
-        return True
-    except Exception as exc:
-        logger.error("Chat deliver failed: %s", exc)
-        db.rollback()
-        return False
+        for start in range(0, len(items), BROADCAST_CHAT_BATCH):
+            chunk = items[start:start + BROADCAST_CHAT_BATCH]
+            rows = [
+                Message(
+                    sender_id=info["user_id"],   # single-user conversation convention
+                    conversation_id=f"user_{info['user_id']}",
+                    content=info["message"],
+                    is_from_admin=True,
+                    is_read=False,
+                )
+                for info in chunk
+            ]
+            try:
+                db.add_all(rows)
+                db.commit()
+            except Exception as exc:
+                logger.error("Chat deliver failed for %d message(s): %s", len(rows), exc)
+                db.rollback()
+                continue
+            for info, msg in zip(chunk, rows):
+                delivered.add(info["id"])
+                # Recipient only: a broadcast writes one of these per user,
+                # and the admin inbox shouldn't refetch thousands of times.
+                push_hub.publish([f"user:{info['user_id']}"], "message", _chat_payload(msg))
     finally:
         db.close()
+    return delivered
 
 
-async def send_broadcast(broadcast_id: int) -> dict:
-    """Deliver an already-approved broadcast.  Idempotent."""
+# ---------------------------------------------------------------------------
+# Bulk delivery
+#
+# Approved broadcasts are delivered as one run: a single query loads the
+# broadcasts with their users, SMS goes out through a bounded worker pool
+# paced by a per-provider rate limit, chat messages are inserted in batches,
+# and every outcome is written back with one UPDATE.
+# ---------------------------------------------------------------------------
+
+# Concurrent SMS sends, and the Twilio send rate to stay under (messages/s).
+BROADCAST_SEND_CONCURRENCY = int(os.getenv("AI_BROADCAST_SEND_CONCURRENCY", "8"))
+BROADCAST_SMS_PER_SECOND = float(os.getenv("AI_BROADCAST_SMS_PER_SECOND", "10"))
+# In-app chat messages written per commit.
+BROADCAST_CHAT_BATCH = 200
+# Broadcast ids per IN (...) when loading a run.
+_LOAD_CHUNK = 500
+
+
+class _RateLimiter:
+    """Spaces calls at least ``1 / rate`` seconds apart across workers."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class DeliveryMetrics:
+    """Throughput of broadcast delivery runs, shown on the admin endpoints."""
+
+    def __init__(self) -> None:
+        self.last_run: Optional[dict] = None
+        self.totals = {"runs": 0, "sent": 0, "failed": 0, "sms_sent": 0, "chat_sent": 0}
+
+    def record(self, run: dict) -> None:
+        self.last_run = run
+        self.totals["runs"] += 1
+        for key in ("sent", "failed", "sms_sent", "chat_sent"):
+            self.totals[key] += run[key]
+
+    def snapshot(self) -> dict:
+        return {"last_run": dict(self.last_run) if self.last_run else None, "totals": dict(self.totals)}
+
+
+delivery_metrics = DeliveryMetrics()
+
+
+def _load_deliveries(broadcast_ids: list[int]) -> dict[int, dict]:
+    """Broadcasts plus their users' SMS details, one query per chunk of ids."""
     from backend.app import SessionLocal
     from backend.ai.models import AIBroadcast
     from backend.models import User
 
-    def _load():
-        db = SessionLocal()
-        try:
-            b = db.query(AIBroadcast).filter(AIBroadcast.id == broadcast_id).first()
-            if not b:
-                return None
-            u = db.query(User).filter(User.id == b.user_id).first()
-            return {
-                "id": b.id,
-                "status": b.status,
-                "channel": b.channel,
-                "message": b.message,
-                "user_id": b.user_id,
-                "phone": u.phone if u else None,
-                "sms_ok": _user_sms_ok(u) if u else False,
-            }
-        finally:
-            db.close()
+    out: dict[int, dict] = {}
+    db = SessionLocal()
+    try:
+        for start in range(0, len(broadcast_ids), _LOAD_CHUNK):
+            chunk = broadcast_ids[start:start + _LOAD_CHUNK]
+            rows = (
+                db.query(
+                    AIBroadcast.id, AIBroadcast.status, AIBroadcast.channel,
+                    AIBroadcast.message, AIBroadcast.user_id,
+                    User.id.label("found_user_id"), User.phone,
+                    User.sms_consent_given, User.sms_opt_out_date,
+                )
+                .outerjoin(User, User.id == AIBroadcast.user_id)
+                .filter(AIBroadcast.id.in_(chunk))
+                .all()
+            )
+            for r in rows:
+                out[r.id] = {
+                    "id": r.id,
+                    "status": r.status,
+                    "channel": r.channel,
+                    "message": r.message,
+                    "user_id": r.user_id,
+                    "phone": r.phone,
+                    "sms_ok": r.found_user_id is not None and _user_sms_ok(r),
+                }
+    finally:
+        db.close()
+    return out
 
-    def _mark(status: str, error: Optional[str] = None) -> None:
-        db = SessionLocal()
-        try:
-            b = db.query(AIBroadcast).filter(AIBroadcast.id == broadcast_id).first()
-            if not b:
-                return
-            b.status = status
-            b.error = error
-            if status == "sent":
-                b.sent_at = datetime.utcnow()
-            db.commit()
-        finally:
-            db.close()
 
+def _mark_deliveries(sent_ids: list[int], failed: dict[str, list[int]]) -> None:
+    """Record every outcome of a run with one UPDATE."""
+    from sqlalchemy import case, update
+    from backend.app import SessionLocal
+    from backend.ai.models import AIBroadcast
+
+    failed_ids = [bid for ids in failed.values() for bid in ids]
+    if not sent_ids and not failed_ids:
+        return
+    sent = AIBroadcast.id.in_(sent_ids)
+    error = (
+        case(*[(AIBroadcast.id.in_(ids), err) for err, ids in failed.items()], else_=None)
+        if failed else None
+    )
+    stmt = (
+        update(AIBroadcast)
+        .where(AIBroadcast.id.in_(sent_ids + failed_ids))
+        .values(
+            status=case((sent, "sent"), else_="failed"),
+            error=error,
+            sent_at=case((sent, datetime.utcnow()), else_=AIBroadcast.sent_at),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db = SessionLocal()
+    try:
+        db.execute(stmt)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def _send_sms_pool(items: list[dict]) -> set[int]:
+    """Send SMS for ``items`` with bounded concurrency under the provider rate."""
+    semaphore = asyncio.Semaphore(max(1, BROADCAST_SEND_CONCURRENCY))
+    limiter = _RateLimiter(BROADCAST_SMS_PER_SECOND)
+    delivered: set[int] = set()
+
+    async def _one(info: dict) -> None:
+        async with semaphore:
+            await limiter.wait()
+            if await _deliver_sms(info["phone"], info["message"]):
+                delivered.add(info["id"])
+
+    await asyncio.gather(*(_one(info) for info in items))
+    return delivered
+
+
+async def send_broadcasts(broadcast_ids: list[int]) -> dict:
+    """Deliver approved (or pending) broadcasts in bulk.  Idempotent per id.
+
+    Returns the run metrics plus ``results``: ``{id: {"ok": True, "errors":
+    [...]}}`` or ``{id: {"ok": False, "error": ...}}``, as ``send_broadcast``
+    always reported for a single id.
+    """
     loop = asyncio.get_event_loop()
-    info = await loop.run_in_executor(None, _load)
-    if not info:
-        return {"ok": False, "error": "not_found"}
-    if info["status"] not in ("approved", "pending"):  # allow replay of 'failed'?
-        return {"ok": False, "error": f"bad_status:{info['status']}"}
-
-    sent_any = False
-    errors: list[str] = []
-
-    if info["channel"] in ("sms", "both") and info["sms_ok"] and info["phone"]:
-        if await _deliver_sms(info["phone"], info["message"]):
-            sent_any = True
+    started = time.monotonic()
+    infos = await loop.run_in_executor(None, _load_deliveries, list(broadcast_ids))
+
+    results: dict[int, dict] = {}
+    deliverable: list[dict] = []
+    for bid in broadcast_ids:
+        info = infos.get(bid)
+        if info is None:
+            results[bid] = {"ok": False, "error": "not_found"}
+        elif info["status"] not in ("approved", "pending"):
+            results[bid] = {"ok": False, "error": f"bad_status:{info['status']}"}
         else:
+            deliverable.append(info)
+
+    sms_items = [
+        i for i in deliverable
+        if i["channel"] in ("sms", "both") and i["sms_ok"] and i["phone"]
+    ]
+    chat_items = [i for i in deliverable if i["channel"] in ("chat", "both")]
+    sms_ok, chat_ok = await asyncio.gather(
+        _send_sms_pool(sms_items),
+        loop.run_in_executor(None, _deliver_chat_bulk, chat_items),
+    )
+    sms_tried = {i["id"] for i in sms_items}
+    chat_tried = {i["id"] for i in chat_items}
+
+    sent_ids: list[int] = []
+    failed: dict[str, list[int]] = {}
+    for info in deliverable:
+        bid = info["id"]
+        errors = []
+        if bid in sms_tried and bid not in sms_ok:
             errors.append("sms_failed")
-
-    if info["channel"] in ("chat", "both"):
-        ok = await loop.run_in_executor(None, _deliver_chat, info["user_id"], info["message"])
-        if ok:
-            sent_any = True
-        else:
+        if bid in chat_tried and bid not in chat_ok:
             errors.append("chat_failed")
+        if bid in sms_ok or bid in chat_ok:
+            sent_ids.append(bid)
+            results[bid] = {"ok": True, "errors": errors}
+        else:
+            error = ",".join(errors) or "no_channel"
+            failed.setdefault(error, []).append(bid)
+            results[bid] = {"ok": False, "error": error}
+
+    await loop.run_in_executor(None, _mark_deliveries, sent_ids, failed)
+
+    duration = time.monotonic() - started
+    run = {
+        "finished_at": datetime.utcnow().isoformat(),
+        "attempted": len(deliverable),
+        "sent": len(sent_ids),
+        "failed": sum(len(ids) for ids in failed.values()),
+        "skipped": len(broadcast_ids) - len(deliverable),
+        "sms_sent": len(sms_ok),
+        "chat_sent": len(chat_ok),
+        "duration_s": round(duration, 3),
+        "per_second": round(len(deliverable) / duration, 1) if duration > 0 else None,
+    }
+    if deliverable:
+        delivery_metrics.record(run)
+        logger.info(
+            "Broadcast delivery: %d sent, %d failed in %.2fs (%d sms, %d chat)",
+            run["sent"], run["failed"], duration, run["sms_sent"], run["chat_sent"],
+        )
+    return {**run, "results": results}
 
-    if sent_any:
-        await loop.run_in_executor(None, _mark, "sent", None)
-        return {"ok": True, "errors": errors}
-    await loop.run_in_executor(None, _mark, "failed", ",".join(errors) or "no_channel")
-    return {"ok": False, "error": ",".join(errors) or "no_channel"}
+
+async def send_broadcast(broadcast_id: int) -> dict:
+    """Deliver one already-approved broadcast.  Idempotent."""
+    run = await send_broadcasts([broadcast_id])
+    return run["results"][broadcast_id]
 
 
 async def auto_send_pending(batch_id: Optional[str] = None) -> int:
@@ -518,12 +848,8 @@ async def auto_send_pending(batch_id: Optional[str] = None) -> int:
     if not ids:
         return 0
     await loop.run_in_executor(None, _approve, ids)
-    sent = 0
-    for bid in ids:
-        res = await send_broadcast(bid)
-        if res.get("ok"):
-            sent += 1
-    return sent
+    run = await send_broadcasts(ids)
+    return run["sent"]
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,143 @@
+"""
+Reply cache for the anonymous landing-page chat (``/api/ai/public_chat``).
+
+The public chat has no tools, no history and no user data. The only thing
+that varies between visitors is what they type, so "how do I get food?"
+asked by a thousand visitors is answered once, not a thousand times.
+
+Entries are keyed on ``reply_key(messages, lang)``:
+
+* Each message is normalized: case-folded, whitespace collapsed, and
+  surrounding punctuation stripped, so "How do I get food?" and
+  "how do i get food" share an answer.
+* The system prompt's "Current date and time" line changes every minute, so
+  it is removed before hashing. Any other edit to the system prompt
+  (including ``ai_training_data.json``) gives new keys.
+
+The cache is an LRU bounded by ``AI_PUBLIC_CACHE_SIZE`` entries, and each
+entry expires after ``AI_PUBLIC_CACHE_TTL`` seconds. Concurrent misses for
+the same key share one upstream call (``ReplyCache.get_or_create``), so a
+burst of identical questions costs one completion. Failures are not cached.
+``stats()`` reports hits, misses, coalesced waits and evictions for
+``/api/ai/health``.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+PUBLIC_CACHE_TTL_S = float(os.getenv("AI_PUBLIC_CACHE_TTL", str(6 * 3600)))
+PUBLIC_CACHE_SIZE = int(os.getenv("AI_PUBLIC_CACHE_SIZE", "1024"))
+
+_STAMP_RE = re.compile(r"^Current date and time: .*$", re.MULTILINE)
+_SPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCT = " \t\n.,;:!?¡¿\"'()[]"
+
+
+def normalize_text(text: str) -> str:
+    """Case, spacing and edge punctuation folded away."""
+    return _SPACE_RE.sub(" ", (text or "").casefold()).strip(_EDGE_PUNCT)
+
+
+def reply_key(messages: list[dict], lang: str) -> str:
+    """Stable cache key for one stateless completion."""
+    parts = []
+    for msg in messages:
+        content = str(msg.get("content") or "")
+        if msg.get("role") == "system":
+            content = _STAMP_RE.sub("", content)
+        parts.append([msg.get("role"), normalize_text(content)])
+    blob = json.dumps([lang, parts], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ReplyCache:
+    """Thread-safe LRU of reply texts with a per-entry TTL."""
+
+    def __init__(self, ttl_s: float = PUBLIC_CACHE_TTL_S, maxsize: int = PUBLIC_CACHE_SIZE):
+        self.ttl_s = ttl_s
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    async def get_or_create(self, key: str, produce: Callable[[], Awaitable[str]]) -> str:
+        """Cached reply; on a miss, one ``produce()`` call per key at a time."""
+        text = self.get(key)
+        if text is not None:
+            return text
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            text = await produce()
+            self.put(key, text)
+            future.set_result(text)
+            return text
+        except Exception as exc:
+            future.set_exception(exc)
+            # Waiters re-raise it; nobody may be waiting, so mark it retrieved.
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            # A coalesced wait missed the cache but still saved an upstream call.
+            saved = self.hits + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.maxsize,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": round(saved / lookups, 3) if lookups else 0.0,
+            }
+
+
+public_reply_cache = ReplyCache()
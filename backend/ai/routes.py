@@ -3,10 +3,13 @@ FoodMaps AI — FastAPI router (mounted onto the main app).
 
 Endpoints:
   POST /api/ai/chat            - Text conversation
+  POST /api/ai/chat/stream     - Text conversation as server-sent events
   GET  /api/ai/history/{uid}   - Retrieve conversation history
   DELETE /api/ai/history/{uid} - Clear history
   POST /api/ai/voice           - Whisper transcribe + chat
-  POST /api/ai/tts             - Text-to-speech
+  POST /api/ai/tts             - Text-to-speech (audio URL, or streamed MP3)
+  GET  /api/ai/audio/{key}.mp3 - Cached TTS clip (supports Range)
+  POST /api/ai/public_chat     - Anonymous landing-page chat (cached replies)
   POST /api/ai/feedback        - Rate a message
   GET  /api/ai/health          - Health check
 
@@ -26,7 +29,9 @@ from typing import Optional, List
 import httpx
 import jwt
 from fastapi import APIRouter, HTTPException, Request, Response, UploadFile, File, Form, Depends
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -38,6 +43,11 @@ from backend.ai.ai_engine import (
     close_http_client,
     OpenAIRateLimitError,
 )
+from backend.ai.reply_cache import public_reply_cache
+from backend.ai.speech_cache import is_valid_key, speech_cache
+from backend.input_pipeline import SanitizedRoute
+from backend.photo_store import sniff_image_type
+from backend.realtime import encode_event
 from backend.ai.errors import (
     AIDatabaseError,
     AIError,
@@ -71,8 +81,11 @@ if JWT_SECRET == _DEFAULT_JWT_SECRET:
 JWT_ALGORITHM = "HS256"
 
 REMINDER_CHECK_INTERVAL = int(os.getenv("REMINDER_CHECK_INTERVAL", "900"))
+# Answer the training data's FAQ questions into the public reply cache at startup.
+PUBLIC_CACHE_PREWARM = os.getenv("AI_PUBLIC_CACHE_PREWARM", "0").lower() in {"1", "true", "yes"}
 
-router = APIRouter(prefix="/api/ai", tags=["ai"])
+# SanitizedRoute: JSON bodies come pre-parsed from the app's input sanitizer.
+router = APIRouter(prefix="/api/ai", tags=["ai"], route_class=SanitizedRoute)
 # auto_error=False so the dependency itself doesn't raise — we want a
 # uniform JSON error shape via _require_auth() below, AND a few endpoints
 # (public_chat, health) accept anonymous callers. Every authenticated
@@ -88,8 +101,10 @@ def _client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
 
-def _enforce_rate_limit(request: Request) -> None:
-    if not check_rate_limit(_client_ip(request)):
+async def _enforce_rate_limit(request: Request) -> None:
+    # With RATE_LIMIT_BACKEND=database the check is a blocking row lock and
+    # commit, so it runs off the event loop.
+    if not await run_in_threadpool(check_rate_limit, _client_ip(request)):
         lang = resolve_lang(request)
         msg = (
             "Demasiadas solicitudes — espera un momento e inténtalo de nuevo."
@@ -99,7 +114,7 @@ def _enforce_rate_limit(request: Request) -> None:
         raise HTTPException(429, msg)
 
 
-def _enforce_user_rate_limit(uid: int, request: Request) -> None:
+async def _enforce_user_rate_limit(uid: int, request: Request) -> None:
     """Per-authenticated-user cost cap on the heavy AI endpoints.
 
     Backs the documented OpenAI spend protection: even with a valid token,
@@ -108,7 +123,7 @@ def _enforce_user_rate_limit(uid: int, request: Request) -> None:
     notice it; abuse / runaway clients do.
     """
     from backend.ai.ai_engine import check_user_rate_limit
-    if not check_user_rate_limit(uid):
+    if not await run_in_threadpool(check_user_rate_limit, uid):
         lang = resolve_lang(request)
         msg = (
             "Has alcanzado el límite por hora del asistente. Inténtalo más tarde."
@@ -211,6 +226,8 @@ class AIFeedbackRequest(BaseModel):
 class TTSRequest(BaseModel):
     text: str = Field(min_length=1, max_length=4000)
     lang: str = "en"
+    # Relay MP3 chunks as they are synthesized instead of returning a URL.
+    stream: bool = False
 
 
 class AIPublicChatRequest(BaseModel):
@@ -235,6 +252,8 @@ async def ai_health() -> dict:
         "openai_configured": bool(OPENAI_API_KEY),
         "chat_model": CHAT_MODEL,
         "circuit_state": _circuit.state.value,
+        "speech_cache": speech_cache.stats(),
+        "public_reply_cache": public_reply_cache.stats(),
     }
 
 
@@ -244,10 +263,10 @@ async def ai_chat(
     request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
-    _enforce_rate_limit(request)
+    await _enforce_rate_limit(request)
     uid = _parse_user_id(body.user_id)
     _require_auth(credentials, uid)
-    _enforce_user_rate_limit(uid, request)
+    await _enforce_user_rate_limit(uid, request)
     # Client-supplied lang wins when valid; otherwise sniff from message
     # text + Accept-Language. resolve_lang already implements that order.
     client_lang = (body.lang or "").strip().lower()
@@ -280,6 +299,52 @@ async def ai_chat(
         raise AIError(lang) from exc
 
 
+@router.post("/chat/stream")
+async def ai_chat_stream(
+    body: AIChatRequest,
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> StreamingResponse:
+    """``/chat`` as server-sent events, so the reply renders as it is written.
+
+    Events, in order: ``start`` (``{lang}``), any number of ``delta``
+    (``{text}``), ``tool`` (``{tool}``) and ``action`` (an ``actions``
+    entry), then ``done`` with the same body ``/chat`` returns. A failure
+    after the stream has started arrives as an ``error`` event.
+    """
+    await _enforce_rate_limit(request)
+    uid = _parse_user_id(body.user_id)
+    _require_auth(credentials, uid)
+    await _enforce_user_rate_limit(uid, request)
+    client_lang = (body.lang or "").strip().lower()
+    if client_lang in {"en", "es"}:
+        lang = client_lang
+    else:
+        lang = resolve_lang(request, body.message)
+
+    async def _events():
+        try:
+            async for event, data in conversation_engine.chat_stream(
+                user_id=uid,
+                message=body.message,
+                include_audio=body.include_audio,
+                lang_hint=lang,
+            ):
+                if event == "delta":
+                    data = {"text": data}
+                yield encode_event(event, data)
+        except Exception:
+            logger.exception("AI chat stream error")
+            yield encode_event("error", {"detail": AIError(lang).detail})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: stop nginx from holding deltas until the end.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/public_chat", response_model=AIPublicChatResponse)
 async def ai_public_chat(
     body: AIPublicChatRequest,
@@ -291,35 +356,17 @@ async def ai_public_chat(
     - No conversation history stored
     - No tools / user-specific data access
     - IP-based rate limited
+    - Replies cached by normalized question + language (backend.ai.reply_cache)
     """
-    _enforce_rate_limit(request)
+    await _enforce_rate_limit(request)
 
     from backend.ai.ai_engine import detect_spanish
 
     lang = "es" if detect_spanish(body.message) else "en"
-    messages = [
-        {"role": "system", "content": conversation_engine.system_prompt},
-        {
-            "role": "system",
-            "content": (
-                "You are talking to an anonymous visitor on the FoodMaps landing page. "
-                "They are not signed in. Do NOT call any tools. Do NOT ask for or reference "
-                "their account, pickups, listings, or reminders. Answer general questions about "
-                "how FoodMaps works, food sharing, food safety, and community impact. "
-                "Keep replies concise (2-4 sentences) and friendly. If they need account-specific "
-                "help, politely suggest they sign up or sign in."
-            ),
-        },
-        {"role": "user", "content": body.message},
-    ]
-    if lang == "es":
-        messages.insert(1, {
-            "role": "system",
-            "content": "The user wrote in Spanish. Respond entirely in Spanish.",
-        })
+    messages = conversation_engine.public_chat_messages(body.message, lang)
 
     try:
-        text = await conversation_engine.public_chat_reply(messages, lang=lang)
+        text = await conversation_engine.cached_public_reply(messages, lang=lang)
     except httpx.TimeoutException as exc:
         raise AITimeout(lang) from exc
     except httpx.HTTPError as exc:
@@ -342,7 +389,7 @@ async def ai_history(
     limit: int = 50,
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
-    _enforce_rate_limit(request)
+    await _enforce_rate_limit(request)
     uid = _parse_user_id(user_id)
     _require_auth(credentials, uid)
 
@@ -367,7 +414,7 @@ async def ai_clear_history(
     request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
-    _enforce_rate_limit(request)
+    await _enforce_rate_limit(request)
     uid = _parse_user_id(user_id)
     _require_auth(credentials, uid)
     lang = resolve_lang(request)
@@ -420,7 +467,7 @@ async def ai_upload_image(
     a tidy URL like /uploads/ai/<uuid>.jpg, then sends that URL to the
     chat as 'image: <url>' for the AI to attach to the listing.
     """
-    _enforce_rate_limit(request)
+    await _enforce_rate_limit(request)
     uid = _parse_user_id(user_id)
     _require_auth(credentials, uid)
 
@@ -439,20 +486,7 @@ async def ai_upload_image(
     # blocks an attacker from uploading a script/HTML file labelled
     # 'image/jpeg' that could be served back and executed by a misbehaving
     # browser or downstream consumer.
-    def _sniff_image_type(buf: bytes) -> str | None:
-        if len(buf) < 12:
-            return None
-        if buf[:3] == b"\xff\xd8\xff":
-            return "image/jpeg"
-        if buf[:8] == b"\x89PNG\r\n\x1a\n":
-            return "image/png"
-        if buf[:6] in (b"GIF87a", b"GIF89a"):
-            return "image/gif"
-        if buf[:4] == b"RIFF" and buf[8:12] == b"WEBP":
-            return "image/webp"
-        return None
-
-    sniffed = _sniff_image_type(data)
+    sniffed = sniff_image_type(data)
     expected = "image/jpeg" if base_type == "image/jpg" else base_type
     if sniffed is None or sniffed != expected:
         raise HTTPException(400, "File contents do not match a supported image format.")
@@ -481,10 +515,10 @@ async def ai_voice(
     include_audio: bool = Form(default=True),
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
-    _enforce_rate_limit(request)
+    await _enforce_rate_limit(request)
     uid = _parse_user_id(user_id)
     _require_auth(credentials, uid)
-    _enforce_user_rate_limit(uid, request)
+    await _enforce_user_rate_limit(uid, request)
 
     allowed = {
         "audio/webm", "audio/wav", "audio/mpeg", "audio/mp4",
@@ -540,24 +574,41 @@ async def ai_tts(
     body: TTSRequest,
     request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-) -> dict:
-    """Generate TTS audio as a base64 data URL. Requires authentication.
+):
+    """Generate TTS audio. Requires authentication.
+
+    Returns ``{"audio_url": "/api/ai/audio/<key>.mp3"}``; repeat phrases are
+    served from the speech cache without calling OpenAI. With
+    ``stream: true`` the MP3 is relayed as it is synthesized instead.
 
     Previously anonymous — a single attacker could synthesize unlimited
     audio against the OpenAI TTS quota. Now requires a valid JWT so abuse
     is tied to an account we can disable.
     """
-    import base64
-    _enforce_rate_limit(request)
+    await _enforce_rate_limit(request)
     auth_uid = _auth_user_id(credentials)
     if auth_uid is None:
         raise HTTPException(401, "Authentication required")
-    _enforce_user_rate_limit(auth_uid, request)
+    await _enforce_user_rate_limit(auth_uid, request)
     lang = resolve_lang(request, body.text)
     try:
-        audio_bytes = await conversation_engine.generate_speech(body.text, lang=body.lang)
-        b64 = base64.b64encode(audio_bytes).decode("ascii")
-        return {"audio_url": f"data:audio/mpeg;base64,{b64}", "lang": body.lang}
+        if body.stream:
+            chunks = conversation_engine.stream_speech(body.text, lang=body.lang)
+            # Pull the first chunk here so upstream failures still map to
+            # a proper error status instead of a truncated 200.
+            first = await chunks.__anext__()
+
+            async def _relay():
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+
+            return StreamingResponse(_relay(), media_type="audio/mpeg",
+                                     headers={"Cache-Control": "no-store"})
+        url = await conversation_engine.speech_url(body.text, lang=body.lang)
+        return {"audio_url": url, "lang": body.lang}
+    except StopAsyncIteration as exc:
+        raise AIUpstreamError(lang) from exc
     except httpx.TimeoutException as exc:
         raise AITimeout(lang) from exc
     except httpx.HTTPError as exc:
@@ -571,13 +622,34 @@ async def ai_tts(
         raise AIError(lang) from exc
 
 
+@router.get("/audio/{filename}")
+async def ai_audio(filename: str):
+    """Serve a cached TTS clip. ``FileResponse`` answers Range requests.
+
+    No auth: the key is a SHA-256 of the reply text, so only someone who
+    already has the text can name the clip, and ``<audio>`` elements can't
+    send a bearer token anyway.
+    """
+    key, ext = os.path.splitext(filename)
+    if ext != ".mp3" or not is_valid_key(key):
+        raise HTTPException(404, "Not found")
+    path = await asyncio.get_running_loop().run_in_executor(None, speech_cache.get, key)
+    if path is None:
+        raise HTTPException(404, "Not found")
+    return FileResponse(
+        path,
+        media_type="audio/mpeg",
+        headers={"Cache-Control": "private, max-age=86400, immutable"},
+    )
+
+
 @router.post("/feedback")
 async def ai_feedback(
     body: AIFeedbackRequest,
     request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
-    _enforce_rate_limit(request)
+    await _enforce_rate_limit(request)
     uid = _parse_user_id(body.user_id)
     _require_auth(credentials, uid)
 
@@ -747,6 +819,7 @@ async def reminder_loop() -> None:
 
 _background_task: asyncio.Task | None = None
 _broadcast_task: asyncio.Task | None = None
+_prewarm_task: asyncio.Task | None = None
 
 
 def _log_background_task_result(name: str):
@@ -763,7 +836,7 @@ def _log_background_task_result(name: str):
 
 
 async def start_background_jobs() -> None:
-    global _background_task, _broadcast_task
+    global _background_task, _broadcast_task, _prewarm_task
     if _background_task is None or _background_task.done():
         _background_task = asyncio.create_task(reminder_loop())
         _background_task.add_done_callback(_log_background_task_result("reminder"))
@@ -776,11 +849,20 @@ async def start_background_jobs() -> None:
             logger.info("AI broadcast loop scheduled")
         except Exception as exc:
             logger.error("Failed to start broadcast loop: %s", exc)
+    if PUBLIC_CACHE_PREWARM and (_prewarm_task is None or _prewarm_task.done()):
+        _prewarm_task = asyncio.create_task(_prewarm_public_replies())
+        _prewarm_task.add_done_callback(_log_background_task_result("public reply prewarm"))
+
+
+async def _prewarm_public_replies() -> None:
+    warmed = await conversation_engine.prewarm_public_replies()
+    logger.info("Public reply cache prewarmed with %d FAQ answers", warmed)
 
 
 async def stop_background_jobs() -> None:
-    global _background_task, _broadcast_task
-    for name, task in (("reminder", _background_task), ("broadcast", _broadcast_task)):
+    global _background_task, _broadcast_task, _prewarm_task
+    for name, task in (("reminder", _background_task), ("broadcast", _broadcast_task),
+                       ("public reply prewarm", _prewarm_task)):
         if task is not None and not task.done():
             task.cancel()
             try:
@@ -790,6 +872,7 @@ async def stop_background_jobs() -> None:
             logger.info("AI %s loop stopped", name)
     _background_task = None
     _broadcast_task = None
+    _prewarm_task = None
     await close_http_client()
 
 
@@ -797,7 +880,7 @@ async def stop_background_jobs() -> None:
 # Admin-facing broadcast endpoints
 # ---------------------------------------------------------------------------
 
-def _require_admin(credentials: HTTPAuthorizationCredentials | None) -> int:
+async def _require_admin(credentials: HTTPAuthorizationCredentials | None) -> int:
     """Return the admin user_id or raise 401/403."""
     if credentials is None:
         raise HTTPException(401, "Authentication required")
@@ -821,7 +904,7 @@ def _require_admin(credentials: HTTPAuthorizationCredentials | None) -> int:
         finally:
             db.close()
 
-    if not _check():
+    if not await asyncio.get_event_loop().run_in_executor(None, _check):
         raise HTTPException(403, "Admin role required")
     return uid
 
@@ -844,6 +927,47 @@ def _broadcast_to_dict(b) -> dict:
     }
 
 
+@router.get("/prompt_stats")
+async def prompt_stats(
+    request: Request,
+    lang: str = "en",
+    role: Optional[str] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> dict:
+    """Admin: token counts for the cached static prompt segments."""
+    await _enforce_rate_limit(request)
+    await _require_admin(credentials)
+    if lang not in ("en", "es"):
+        raise HTTPException(400, "lang must be 'en' or 'es'")
+    from backend.ai.context import CONTEXT_TOKEN_BUDGET
+    segments = conversation_engine.prompts.token_counts(lang, role)
+    return {
+        "lang": lang, "role": role, "segments": segments, "total": sum(segments.values()),
+        # Per-turn cap; history and the rolling summary get what the segments leave.
+        "budget": CONTEXT_TOKEN_BUDGET,
+    }
+
+
+@router.post("/routing/refresh_matrix")
+async def refresh_route_matrix(
+    request: Request,
+    profile: str = "driving",
+    max_requests: int = 50,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> dict:
+    """Admin: refresh stale center-to-listing travel times in batches."""
+    await _enforce_rate_limit(request)
+    await _require_admin(credentials)
+    if profile not in ("driving", "walking", "cycling"):
+        raise HTTPException(400, "profile must be driving, walking or cycling")
+    if max_requests < 1 or max_requests > 500:
+        raise HTTPException(400, "max_requests must be 1..500")
+    from backend.app import SessionLocal
+    from backend.routing import refresh_center_matrix, route_cache
+    stats = await refresh_center_matrix(SessionLocal, profile=profile, max_requests=max_requests)
+    return {"profile": profile, "matrix": stats, "route_cache": route_cache.stats()}
+
+
 @router.get("/broadcasts")
 async def list_broadcasts(
     request: Request,
@@ -853,8 +977,8 @@ async def list_broadcasts(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
     """Admin: list broadcasts by status."""
-    _enforce_rate_limit(request)
-    _require_admin(credentials)
+    await _enforce_rate_limit(request)
+    await _require_admin(credentials)
     if limit < 1 or limit > 500:
         raise HTTPException(400, "limit must be 1..500")
     # This is admin-only mutable state. Never let any intermediate cache
@@ -878,7 +1002,25 @@ async def list_broadcasts(
             db.close()
 
     data = await asyncio.get_event_loop().run_in_executor(None, _fetch)
-    return {"status": status, "count": len(data), "broadcasts": data}
+    from backend.ai.notifications import delivery_metrics
+    return {
+        "status": status,
+        "count": len(data),
+        "broadcasts": data,
+        "delivery": delivery_metrics.snapshot(),
+    }
+
+
+@router.get("/broadcasts/metrics")
+async def broadcast_metrics(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> dict:
+    """Admin: throughput of the last delivery run and running totals."""
+    await _enforce_rate_limit(request)
+    await _require_admin(credentials)
+    from backend.ai.notifications import delivery_metrics
+    return delivery_metrics.snapshot()
 
 
 class BroadcastEditRequest(BaseModel):
@@ -894,8 +1036,8 @@ async def approve_broadcast(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
     """Admin: approve (optionally edit) and send a pending broadcast."""
-    _enforce_rate_limit(request)
-    admin_uid = _require_admin(credentials)
+    await _enforce_rate_limit(request)
+    admin_uid = await _require_admin(credentials)
 
     def _approve():
         from backend.app import SessionLocal
@@ -938,8 +1080,8 @@ async def reject_broadcast(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
     """Admin: reject a pending broadcast (will not be sent)."""
-    _enforce_rate_limit(request)
-    admin_uid = _require_admin(credentials)
+    await _enforce_rate_limit(request)
+    admin_uid = await _require_admin(credentials)
 
     def _reject():
         from backend.app import SessionLocal
@@ -974,11 +1116,11 @@ async def approve_batch(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
     """Admin: approve + send every pending broadcast (optionally by batch)."""
-    _enforce_rate_limit(request)
-    _require_admin(credentials)
-    from backend.ai.notifications import auto_send_pending
+    await _enforce_rate_limit(request)
+    await _require_admin(credentials)
+    from backend.ai.notifications import auto_send_pending, delivery_metrics
     sent = await auto_send_pending(batch_id=batch_id)
-    return {"sent": sent, "batch_id": batch_id}
+    return {"sent": sent, "batch_id": batch_id, "delivery": delivery_metrics.snapshot()}
 
 
 @router.post("/broadcasts/run_now")
@@ -987,8 +1129,8 @@ async def run_broadcast_job(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
     """Admin: trigger the hourly scan-and-draft job on-demand."""
-    _enforce_rate_limit(request)
-    _require_admin(credentials)
+    await _enforce_rate_limit(request)
+    await _require_admin(credentials)
     from backend.ai.notifications import scan_and_draft_new_listings
     stats = await scan_and_draft_new_listings()
     return {"ok": True, "stats": stats}
@@ -0,0 +1,227 @@
+"""
+Content-addressed on-disk cache for synthesized speech.
+
+``/api/ai/chat`` and ``/api/ai/voice`` used to base64-encode the whole MP3
+into the JSON response as a ``data:`` URL. That made every voice reply a
+third larger than the audio itself. It also re-synthesized identical phrases
+(greetings, canned errors, confirmations) against the OpenAI TTS quota on
+every request.
+
+Each clip is now stored once under ``speech_key(text, voice, model)``, a
+SHA-256 of exactly what was sent to the TTS endpoint. Responses carry a short
+URL (``/api/ai/audio/<key>.mp3``) instead of the bytes. That route serves the
+file with ``FileResponse``, which answers HTTP ``Range`` requests, so
+browsers can seek and resume. Identical text is served from disk without
+calling OpenAI.
+
+The cache is bounded by ``AI_TTS_CACHE_MAX_MB``. Reads bump a file's mtime,
+and when a write pushes the total over the limit, the least recently used
+clips are deleted first. Writes go to a temp file and are renamed into
+place, so a reader never sees half a clip. Concurrent misses for the same
+key share one synthesis (see ``SpeechCache.get_or_create``).
+
+Several workers can share one directory. A key this process has not seen
+is looked up on disk before it counts as a miss, and every write rescans the
+directory, so clips written by other workers are served and counted toward
+the size limit.
+
+Keys are unguessable without the exact reply text, which is what keeps a
+reply's audio private to the person who received the text.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger("ai_speech_cache")
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SPEECH_CACHE_DIR = os.getenv("AI_TTS_CACHE_DIR", os.path.join(_PROJECT_ROOT, "cache", "tts"))
+SPEECH_CACHE_MAX_BYTES = int(float(os.getenv("AI_TTS_CACHE_MAX_MB", "256")) * 1024 * 1024)
+AUDIO_URL_PREFIX = "/api/ai/audio/"
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def speech_key(text: str, voice: str, model: str) -> str:
+    """Stable cache key for one TTS request."""
+    digest = hashlib.sha256()
+    for part in (model, voice, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def is_valid_key(key: str) -> bool:
+    return bool(_KEY_RE.match(key or ""))
+
+
+def audio_url(key: str) -> str:
+    return f"{AUDIO_URL_PREFIX}{key}.mp3"
+
+
+class SpeechCache:
+    """Size-bounded LRU of MP3 files, one per ``speech_key``."""
+
+    def __init__(self, directory: str = SPEECH_CACHE_DIR, max_bytes: int = SPEECH_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Tuple[int, float]]] = None  # key -> (size, last use)
+        self._total = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _load_index(self, rescan: bool = False) -> Dict[str, Tuple[int, float]]:
+        """Scan the directory so the size limit survives restarts.
+
+        ``rescan`` picks up clips other workers wrote or evicted since the
+        last scan; reads bump mtime, so the LRU order survives it.
+        """
+        if self._index is None or rescan:
+            index: Dict[str, Tuple[int, float]] = {}
+            try:
+                for entry in os.scandir(self.directory):
+                    key, ext = os.path.splitext(entry.name)
+                    if ext == ".mp3" and is_valid_key(key):
+                        st = entry.stat()
+                        index[key] = (st.st_size, st.st_mtime)
+            except FileNotFoundError:
+                pass
+            self._index = index
+            self._total = sum(size for size, _ in index.values())
+        return self._index
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of the cached clip, or None; marks it recently used."""
+        if not is_valid_key(key):
+            return None
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            path = self.path(key)
+            if entry is None:
+                # Possibly written by another worker sharing the directory.
+                try:
+                    entry = (os.stat(path).st_size, 0.0)
+                except OSError:
+                    entry = None
+                else:
+                    self._total += entry[0]
+            if entry is None or not os.path.exists(path):
+                if entry is not None:
+                    index.pop(key, None)
+                    self._total -= entry[0]
+                self.misses += 1
+                return None
+            now = time.time()
+            index[key] = (entry[0], now)
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+            self.hits += 1
+            return path
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store ``data`` atomically and evict past ``max_bytes``."""
+        if not is_valid_key(key):
+            raise ValueError(f"invalid speech key: {key!r}")
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, self.path(key))
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            now = time.time()
+            try:
+                os.utime(self.path(key), (now, now))
+            except OSError:
+                pass
+            index = self._load_index(rescan=True)
+            if key not in index:
+                self._total += len(data)
+            index[key] = (len(data), now)
+            self._evict(keep=key)
+        return self.path(key)
+
+    def _evict(self, keep: str) -> None:
+        index = self._index or {}
+        if self._total <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(index.items(), key=lambda kv: kv[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.unlink(self.path(key))
+            except FileNotFoundError:
+                pass
+            except OSError as exc:
+                logger.warning("Could not evict %s: %s", key, exc)
+                continue
+            del index[key]
+            self._total -= size
+            self.evictions += 1
+
+    async def get_or_create(self, key: str, synthesize: Callable[[], Awaitable[bytes]]) -> str:
+        """Cached clip path; on a miss, one ``synthesize()`` call per key at a time."""
+        loop = asyncio.get_running_loop()
+        path = await loop.run_in_executor(None, self.get, key)
+        if path is not None:
+            return path
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            data = await synthesize()
+            path = await loop.run_in_executor(None, self.put, key, data)
+            future.set_result(path)
+            return path
+        except Exception as exc:
+            future.set_exception(exc)
+            # Waiters re-raise it; nobody may be waiting, so mark it retrieved.
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            index = self._load_index()
+            return {
+                "entries": len(index),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+speech_cache = SpeechCache()
@@ -26,6 +26,9 @@ os.environ.setdefault("AI_BROADCAST_AUTO_APPROVE", "0")
 os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
 os.environ.setdefault("PUBLIC_BASE_URL", "http://testserver")
 os.environ.setdefault("JWT_SECRET", "test-jwt-secret-not-for-production-use")
+# Keep claim confirmation codes in-process; the sqlite :memory: database is
+# per-connection, so a DB-backed store would not see its own writes.
+os.environ.setdefault("CLAIM_CONFIRMATION_STORE", "memory")
 
 import pytest  # noqa: E402
 
@@ -34,6 +37,60 @@ import pytest  # noqa: E402
 def _reset_rate_limiter():
     """Make sure per-IP rate-limiter state does not leak between tests."""
     from backend.ai import ai_engine
-    ai_engine._rate_store.clear()
+    ai_engine.ip_rate_limiter.reset()
     yield
-    ai_engine._rate_store.clear()
+    ai_engine.ip_rate_limiter.reset()
+
+
+@pytest.fixture
+def sqlite_sessionmaker():
+    """Session factory bound to a throwaway in-memory DB with every table created.
+
+    For tests that need real SQL behaviour (filters, indexes, ORM events)
+    rather than a mocked session. StaticPool keeps the single in-memory
+    connection alive across sessions and threads.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from backend.models import Base
+    from backend.ai import models as _ai_models  # noqa: F401  (register AI tables)
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    try:
+        yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture
+def count_sql():
+    """Context manager that records every SQL statement run on an engine.
+
+    ``with count_sql(engine) as statements: ...`` leaves the statement
+    strings in ``statements``; used to catch N+1 query patterns.
+    """
+    from contextlib import contextmanager
+
+    from sqlalchemy import event
+
+    @contextmanager
+    def counting(bind):
+        statements: list = []
+
+        def _record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(bind, "before_cursor_execute", _record)
+        try:
+            yield statements
+        finally:
+            event.remove(bind, "before_cursor_execute", _record)
+
+    return counting
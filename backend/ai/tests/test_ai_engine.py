@@ -1,7 +1,11 @@
 """Pure-logic tests for backend.ai.ai_engine — no DB, no network."""
 from __future__ import annotations
 
+import json
+import os
 import time
+from datetime import datetime, timezone
+
 import pytest
 
 from backend.ai import ai_engine
@@ -144,3 +148,260 @@ class TestRoleBehaviorPrompt:
     def test_none_role_ok(self):
         out = ai_engine._role_behavior_prompt(None, "en")
         assert out is None or isinstance(out, str)
+
+
+# ---------------------------------------------------------------------------
+# PromptCache
+# ---------------------------------------------------------------------------
+
+class TestPromptCache:
+    @pytest.fixture
+    def training_file(self, tmp_path):
+        path = tmp_path / "training.json"
+        path.write_text('{"system_base": "Base v1", "processes": ["claim"]}', encoding="utf-8")
+        return path
+
+    def test_matches_uncached_build(self, training_file):
+        cache = ai_engine.PromptCache(str(training_file))
+        now = datetime(2026, 1, 2, 3, 4, tzinfo=timezone.utc)
+        data = json.loads(training_file.read_text())
+        expected = ai_engine._stamp_system_prompt(*ai_engine._system_prompt_parts(data), now=now)
+        assert cache.system_prompt(now=now) == expected
+        assert "Current date and time: 2026-01-02 03:04 UTC" in expected
+
+    def test_reloads_only_when_mtime_changes(self, training_file, monkeypatch):
+        cache = ai_engine.PromptCache(str(training_file))
+        assert cache.system_prompt().startswith("Base v1")
+        loads = []
+        real_load = ai_engine._load_training_data
+        monkeypatch.setattr(ai_engine, "_load_training_data", lambda p: loads.append(p) or real_load(p))
+        cache.system_prompt()
+        cache.static_blocks("en", "donor")
+        assert loads == []
+
+        training_file.write_text('{"system_base": "Base v2"}', encoding="utf-8")
+        stat = training_file.stat()
+        os.utime(training_file, (stat.st_atime, stat.st_mtime + 5))
+        assert cache.system_prompt().startswith("Base v2")
+        assert len(loads) == 1
+
+    def test_static_blocks_per_lang_and_role(self, training_file):
+        cache = ai_engine.PromptCache(str(training_file))
+        es = cache.static_blocks("es", "Donor")
+        assert es["language_lock"] == ai_engine._LANGUAGE_LOCK_PROMPTS["es"]
+        assert es["action_policy"] == ai_engine._ACTION_POLICY_PROMPTS["es"]
+        assert es["role_behavior"] == ai_engine._role_behavior_prompt("donor", "es")
+        assert "role_behavior" not in cache.static_blocks("en", None)
+
+        counts = cache.token_counts("es", "donor")
+        assert set(counts) == {"system", *es}
+        assert all(n > 0 for n in counts.values())
+
+    def test_broken_role_prompt_falls_back_to_default(self, training_file, monkeypatch):
+        def broken(role, lang="en"):
+            raise KeyError(role)
+
+        monkeypatch.setattr(ai_engine, "_role_behavior_prompt", broken)
+        blocks = ai_engine.PromptCache(str(training_file)).static_blocks("en", "donor")
+        assert "role_behavior" not in blocks
+        assert blocks["action_policy"] == ai_engine._ACTION_POLICY_PROMPTS["en"]
+
+    def test_missing_file_is_empty_not_fatal(self, tmp_path):
+        cache = ai_engine.PromptCache(str(tmp_path / "nope.json"))
+        assert cache.training_data == {}
+        assert "FoodMaps" in cache.system_prompt()
+
+
+# ---------------------------------------------------------------------------
+# Tool rounds
+# ---------------------------------------------------------------------------
+
+class TestRunToolCalls:
+    @pytest.fixture
+    def engine(self):
+        import asyncio
+
+        engine = ai_engine.ConversationEngine()
+        events = []
+
+        async def fake_execute(name, args):
+            events.append(("start", name))
+            await asyncio.sleep(args.get("sleep", 0.05))
+            events.append(("end", name))
+            return {"tool": name}
+
+        engine._execute_tool = fake_execute
+        return engine, events
+
+    @pytest.mark.asyncio
+    async def test_reads_overlap_and_writes_are_barriers(self, engine):
+        engine, events = engine
+        out = await engine._run_tool_calls([
+            ("search_food_near_user", {}),
+            ("query_distribution_centers", {}),
+            ("claim_listing", {}),
+            ("get_user_dashboard", {}),
+            ("bad_args", None),
+        ])
+        assert [r for r, _ in out[:4]] == [{"tool": n} for n in (
+            "search_food_near_user", "query_distribution_centers", "claim_listing", "get_user_dashboard")]
+        assert out[4] is None
+        assert all(ms >= 40 for _, ms in out[:4])
+        # Both reads start before either finishes; the claim runs alone.
+        assert events[:2] == [("start", "search_food_near_user"), ("start", "query_distribution_centers")]
+        assert events[4:6] == [("start", "claim_listing"), ("end", "claim_listing")]
+        assert events[6:] == [("start", "get_user_dashboard"), ("end", "get_user_dashboard")]
+
+    @pytest.mark.asyncio
+    async def test_slow_read_times_out(self, engine, monkeypatch):
+        engine, _ = engine
+        monkeypatch.setattr(ai_engine, "TOOL_TIMEOUT_SECONDS", 0.01)
+        started = time.monotonic()
+        out = await engine._run_tool_calls([("get_recipes", {"sleep": 1}), ("get_storage_tips", {"sleep": 0})])
+        assert time.monotonic() - started < 0.5
+        assert out[0][0]["error"] is True and "timed out" in out[0][0]["message"]
+        assert out[1][0] == {"tool": "get_storage_tips"}
+
+
+def _sse(*chunks: dict) -> bytes:
+    body = "".join(f"data: {json.dumps(c)}\n\n" for c in chunks) + "data: [DONE]\n\n"
+    return body.encode()
+
+
+class TestChatStream:
+    @pytest.fixture
+    def upstream(self, monkeypatch):
+        """Fake OpenAI: each POST pops the next canned (status, body)."""
+        import httpx
+
+        replies, payloads = [], []
+
+        def handler(request):
+            payloads.append(json.loads(request.content))
+            status, body = replies.pop(0)
+            return httpx.Response(status, content=body)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(ai_engine, "_get_http_client", lambda timeout=30: client)
+        monkeypatch.setattr(ai_engine, "OPENAI_API_KEY", "test-key")
+        monkeypatch.setattr(ai_engine, "_circuit", ai_engine.CircuitBreaker())
+        return replies, payloads
+
+    @pytest.mark.asyncio
+    async def test_deltas_and_tool_call_fragments_are_assembled(self, upstream):
+        replies, payloads = upstream
+        replies.append((200, _sse(
+            {"choices": [{"delta": {"content": "Hel"}}]},
+            {"choices": [{"delta": {"content": "lo"}}]},
+            {"choices": [{"delta": {"tool_calls": [
+                {"index": 0, "id": "c1", "function": {"name": "get_user_dashboard", "arguments": "{\"user_"}}]}}]},
+            {"choices": [{"delta": {"tool_calls": [{"index": 0, "function": {"arguments": "id\": \"7\"}"}}]}}]},
+        )))
+        engine = ai_engine.ConversationEngine()
+        out = [e async for e in engine._openai_chat_stream({"model": "m", "messages": []}, {})]
+        assert out[:2] == [("delta", "Hel"), ("delta", "lo")]
+        kind, msg = out[-1]
+        assert kind == "message" and msg["content"] == "Hello"
+        assert msg["tool_calls"][0]["function"] == {"name": "get_user_dashboard", "arguments": '{"user_id": "7"}'}
+        assert payloads[0]["stream"] is True
+
+    @pytest.mark.asyncio
+    async def test_overloaded_stream_falls_back_to_plain_request(self, upstream):
+        replies, payloads = upstream
+        replies.append((503, b""))
+        replies.append((200, json.dumps({"choices": [{"message": {"role": "assistant", "content": "Hi"}}]}).encode()))
+        engine = ai_engine.ConversationEngine()
+        out = [e async for e in engine._openai_chat_stream({"model": "m", "messages": []}, {})]
+        assert out == [("delta", "Hi"), ("message", {"role": "assistant", "content": "Hi"})]
+        assert "stream" not in payloads[1]
+
+    @pytest.mark.asyncio
+    async def test_turn_streams_tool_events_then_persists(self, upstream):
+        replies, payloads = upstream
+        replies.append((200, _sse({"choices": [{"delta": {"tool_calls": [
+            {"index": 0, "id": "c1", "function": {"name": "get_user_dashboard", "arguments": "{\"user_id\": \"99\"}"}}]}}]})))
+        replies.append((200, _sse({"choices": [{"delta": {"content": "You have "}}]},
+                                  {"choices": [{"delta": {"content": "2 pickups."}}]})))
+        engine = ai_engine.ConversationEngine()
+        calls, stored = [], []
+
+        async def fake_build(user_id, message, lang_hint=None):
+            return [{"role": "user", "content": message}], "en", {"role": "recipient"}
+
+        async def fake_execute(name, args):
+            calls.append((name, args))
+            return {"summary": "2 pickups"}
+
+        async def fake_persist(user_id, user_msg, assistant_msg, lang):
+            stored.append(assistant_msg)
+            return 5
+
+        engine._build_turn = fake_build
+        engine._execute_tool = fake_execute
+        engine._persist_conversation = fake_persist
+
+        events = [e async for e in engine.chat_stream(7, "what's on today?")]
+        kinds = [k for k, _ in events]
+        assert kinds == ["start", "tool", "action", "delta", "delta", "done"]
+        assert calls == [("get_user_dashboard", {"user_id": "7"})]
+        done = events[-1][1]
+        assert done["text"] == "You have 2 pickups." and done["conversation_id"] == "5"
+        assert done["actions"][0]["tool"] == "get_user_dashboard"
+        assert stored == ["You have 2 pickups."]
+        assert payloads[1]["model"] == ai_engine.FOLLOWUP_MODEL
+
+    @pytest.mark.asyncio
+    async def test_abandoned_stream_is_still_saved(self, upstream):
+        import asyncio
+
+        replies, _ = upstream
+        replies.append((200, _sse({"choices": [{"delta": {"content": "Half "}}]},
+                                  {"choices": [{"delta": {"content": "a reply"}}]})))
+        engine = ai_engine.ConversationEngine()
+        stored = []
+
+        async def fake_build(user_id, message, lang_hint=None):
+            return [{"role": "user", "content": message}], "en", {"role": "recipient"}
+
+        async def fake_persist(user_id, user_msg, assistant_msg, lang):
+            await asyncio.sleep(0)
+            stored.append(assistant_msg)
+            return 5
+
+        engine._build_turn = fake_build
+        engine._persist_conversation = fake_persist
+
+        stream = engine.chat_stream(7, "hi")
+        assert (await stream.__anext__())[0] == "start"
+        assert await stream.__anext__() == ("delta", "Half ")
+        await stream.aclose()  # client disconnected
+        assert len(engine._persist_tasks) == 1
+        await asyncio.gather(*engine._persist_tasks)
+        assert stored == ["Half "] and not engine._persist_tasks
+
+    def test_route_frames_events_as_sse(self, monkeypatch):
+        import jwt
+        from fastapi.testclient import TestClient
+
+        from backend.ai import routes
+        from backend.app import app
+
+        async def fake_stream(user_id, message, include_audio=False, lang_hint=None):
+            yield "start", {"lang": lang_hint}
+            yield "delta", "Hi"
+            yield "done", {"text": "Hi", "user_id": str(user_id)}
+
+        monkeypatch.setattr(routes.conversation_engine, "chat_stream", fake_stream)
+        token = jwt.encode({"sub": "7"}, routes.JWT_SECRET, algorithm="HS256")
+        res = TestClient(app).post(
+            "/api/ai/chat/stream",
+            json={"user_id": "7", "message": "hello", "lang": "en"},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert res.status_code == 200
+        assert res.headers["content-type"].startswith("text/event-stream")
+        assert res.text == (
+            'event: start\ndata: {"lang":"en"}\n\n'
+            'event: delta\ndata: {"text":"Hi"}\n\n'
+            'event: done\ndata: {"text":"Hi","user_id":"7"}\n\n'
+        )
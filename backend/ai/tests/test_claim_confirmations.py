@@ -0,0 +1,211 @@
+"""Tests for the claim confirmation stores and the auto-release scheduler."""
+from __future__ import annotations
+
+import itertools
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.claim_confirmations import (
+    ClaimExpiryScheduler,
+    DatabaseConfirmationStore,
+    InMemoryConfirmationStore,
+    release_expired_claims,
+    release_orphaned_claims,
+)
+from backend.models import FoodResource, User, UserRole
+
+
+def _make_store(kind, sessionmaker):
+    if kind == "memory":
+        return InMemoryConfirmationStore()
+    return DatabaseConfirmationStore(sessionmaker)
+
+
+@pytest.fixture(params=["memory", "database"])
+def store(request, sqlite_sessionmaker):
+    return _make_store(request.param, sqlite_sessionmaker)
+
+
+_emails = itertools.count()
+
+
+def _pending_listing(Session, claimed_at):
+    db = Session()
+    try:
+        donor = User(email=f"donor{next(_emails)}@example.com", name="Donor", role=UserRole.DONOR)
+        db.add(donor)
+        db.flush()
+        item = FoodResource(
+            donor_id=donor.id, title="Bread", qty=1, unit="loaf",
+            address="x", status="pending_confirmation", recipient_id=donor.id,
+            claimed_at=claimed_at,
+        )
+        db.add(item)
+        db.commit()
+        return item.id
+    finally:
+        db.close()
+
+
+def _status(Session, listing_id):
+    db = Session()
+    try:
+        return db.get(FoodResource, listing_id).status
+    finally:
+        db.close()
+
+
+class TestStores:
+    def test_put_get_pop(self, store):
+        exp = datetime.utcnow() + timedelta(minutes=5)
+        store.put(7, "1234", 3, exp)
+        assert store.get(7) == {"code": "1234", "recipient_id": 3, "expires_at": exp}
+        assert store.find(3, "1234") == [7]
+        assert store.find(3, "0000") == []
+        assert store.pop(7)["code"] == "1234"
+        assert store.get(7) is None
+        assert store.pop(7) is None
+
+    def test_put_replaces_previous_code(self, store):
+        exp = datetime.utcnow() + timedelta(minutes=5)
+        store.put(7, "1111", 3, exp)
+        store.put(7, "2222", 4, exp)
+        assert store.get(7)["code"] == "2222"
+        assert store.get(7)["recipient_id"] == 4
+
+    def test_pop_expired_is_oldest_first_and_limited(self, store):
+        now = datetime.utcnow()
+        store.put(1, "1", 1, now - timedelta(seconds=30))
+        store.put(2, "2", 1, now - timedelta(seconds=60))
+        store.put(3, "3", 1, now - timedelta(seconds=10))
+        store.put(4, "4", 1, now + timedelta(minutes=5))
+        assert store.pop_expired(now, limit=2) == [2, 1]
+        assert store.pop_expired(now) == [3]
+        assert store.pop_expired(now) == []
+        assert store.get(4) is not None
+
+
+class TestRelease:
+    def test_expired_claims_released_in_batches(self, sqlite_sessionmaker):
+        store = InMemoryConfirmationStore()
+        now = datetime.utcnow()
+        ids = [_pending_listing(sqlite_sessionmaker, now) for _ in range(5)]
+        for lid in ids[:4]:
+            store.put(lid, "1234", 1, now - timedelta(seconds=1))
+        store.put(ids[4], "1234", 1, now + timedelta(minutes=5))
+
+        assert release_expired_claims(sqlite_sessionmaker, store, now, batch_size=3) == ids[:4]
+        assert [_status(sqlite_sessionmaker, lid) for lid in ids] == ["available"] * 4 + ["pending_confirmation"]
+
+    def test_confirmed_listing_is_not_released(self, sqlite_sessionmaker):
+        store = InMemoryConfirmationStore()
+        now = datetime.utcnow()
+        lid = _pending_listing(sqlite_sessionmaker, now)
+        db = sqlite_sessionmaker()
+        db.get(FoodResource, lid).status = "claimed"
+        db.commit()
+        db.close()
+        store.put(lid, "1234", 1, now - timedelta(seconds=1))
+
+        assert release_expired_claims(sqlite_sessionmaker, store, now) == []
+        assert _status(sqlite_sessionmaker, lid) == "claimed"
+
+    def test_orphans_released_only_after_ttl(self, sqlite_sessionmaker):
+        store = InMemoryConfirmationStore()
+        now = datetime.utcnow()
+        stale = _pending_listing(sqlite_sessionmaker, now - timedelta(minutes=10))
+        fresh = _pending_listing(sqlite_sessionmaker, now)
+        tracked = _pending_listing(sqlite_sessionmaker, now - timedelta(minutes=10))
+        store.put(tracked, "1234", 1, now + timedelta(minutes=1))
+
+        assert release_orphaned_claims(sqlite_sessionmaker, store, now) == [stale]
+        assert _status(sqlite_sessionmaker, stale) == "available"
+        assert _status(sqlite_sessionmaker, fresh) == "pending_confirmation"
+        assert _status(sqlite_sessionmaker, tracked) == "pending_confirmation"
+
+    def test_sweep_publishes_each_released_listing(self, sqlite_sessionmaker, monkeypatch):
+        import backend.app as app_module
+
+        store = InMemoryConfirmationStore()
+        now = datetime.utcnow()
+        expired = _pending_listing(sqlite_sessionmaker, now)
+        orphan = _pending_listing(sqlite_sessionmaker, now - timedelta(minutes=10))
+        store.put(expired, "1234", 1, now - timedelta(seconds=1))
+        published = []
+        monkeypatch.setattr(app_module, "SessionLocal", sqlite_sessionmaker)
+        monkeypatch.setattr(app_module, "claim_confirmations", store)
+        monkeypatch.setattr(app_module.push_hub, "publish",
+                            lambda topics, event, data: published.append((topics, event, data)))
+
+        assert app_module.sweep_expired_claims(now) == 2
+        assert published == [
+            (["listings"], "listing.updated", {"listing_id": lid, "status": "available"})
+            for lid in (expired, orphan)
+        ]
+
+    def test_orphan_sweep_checks_the_store_in_one_query(self, sqlite_sessionmaker, count_sql):
+        store = DatabaseConfirmationStore(sqlite_sessionmaker)
+        now = datetime.utcnow()
+        ids = [_pending_listing(sqlite_sessionmaker, now - timedelta(minutes=10)) for _ in range(6)]
+        for lid in ids[:3]:
+            store.put(lid, "1234", 1, now + timedelta(minutes=1))
+
+        with count_sql(sqlite_sessionmaker.kw["bind"]) as statements:
+            assert release_orphaned_claims(sqlite_sessionmaker, store, now) == ids[3:]
+        assert sum("FROM pending_claim_confirmations" in sql for sql in statements) == 1
+        assert [_status(sqlite_sessionmaker, lid) for lid in ids] == ["pending_confirmation"] * 3 + ["available"] * 3
+
+
+class TestScheduler:
+    def test_due_entries_trigger_one_sweep(self):
+        calls = []
+        swept = threading.Event()
+
+        def sweep(now):
+            calls.append(now)
+            swept.set()
+
+        def expiry_threads():
+            return sum(t.name == "claim-expiry" for t in threading.enumerate())
+
+        before = expiry_threads()
+        scheduler = ClaimExpiryScheduler(sweep, poll_interval=60)
+        try:
+            soon = datetime.utcnow() + timedelta(milliseconds=50)
+            for lid in range(100):
+                scheduler.schedule(lid, soon)
+            assert swept.wait(2)
+            assert scheduler.pending() == 0
+            assert len(calls) == 1
+            assert expiry_threads() == before + 1
+        finally:
+            scheduler.stop()
+
+    def test_periodic_sweep_without_schedule(self):
+        swept = threading.Event()
+        scheduler = ClaimExpiryScheduler(lambda now: swept.set(), poll_interval=0.05)
+        scheduler.start()
+        try:
+            assert swept.wait(2)
+        finally:
+            scheduler.stop()
+
+    def test_sweep_errors_do_not_kill_thread(self):
+        calls = []
+
+        def sweep(now):
+            calls.append(now)
+            if len(calls) == 1:
+                raise RuntimeError("db down")
+
+        scheduler = ClaimExpiryScheduler(sweep, poll_interval=0.05)
+        scheduler.start()
+        try:
+            deadline = datetime.utcnow() + timedelta(seconds=2)
+            while len(calls) < 2 and datetime.utcnow() < deadline:
+                threading.Event().wait(0.01)
+            assert len(calls) >= 2
+        finally:
+            scheduler.stop()
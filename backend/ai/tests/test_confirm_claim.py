@@ -20,47 +20,36 @@ class TestConfirmClaimValidation:
 
     async def test_no_pending_confirmation_rejected(self):
         # Use a listing id that almost certainly has no pending confirmation.
-        from backend.app import pending_confirmations
-        pending_confirmations.pop(99999, None)
+        from backend.app import claim_confirmations
+        claim_confirmations.pop(99999)
         r = await execute_tool("confirm_claim", {"user_id": "1", "listing_id": 99999, "code": "1234"})
         assert "error" in r
 
     async def test_wrong_code_rejected(self):
-        from backend.app import pending_confirmations
-        pending_confirmations[99998] = {
-            "code": "9999",
-            "recipient_id": 1,
-            "expires_at": datetime.utcnow() + timedelta(minutes=5),
-        }
+        from backend.app import claim_confirmations
+        claim_confirmations.put(99998, "9999", 1, datetime.utcnow() + timedelta(minutes=5))
         try:
             r = await execute_tool("confirm_claim", {"user_id": "1", "listing_id": 99998, "code": "0000"})
             assert "error" in r and "invalid" in r["error"].lower()
         finally:
-            pending_confirmations.pop(99998, None)
+            claim_confirmations.pop(99998)
 
     async def test_wrong_recipient_rejected(self):
-        from backend.app import pending_confirmations
-        pending_confirmations[99997] = {
-            "code": "1234",
-            "recipient_id": 1,
-            "expires_at": datetime.utcnow() + timedelta(minutes=5),
-        }
+        from backend.app import claim_confirmations
+        claim_confirmations.put(99997, "1234", 1, datetime.utcnow() + timedelta(minutes=5))
         try:
             r = await execute_tool("confirm_claim", {"user_id": "2", "listing_id": 99997, "code": "1234"})
             assert "error" in r
         finally:
-            pending_confirmations.pop(99997, None)
+            claim_confirmations.pop(99997)
 
     async def test_expired_code_rejected(self):
-        from backend.app import pending_confirmations
-        pending_confirmations[99996] = {
-            "code": "1234",
-            "recipient_id": 1,
-            "expires_at": datetime.utcnow() - timedelta(seconds=1),
-        }
+        from backend.app import claim_confirmations
+        claim_confirmations.put(99996, "1234", 1, datetime.utcnow() - timedelta(seconds=1))
         try:
             r = await execute_tool("confirm_claim", {"user_id": "1", "listing_id": 99996, "code": "1234"})
             assert "error" in r and "expired" in r["error"].lower()
-            assert 99996 not in pending_confirmations
+            # Left for the auto-release sweep, which also frees the listing.
+            assert 99996 in claim_confirmations.pop_expired(datetime.utcnow())
         finally:
-            pending_confirmations.pop(99996, None)
+            claim_confirmations.pop(99996)
@@ -0,0 +1,182 @@
+"""Tests for token-budgeted context assembly and rolling summaries."""
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+
+from backend.ai import ai_engine, context
+from backend.ai.context import ContextBuilder
+from backend.ai.models import AIConversation, AIConversationSummary
+from backend.models import User, UserRole
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+def _history(n: int) -> list[dict]:
+    return [{"role": "user" if i % 2 == 0 else "assistant", "message": f"turn {i} " + "x " * 8}
+            for i in range(n)]
+
+
+def test_history_is_trimmed_oldest_first_to_fit_the_budget():
+    ctx = ContextBuilder(_words, budget=60)
+    ctx.add("system", "one two three four five six seven eight nine ten")
+    messages, breakdown = ctx.build(_history(10), "what now?")
+    replayed = [m["content"].split()[1] for m in messages[1:-1]]
+    # 10 tokens fixed + 2 for the message leaves 48: four 10-token turns.
+    assert replayed == ["6", "7", "8", "9"]
+    assert breakdown["history"] == 40 and breakdown["history_dropped"] == 6
+    assert breakdown["total"] == 52 <= ctx.budget
+    assert messages[-1] == {"role": "user", "content": "what now?"}
+
+
+def test_summary_is_replayed_before_recent_turns():
+    ctx = ContextBuilder(_words, budget=1000)
+    ctx.add("system", "base prompt")
+    messages, breakdown = ctx.build(_history(2), "hi", summary="User claimed listing 42.")
+    assert messages[1]["role"] == "system" and "listing 42" in messages[1]["content"]
+    assert [m["role"] for m in messages[2:]] == ["user", "assistant", "user"]
+    assert breakdown["summary"] > 0 and breakdown["history_dropped"] == 0
+
+
+def test_long_messages_are_clipped():
+    ctx = ContextBuilder(len, budget=100_000)
+    messages, _ = ctx.build([{"role": "assistant", "message": "y" * 9000}], "ok")
+    assert messages[0]["content"].endswith("... [truncated]")
+    assert len(messages[0]["content"]) == context.HISTORY_MESSAGE_MAX_CHARS + len("... [truncated]")
+
+
+@pytest.fixture
+def chat_db(sqlite_sessionmaker, monkeypatch):
+    import backend.app
+
+    monkeypatch.setattr(backend.app, "SessionLocal", sqlite_sessionmaker)
+    db = sqlite_sessionmaker()
+    user = User(email="c@example.com", name="C", role=UserRole.RECIPIENT)
+    db.add(user)
+    db.commit()
+    for i in range(20):
+        db.add(AIConversation(user_id=user.id, role="user" if i % 2 == 0 else "assistant",
+                              message=f"message {i}"))
+    db.commit()
+    yield db, user.id
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_refresh_summary_folds_older_rows(chat_db, monkeypatch):
+    db, user_id = chat_db
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"summary v{len(requests)}"}}]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(ai_engine, "_get_http_client", lambda timeout=30: client)
+    monkeypatch.setattr(ai_engine, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(ai_engine, "_circuit", ai_engine.CircuitBreaker())
+    engine = ai_engine.ConversationEngine()
+
+    assert await engine.refresh_summary(user_id) is True
+    row = db.get(AIConversationSummary, user_id)
+    keep = context.SUMMARY_KEEP_RECENT
+    assert row.summary == "summary v1" and row.message_count == 20 - keep
+    assert "message 0" in requests[0]["messages"][1]["content"]
+    assert f"message {20 - keep}" not in requests[0]["messages"][1]["content"]
+
+    # Not enough new rows yet: no upstream call.
+    assert await engine.refresh_summary(user_id) is False
+    assert len(requests) == 1
+
+    summary, history = await engine.get_context_history(user_id)
+    assert summary == "summary v1"
+    assert [h["message"] for h in history] == [f"message {i}" for i in range(20 - keep, 20)]
+
+    assert await engine.clear_history(user_id) == 20
+    db.expire_all()
+    assert db.get(AIConversationSummary, user_id) is None
+
+
+def _roles(n: int) -> list[tuple[str, int]]:
+    # chat_db alternates roles for its first 20 rows; the extra rows are all "user".
+    return [("assistant" if i < 20 and i % 2 else "user", i) for i in range(n)]
+
+
+def _summarizer(monkeypatch, on_request=None):
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        if on_request is not None:
+            on_request()
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"summary v{len(requests)}"}}]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(ai_engine, "_get_http_client", lambda timeout=30: client)
+    monkeypatch.setattr(ai_engine, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(ai_engine, "_circuit", ai_engine.CircuitBreaker())
+    return requests
+
+
+@pytest.mark.asyncio
+async def test_long_history_is_folded_a_bounded_batch_per_pass(chat_db, monkeypatch):
+    db, user_id = chat_db
+    fold, keep = context.SUMMARY_MAX_FOLD, context.SUMMARY_KEEP_RECENT
+    total = fold + keep + context.SUMMARY_BATCH + 20
+    for i in range(20, total):
+        db.add(AIConversation(user_id=user_id, role="user", message=f"message {i}"))
+    db.commit()
+    requests = _summarizer(monkeypatch)
+    engine = ai_engine.ConversationEngine()
+
+    assert await engine.refresh_summary(user_id) is True
+    folded = requests[0]["messages"][1]["content"].split("New messages:\n")[1].splitlines()
+    assert folded == [f"{r}: message {i}" for r, i in _roles(fold)]
+    db.expire_all()
+    row = db.get(AIConversationSummary, user_id)
+    assert row.message_count == fold
+    assert row.through_id == db.query(AIConversation.id).order_by(AIConversation.id).offset(fold - 1).limit(1).scalar()
+
+    # The next pass picks up where the first stopped.
+    assert await engine.refresh_summary(user_id) is True
+    assert f"user: message {fold}\n" in requests[1]["messages"][1]["content"]
+    db.expire_all()
+    assert db.get(AIConversationSummary, user_id).message_count == total - keep
+
+
+@pytest.mark.asyncio
+async def test_clear_during_first_fold_leaves_no_summary(chat_db, monkeypatch):
+    db, user_id = chat_db
+
+    def clear_now():
+        # clear_history lands while the summarizer request is in flight.
+        db.query(AIConversation).filter(AIConversation.user_id == user_id).delete()
+        db.query(AIConversationSummary).filter(AIConversationSummary.user_id == user_id).delete()
+        db.commit()
+
+    requests = _summarizer(monkeypatch, on_request=clear_now)
+    engine = ai_engine.ConversationEngine()
+
+    assert await engine.refresh_summary(user_id) is False
+    assert len(requests) == 1
+    db.expire_all()
+    assert db.get(AIConversationSummary, user_id) is None
+
+
+@pytest.mark.asyncio
+async def test_turn_prompt_uses_summary_and_stays_under_budget(chat_db, monkeypatch):
+    db, user_id = chat_db
+    db.add(AIConversationSummary(user_id=user_id, summary="Asked about pantry hours.",
+                                 through_id=10, message_count=10))
+    db.commit()
+    engine = ai_engine.ConversationEngine()
+    messages, lang, _ = await engine._build_turn(user_id, "and tomorrow?")
+    contents = [m["content"] for m in messages]
+    assert any("Asked about pantry hours." in c for c in contents)
+    assert not any(c == "message 9" for c in contents)
+    assert "message 10" in contents and contents[-1] == "and tomorrow?"
+    assert sum(ai_engine.count_tokens(c) for c in contents) <= context.CONTEXT_TOKEN_BUDGET
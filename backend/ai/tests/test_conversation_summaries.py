@@ -0,0 +1,141 @@
+"""Tests for the conversation_summaries table behind the messaging inbox."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+
+from backend.app import (
+    JWT_ALGORITHM,
+    JWT_SECRET,
+    _backfill_conversation_summaries,
+    get_conversations,
+    get_messages,
+)
+from backend.models import ConversationSummary, Message, User, UserRole
+
+
+def _creds(user_id):
+    token = jwt.encode({"sub": str(user_id)}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.fixture
+def inbox(sqlite_sessionmaker):
+    db = sqlite_sessionmaker()
+    admin = User(email="admin@example.com", name="Admin", role=UserRole.ADMIN)
+    users = [User(email=f"u{i}@example.com", name=f"User {i}", role=UserRole.RECIPIENT) for i in range(3)]
+    db.add_all([admin, *users])
+    db.commit()
+    yield db, admin, users
+    db.close()
+
+
+def _send(db, sender, conversation_id, content, from_admin=False, at=None):
+    db.add(Message(
+        sender_id=sender.id, conversation_id=conversation_id, content=content,
+        is_from_admin=from_admin, is_read=False, created_at=at or datetime.utcnow(),
+    ))
+    db.commit()
+
+
+def test_insert_maintains_summary(inbox):
+    db, admin, (u0, *_) = inbox
+    conv = f"user_{u0.id}"
+    _send(db, u0, conv, "hi")
+    _send(db, u0, conv, "anyone?")
+    _send(db, admin, conv, "hello", from_admin=True)
+
+    summary = db.get(ConversationSummary, conv)
+    db.refresh(summary)
+    last = db.query(Message).order_by(Message.id.desc()).first()
+    assert summary.user_id == u0.id
+    assert summary.last_message_id == last.id
+    assert summary.unread_for_admin == 2
+    assert summary.unread_for_user == 1
+
+
+def test_admin_list_is_sorted_and_read_resets_counter(inbox):
+    db, admin, (u0, u1, u2) = inbox
+    base = datetime.utcnow()
+    _send(db, u0, f"user_{u0.id}", "older", at=base - timedelta(minutes=5))
+    _send(db, u1, f"user_{u1.id}", "newer", at=base)
+    _send(db, u2, f"pair_{u1.id}_{u2.id}", "side chat", at=base - timedelta(minutes=10))
+
+    rows = get_conversations(credentials=_creds(admin.id), db=db)
+    assert [r["latest_message"] for r in rows] == ["newer", "older", "side chat"]
+    assert rows[0]["user_name"] == "User 1" and rows[0]["user_id"] == u1.id
+    assert rows[2]["user_name"] == "Unknown" and rows[2]["user_id"] is None
+    assert [r["unread_count"] for r in rows] == [1, 1, 1]
+
+    msgs = get_messages(f"user_{u1.id}", credentials=_creds(admin.id), db=db)
+    assert all(m["is_read"] for m in msgs)
+    # Opening it again must not push the counter below zero or re-count.
+    get_messages(f"user_{u1.id}", credentials=_creds(admin.id), db=db)
+    rows = get_conversations(credentials=_creds(admin.id), db=db)
+    assert rows[0]["unread_count"] == 0
+    assert rows[1]["unread_count"] == 1
+
+
+def test_user_sees_own_conversation_unread_from_admin(inbox):
+    db, admin, (u0, *_) = inbox
+    conv = f"user_{u0.id}"
+    _send(db, u0, conv, "help")
+    _send(db, admin, conv, "on it", from_admin=True)
+
+    rows = get_conversations(credentials=_creds(u0.id), db=db)
+    assert rows == [{
+        "conversation_id": conv,
+        "user_name": "Admin Support",
+        "latest_message": "on it",
+        "latest_message_time": rows[0]["latest_message_time"],
+        "unread_count": 1,
+        "is_from_admin": True,
+    }]
+    get_messages(conv, credentials=_creds(u0.id), db=db)
+    assert get_conversations(credentials=_creds(u0.id), db=db)[0]["unread_count"] == 0
+
+
+def test_admin_list_query_count_is_constant(inbox):
+    db, admin, users = inbox
+    for i in range(30):
+        sender = users[i % len(users)]
+        _send(db, sender, f"conv_{i}", f"m{i}")
+
+    creds = _creds(admin.id)
+    statements = []
+    engine = db.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        rows = get_conversations(credentials=creds, db=db)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len(rows) == 30
+    # One user lookup for the caller, one summary query.
+    assert len(statements) == 2
+
+
+def test_backfill_summarizes_existing_conversations(sqlite_sessionmaker, monkeypatch):
+    import backend.app as app_module
+
+    db = sqlite_sessionmaker()
+    user = User(email="old@example.com", name="Old", role=UserRole.RECIPIENT)
+    db.add(user)
+    db.commit()
+    _send(db, user, f"user_{user.id}", "from before")
+    _send(db, user, f"user_{user.id}", "still waiting")
+    # Simulate rows written before the summary table existed.
+    db.query(ConversationSummary).delete()
+    db.commit()
+
+    monkeypatch.setattr(app_module, "SessionLocal", sqlite_sessionmaker)
+    assert _backfill_conversation_summaries() == 1
+    assert _backfill_conversation_summaries() == 0
+    summary = db.get(ConversationSummary, f"user_{user.id}")
+    assert summary.unread_for_admin == 2
+    assert summary.user_id == user.id
+    db.close()
@@ -0,0 +1,160 @@
+"""Tests for server-side dispatch matching (backend.dispatch_matching)."""
+from __future__ import annotations
+
+import itertools
+import random
+from datetime import datetime, timedelta
+
+from backend import dispatch_matching as dm
+from backend.dispatch_matching import DriverSnap, ListingSnap, RequestSnap
+from backend.models import FoodCategory, FoodRequest, FoodResource, User, UserRole
+
+NOW = datetime(2026, 3, 14, 9, 0)
+LAT, LNG = 37.80, -122.27
+
+
+def _east(km: float) -> float:
+    return LNG + km / 88.0
+
+
+def _req(rid, km=0.0, category=None, household=2, urgency=0, **kw):
+    return RequestSnap(rid, category, household, LAT, _east(km), urgency, kw.get("latest_by"), kw.get("created_at", NOW))
+
+
+def _lst(lid, km=0.0, category=None, qty=4, weight=None, **kw):
+    return ListingSnap(lid, category, qty, weight, LAT, _east(km), kw.get("pickup_start"), kw.get("pickup_by"))
+
+
+def test_assign_is_optimal_on_rectangular_matrices():
+    rng = random.Random(3)
+    for _ in range(200):
+        n, m = rng.randint(1, 5), rng.randint(1, 5)
+        cost = [[rng.randint(0, 30) for _ in range(m)] for _ in range(n)]
+        pairs = dm.assign(cost)
+        assert len(pairs) == min(n, m)
+        if n <= m:
+            best = min(sum(cost[i][p[i]] for i in range(n)) for p in itertools.permutations(range(m), n))
+        else:
+            best = min(sum(cost[p[j]][j] for j in range(m)) for p in itertools.permutations(range(n), m))
+        assert sum(cost[i][j] for i, j in pairs) == best
+
+
+def test_pair_feasibility_rules():
+    assert dm.pair_cost(_req(1, category="produce"), _lst(1, category="bakery")) is None
+    assert dm.pair_cost(_req(1), _lst(1, km=dm.MAX_MATCH_KM + 5)) is None
+    assert dm.pair_cost(
+        _req(1, latest_by=NOW), _lst(1, pickup_start=NOW + timedelta(hours=1)),
+    ) is None
+    # A short listing costs more than a right-sized one at the same distance.
+    assert dm.pair_cost(_req(1, household=6), _lst(1, qty=2)) > dm.pair_cost(_req(1, household=6), _lst(2, qty=6))
+
+
+def test_scarce_listing_goes_to_the_more_urgent_request():
+    reqs = [_req(1, km=0.5, urgency=0), _req(2, km=3.0, urgency=80)]
+    result = dm.solve(reqs, [_lst(10)], [], NOW)
+    assert [(m["request_id"], m["listing_id"]) for m in result["matches"]] == [(2, 10)]
+    assert result["unmatched_requests"] == [1]
+
+
+def test_closed_pickup_window_is_not_matched():
+    result = dm.solve([_req(1)], [_lst(10, pickup_by=NOW - timedelta(minutes=1))], [], NOW)
+    assert result["matches"] == [] and result["unmatched_requests"] == [1]
+
+
+def test_drivers_are_assigned_within_capacity():
+    reqs = [_req(1, km=1), _req(2, km=-1)]
+    lsts = [_lst(10, km=2, weight=30), _lst(20, km=-2, weight=5)]
+    drivers = [
+        DriverSnap(100, LAT, _east(2), capacity_kg=40, load_kg=20),  # near listing 10, but only 20 kg free
+        DriverSnap(200, LAT, _east(-3), capacity_kg=100, load_kg=0),
+    ]
+    result = dm.solve(reqs, lsts, drivers, NOW)
+    by_listing = {m["listing_id"]: m["driver"] for m in result["matches"]}
+    assert by_listing[10]["driver_id"] == 200
+    assert by_listing[20]["driver_id"] == 100
+    assert result["idle_drivers"] == []
+
+
+def _seed(db):
+    recipient = User(email="r@example.com", name="R", role=UserRole.RECIPIENT)
+    donor = User(email="d@example.com", name="D", role=UserRole.DONOR)
+    driver = User(email="v@example.com", name="V", role=UserRole.DRIVER,
+                  coords_lat=LAT, coords_lng=_east(1), vehicle_capacity_kg=50)
+    db.add_all([recipient, donor, driver])
+    db.flush()
+    request = FoodRequest(recipient_id=recipient.id, category=FoodCategory.PRODUCE, household_size=2,
+                          address="x", coords_lat=LAT, coords_lng=LNG, status="open", urgency_score=10)
+    listing = FoodResource(donor_id=donor.id, title="Apples", category=FoodCategory.PRODUCE, qty=3,
+                           unit="bag", address="y", status="available", coords_lat=LAT, coords_lng=_east(2))
+    db.add_all([request, listing])
+    db.commit()
+    return request, listing, driver
+
+
+def test_matcher_reuses_result_and_reloads_only_dirty_rows(sqlite_sessionmaker):
+    db = sqlite_sessionmaker()
+    request, listing, driver = _seed(db)
+    matcher = dm.DispatchMatcher(ttl_seconds=3600)
+
+    first = matcher.matches(sqlite_sessionmaker, now=NOW)
+    assert [(m["request_id"], m["listing_id"]) for m in first["matches"]] == [(request.id, listing.id)]
+    assert first["matches"][0]["driver"]["driver_id"] == driver.id
+    assert matcher.matches(sqlite_sessionmaker, now=NOW) is first
+    assert (matcher.solves, matcher.full_reloads) == (1, 1)
+
+    listing.status = "claimed"
+    db.commit()
+    matcher.mark_dirty(listings=[listing.id])
+    second = matcher.matches(sqlite_sessionmaker, now=NOW)
+    assert second["matches"] == [] and second["unmatched_requests"] == [request.id]
+    assert (matcher.solves, matcher.full_reloads) == (2, 1)
+    db.close()
+
+
+def test_app_flush_hook_marks_the_shared_matcher_dirty(sqlite_sessionmaker):
+    import backend.app  # noqa: F401  (installs the listeners)
+
+    db = sqlite_sessionmaker()
+    dm.dispatch_matcher.matches(sqlite_sessionmaker, now=NOW)
+    request, listing, _ = _seed(db)
+    assert request.id in dm.dispatch_matcher._dirty_requests
+    assert listing.id in dm.dispatch_matcher._dirty_listings
+    result = dm.dispatch_matcher.matches(sqlite_sessionmaker, now=NOW)
+    assert [m["listing_id"] for m in result["matches"]] == [listing.id]
+    db.close()
+
+
+def test_flushes_mark_dirty_only_on_commit(sqlite_sessionmaker, monkeypatch):
+    import backend.app  # noqa: F401  (installs the listeners)
+
+    db = sqlite_sessionmaker()
+    request, listing, driver = _seed(db)
+    matcher = dm.dispatch_matcher
+    monkeypatch.setattr(matcher, "ttl_seconds", 3600)
+    try:
+        first = matcher.matches(sqlite_sessionmaker, now=NOW)
+
+        listing.qty = 1
+        db.flush()
+        assert not matcher._dirty_listings  # not committed: a solve now must not forget it
+        db.rollback()
+        db.commit()
+        assert not matcher._dirty_listings
+
+        # Touching a driver's activity does not change the matching.
+        driver.last_active = NOW
+        db.commit()
+        assert matcher.matches(sqlite_sessionmaker, now=NOW) is first
+
+        driver.vehicle_capacity_kg = 10
+        listing.qty = 2
+        db.commit()
+        assert matcher._dirty_listings == {listing.id} and matcher._stale
+
+        # Marking never waits for a solve in progress.
+        with matcher._lock:
+            matcher.mark_dirty(requests=[request.id])
+        second = matcher.matches(sqlite_sessionmaker, now=NOW)
+        assert second is not first and not matcher._dirty_listings and not matcher._dirty_requests
+    finally:
+        db.close()
@@ -0,0 +1,51 @@
+"""Guards for the sync-handler execution model in backend/app.py.
+
+DB-bound routes must be plain ``def`` so FastAPI runs them in its
+threadpool; an ``async def`` handler calling the sync Session would block
+the event loop for every concurrent request.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+from backend.app import RequestBody, app
+from backend.db import get_db
+
+
+def _dependency_calls(dependant) -> set:
+    calls = set()
+    for dep in dependant.dependencies:
+        calls.add(dep.call)
+        calls |= _dependency_calls(dep)
+    return calls
+
+
+def test_no_async_route_depends_on_sync_session():
+    offenders = [
+        f"{sorted(route.methods)} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        and asyncio.iscoroutinefunction(route.endpoint)
+        and get_db in _dependency_calls(route.dependant)
+    ]
+    assert offenders == []
+
+
+def test_request_body_json_matches_starlette_contract():
+    assert RequestBody(b'{"a": [1, 2]}').json() == {"a": [1, 2]}
+    with pytest.raises(json.JSONDecodeError):
+        RequestBody(b"{not json").json()
+
+
+def test_sync_handler_receives_body():
+    client = TestClient(app)
+    # The body is read by the async dependency and parsed inside the
+    # threadpool handler, which validates it before touching the database.
+    r = client.post("/api/newsletter/subscribe", json={"email": "not-an-email"})
+    assert r.status_code == 400
+    assert "email" in r.json()["detail"].lower()
@@ -0,0 +1,196 @@
+"""Tests for the geohash listing index (backend.geo_index)."""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+
+from fastapi import Response
+from sqlalchemy import event, text
+
+from backend import geo_index as G
+from backend.app import get_listings
+from backend.models import FoodCategory, FoodResource, PerishabilityLevel
+
+
+def _listing(lat, lng, *, status="available", title="x", created_at=None):
+    return FoodResource(
+        title=title,
+        category=FoodCategory.PRODUCE,
+        perishability=PerishabilityLevel.LOW,
+        qty=1,
+        unit="box",
+        address="somewhere",
+        coords_lat=lat,
+        coords_lng=lng,
+        status=status,
+        created_at=created_at or datetime.utcnow(),
+    )
+
+
+class TestEncode:
+    def test_reference_value(self):
+        # Canonical example from the geohash spec.
+        assert G.encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+    def test_prefix_is_containing_cell(self):
+        full = G.encode(37.7749, -122.4194)
+        assert G.encode(37.7749, -122.4194, 5) == full[:5]
+
+    def test_encode_or_none_handles_missing(self):
+        assert G.encode_or_none(None, 1.0) is None
+        assert G.encode_or_none(1.0, None) is None
+        assert G.encode_or_none(200.0, 1.0) is None
+        assert G.encode_or_none("37.7", "-122.4") == G.encode(37.7, -122.4)
+
+
+class TestCoveringPrefixes:
+    def test_cover_contains_every_point_in_box(self):
+        rng = random.Random(7)
+        box = G.bounding_box(37.8044, -122.2712, 5)
+        prefixes = G.covering_prefixes(*box)
+        assert 0 < len(prefixes) <= G.MAX_COVER_CELLS
+        for _ in range(500):
+            lat = rng.uniform(box[0], box[2])
+            lng = rng.uniform(box[1], box[3])
+            gh = G.encode(lat, lng)
+            assert any(gh.startswith(p) for p in prefixes)
+
+    def test_small_radius_uses_fine_cells(self):
+        prefixes = G.covering_prefixes(*G.bounding_box(37.8, -122.27, 1))
+        assert min(len(p) for p in prefixes) >= 5
+
+    def test_antimeridian_box(self):
+        box = G.bounding_box(0.0, 179.99, 10)
+        assert box[3] > 180.0
+        prefixes = G.covering_prefixes(*box)
+        assert any(G.encode(0.0, -179.99).startswith(p) for p in prefixes)
+        assert any(G.encode(0.0, 179.99).startswith(p) for p in prefixes)
+
+    def test_prefix_upper_bound_carries(self):
+        assert G._prefix_upper_bound("9q8") == "9q9"
+        assert G._prefix_upper_bound("9qz") == "9r"
+        assert G._prefix_upper_bound("zz") is None
+
+
+class TestOrmSync:
+    def test_geohash_set_on_insert_and_update(self, sqlite_sessionmaker):
+        db = sqlite_sessionmaker()
+        item = _listing(37.8044, -122.2712)
+        db.add(item)
+        db.commit()
+        assert item.geohash == G.encode(37.8044, -122.2712)
+
+        item.coords_lat, item.coords_lng = 40.7128, -74.0060
+        db.commit()
+        assert item.geohash == G.encode(40.7128, -74.0060)
+
+        item.coords_lat = None
+        db.commit()
+        assert item.geohash is None
+        db.close()
+
+    def test_backfill_hashes_legacy_rows(self, sqlite_sessionmaker):
+        db = sqlite_sessionmaker()
+        db.add_all([_listing(37.80, -122.27), _listing(None, None)])
+        db.commit()
+        # Simulate rows written before the column existed.
+        db.query(FoodResource).update({FoodResource.geohash: None}, synchronize_session=False)
+        db.commit()
+        db.close()
+
+        assert G.backfill_geohashes(sqlite_sessionmaker, FoodResource, batch_size=1) == 1
+        db = sqlite_sessionmaker()
+        hashes = sorted((r.geohash or "") for r in db.query(FoodResource).all())
+        assert hashes == ["", G.encode(37.80, -122.27)]
+        db.close()
+
+
+class TestRadiusQuery:
+    def test_returns_only_rows_within_radius(self, sqlite_sessionmaker):
+        db = sqlite_sessionmaker()
+        origin = (37.8044, -122.2712)  # Oakland
+        now = datetime.utcnow()
+        # An old nearby listing behind a wall of newer far-away ones: the
+        # previous newest-N scan never saw it.
+        db.add(_listing(37.81, -122.27, title="old-near", created_at=now - timedelta(days=30)))
+        for i in range(600):
+            db.add(_listing(40.71, -74.0 + i * 1e-4, title=f"nyc-{i}", created_at=now))
+        db.add(_listing(37.8044, -122.20, title="6km-east", created_at=now))
+        db.add(_listing(37.80, -122.27, status="claimed", title="claimed-near"))
+        db.commit()
+
+        q = db.query(FoodResource).filter(
+            FoodResource.status == "available",
+            G.radius_filter(FoodResource, *origin, 5),
+        )
+        rows = q.all()
+        titles = {r.title for r in rows}
+        assert titles == {"old-near"}
+
+        pairs = G.within_radius(
+            db.query(FoodResource).filter(G.radius_filter(FoodResource, *origin, 10)).all(),
+            *origin, 10,
+        )
+        assert [r.title for r, _ in pairs][:2] == ["claimed-near", "old-near"]
+        assert all(d <= 10 for _, d in pairs)
+        db.close()
+
+    def test_take_within_radius_skips_box_corners(self, sqlite_sessionmaker):
+        db = sqlite_sessionmaker()
+        origin = (0.0, 0.0)
+        now = datetime.utcnow()
+        # Newest rows sit in the bbox corner (inside the box, outside the circle).
+        for i in range(5):
+            db.add(_listing(0.0085, 0.0085, title=f"corner-{i}", created_at=now))
+        db.add(_listing(0.001, 0.001, title="inside", created_at=now - timedelta(days=1)))
+        db.commit()
+
+        ordered = (
+            db.query(FoodResource)
+            .filter(G.radius_filter(FoodResource, *origin, 1))
+            .order_by(FoodResource.created_at.desc())
+        )
+        pairs = G.take_within_radius(ordered, *origin, 1, limit=1, chunk_size=2)
+        assert [r.title for r, _ in pairs] == ["inside"]
+        db.close()
+
+
+def _plans(db, call) -> list:
+    """Run ``call`` and return the EXPLAIN QUERY PLAN detail lines of its food_resources SELECTs."""
+    bind = db.get_bind()
+    captured = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM food_resources" in statement:
+            captured.append((statement, parameters))
+
+    event.listen(bind, "before_cursor_execute", _record)
+    try:
+        call()
+    finally:
+        event.remove(bind, "before_cursor_execute", _record)
+    with bind.connect() as conn:
+        return [row[-1] for statement, parameters in captured
+                for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+
+
+def test_radius_and_bbox_searches_use_the_geohash_index(sqlite_sessionmaker):
+    db = sqlite_sessionmaker()
+    # Listings spread over the western US, with planner statistics.
+    db.execute(FoodResource.__table__.insert(), [
+        {"title": f"Item {i}", "status": "available", "created_at": datetime(2024, 1, 1),
+         "coords_lat": 30 + (i % 40) * 0.4, "coords_lng": -120 + (i // 40) * 0.5,
+         "geohash": G.encode_or_none(30 + (i % 40) * 0.4, -120 + (i // 40) * 0.5)}
+        for i in range(800)
+    ])
+    db.commit()
+    db.execute(text("ANALYZE"))
+    searches = [
+        lambda: get_listings(response=Response(), db=db, credentials=None, lat=37.8, lng=-122.27, radius_km=5),
+        lambda: get_listings(response=Response(), db=db, credentials=None,
+                             min_lat=37.7, min_lng=-122.4, max_lat=37.9, max_lng=-122.2),
+    ]
+    for search in searches:
+        plan = _plans(db, search)
+        assert any("ix_food_resources_geohash" in line for line in plan), plan
+    db.close()
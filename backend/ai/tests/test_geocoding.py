@@ -0,0 +1,115 @@
+"""Tests for the shared geocoder (backend.geocoding) with a local provider."""
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from backend.geocoding import Geocoder, GeocodeHit, StaticProvider, normalize_address
+from backend.models import GeocodeCacheEntry
+
+PLACES = {"12 Main St, Oakland, CA": (37.8, -122.27)}
+
+
+def test_normalize_address():
+    assert normalize_address("  12 MAIN st ,Oakland,  CA. ") == "12 main st, oakland, ca"
+    assert normalize_address(None) == ""
+
+
+@pytest.mark.asyncio
+async def test_memory_and_db_tiers(sqlite_sessionmaker):
+    provider = StaticProvider(PLACES)
+    geo = Geocoder(provider, session_factory=sqlite_sessionmaker)
+    assert await geo.geocode("12 main st, oakland, ca") == (37.8, -122.27)
+    assert await geo.geocode("12 Main St,Oakland, CA") == (37.8, -122.27)
+    assert await geo.geocode("nowhere") is None
+    assert await geo.geocode("Nowhere.") is None
+    assert provider.calls == 2
+    assert geo.stats["memory_hits"] == 2
+
+    # A fresh process (empty LRU) is answered from the table, misses included.
+    fresh = Geocoder(StaticProvider({}), session_factory=sqlite_sessionmaker)
+    assert await fresh.geocode("12 Main St, Oakland, CA") == (37.8, -122.27)
+    assert await fresh.geocode("nowhere") is None
+    assert fresh.provider.calls == 0
+    assert fresh.stats["db_hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_rows_are_refetched(sqlite_sessionmaker):
+    from datetime import timedelta
+
+    provider = StaticProvider(PLACES)
+    geo = Geocoder(provider, session_factory=sqlite_sessionmaker, ttl=timedelta(seconds=-1))
+    await geo.geocode("12 Main St, Oakland, CA")
+    geo.clear_memory()
+    await geo.geocode("12 Main St, Oakland, CA")
+    assert provider.calls == 2
+    db = sqlite_sessionmaker()
+    assert db.query(GeocodeCacheEntry).count() == 1
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_identical_lookups_are_coalesced():
+    provider = StaticProvider(PLACES, delay=0.02)
+    geo = Geocoder(provider, session_factory=None)
+    results = await asyncio.gather(*(geo.geocode("12 Main St, Oakland, CA") for _ in range(10)))
+    assert set(results) == {(37.8, -122.27)}
+    assert provider.calls == 1
+    assert geo.stats["coalesced"] == 9
+
+
+@pytest.mark.asyncio
+async def test_provider_errors_are_not_cached():
+    class Flaky(StaticProvider):
+        async def forward(self, address):
+            self.calls += 1
+            if self.calls == 1:
+                raise RuntimeError("mapbox status 503")
+            return await super().forward(address)
+
+    geo = Geocoder(Flaky(PLACES), session_factory=None)
+    assert await geo.geocode("12 Main St, Oakland, CA") is None
+    assert await geo.geocode("12 Main St, Oakland, CA") == (37.8, -122.27)
+
+
+@pytest.mark.asyncio
+async def test_strict_rejects_coarse_matches():
+    class Coarse(StaticProvider):
+        async def forward(self, address):
+            return GeocodeHit(37.0, -120.0, 0.9, ("region",))
+
+    geo = Geocoder(Coarse(), session_factory=None)
+    assert await geo.geocode("California") == (37.0, -120.0)
+    assert await geo.geocode("California", strict=True) is None
+
+
+def test_blocking_calls_run_on_the_attached_loop():
+    provider = StaticProvider(PLACES, delay=0.01)
+    geo = Geocoder(provider, session_factory=None)
+    loop = asyncio.new_event_loop()
+    runner = threading.Thread(target=loop.run_forever, daemon=True)
+    runner.start()
+    try:
+        geo.attach(loop)
+        results = []
+        workers = [
+            threading.Thread(target=lambda: results.append(geo.geocode_blocking("12 main st, oakland, ca")))
+            for _ in range(5)
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        assert results == [(37.8, -122.27)] * 5
+        assert provider.calls == 1
+    finally:
+        asyncio.run_coroutine_threadsafe(geo.aclose(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        runner.join(5)
+        loop.close()
+
+    # Without a running loop the lookup runs in a private one.
+    assert Geocoder(StaticProvider(PLACES), session_factory=None).geocode_blocking("12 Main St, Oakland, CA") == (37.8, -122.27)
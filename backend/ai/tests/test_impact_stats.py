@@ -0,0 +1,155 @@
+"""Tests for the incrementally maintained public impact totals (backend.impact_stats)."""
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from fastapi import Response
+from fastapi.security import HTTPAuthorizationCredentials
+
+import backend.app as app_module
+from backend.ai.tools import _cancel_claim
+from backend.app import JWT_ALGORITHM, JWT_SECRET, RequestBody, confirm_claim, get_public_stats
+from backend.claim_confirmations import InMemoryConfirmationStore
+from backend.impact_stats import PublicStatsCache, read_totals, reconcile
+from backend.models import FoodResource, ImpactRecipient, User, UserRole
+
+
+@pytest.fixture
+def impact(sqlite_sessionmaker, monkeypatch):
+    monkeypatch.setattr(app_module, "SessionLocal", sqlite_sessionmaker)
+    monkeypatch.setattr(app_module, "claim_confirmations", InMemoryConfirmationStore())
+    db = sqlite_sessionmaker()
+    donor = User(email="donor@example.com", name="Donor", role=UserRole.DONOR)
+    alice = User(email="alice@example.com", name="Alice", role=UserRole.RECIPIENT)
+    bob = User(email="bob@example.com", name="Bob", role=UserRole.RECIPIENT)
+    db.add_all([donor, alice, bob])
+    db.commit()
+    reconcile(sqlite_sessionmaker)
+
+    def listing(status="available", recipient=None, qty=10, unit="lb", **extra):
+        item = FoodResource(donor_id=donor.id, title="Food", qty=qty, unit=unit, address="x", status=status,
+                            recipient_id=recipient.id if recipient else None, **extra)
+        db.add(item)
+        db.commit()
+        return item
+
+    def totals():
+        db.expire_all()
+        return read_totals(db)
+
+    yield db, sqlite_sessionmaker, listing, totals, (alice, bob)
+    db.close()
+
+
+def _creds(user_id: int) -> HTTPAuthorizationCredentials:
+    token = jwt.encode({"sub": str(user_id), "role": "recipient"}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def _counts(t: dict) -> tuple:
+    return t["pounds_donated_lbs"], t["families_helped"], t["claimed_listings"]
+
+
+def test_counters_follow_claims_edits_and_deletes(impact):
+    db, session_factory, listing, totals, (alice, bob) = impact
+    assert _counts(totals()) == (0, 0, 0)
+
+    bread = listing("claimed", alice, qty=10, unit="lb", claimed_at=datetime(2024, 5, 1))
+    listing("available", qty=99)
+    assert _counts(totals()) == (10, 1, 1)
+    assert totals()["updated_at"] == "2024-05-01T00:00:00"
+
+    soup = listing("claimed", alice, qty=4, unit="box")  # 0.5 lb per unit
+    assert _counts(totals()) == (12, 1, 2)
+
+    soup.est_weight_kg = 10.0  # re-weighed: 22.0462 lb instead of 2
+    db.commit()
+    assert _counts(totals()) == (32, 1, 2)
+
+    bread.status = "completed"
+    db.commit()
+    assert _counts(totals()) == (22, 1, 1)
+
+    db.delete(soup)
+    db.commit()
+    assert _counts(totals()) == (0, 0, 0)
+    assert db.query(ImpactRecipient).count() == 0
+    assert _counts(totals()) == _counts(reconcile(session_factory))
+
+
+def test_confirm_and_cancel_bulk_updates_are_counted(impact):
+    db, session_factory, listing, totals, (alice, bob) = impact
+    listing("claimed", alice, qty=6)
+    pending = listing("pending_confirmation", bob, qty=3, claimed_at=datetime.utcnow())
+    assert _counts(totals()) == (6, 1, 1)
+
+    app_module.claim_confirmations.put(pending.id, "1234", bob.id, datetime.utcnow() + timedelta(minutes=5))
+    confirm_claim(pending.id, None, RequestBody(b"", {"code": "1234"}), db=db, credentials=_creds(bob.id))
+    assert _counts(totals()) == (9, 2, 2)
+
+    result = asyncio.run(_cancel_claim(str(bob.id), pending.id))
+    assert "error" not in result
+    assert _counts(totals()) == (6, 1, 1)
+    assert _counts(totals()) == _counts(reconcile(session_factory))
+
+
+def test_reconcile_repairs_drift(impact):
+    db, session_factory, listing, totals, (alice, bob) = impact
+    item = listing("claimed", alice, qty=8)
+    # Raw SQL bypasses both the listeners and the explicit deltas.
+    db.query(FoodResource).filter(FoodResource.id == item.id).update(
+        {FoodResource.recipient_id: bob.id, FoodResource.qty: 20}, synchronize_session=False)
+    db.commit()
+    assert _counts(totals()) == (8, 1, 1)
+    assert db.query(ImpactRecipient.recipient_id).scalar() == alice.id
+
+    assert _counts(reconcile(session_factory)) == (20, 1, 1)
+    db.expire_all()
+    assert db.query(ImpactRecipient.recipient_id).scalar() == bob.id
+    # Deltas after a reconcile build on the repaired numbers.
+    item.status = "completed"
+    db.commit()
+    assert _counts(totals()) == (0, 0, 0)
+
+
+def test_cache_serves_stale_while_one_refresh_runs():
+    now = [0.0]
+    loads = []
+
+    def loader():
+        loads.append(now[0])
+        return {"claimed_listings": len(loads)}
+
+    cache = PublicStatsCache(loader, fresh_s=10, stale_s=50, clock=lambda: now[0])
+    assert cache.get() == {"claimed_listings": 1}
+    now[0] = 5
+    assert cache.get() == {"claimed_listings": 1} and len(loads) == 1
+
+    now[0] = 30  # stale: old value now, reload in the background
+    assert cache.get() == {"claimed_listings": 1}
+    for _ in range(200):
+        if cache.get()["claimed_listings"] == 2:
+            break
+        time.sleep(0.005)
+    assert loads == [0.0, 30]
+
+    now[0] = 200  # past the stale window: the caller waits for a reload
+    assert cache.get() == {"claimed_listings": 3}
+
+
+def test_endpoint_is_a_primary_key_read_then_memory(impact, count_sql, monkeypatch):
+    db, session_factory, listing, totals, (alice, _) = impact
+    for qty in (1, 2, 3):
+        listing("claimed", alice, qty=qty)
+    cache = PublicStatsCache(app_module._load_public_stats)
+    monkeypatch.setattr(app_module, "public_stats_cache", cache)
+
+    with count_sql(db.get_bind()) as statements:
+        first = get_public_stats(Response())
+        second = get_public_stats(Response())
+    assert _counts(first) == (6, 1, 3) and second == first
+    assert len(statements) == 1 and "food_resources" not in statements[0]
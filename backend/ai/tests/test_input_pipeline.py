@@ -0,0 +1,96 @@
+"""Tests for the single-pass API input sanitizer (backend.input_pipeline)."""
+from __future__ import annotations
+
+import json
+
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from backend.ai import ai_engine
+from backend.input_pipeline import SanitizedRoute, SanitizeInputMiddleware
+
+
+def _mini_app(limit: int = 1024):
+    from backend.app import _sanitize_json_payload, _validate_query_params
+
+    parses = []
+    app = FastAPI()
+    app.router.route_class = SanitizedRoute
+    app.add_middleware(
+        SanitizeInputMiddleware,
+        body_limit=lambda path: limit,
+        validate_query=_validate_query_params,
+        sanitize_json=_sanitize_json_payload,
+    )
+
+    @app.post("/api/echo")
+    async def echo(request: Request):
+        return {"body": await request.json()}
+
+    @app.post("/api/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    real_loads = json.loads
+
+    def counting_loads(*args, **kwargs):
+        parses.append(1)
+        return real_loads(*args, **kwargs)
+
+    return app, parses, counting_loads
+
+
+def test_json_is_parsed_once_and_sanitized(monkeypatch):
+    app, parses, counting_loads = _mini_app()
+    client = TestClient(app)
+    monkeypatch.setattr(json, "loads", counting_loads)  # every json.loads in the process
+    resp = client.post("/api/echo", json={"name": "  Apples  ", "tags": [" a "]})
+    assert len(parses) == 1
+    monkeypatch.undo()
+    assert resp.status_code == 200
+    assert resp.json() == {"body": {"name": "Apples", "tags": ["a"]}}
+
+
+def test_errors_are_json_responses_not_500s():
+    app, _, _ = _mini_app(limit=64)
+    client = TestClient(app)
+    assert client.post("/api/echo", content=b"{nope", headers={"content-type": "application/json"}).status_code == 400
+    resp = client.post("/api/echo", json={"x": "y" * 100})
+    assert resp.status_code == 413 and resp.json() == {"detail": "Request body is too large"}
+    resp = client.post("/api/echo?q=" + "z" * 600, json={})
+    assert resp.status_code == 413
+
+
+def test_chunked_upload_is_cut_off_while_streaming():
+    app, _, _ = _mini_app(limit=4096)
+    client = TestClient(app)
+    boundary = "xyz"
+
+    def multipart(size: int):
+        yield (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.bin\"\r\n"
+               "Content-Type: application/octet-stream\r\n\r\n").encode()
+        for _ in range(size // 1024):
+            yield b"\0" * 1024
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    headers = {"content-type": f"multipart/form-data; boundary={boundary}"}
+    ok = client.post("/api/upload", content=multipart(2048), headers=headers)
+    assert ok.status_code == 200 and ok.json() == {"size": 2048}
+    # No Content-Length: the limit is enforced on the stream itself.
+    big = client.post("/api/upload", content=multipart(64 * 1024), headers=headers)
+    assert big.status_code == 413
+
+
+def test_app_handlers_receive_the_sanitized_body(monkeypatch):
+    from backend.app import app
+
+    seen = []
+
+    async def fake_reply(messages, lang="en"):
+        seen.append(messages[-1]["content"])
+        return "ok"
+
+    monkeypatch.setattr(ai_engine.conversation_engine, "cached_public_reply", fake_reply)
+    resp = TestClient(app).post("/api/ai/public_chat", json={"message": "   hello there   "})
+    assert resp.status_code == 200
+    assert seen == ["hello there"]
@@ -0,0 +1,116 @@
+"""Statement-count tests for listing reads (backend.listing_reads).
+
+Each list endpoint is run at two result sizes; the number of SQL statements
+must not change with the number of rows.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from fastapi import Response
+from fastapi.security import HTTPAuthorizationCredentials
+
+from backend.app import (
+    JWT_ALGORITHM, JWT_SECRET, get_listings, get_pickup_reminders, get_recent_listings, serialize_listing,
+)
+from backend.listing_reads import detail_options, summary_options
+from backend.models import FoodCategory, FoodResource, PickupReminder, User, UserRole
+
+
+def _creds(user):
+    token = jwt.encode({"sub": str(user.id), "role": user.role.value}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.fixture
+def seeded(sqlite_sessionmaker):
+    db = sqlite_sessionmaker()
+    recipient = User(email="recipient@example.com", name="Recipient", role=UserRole.RECIPIENT)
+    db.add(recipient)
+    db.commit()
+    recipient_id, creds = recipient.id, _creds(recipient)
+    counter = iter(range(10_000))
+
+    def add(n: int):
+        """n listings, each from its own donor; every third claimed by the recipient."""
+        now = datetime.utcnow()
+        for _ in range(n):
+            i = next(counter)
+            donor = User(email=f"donor{i}@example.com", name=f"Donor {i}", role=UserRole.DONOR, phone="555")
+            db.add(donor)
+            db.flush()
+            claimed = i % 3 == 0
+            listing = FoodResource(
+                donor_id=donor.id, title=f"Item {i}", qty=1, unit="box", address="x",
+                category=FoodCategory.PRODUCE, created_at=now - timedelta(seconds=i),
+                status="claimed" if claimed else "available",
+                recipient_id=recipient_id if claimed else None,
+            )
+            db.add(listing)
+            db.flush()
+            db.add(PickupReminder(user_id=recipient_id, listing_id=listing.id, scheduled_time=now))
+        db.commit()
+        db.expunge_all()
+
+    yield db, creds, add
+    db.close()
+
+
+def _statements_at_two_sizes(seeded, count_sql, call):
+    db, creds, add = seeded
+    counts = []
+    for n in (4, 20):
+        add(n)
+        db.expunge_all()
+        with count_sql(db.get_bind()) as statements:
+            rows = call(db, creds)
+        counts.append((len(statements), rows))
+    return counts
+
+
+def test_get_listings_statement_count_is_flat(seeded, count_sql):
+    def call(db, creds):
+        return len(get_listings(response=Response(), db=db, credentials=creds))
+
+    (small, rows_small), (large, rows_large) = _statements_at_two_sizes(seeded, count_sql, call)
+    assert (rows_small, rows_large) == (4, 24)
+    assert small == large <= 2
+
+
+def test_recent_listings_statement_count_is_flat(seeded, count_sql):
+    def call(db, creds):
+        return len(get_recent_listings(minutes=30, credentials=creds, db=db))
+
+    (small, rows_small), (large, rows_large) = _statements_at_two_sizes(seeded, count_sql, call)
+    assert rows_large > rows_small > 0
+    assert small == large <= 2
+
+
+def test_pickup_reminders_statement_count_is_flat(seeded, count_sql):
+    def call(db, creds):
+        return len(get_pickup_reminders(credentials=creds, db=db)["reminders"])
+
+    (small, rows_small), (large, rows_large) = _statements_at_two_sizes(seeded, count_sql, call)
+    assert (rows_small, rows_large) == (4, 24)
+    assert small == large <= 2
+
+
+def test_summary_projection_serializes_like_the_full_row(seeded, count_sql):
+    db, _, add = seeded
+    add(6)
+    full = [serialize_listing(row) for row in db.query(FoodResource).order_by(FoodResource.id)]
+    db.expunge_all()
+    with count_sql(db.get_bind()) as statements:
+        summary = [serialize_listing(row) for row in
+                   db.query(FoodResource).options(*summary_options()).order_by(FoodResource.id)]
+    assert summary == full
+    assert len(statements) == 2
+    assert "before_photo" not in statements[0] and "storage_temperature" not in statements[0]
+
+    db.expunge_all()
+    with count_sql(db.get_bind()) as statements:
+        one = db.query(FoodResource).options(*detail_options()).filter(FoodResource.id == full[0]["id"]).first()
+        assert serialize_listing(one) == full[0]
+    assert len(statements) == 1
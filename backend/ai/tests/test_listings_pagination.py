@@ -0,0 +1,135 @@
+"""Tests for keyset paging and server-side filters on /api/listings/get."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from fastapi import HTTPException, Response
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql, postgresql
+
+from backend.app import JWT_ALGORITHM, JWT_SECRET, _listing_order, get_listings
+from backend.models import FoodCategory, FoodResource, User, UserRole
+
+
+def _creds(user):
+    token = jwt.encode({"sub": str(user.id), "role": user.role.value}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.fixture
+def listings(sqlite_sessionmaker):
+    db = sqlite_sessionmaker()
+    donor = User(email="donor@example.com", name="Donor", role=UserRole.DONOR)
+    other = User(email="other@example.com", name="Other", role=UserRole.DONOR)
+    recipient = User(email="recipient@example.com", name="Recipient", role=UserRole.RECIPIENT)
+    db.add_all([donor, other, recipient])
+    db.flush()
+    now = datetime.utcnow()
+    # Pairs share a created_at so paging has to break ties on id.
+    for i in range(10):
+        db.add(FoodResource(
+            donor_id=donor.id if i % 2 == 0 else other.id,
+            title=f"Item {i}", qty=1, unit="box", address="x",
+            category=FoodCategory.PRODUCE if i < 5 else FoodCategory.BAKERY,
+            status="available", created_at=now - timedelta(minutes=i // 2),
+        ))
+    db.add(FoodResource(
+        donor_id=donor.id, title="Stale", qty=1, unit="box", address="x",
+        status="available", created_at=now - timedelta(hours=1),
+        pickup_window_end=now - timedelta(minutes=1),
+    ))
+    db.add(FoodResource(
+        donor_id=donor.id, title="Mine", qty=1, unit="box", address="x",
+        status="claimed", recipient_id=recipient.id, created_at=now - timedelta(hours=2),
+    ))
+    db.add(FoodResource(
+        donor_id=donor.id, title="Theirs", qty=1, unit="box", address="x",
+        status="claimed", recipient_id=donor.id, created_at=now - timedelta(hours=3),
+    ))
+    db.commit()
+    yield db, donor, recipient
+    db.close()
+
+
+def _page(db, **kwargs):
+    response = Response()
+    kwargs.setdefault("credentials", None)
+    rows = get_listings(response=response, db=db, **kwargs)
+    return [r["title"] for r in rows], response.headers.get("X-Next-Cursor")
+
+
+def test_pages_cover_everything_once(listings):
+    db, *_ = listings
+    expected, _ = _page(db, limit=100)
+    seen, cursor = [], None
+    while True:
+        titles, cursor = _page(db, limit=3, cursor=cursor)
+        seen.extend(titles)
+        if cursor is None:
+            break
+    assert seen == expected
+    assert len(seen) == 13
+
+
+def test_undated_listings_page_last(listings):
+    db, *_ = listings
+    db.query(FoodResource).filter(FoodResource.title.in_(["Item 3", "Mine"])).update(
+        {FoodResource.created_at: None}, synchronize_session=False)
+    db.commit()
+    seen, cursor = [], None
+    while True:
+        titles, cursor = _page(db, limit=2, cursor=cursor)
+        seen.extend(titles)
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 13
+    assert seen[-2:] == ["Mine", "Item 3"]
+
+
+def test_order_puts_nulls_last_on_every_dialect():
+    def order_sql(dialect):
+        db = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=dialect))
+        return str(select(FoodResource.id).order_by(*_listing_order(db)).compile(dialect=dialect))
+
+    assert "created_at DESC NULLS LAST" in order_sql(postgresql.dialect())
+    assert "NULLS" not in order_sql(mysql.dialect())
+
+
+def test_filters_are_applied_in_sql(listings):
+    db, donor, _ = listings
+    titles, cursor = _page(db, limit=4, category="bakery")
+    # Ties on created_at come back in descending id order.
+    assert titles == ["Item 5", "Item 7", "Item 6", "Item 9"]
+    assert cursor is not None
+    assert _page(db, limit=4, category="bakery", cursor=cursor) == (["Item 8"], None)
+
+    assert _page(db, status="expired")[0] == ["Stale"]
+    assert "Stale" not in _page(db, status="available")[0]
+    assert _page(db, donor_id=donor.id, status="claimed")[0] == ["Mine", "Theirs"]
+
+
+def test_expiry_is_reported_as_status(listings):
+    db, *_ = listings
+    rows = get_listings(response=Response(), limit=100, db=db, credentials=None)
+    assert {r["title"]: r["status"] for r in rows}["Stale"] == "expired"
+
+
+def test_recipient_sees_available_and_own_claims(listings):
+    db, _, recipient = listings
+    titles, _ = _page(db, limit=100, credentials=_creds(recipient))
+    assert "Mine" in titles
+    assert "Theirs" not in titles
+    assert "Stale" not in titles
+    assert len(titles) == 11
+
+
+@pytest.mark.parametrize("kwargs", [{"cursor": "not-a-cursor"}, {"category": "gravel"}])
+def test_bad_input_is_rejected(listings, kwargs):
+    db, *_ = listings
+    with pytest.raises(HTTPException) as exc:
+        _page(db, **kwargs)
+    assert exc.value.status_code == 400
@@ -0,0 +1,186 @@
+"""Tests for versioned migrations (backend.migrations) and hot-path query plans.
+
+The plan tests run real endpoint handlers against SQLite, capture every
+SELECT they issue, and run ``EXPLAIN QUERY PLAN`` on each one. They fail
+if a hot table is read with a full scan instead of through an index.
+"""
+from __future__ import annotations
+
+import re
+from datetime import datetime
+
+import jwt
+import pytest
+from fastapi import Response
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine, event, inspect, text
+
+from backend import migrations
+from backend.app import (
+    JWT_ALGORITHM, JWT_SECRET, get_donation_schedules, get_favorites, get_listings, get_messages,
+    get_pickup_reminders, get_recent_listings, get_reminders,
+)
+from backend.claim_confirmations import InMemoryConfirmationStore, release_orphaned_claims
+from backend.models import Base, User, UserRole
+
+HOT_TABLES = {"food_resources", "messages", "pickup_reminders", "donation_reminders",
+              "donation_schedules", "favorite_locations"}
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def test_upgrade_patches_an_old_database_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    # food_resources and users as an early deployment created them.
+    old = MetaData()
+    Table("food_resources", old, Column("id", Integer, primary_key=True), Column("title", String(255)),
+          Column("status", String(255)), Column("created_at", DateTime))
+    Table("users", old, Column("id", Integer, primary_key=True), Column("email", String(255)),
+          Column("created_at", DateTime))
+    old.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO food_resources (id, title, status, created_at) "
+                          "VALUES (1, 'Bread', 'available', '2024-01-01 00:00:00')"))
+    Base.metadata.create_all(bind=engine)  # new tables only, as at startup
+
+    assert migrations.upgrade(engine) == [1, 2, 3, 4, 5]
+    inspector = inspect(engine)
+    columns = {c["name"] for c in inspector.get_columns("food_resources")}
+    assert {"updated_at", "geohash", "before_photo", "recipient_id"} <= columns
+    indexes = {ix["name"] for ix in inspector.get_indexes("food_resources")}
+    assert {"ix_food_resources_status_created", "ix_food_resources_status_geohash",
+            "ix_food_resources_geohash"} <= indexes
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT updated_at FROM food_resources")).scalar() is not None
+
+    assert migrations.upgrade(engine) == []
+    assert migrations.applied_versions(engine) == {1, 2, 3, 4, 5}
+
+
+def test_added_columns_take_their_defaults_on_existing_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    old = MetaData()
+    Table("users", old, Column("id", Integer, primary_key=True), Column("email", String(255)))
+    Table("food_resources", old, Column("id", Integer, primary_key=True), Column("title", String(255)))
+    old.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email) VALUES (1, 'a@example.com'), (2, 'b@example.com')"))
+        conn.execute(text("INSERT INTO food_resources (id, title) VALUES (1, 'Bread')"))
+    Base.metadata.create_all(bind=engine)
+
+    # Migration 1 alone: the DEFAULT on ADD COLUMN fills existing rows.
+    assert migrations.upgrade(engine, [m for m in migrations.MIGRATIONS if m[0] == 1]) == [1]
+    with engine.connect() as conn:
+        users = conn.execute(text(
+            "SELECT household_size, sms_consent_given, completed_exchanges, positive_feedback, "
+            "email_verified, phone_verified, id_verified, address_verified FROM users ORDER BY id"
+        )).all()
+        listing = conn.execute(text(
+            "SELECT packaging_condition, verification_status FROM food_resources")).one()
+    assert [tuple(u) for u in users] == [(1, 0, 0, 0, 0, 0, 0, 0)] * 2
+    assert tuple(listing) == ("good", "not_required")
+
+
+def test_rows_left_null_by_migration_1_are_backfilled(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    # Migrations 1-4 already ran here, back when ADD COLUMN had no DEFAULT.
+    migrations.upgrade(engine, [m for m in migrations.MIGRATIONS if m[0] < 5])
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, name, role, household_size, email_verified) "
+                          "VALUES (1, 'a@example.com', 'A', 'RECIPIENT', NULL, NULL), "
+                          "(2, 'b@example.com', 'B', 'RECIPIENT', 4, 1)"))
+
+    assert migrations.upgrade(engine) == [5]
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT household_size, email_verified FROM users ORDER BY id")).all()
+    assert [tuple(r) for r in rows] == [(1, 0), (4, 1)]
+
+
+def test_failed_migration_stops_the_run_and_is_retried(sqlite_sessionmaker):
+    engine = sqlite_sessionmaker.kw["bind"]
+    calls = []
+
+    def broken(_engine):
+        calls.append("broken")
+        raise RuntimeError("boom")
+
+    steps = [(1, "ok", lambda e: calls.append("ok")), (2, "broken", broken), (3, "after", lambda e: calls.append("after"))]
+    assert migrations.upgrade(engine, steps) == [1]
+    assert calls == ["ok", "broken"]
+    steps[1] = (2, "fixed", lambda e: calls.append("fixed"))
+    assert migrations.upgrade(engine, steps) == [2, 3]
+
+
+def _creds(user_id: int, role: str) -> HTTPAuthorizationCredentials:
+    token = jwt.encode({"sub": str(user_id), "role": role}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.fixture
+def planned(sqlite_sessionmaker):
+    db = sqlite_sessionmaker()
+    admin = User(email="admin@example.com", name="Admin", role=UserRole.ADMIN)
+    donor = User(email="donor@example.com", name="Donor", role=UserRole.DONOR)
+    db.add_all([admin, donor])
+    db.commit()
+    ids = {"admin": admin.id, "donor": donor.id}
+    db.expunge_all()
+    yield db, sqlite_sessionmaker, ids
+    db.close()
+
+
+def _full_scans(db, call) -> list:
+    """Run ``call`` and return (table, sql) for every hot-table full scan it caused."""
+    bind = db.get_bind()
+    captured = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(bind, "before_cursor_execute", _record)
+    try:
+        call()
+    finally:
+        event.remove(bind, "before_cursor_execute", _record)
+
+    scans = []
+    with bind.connect() as conn:
+        for statement, parameters in captured:
+            for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters):
+                match = _FULL_SCAN.match(row[-1])
+                if match and match.group(1) in HOT_TABLES:
+                    scans.append((match.group(1), statement))
+    return scans
+
+
+def test_listing_queries_use_indexes(planned):
+    db, _, ids = planned
+    donor = _creds(ids["donor"], "donor")
+    assert _full_scans(db, lambda: get_listings(response=Response(), db=db, credentials=None)) == []
+    assert _full_scans(db, lambda: get_listings(response=Response(), db=db, credentials=None,
+                                                status="available", limit=20)) == []
+    assert _full_scans(db, lambda: get_listings(response=Response(), db=db, credentials=donor,
+                                                donor_id=ids["donor"])) == []
+    assert _full_scans(db, lambda: get_recent_listings(minutes=30, credentials=donor, db=db)) == []
+
+
+def test_per_user_lists_use_indexes(planned):
+    db, _, ids = planned
+    admin, donor = _creds(ids["admin"], "admin"), _creds(ids["donor"], "donor")
+    calls = [
+        lambda: get_messages(f"user_{ids['donor']}", credentials=admin, db=db),
+        lambda: get_pickup_reminders(credentials=donor, db=db),
+        lambda: get_reminders(credentials=donor, db=db),
+        lambda: get_donation_schedules(credentials=donor, db=db),
+        lambda: get_favorites(credentials=donor, db=db),
+    ]
+    for call in calls:
+        assert _full_scans(db, call) == []
+
+
+def test_claim_sweep_uses_an_index(planned):
+    db, session_factory, _ = planned
+    sweep = lambda: release_orphaned_claims(session_factory, InMemoryConfirmationStore(),  # noqa: E731
+                                            now=datetime(2024, 1, 1))
+    assert _full_scans(db, sweep) == []
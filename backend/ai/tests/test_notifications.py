@@ -1,9 +1,14 @@
 """Pure-logic tests for backend.ai.notifications helpers (no DB, no Twilio)."""
 from __future__ import annotations
 
+import asyncio
+import json
+import random
 from datetime import datetime
 from types import SimpleNamespace
 
+import pytest
+
 from backend.ai import notifications as N
 
 
@@ -50,6 +55,11 @@ class TestAsLowerSet:
     def test_strips_whitespace(self):
         assert N._as_lower_set(["  Peanuts  ", "", "  "]) == {"peanuts"}
 
+    def test_profile_sets(self):
+        assert N._as_lower_set(frozenset({"Peanut"})) == {"peanut"}
+        assert N._as_lower_set({"Milk"}) == {"milk"}
+        assert N._as_lower_set(42) == set()
+
 
 # ---------------------------------------------------------------------------
 # _user_prefers_language
@@ -240,3 +250,198 @@ class TestTemplates:
         food = self._make_food()
         text = N._template_en(None, food, None)
         assert "Hi there" in text or "there" in text
+
+
+# ---------------------------------------------------------------------------
+# RecipientIndex
+# ---------------------------------------------------------------------------
+
+class TestRecipientIndex:
+    CATEGORIES = ["produce", "bakery", "dairy", "prepared"]
+    ALLERGENS = ["peanuts", "milk", "shellfish", "soy"]
+    TAGS = ["vegan", "vegetarian", "halal", "gluten-free", "low-sodium"]
+
+    def _user(self, rng, uid):
+        def pick(pool):
+            return json.dumps(rng.sample(pool, rng.randint(0, 2))) if rng.random() < 0.7 else None
+        return SimpleNamespace(
+            id=uid, name=f"U{uid}", notification_preferences=None, sms_notification_types=None,
+            sms_consent_given=rng.random() < 0.5, sms_opt_out_date=None, phone="+1555",
+            allergies=pick(self.ALLERGENS), dietary_restrictions=pick(self.TAGS),
+            preferred_categories=pick(self.CATEGORIES), household_size=2,
+        )
+
+    def _food(self, rng):
+        cat = rng.choice(self.CATEGORIES + [None])
+        return SimpleNamespace(
+            category=SimpleNamespace(value=cat) if cat else None,
+            allergens=json.dumps(rng.sample(self.ALLERGENS, rng.randint(0, 2))),
+            dietary_tags=json.dumps(rng.sample(self.TAGS, rng.randint(0, 3))),
+            donor_id=rng.randint(1, 60),
+        )
+
+    def test_matches_per_pair_helpers(self):
+        rng = random.Random(3)
+        users = [self._user(rng, uid) for uid in range(1, 61)]
+        index = N.RecipientIndex(N.RecipientProfile(u) for u in users)
+        for _ in range(50):
+            food = self._food(rng)
+            expected = [
+                u.id for u in users
+                if u.id != food.donor_id
+                and not N._allergen_conflict(u, food)
+                and not N._dietary_conflict(u, food)
+                and N._category_match(u, food)
+            ]
+            assert index.match(food) == expected
+
+    def test_profile_parses_once(self):
+        u = SimpleNamespace(
+            id=1, name="Ana", notification_preferences='{"language": "es"}',
+            sms_notification_types=None, sms_consent_given=True, sms_opt_out_date=None,
+            phone="+1555", allergies='["Peanuts"]', dietary_restrictions="Vegan",
+            preferred_categories=None, household_size=3,
+        )
+        p = N.RecipientProfile(u)
+        assert (p.language, p.sms_ok) == ("es", True)
+        assert p.allergies == {"peanuts"} and p.dietary_restrictions == {"vegan"}
+        assert p.categories == frozenset()
+
+
+# ---------------------------------------------------------------------------
+# Drafting
+# ---------------------------------------------------------------------------
+
+class TestTokenBudget:
+    def test_stops_when_spent(self):
+        budget = N._TokenBudget(2 * (100 + N._TokenBudget.REPLY_TOKENS))
+        assert budget.spend(100) and budget.spend(100)
+        assert budget.spend(1) is False
+        assert budget.calls == 2
+
+
+class TestAiPersonalize:
+    @pytest.mark.asyncio
+    async def test_profile_allergies_reach_the_prompt(self, monkeypatch):
+        from backend.ai import ai_engine
+
+        sent = []
+
+        async def fake_reply(messages, lang="en"):
+            sent.append(messages)
+            return "Fresh bread near you! Reply STOP to opt out"
+
+        monkeypatch.setattr(ai_engine, "OPENAI_API_KEY", "test-key")
+        monkeypatch.setattr(ai_engine.conversation_engine, "public_chat_reply", fake_reply)
+        user = SimpleNamespace(id=1, name="Ana", allergies='["Peanut", "Milk"]',
+                               dietary_restrictions='["Vegan"]', preferred_categories=None,
+                               household_size=3, notification_preferences=None, sms_consent_given=True)
+        profile = N.RecipientProfile(user)
+        await N._ai_personalize("Draft", profile, SimpleNamespace(title="Bread"), "en")
+
+        prompt = sent[0][1]["content"]
+        assert "user allergies: milk, peanut" in prompt
+        assert "dietary: vegan" in prompt
+        assert "household size: 3" in prompt
+
+
+class TestDraftAll:
+    @pytest.mark.asyncio
+    async def test_bounded_concurrency_keeps_order(self, monkeypatch):
+        running = 0
+        peak = 0
+
+        async def fake_draft(user, food, donor_name, budget=None):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return f"msg {user.id}", "en"
+
+        monkeypatch.setattr(N, "_draft_message", fake_draft)
+        monkeypatch.setattr(N, "BROADCAST_DRAFT_CONCURRENCY", 4)
+        candidates = [
+            {"food_id": 1, "user_id": i, "channel": "chat", "donor_name": "",
+             "_user": SimpleNamespace(id=i), "_food": None}
+            for i in range(20)
+        ]
+        drafts, _ = await N._draft_all(candidates)
+        assert [d["message"] for d in drafts] == [f"msg {i}" for i in range(20)]
+        assert peak == 4
+
+
+# ---------------------------------------------------------------------------
+# Bulk delivery
+# ---------------------------------------------------------------------------
+
+class TestRateLimiter:
+    @pytest.mark.asyncio
+    async def test_spaces_calls(self, monkeypatch):
+        clock = [100.0]
+        slept = []
+
+        async def fake_sleep(delay):
+            slept.append(round(delay, 3))
+
+        monkeypatch.setattr(N.time, "monotonic", lambda: clock[0])
+        monkeypatch.setattr(N.asyncio, "sleep", fake_sleep)
+        limiter = N._RateLimiter(10)
+        for _ in range(3):
+            await limiter.wait()
+        assert slept == [0.1, 0.2]
+
+
+class TestSendBroadcasts:
+    @pytest.mark.asyncio
+    async def test_one_run_marks_every_outcome(self, sqlite_sessionmaker, monkeypatch):
+        import backend.app
+        from backend.ai.models import AIBroadcast
+        from backend.models import Message, User, UserRole
+
+        db = sqlite_sessionmaker()
+        texter = User(email="t@example.com", name="T", role=UserRole.RECIPIENT,
+                      phone="+15550001", sms_consent_given=True)
+        chatter = User(email="c@example.com", name="C", role=UserRole.RECIPIENT)
+        db.add_all([texter, chatter])
+        db.flush()
+        rows = [
+            AIBroadcast(user_id=texter.id, channel="both", message="hi", status="approved"),
+            AIBroadcast(user_id=chatter.id, channel="chat", message="hey", status="approved"),
+            AIBroadcast(user_id=chatter.id, channel="sms", message="no phone", status="approved"),
+            AIBroadcast(user_id=chatter.id, channel="chat", message="old", status="rejected"),
+        ]
+        db.add_all(rows)
+        db.commit()
+        ids = [r.id for r in rows]
+
+        texts = []
+
+        async def fake_sms(phone, text):
+            texts.append(phone)
+            return True
+
+        monkeypatch.setattr(backend.app, "SessionLocal", sqlite_sessionmaker)
+        monkeypatch.setattr(N, "_deliver_sms", fake_sms)
+        monkeypatch.setattr(N, "delivery_metrics", N.DeliveryMetrics())
+
+        run = await N.send_broadcasts(ids + [9999])
+        assert run["results"] == {
+            ids[0]: {"ok": True, "errors": []},
+            ids[1]: {"ok": True, "errors": []},
+            ids[2]: {"ok": False, "error": "no_channel"},
+            ids[3]: {"ok": False, "error": "bad_status:rejected"},
+            9999: {"ok": False, "error": "not_found"},
+        }
+        assert (run["sent"], run["failed"], run["skipped"]) == (2, 1, 2)
+        assert (run["sms_sent"], run["chat_sent"]) == (1, 2)
+        assert texts == ["+15550001"]
+
+        db.expire_all()
+        status = {b.id: (b.status, b.error, b.sent_at is not None) for b in db.query(AIBroadcast)}
+        assert status[ids[0]] == ("sent", None, True)
+        assert status[ids[2]] == ("failed", "no_channel", False)
+        assert status[ids[3]] == ("rejected", None, False)
+        assert db.query(Message).count() == 2
+        assert N.delivery_metrics.snapshot()["totals"]["sent"] == 2
+        db.close()
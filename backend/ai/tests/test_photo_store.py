@@ -0,0 +1,143 @@
+"""Tests for content-addressed verification photos (backend.photo_store)."""
+from __future__ import annotations
+
+import base64
+from datetime import datetime
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import backend.app as app_module
+from backend.app import JWT_ALGORITHM, JWT_SECRET, RequestBody, app, get_verification_status, verify_before_pickup
+from backend.models import FoodResource, User, UserRole
+from backend.photo_store import LocalPhotoStore, PhotoError, migrate_inline_photos, store_photo
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+JPEG = b"\xff\xd8\xff\xe0" + b"\x01" * 32
+
+
+def _data_url(data: bytes, kind: str = "png") -> str:
+    return f"data:image/{kind};base64," + base64.b64encode(data).decode()
+
+
+def _token(user_id: int) -> str:
+    return jwt.encode({"sub": str(user_id), "role": "recipient"}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = LocalPhotoStore(str(tmp_path))
+    monkeypatch.setattr("backend.photo_store.photo_store", store)
+    monkeypatch.setattr(app_module, "photo_store", store)
+    return store
+
+
+@pytest.fixture
+def claimed(sqlite_sessionmaker):
+    db = sqlite_sessionmaker()
+    donor = User(email="donor@example.com", name="Donor", role=UserRole.DONOR)
+    recipient = User(email="recipient@example.com", name="Recipient", role=UserRole.RECIPIENT)
+    db.add_all([donor, recipient])
+    db.flush()
+    listing = FoodResource(donor_id=donor.id, recipient_id=recipient.id, title="Bread", qty=1,
+                           unit="loaf", address="x", status="claimed")
+    db.add(listing)
+    db.commit()
+    yield db, listing.id, donor.id, recipient.id
+    db.close()
+
+
+def test_photos_are_stored_once_by_content(store, tmp_path):
+    url = store.put(PNG)
+    assert url.startswith("/uploads/verification/") and url.endswith(".png")
+    assert store.put(PNG) == url and len(list(tmp_path.iterdir())) == 1
+    assert open(store.path(url), "rb").read() == PNG
+
+    assert store_photo(_data_url(PNG)) == url
+    assert store_photo(base64.b64encode(JPEG).decode()).endswith(".jpg")
+    assert store_photo(url) == url
+    for bad in ("", "data:image/png;base64,@@@", _data_url(b"<script>alert(1)</script>"),
+                "https://example.com/cat.png", "/uploads/verification/abc.png",
+                "/uploads/other.png", "/uploads/verification/../../backend/app.py"):
+        with pytest.raises(PhotoError):
+            store_photo(bad)
+
+
+def test_listing_queries_do_not_load_photos(claimed):
+    db, listing_id, *_ = claimed
+    db.query(FoodResource).filter(FoodResource.id == listing_id).update(
+        {"before_photo": _data_url(PNG), "pickup_notes": "left at door"})
+    db.commit()
+    db.expunge_all()
+
+    statements = []
+    listen = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(db.get_bind(), "before_cursor_execute", listen)
+    try:
+        listing = db.query(FoodResource).first()
+        assert "before_photo" not in statements[-1] and "safety_notes" not in statements[-1]
+        # Touching one verification column loads the whole group in one query.
+        assert listing.pickup_notes == "left at door"
+        assert listing.before_photo.startswith("data:") and len(statements) == 2
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listen)
+
+
+def test_migration_moves_inline_photos_in_batches(claimed, sqlite_sessionmaker, store):
+    db, listing_id, donor_id, recipient_id = claimed
+    stamp = datetime(2024, 1, 1)
+    rows = [
+        FoodResource(donor_id=donor_id, title="a", before_photo=_data_url(PNG), after_photo=_data_url(JPEG, "jpeg")),
+        FoodResource(donor_id=donor_id, title="b", before_photo="/uploads/verification/done.png"),
+        FoodResource(donor_id=donor_id, title="c", after_photo="not base64 at all!"),
+        FoodResource(donor_id=donor_id, title="d", before_photo=base64.b64encode(PNG).decode()),
+    ]
+    db.add_all(rows)
+    db.commit()
+    db.query(FoodResource).update({"updated_at": stamp})
+    db.commit()
+
+    assert migrate_inline_photos(sqlite_sessionmaker, batch_size=2, dry_run=True) == {
+        "rows": 3, "photos": 3, "failed": 1}
+    counts = migrate_inline_photos(sqlite_sessionmaker, batch_size=2)
+    assert counts == {"rows": 3, "photos": 3, "failed": 1}
+
+    db.expire_all()
+    a, b, c, d = (db.get(FoodResource, r.id) for r in rows)
+    assert a.before_photo == d.before_photo == store.put(PNG)
+    assert a.after_photo.endswith(".jpg")
+    assert b.before_photo == "/uploads/verification/done.png"
+    assert c.after_photo == "not base64 at all!"
+    assert a.updated_at == stamp
+    # Only the undecodable photo is picked up again.
+    assert migrate_inline_photos(sqlite_sessionmaker) == {"rows": 1, "photos": 0, "failed": 1}
+
+
+def test_upload_then_verify_keeps_only_the_url(claimed, sqlite_sessionmaker, store, monkeypatch):
+    db, listing_id, donor_id, recipient_id = claimed
+    monkeypatch.setattr(app_module, "SessionLocal", sqlite_sessionmaker)
+    client = TestClient(app)
+    url = f"/api/listings/{listing_id}/verification-photo"
+    files = {"photo": ("v.jpg", JPEG, "image/jpeg")}
+
+    assert client.post(url, files=files, headers={"Authorization": f"Bearer {_token(donor_id)}"}).status_code == 403
+    bad = client.post(url, files={"photo": ("v.jpg", b"hello world, not an image", "image/jpeg")},
+                      headers={"Authorization": f"Bearer {_token(recipient_id)}"})
+    assert bad.status_code == 400
+    resp = client.post(url, files=files, headers={"Authorization": f"Bearer {_token(recipient_id)}"})
+    assert resp.status_code == 200
+    photo_url = resp.json()["url"]
+
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=_token(recipient_id))
+    linked = RequestBody(b"", {"photo": "https://example.com/somebody-elses.jpg"})
+    with pytest.raises(HTTPException) as rejected:
+        verify_before_pickup(listing_id, None, linked, db=db, credentials=creds)
+    assert rejected.value.status_code == 400
+    body = RequestBody(b"", {"photo": photo_url, "notes": "ok"})
+    verify_before_pickup(listing_id, None, body, db=db, credentials=creds)
+    status = get_verification_status(listing_id, db=db, credentials=creds)
+    assert status["before_photo"] == photo_url and status["verification_status"] == "before_verified"
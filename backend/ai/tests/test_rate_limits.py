@@ -0,0 +1,123 @@
+"""Tests for the sliding-window rate limiter (backend.rate_limits)."""
+from __future__ import annotations
+
+import pytest
+
+from backend.rate_limits import (
+    DatabaseRateBackend, InMemoryRateBackend, RateLimiter, decide, retry_minutes,
+)
+
+
+class _Clock:
+    def __init__(self, t: float = 1_000_000.0):
+        self.t = t
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def test_window_slides_instead_of_resetting():
+    clock = _Clock(600.0 * 1000)  # start of a window
+    limiter = RateLimiter("t", 5, 600, backend=InMemoryRateBackend(), clock=clock)
+    assert all(limiter.allow("k") for _ in range(5))
+    allowed, retry = limiter.hit("k")
+    # Next window, plus a fifth of it for the 5 hits to decay below the limit.
+    assert not allowed and retry == pytest.approx(720)
+
+    # Just into the next window the previous 5 still count almost fully...
+    clock.t += 610
+    assert not limiter.allow("k")
+    # ...and free up one slot per fifth of a window.
+    clock.t += 120
+    assert limiter.allow("k")
+    assert not limiter.allow("k")
+
+
+def test_retry_after_matches_when_a_slot_opens():
+    for prev, count, elapsed in [(5, 0, 0.1), (4, 3, 0.5), (0, 5, 0.3), (4, 4, 0.9)]:
+        allowed, retry = decide(prev, count, elapsed, 5, 100)
+        assert not allowed
+        # One second later than retry_after the hit is allowed.
+        t = elapsed + (retry + 1) / 100
+        if t >= 1:
+            prev, count, t = count, 0, t - 1
+        assert decide(prev, count, t, 5, 100)[0]
+    assert retry_minutes(61) == 2 and retry_minutes(0) == 1
+
+
+def test_memory_backend_is_bounded_and_expires_idle_keys():
+    clock = _Clock()
+    backend = InMemoryRateBackend(max_keys=100)
+    limiter = RateLimiter("t", 3, 60, backend=backend, clock=clock)
+    for i in range(250):
+        limiter.allow(f"ip{i}")
+    assert len(backend) == 100 and backend.evictions == 150
+
+    clock.t += 121  # both windows of every key have passed
+    for i in range(60):
+        limiter.allow(f"new{i}")
+    # Each check drops up to two idle keys from the front.
+    assert len(backend) == 60
+
+
+def test_limiters_sharing_a_backend_are_independent():
+    backend = InMemoryRateBackend()
+    a = RateLimiter("a", 1, 60, backend=backend)
+    b = RateLimiter("b", 1, 60, backend=backend)
+    assert a.allow("x") and not a.allow("x")
+    assert b.allow("x")
+    a.reset()
+    assert a.allow("x") and not b.allow("x")
+
+
+def test_database_backend_is_shared_between_workers(sqlite_sessionmaker):
+    clock = _Clock()
+    worker_1 = RateLimiter("login", 3, 600, backend=DatabaseRateBackend(sqlite_sessionmaker), clock=clock)
+    worker_2 = RateLimiter("login", 3, 600, backend=DatabaseRateBackend(sqlite_sessionmaker), clock=clock)
+    assert worker_1.allow("a@example.com") and worker_2.allow("a@example.com")
+    assert worker_1.allow("a@example.com")
+    assert not worker_2.allow("a@example.com")
+    assert worker_2.allow("b@example.com")
+
+    from backend.models import RateLimitCounter
+    db = sqlite_sessionmaker()
+    buckets = [r.bucket for r in db.query(RateLimitCounter)]
+    assert len(buckets) == 2 and all(b.startswith("login:") and "@" not in b for b in buckets)
+    db.close()
+
+    clock.t += 1801
+    assert worker_1.backend.purge(clock.t) == 2
+
+
+@pytest.mark.asyncio
+async def test_ai_route_checks_run_off_the_event_loop(monkeypatch):
+    import threading
+
+    from fastapi import HTTPException
+    from starlette.requests import Request
+
+    from backend.ai import ai_engine, routes
+
+    threads = []
+
+    class _RecordingBackend(InMemoryRateBackend):
+        def acquire(self, *args):
+            threads.append(threading.get_ident())
+            return super().acquire(*args)
+
+    backend = _RecordingBackend()
+    monkeypatch.setattr(routes, "check_rate_limit",
+                        RateLimiter("ip", 1, 60, backend=backend).allow)
+    monkeypatch.setattr(ai_engine, "check_user_rate_limit",
+                        RateLimiter("user", 1, 60, backend=backend).allow)
+    request = Request({"type": "http", "headers": [], "client": ("10.0.0.1", 1234), "query_string": b""})
+
+    await routes._enforce_rate_limit(request)
+    await routes._enforce_user_rate_limit(7, request)
+    assert len(threads) == 2 and threading.get_ident() not in threads
+
+    with pytest.raises(HTTPException) as blocked:
+        await routes._enforce_rate_limit(request)
+    assert blocked.value.status_code == 429
+    with pytest.raises(HTTPException):
+        await routes._enforce_user_rate_limit(7, request)
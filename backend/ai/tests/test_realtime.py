@@ -0,0 +1,119 @@
+"""Tests for the in-process push hub behind /api/events/stream."""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+
+import jwt
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+
+from backend import realtime
+from backend.realtime import PushHub, conversation_topics, encode_event, subscriber_topics
+
+
+def _decode(frame):
+    lines = dict(line.split(": ", 1) for line in frame.strip().split("\n"))
+    return lines["event"], json.loads(lines["data"])
+
+
+def test_topics():
+    assert conversation_topics("user_7") == ["user:7", "role:admin"]
+    assert conversation_topics("pair_3_9") == ["user:3", "user:9"]
+    assert conversation_topics("weird") == ["role:admin"]
+    assert subscriber_topics(7, "admin") == ["user:7", "listings", "role:admin"]
+
+
+def test_encode_event():
+    assert encode_event("x", {"a": 1}) == 'event: x\ndata: {"a":1}\n\n'
+
+
+@pytest.mark.asyncio
+async def test_fan_out_by_topic():
+    hub = PushHub()
+    admin = hub.subscribe(subscriber_topics(1, "admin"))
+    user7 = hub.subscribe(subscriber_topics(7, "recipient"))
+    user8 = hub.subscribe(subscriber_topics(8, "recipient"))
+
+    assert hub.publish(conversation_topics("user_7"), "message", {"id": 1}) == 2
+    assert hub.publish(["listings"], "listing.created", {"id": 2}) == 3
+    await asyncio.sleep(0)
+
+    assert _decode(await admin.get(0.1)) == ("message", {"id": 1})
+    assert _decode(await user7.get(0.1)) == ("message", {"id": 1})
+    assert _decode(await user8.get(0.1)) == ("listing.created", {"id": 2})
+    assert await user8.get(0.01) is None
+
+    for sub in (admin, user7, user8):
+        sub.close()
+    assert hub.subscriber_count() == 0
+    assert hub.publish(["listings"], "listing.created", {}) == 0
+
+
+@pytest.mark.asyncio
+async def test_publish_from_worker_thread():
+    hub = PushHub()
+    sub = hub.subscribe(["listings"])
+    thread = threading.Thread(target=hub.publish, args=(["listings"], "listing.updated", {"listing_id": 5}))
+    thread.start()
+    thread.join()
+    assert _decode(await sub.get(1)) == ("listing.updated", {"listing_id": 5})
+    sub.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_drops_oldest(monkeypatch):
+    monkeypatch.setattr(realtime, "QUEUE_SIZE", 3)
+    hub = PushHub()
+    sub = hub.subscribe(["listings"])
+    for i in range(5):
+        hub.publish(["listings"], "listing.created", {"n": i})
+    await asyncio.sleep(0)
+    assert [_decode(await sub.get(0.1))[1]["n"] for _ in range(3)] == [2, 3, 4]
+    assert sub.dropped == 2
+    sub.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_subscribes_for_its_lifetime():
+    hub = PushHub()
+    gen = realtime.stream(["user:1"], heartbeat=0.01, push_hub=hub)
+    assert "event: ready" in await gen.__anext__()
+    assert hub.subscriber_count() == 1
+    assert await gen.__anext__() == ": keep-alive\n\n"
+    hub.publish(["user:1"], "message", {"ok": True})
+    assert _decode(await gen.__anext__()) == ("message", {"ok": True})
+    await gen.aclose()
+    assert hub.subscriber_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_send_message_publishes_to_conversation(sqlite_sessionmaker):
+    from backend.app import JWT_ALGORITHM, JWT_SECRET, RequestBody, send_message
+    from backend.models import User, UserRole
+
+    db = sqlite_sessionmaker()
+    user = User(email="push@example.com", name="Pusher", role=UserRole.RECIPIENT)
+    db.add(user)
+    db.commit()
+
+    admin_sub = realtime.hub.subscribe(["role:admin"])
+    other_sub = realtime.hub.subscribe(["user:999999"])
+    try:
+        token = jwt.encode({"sub": str(user.id)}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+        result = send_message(
+            request=None,
+            request_body=RequestBody(json.dumps({"content": "hello"}).encode()),
+            credentials=HTTPAuthorizationCredentials(scheme="Bearer", credentials=token),
+            db=db,
+        )
+        event, data = _decode(await admin_sub.get(1))
+        assert event == "message"
+        assert data["conversation_id"] == f"user_{user.id}"
+        assert data["message"] == result["message"]
+        assert await other_sub.get(0.01) is None
+    finally:
+        admin_sub.close()
+        other_sub.close()
+        db.close()
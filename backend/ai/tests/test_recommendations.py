@@ -0,0 +1,127 @@
+"""Tests for precomputed recommendation scoring (backend.recommendations)."""
+from __future__ import annotations
+
+import json
+
+import jwt
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+
+from backend import recommendations as R
+from backend.models import FoodCategory, FoodResource, User, UserRole
+
+
+class TestFeatures:
+    def test_keywords_map_to_bits(self):
+        mask = R.listing_features("Chicken Soup", "with egg noodles")
+        assert mask & R.MEAT and mask & R.ANIMAL and mask & R.EGG
+        assert not mask & R.NUTS
+
+    def test_structured_columns_are_mapped_not_substring_matched(self):
+        mask = R.listing_features("Granola", None, allergens='["nuts", "sesame"]', dietary_tags='["vegan", "nut-free"]')
+        assert mask & R.NUTS
+        assert mask & R.VEGAN and mask & R.VEGGIE
+        assert R.listing_features("Bars", None, dietary_tags="nut-free, dairy-free") == 0
+
+    def test_listeners_keep_features_current(self, sqlite_sessionmaker):
+        db = sqlite_sessionmaker()
+        donor = User(email="feat@example.com", name="D", role=UserRole.DONOR)
+        db.add(donor)
+        db.flush()
+        item = FoodResource(donor_id=donor.id, title="Bread", qty=1, unit="loaf", address="x")
+        db.add(item)
+        db.commit()
+        assert item.diet_features == R.listing_features("Bread", None)
+        item.description = "contains walnuts"
+        db.commit()
+        assert item.diet_features & R.NUTS
+        db.close()
+
+
+class TestProfile:
+    def test_skip_and_rules(self):
+        profile = R.RecommendationProfile(["vegetarian", "halal"], ["dairy"])
+        assert profile.mask_score(R.listing_features("Pork buns", None)) is None
+        assert profile.mask_score(R.listing_features("Milk", None)) is None
+        assert profile.mask_score(R.listing_features("Fruit", "halal")) == 50
+        assert profile.mask_score(R.listing_features("Beef", None)) == -30
+
+    def test_rank_keeps_input_order_on_ties(self):
+        profile = R.RecommendationProfile(preferred_categories=["produce"])
+        rows = [
+            (1, FoodCategory.BAKERY, None, None, None, None, 0),
+            (2, FoodCategory.PRODUCE, None, None, None, None, 0),
+            (3, FoodCategory.BAKERY, None, None, None, None, 0),
+        ]
+        assert R.rank(profile, rows, top_n=2) == ([2, 1], 3)
+
+
+class TestCache:
+    def test_stale_version_is_not_stored(self):
+        cache = R.RecommendationCache()
+        version = cache.version
+        cache.invalidate()
+        cache.put(1, "k", version, [5], 1)
+        assert cache.get(1, "k") is None
+        cache.put(1, "k", cache.version, [5], 1)
+        assert cache.get(1, "k") == ([5], 1)
+        assert cache.get(1, "other-prefs") is None
+
+
+@pytest.fixture
+def recommend(sqlite_sessionmaker):
+    from backend.app import JWT_ALGORITHM, JWT_SECRET, get_recommended_listings, recommendation_cache
+
+    recommendation_cache.invalidate()
+    db = sqlite_sessionmaker()
+    donor = User(email="rdonor@example.com", name="Donor", role=UserRole.DONOR)
+    user = User(
+        email="ruser@example.com", name="User", role=UserRole.RECIPIENT,
+        dietary_restrictions=json.dumps(["vegetarian"]), allergies=json.dumps(["peanuts"]),
+    )
+    db.add_all([donor, user])
+    db.commit()
+
+    def add(title, **kwargs):
+        db.add(FoodResource(donor_id=donor.id, title=title, qty=1, unit="box", address="x",
+                            status="available", **kwargs))
+        db.commit()
+
+    def call():
+        token = jwt.encode({"sub": str(user.id)}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+        result = get_recommended_listings(
+            db=db, credentials=HTTPAuthorizationCredentials(scheme="Bearer", credentials=token),
+        )
+        return [listing.title for listing in result["listings"]], result["total_matches"]
+
+    yield add, call, db
+    db.close()
+
+
+def test_endpoint_ranks_and_invalidates_on_listing_change(recommend):
+    add, call, db = recommend
+    add("Fresh fruit")
+    add("Beef stew")
+    add("Peanut butter")
+    add("Granola", allergens=json.dumps(["tree nuts"]))
+    assert call() == (["Fresh fruit", "Beef stew"], 2)
+
+    # A new listing must show up on the next call, not after the cache TTL.
+    add("Veggie wraps")
+    assert call() == (["Fresh fruit", "Veggie wraps", "Beef stew"], 3)
+
+    db.query(FoodResource).filter(FoodResource.title == "Fresh fruit").update({"status": "claimed"})
+    db.commit()
+    assert call() == (["Veggie wraps", "Beef stew"], 2)
+
+    # A flushed but uncommitted write must not bump the version early: a
+    # call made before the commit would cache the old list under it.
+    from backend.app import recommendation_cache
+
+    version = recommendation_cache.version
+    db.add(FoodResource(donor_id=db.query(FoodResource.donor_id).limit(1).scalar(), title="Lentil soup",
+                        qty=2, unit="bowl", address="x", status="available"))
+    db.flush()
+    assert recommendation_cache.version == version
+    db.commit()
+    assert recommendation_cache.version > version
@@ -0,0 +1,105 @@
+"""Tests for the public chat reply cache (backend.ai.reply_cache)."""
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.ai import ai_engine, reply_cache
+from backend.ai.reply_cache import ReplyCache, reply_key
+
+
+def test_key_ignores_case_punctuation_and_the_prompt_timestamp():
+    def msgs(stamp, question):
+        return [{"role": "system", "content": f"Head\n\nCurrent date and time: {stamp}\n\nBody"},
+                {"role": "user", "content": question}]
+
+    base = reply_key(msgs("2026-01-01 09:00 UTC", "How do I get food?"), "en")
+    assert base == reply_key(msgs("2026-01-01 09:01 UTC", "  how do i   get FOOD "), "en")
+    assert base != reply_key(msgs("2026-01-01 09:00 UTC", "How do I share food?"), "en")
+    assert base != reply_key(msgs("2026-01-01 09:00 UTC", "How do I get food?"), "es")
+
+
+def test_entries_expire_and_are_evicted(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(reply_cache.time, "monotonic", lambda: clock[0])
+    cache = ReplyCache(ttl_s=60, maxsize=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # a is now more recent than b
+    cache.put("c", "C")
+    assert cache.get("b") is None and cache.evictions == 1
+    clock[0] += 61
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_questions_share_one_completion(monkeypatch):
+    monkeypatch.setattr(ai_engine, "public_reply_cache", ReplyCache())
+    monkeypatch.setattr(ai_engine, "OPENAI_API_KEY", "test-key")
+    engine = ai_engine.ConversationEngine()
+    calls = []
+
+    async def completion(messages):
+        calls.append(messages[-1]["content"])
+        await asyncio.sleep(0.01)
+        return "Browse the map and tap Claim."
+
+    monkeypatch.setattr(engine, "_public_completion", completion)
+    questions = ["How do I get food?", "how do i get food", "HOW DO I GET FOOD?!"]
+    replies = await asyncio.gather(*(
+        engine.cached_public_reply(engine.public_chat_messages(q, "en"), "en") for q in questions * 3
+    ))
+    assert set(replies) == {"Browse the map and tap Claim."}
+    assert len(calls) == 1
+    stats = ai_engine.public_reply_cache.stats()
+    assert stats["coalesced"] == 8 and stats["hit_rate"] == pytest.approx(8 / 9, abs=1e-3)
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_cached(monkeypatch):
+    monkeypatch.setattr(ai_engine, "public_reply_cache", ReplyCache())
+    monkeypatch.setattr(ai_engine, "OPENAI_API_KEY", "test-key")
+    engine = ai_engine.ConversationEngine()
+    outcomes = [httpx.ReadTimeout("slow"), "Welcome!"]
+
+    async def completion(messages):
+        result = outcomes.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(engine, "_public_completion", completion)
+    messages = engine.public_chat_messages("hi", "en")
+    assert await engine.cached_public_reply(messages, "en") == ai_engine.get_canned_response("timeout", "en")
+    assert await engine.cached_public_reply(messages, "en") == "Welcome!"
+    assert await engine.cached_public_reply(messages, "en") == "Welcome!"
+    assert outcomes == []
+
+
+def test_prewarmed_faq_is_served_by_the_route(monkeypatch):
+    from backend.app import app
+
+    monkeypatch.setattr(ai_engine, "public_reply_cache", ReplyCache())
+    monkeypatch.setattr(ai_engine, "OPENAI_API_KEY", "test-key")
+    engine = ai_engine.conversation_engine
+    monkeypatch.setattr(engine.prompts, "_training_data", {**engine.training_data, "faq": ["How do I get food?", "¿Cómo consigo comida?"]})
+    monkeypatch.setattr(engine.prompts, "_refresh", lambda: None)
+    calls = []
+
+    async def completion(messages):
+        calls.append(messages[-1]["content"])
+        return f"answer {len(calls)}"
+
+    monkeypatch.setattr(engine, "_public_completion", completion)
+    assert asyncio.run(engine.prewarm_public_replies()) == 2
+    assert asyncio.run(engine.prewarm_public_replies()) == 0
+
+    resp = TestClient(app).post("/api/ai/public_chat", json={"message": "how do I get food"})
+    assert resp.status_code == 200
+    assert resp.json()["text"] == "answer 1" and resp.json()["lang"] == "en"
+    assert calls == ["How do I get food?", "¿Cómo consigo comida?"]
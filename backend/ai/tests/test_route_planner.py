@@ -0,0 +1,93 @@
+"""Tests for the local pickup-route solver (backend.route_planner)."""
+from __future__ import annotations
+
+import random
+import time
+from datetime import datetime, timedelta
+
+from backend.ai.tools import _plan_stops
+from backend.route_planner import RouteStop, describe_order, evaluate_order, plan_route
+
+START = datetime(2026, 3, 14, 9, 0)
+ORIGIN = (37.80, -122.27)
+
+
+def _east(km: float) -> float:
+    """Longitude ``km`` east of the origin (roughly, at this latitude)."""
+    return ORIGIN[1] + km / 88.0
+
+
+def test_points_on_a_line_are_visited_in_order():
+    stops = [RouteStop(k, ORIGIN[0], _east(k)) for k in (3, 1, 4, 2)]
+    plan = plan_route(ORIGIN, stops, start=START)
+    assert [stops[i].key for i in plan.order] == [1, 2, 3, 4]
+    assert plan.late == [] and plan.deferred == []
+    assert abs(plan.total_km - 4.0) < 0.2
+
+
+def test_deadline_beats_distance():
+    # Nearest-first would drive 1 km east, then 11 km west, arriving late.
+    stops = [
+        RouteStop("near", ORIGIN[0], _east(1)),
+        RouteStop("urgent", ORIGIN[0], _east(-10), deadline=START + timedelta(minutes=25)),
+    ]
+    assert evaluate_order(ORIGIN, stops, [0, 1], start=START)[1] == 1
+    plan = plan_route(ORIGIN, stops, start=START)
+    assert [stops[i].key for i in plan.order] == ["urgent", "near"]
+    assert plan.late == []
+    assert plan.arrivals[0] <= stops[1].deadline
+
+
+def test_describe_order_matches_evaluate_order():
+    stops = [
+        RouteStop("near", ORIGIN[0], _east(1)),
+        RouteStop("urgent", ORIGIN[0], _east(-10), deadline=START + timedelta(minutes=25)),
+    ]
+    plan = describe_order(ORIGIN, stops, [0, 1], start=START)
+    _, late, km = evaluate_order(ORIGIN, stops, [0, 1], start=START)
+    assert plan.order == [0, 1] and plan.late == [1] and len(plan.late) == late
+    assert abs(plan.total_km - km) < 0.01
+
+
+def test_capacity_defers_least_urgent_stops():
+    stops = [
+        RouteStop("a", ORIGIN[0], _east(1), weight_kg=40),
+        RouteStop("b", ORIGIN[0], _east(2), weight_kg=40, deadline=START + timedelta(hours=1)),
+        RouteStop("c", ORIGIN[0], _east(3), weight_kg=40),
+    ]
+    plan = plan_route(ORIGIN, stops, capacity_kg=90, start=START)
+    assert sorted(stops[i].key for i in plan.order) == ["a", "b"]
+    assert [stops[i].key for i in plan.deferred] == ["c"]
+    assert plan.load_kg == 80
+
+
+def test_hundred_stops_solve_quickly_and_beat_nearest_neighbour():
+    rng = random.Random(11)
+    stops = [
+        RouteStop(i, ORIGIN[0] + rng.uniform(-0.1, 0.1), ORIGIN[1] + rng.uniform(-0.1, 0.1))
+        for i in range(100)
+    ]
+    started = time.monotonic()
+    plan = plan_route(ORIGIN, stops, start=START)
+    assert time.monotonic() - started < 1.0
+    assert sorted(plan.order) == list(range(100))
+
+    # Nearest neighbour, as the tools used to order stops.
+    remaining, order, cur = set(range(100)), [], ORIGIN
+    while remaining:
+        nxt = min(remaining, key=lambda i: (stops[i].lat - cur[0]) ** 2 + (stops[i].lng - cur[1]) ** 2)
+        remaining.remove(nxt)
+        order.append(nxt)
+        cur = (stops[nxt].lat, stops[nxt].lng)
+    assert plan.total_km < evaluate_order(ORIGIN, stops, order, start=START)[2]
+
+
+def test_plan_stops_decorates_tool_dicts():
+    stops = [
+        {"listing_id": 1, "lat": ORIGIN[0], "lng": _east(2), "_deadline": None, "_weight_kg": 5},
+        {"listing_id": 2, "lat": ORIGIN[0], "lng": _east(1), "_deadline": None, "_weight_kg": None},
+    ]
+    planned = _plan_stops(ORIGIN, stops, None)
+    assert [s["listing_id"] for s in planned["ordered"]] == [2, 1]
+    assert all("_deadline" not in s and "eta" in s and s["late"] is False for s in planned["ordered"])
+    assert planned["deferred"] == []
@@ -0,0 +1,155 @@
+"""Tests for the routing cache, matrix store and offline estimates (backend.routing)."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from backend import routing
+from backend.ai.tools import execute_tool
+from backend.models import DistributionCenter, FoodResource, RouteMatrixEntry, User, UserRole
+
+
+@pytest.fixture(autouse=True)
+def _empty_route_cache():
+    routing.route_cache.clear()
+    yield
+    routing.route_cache.clear()
+
+
+def test_cache_rounds_keys_and_expires(monkeypatch):
+    cache = routing.RouteCache(ttl_s=60, maxsize=2)
+    key = routing.route_key("driving", [(37.800001, -122.27), (37.81, -122.28)])
+    cache.put(key, {"km": 1})
+    assert cache.get(routing.route_key("driving", [(37.80004, -122.270001), (37.81, -122.28)])) == {"km": 1}
+    assert cache.get(routing.route_key("walking", [(37.8, -122.27), (37.81, -122.28)])) is None
+
+    clock = [routing.time.monotonic() + 61]
+    monkeypatch.setattr(routing.time, "monotonic", lambda: clock[0])
+    assert cache.get(key) is None
+
+
+def test_estimate_scales_by_profile():
+    drive_m, drive_s = routing.estimate(37.80, -122.27, 37.89, -122.27, "driving")
+    walk_m, walk_s = routing.estimate(37.80, -122.27, 37.89, -122.27, "walking")
+    assert drive_m == walk_m and 12_000 < drive_m < 14_000
+    assert walk_s == pytest.approx(drive_s * 8)
+
+
+def _mapbox_client(payload):
+    resp = MagicMock(status_code=200)
+    resp.json = MagicMock(return_value=payload)
+    resp.raise_for_status = MagicMock()
+    client = MagicMock(get=AsyncMock(return_value=resp))
+    ctx = MagicMock()
+    ctx.__aenter__ = AsyncMock(return_value=client)
+    ctx.__aexit__ = AsyncMock(return_value=None)
+    return ctx, client
+
+
+@pytest.mark.asyncio
+async def test_repeat_route_is_served_from_cache():
+    ctx, client = _mapbox_client({"routes": [{"duration": 600, "distance": 5000, "legs": []}]})
+    args = {"origin_lng": -122.27, "origin_lat": 37.8, "dest_lng": -122.25, "dest_lat": 37.82}
+    with patch("backend.ai.tools.MAPBOX_TOKEN", "test-token"), \
+         patch("backend.ai.tools.httpx.AsyncClient", return_value=ctx):
+        first = await execute_tool("get_mapbox_route", args)
+        again = await execute_tool("get_mapbox_route", dict(args, origin_lat=37.80001))
+    assert first["distance_km"] == 5.0 and "cached" not in first
+    assert again["cached"] is True and again["duration_minutes"] == 10.0
+    assert client.get.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_route_without_token_is_estimated():
+    with patch("backend.ai.tools.MAPBOX_TOKEN", ""):
+        r = await execute_tool("get_mapbox_route", {
+            "origin_lng": -122.27, "origin_lat": 37.8, "dest_lng": -122.27, "dest_lat": 37.89,
+        })
+    assert "error" not in r
+    assert r["approximate"] is True and 12 < r["distance_km"] < 14
+
+
+@pytest.mark.asyncio
+async def test_matrix_refresh_batches_estimates_and_prunes(sqlite_sessionmaker, monkeypatch):
+    monkeypatch.setattr(routing, "MATRIX_BATCH", 2)
+    db = sqlite_sessionmaker()
+    donor = User(email="m@example.com", name="D", role=UserRole.DONOR)
+    db.add(donor)
+    db.flush()
+    db.add_all([
+        DistributionCenter(name="A", coords_lat=37.80, coords_lng=-122.27, is_active=True),
+        DistributionCenter(name="Closed", coords_lat=37.80, coords_lng=-122.27, is_active=False),
+    ])
+    listings = [
+        FoodResource(donor_id=donor.id, title=f"L{i}", qty=1, unit="box", address="x",
+                     status="available", coords_lat=37.80 + i / 100, coords_lng=-122.27)
+        for i in range(3)
+    ]
+    db.add_all(listings)
+    db.commit()
+
+    calls = []
+
+    async def fake_fetch(profile, source, destinations, token):
+        calls.append(len(destinations))
+        if len(calls) == 2:
+            raise RuntimeError("mapbox status 429")
+        return [(1000.0 * (i + 1), 60.0 * (i + 1)) for i in range(len(destinations))]
+
+    stats = await routing.refresh_center_matrix(sqlite_sessionmaker, token="t", fetch=fake_fetch)
+    assert calls == [2, 1]
+    assert (stats["mapbox"], stats["estimated"]) == (2, 1)
+    rows = {r.listing_id: r.source for r in db.query(RouteMatrixEntry)}
+    assert rows == {listings[0].id: "mapbox", listings[1].id: "mapbox", listings[2].id: "estimate"}
+
+    # Fresh Mapbox pairs are not refetched, but the estimate left by the
+    # failed batch is; a claimed listing's pairs are dropped.
+    listings[0].status = "claimed"
+    db.commit()
+    stats = await routing.refresh_center_matrix(sqlite_sessionmaker, token="t", fetch=fake_fetch)
+    assert calls[2:] == [1] and stats["mapbox"] == 1 and stats["pruned"] == 1
+    db.expire_all()
+    assert db.get(RouteMatrixEntry, (1, listings[2].id, "driving")).source == "mapbox"
+    stats = await routing.refresh_center_matrix(sqlite_sessionmaker, token="t", fetch=fake_fetch)
+    assert stats["requests"] == 0
+    assert [c["center_id"] for c in routing.nearest_centers(db, listings[1].id)] == [1]
+
+    # Stale rows are refreshed.
+    db.query(RouteMatrixEntry).update({"updated_at": datetime.utcnow() - timedelta(days=30)})
+    db.commit()
+    stats = await routing.refresh_center_matrix(sqlite_sessionmaker, token="t", fetch=fake_fetch)
+    assert stats["mapbox"] == 2
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_centers_for_a_listing_sort_by_stored_travel_time(sqlite_sessionmaker, monkeypatch):
+    import backend.app
+
+    monkeypatch.setattr(backend.app, "SessionLocal", sqlite_sessionmaker)
+    db = sqlite_sessionmaker()
+    donor = User(email="c@example.com", name="D", role=UserRole.DONOR)
+    db.add(donor)
+    db.flush()
+    far, near, unmapped = (
+        DistributionCenter(name="Far", coords_lat=37.80, coords_lng=-122.27, is_active=True),
+        DistributionCenter(name="Near", coords_lat=37.90, coords_lng=-122.27, is_active=True),
+        DistributionCenter(name="Unmapped", coords_lat=37.95, coords_lng=-122.27, is_active=True),
+    )
+    listing = FoodResource(donor_id=donor.id, title="L", qty=1, unit="box", address="x",
+                           status="available", coords_lat=37.85, coords_lng=-122.27)
+    db.add_all([far, near, unmapped, listing])
+    db.flush()
+    db.add_all([
+        RouteMatrixEntry(center_id=far.id, listing_id=listing.id, distance_m=20000, duration_s=1800),
+        RouteMatrixEntry(center_id=near.id, listing_id=listing.id, distance_m=4000, duration_s=420),
+    ])
+    db.commit()
+
+    r = await execute_tool("query_distribution_centers", {"listing_id": listing.id})
+    assert [c["name"] for c in r["centers"]] == ["Near", "Unmapped", "Far"]
+    assert r["centers"][0]["travel_minutes"] == 7.0 and r["centers"][0]["approximate"] is False
+    assert r["centers"][1]["approximate"] is True
+    db.close()
@@ -0,0 +1,105 @@
+"""Tests for the content-addressed TTS cache and its audio route."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.ai import ai_engine, routes, speech_cache
+from backend.ai.speech_cache import SpeechCache, audio_url, speech_key
+
+
+def test_key_depends_on_text_voice_and_model():
+    base = speech_key("Hello!", "nova", "tts-1")
+    assert base == speech_key("Hello!", "nova", "tts-1")
+    assert len({base, speech_key("Hello", "nova", "tts-1"), speech_key("Hello!", "alloy", "tts-1"),
+                speech_key("Hello!", "nova", "tts-1-hd")}) == 4
+    assert audio_url(base) == f"/api/ai/audio/{base}.mp3"
+
+
+def test_least_recently_used_clip_is_evicted(tmp_path, monkeypatch):
+    clock = iter(range(1_000_000, 2_000_000))
+    monkeypatch.setattr(speech_cache.time, "time", lambda: float(next(clock)))
+    cache = SpeechCache(str(tmp_path), max_bytes=25)
+    a, b, c = (speech_key(t, "nova", "tts-1") for t in "abc")
+    cache.put(a, b"x" * 10)
+    cache.put(b, b"y" * 10)
+    assert cache.get(a) is not None  # a is now more recent than b
+    cache.put(c, b"z" * 10)
+    assert cache.get(b) is None
+    assert cache.get(a) is not None and cache.get(c) is not None
+    assert cache.stats()["bytes"] == 20 and cache.evictions == 1
+
+    # A fresh instance picks the sizes up from disk.
+    assert SpeechCache(str(tmp_path), max_bytes=25).stats()["entries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_synthesize_once(tmp_path):
+    cache = SpeechCache(str(tmp_path))
+    key = speech_key("Welcome back!", "nova", "tts-1")
+    calls = []
+
+    async def synthesize():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return b"ID3-audio"
+
+    paths = await asyncio.gather(*(cache.get_or_create(key, synthesize) for _ in range(5)))
+    assert len(calls) == 1 and len(set(paths)) == 1
+    await cache.get_or_create(key, synthesize)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_reply_audio_is_a_url(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_engine, "speech_cache", SpeechCache(str(tmp_path)))
+    engine = ai_engine.ConversationEngine()
+    calls = []
+
+    async def fake_speech(text, lang="en"):
+        calls.append(text)
+        return b"mp3-bytes"
+
+    monkeypatch.setattr(engine, "generate_speech", fake_speech)
+    first = await engine._generate_audio_url("Sorry, something went wrong.")
+    again = await engine._generate_audio_url("Sorry, something went wrong.")
+    assert first == again and first.startswith("/api/ai/audio/") and first.endswith(".mp3")
+    assert calls == ["Sorry, something went wrong."]
+
+
+def test_audio_route_serves_byte_ranges(tmp_path, monkeypatch):
+    from backend.app import app
+
+    cache = SpeechCache(str(tmp_path))
+    key = speech_key("hi", "nova", "tts-1")
+    cache.put(key, b"0123456789")
+    monkeypatch.setattr(routes, "speech_cache", cache)
+    client = TestClient(app)
+
+    full = client.get(f"/api/ai/audio/{key}.mp3")
+    assert full.status_code == 200 and full.content == b"0123456789"
+    assert full.headers["content-type"] == "audio/mpeg"
+
+    part = client.get(f"/api/ai/audio/{key}.mp3", headers={"Range": "bytes=2-5"})
+    assert part.status_code == 206 and part.content == b"2345"
+
+    assert client.get(f"/api/ai/audio/{'0' * 64}.mp3").status_code == 404
+    assert client.get("/api/ai/audio/..%2Fsecrets.mp3").status_code == 404
+
+
+def test_workers_sharing_a_directory_see_each_others_clips(tmp_path):
+    a, b = SpeechCache(str(tmp_path), max_bytes=25), SpeechCache(str(tmp_path), max_bytes=25)
+    assert a.stats()["entries"] == b.stats()["entries"] == 0  # both indexes loaded empty
+    k1, k2, k3 = (speech_key(t, "nova", "tts-1") for t in "abc")
+
+    a.put(k1, b"x" * 10)
+    assert b.get(k1) == a.path(k1)
+    assert b.stats()["bytes"] == 10 and b.hits == 1
+
+    # b's writes count a's clip toward the limit and evict the oldest.
+    b.put(k2, b"y" * 10)
+    b.put(k3, b"z" * 10)
+    assert b.stats()["bytes"] == 20 and b.evictions == 1
+    assert len(list(tmp_path.glob("*.mp3"))) == 2
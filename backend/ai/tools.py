@@ -10,7 +10,6 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
-import math
 import os
 import re
 from datetime import datetime, timedelta, timezone
@@ -19,6 +18,11 @@ from typing import Optional
 import httpx
 
 from backend.aws_secrets import load_aws_secrets
+from backend.geo_index import haversine_km, radius_filter, within_radius
+from backend.impact_stats import listing_claimed, listing_unclaimed
+from backend.geocoding import geocoder
+from backend.routing import estimate as estimate_route, nearest_centers, route_cache, route_key
+from backend.route_planner import describe_order, evaluate_order
 
 # Pull secrets (e.g. MAPBOX_TOKEN) from AWS Secrets Manager into the
 # process env BEFORE we read module-level config below. In production the
@@ -43,7 +47,6 @@ def _utcnow() -> datetime:
 
 MAPBOX_TOKEN = os.getenv("MAPBOX_TOKEN") or os.getenv("VITE_MAPBOX_TOKEN", "")
 MAPBOX_DIRECTIONS_URL = "https://api.mapbox.com/directions/v5/mapbox"
-MAPBOX_GEOCODE_URL = "https://api.mapbox.com/geocoding/v5/mapbox.places/{}.json"
 
 
 # Per-user cache of the most recent search_food_near_user result.
@@ -83,52 +86,21 @@ def _resolve_ordinal_listing_id(uid: int, listing_id: int) -> Optional[int]:
 
 
 def _geocode_address(address: str) -> Optional[tuple]:
-    """Best-effort forward-geocode of an address via Mapbox.
+    """Best-effort forward-geocode of an address via the shared geocoder.
 
     Returns ``(lat, lng)`` on success, ``None`` if no token, no match, or
     on any error. Used to make sure AI-posted listings show up on the map
-    instead of only in the sidebar list. Filters out low-relevance hits
-    (country / region centroids) so a vague string like 'Alameda' doesn't
-    drop a listing in the middle of the wrong area.
+    instead of only in the sidebar list. Strict mode filters out
+    low-relevance hits (country / region centroids) so a vague string like
+    'Alameda' doesn't drop a listing in the middle of the wrong area.
+
+    Tool bodies run in executor threads, so this blocks on the lookup.
     """
     addr = (address or "").strip()
-    if not addr or not MAPBOX_TOKEN:
+    if not addr:
         return None
     try:
-        from urllib.parse import quote as urlquote
-        url = MAPBOX_GEOCODE_URL.format(urlquote(addr))
-        # Two attempts; transient mapbox errors shouldn't permanently fail
-        # a listing post.
-        last_exc = None
-        for attempt in range(2):
-            try:
-                with httpx.Client(timeout=10.0) as client:
-                    resp = client.get(url, params={"access_token": MAPBOX_TOKEN, "limit": 1})
-                if resp.status_code != 200:
-                    continue
-                features = (resp.json() or {}).get("features") or []
-                if not features:
-                    return None
-                feat = features[0]
-                # Reject very low-relevance matches and country/region
-                # centroids — those are useless on a delivery map.
-                relevance = float(feat.get("relevance") or 0)
-                place_types = set(feat.get("place_type") or [])
-                if relevance < 0.5:
-                    return None
-                if place_types and place_types.issubset({"country", "region"}):
-                    return None
-                center = feat.get("center")
-                if not center or len(center) < 2:
-                    return None
-                # Mapbox returns [lng, lat]
-                return float(center[1]), float(center[0])
-            except Exception as exc:
-                last_exc = exc
-                continue
-        if last_exc is not None:
-            logger.warning("Geocode failed for %r: %s", addr, last_exc)
-        return None
+        return geocoder.geocode_blocking(addr, strict=True)
     except Exception as exc:
         logger.warning("Geocode failed for %r: %s", addr, exc)
         return None
@@ -234,6 +206,11 @@ TOOL_DEFINITIONS = [
                 "properties": {
                     "max_results": {"type": "integer", "default": 10},
                     "user_id": {"type": "string", "description": "Optional: sort by proximity"},
+                    "listing_id": {
+                        "type": "integer",
+                        "description": "Optional: sort by driving time from this listing "
+                                       "(where to drop off or redistribute it)",
+                    },
                 },
                 "required": [],
             },
@@ -334,7 +311,7 @@ TOOL_DEFINITIONS = [
         "type": "function",
         "function": {
             "name": "get_dispatch_queue",
-            "description": "DISPATCHER ROLE: open food requests and unclaimed listings that need matching/assignment.",
+            "description": "DISPATCHER ROLE: open food requests, unclaimed listings, and server-computed suggested request/listing/driver matches.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -804,6 +781,38 @@ TOOL_DEFINITIONS = [
 # Dispatcher
 # ---------------------------------------------------------------------------
 
+# Tools that never write to the database, send SMS or publish events. The
+# engine runs these concurrently (with a timeout) when the model asks for
+# several in one round; anything not listed is treated as mutating and runs
+# alone, in the order the model asked for it.
+READ_ONLY_TOOLS = frozenset({
+    "search_food_near_user",
+    "get_user_profile",
+    "get_pickup_schedule",
+    "get_mapbox_route",
+    "query_distribution_centers",
+    "get_user_dashboard",
+    "check_pickup_schedule",
+    "get_recipes",
+    "get_storage_tips",
+    "get_donor_expiring_listings",
+    "get_driver_route_plan",
+    "get_dispatch_queue",
+    "get_platform_stats",
+    "get_profile_gaps",
+    "search_food_by_location",
+    "optimize_pickup_route",
+    "run_safe_query",
+    "show_map",
+    "show_route_to_listing",
+    "navigate_ui",
+})
+
+
+def is_read_only_tool(name: str) -> bool:
+    return name in READ_ONLY_TOOLS
+
+
 async def execute_tool(name: str, arguments: dict) -> dict:
     handlers = {
         "search_food_near_user": _search_food_near_user,
@@ -872,16 +881,7 @@ async def execute_tool(name: str, arguments: dict) -> dict:
 # ---------------------------------------------------------------------------
 
 def _haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    R = 6371.0
-    d_lat = math.radians(lat2 - lat1)
-    d_lon = math.radians(lon2 - lon1)
-    a = (
-        math.sin(d_lat / 2) ** 2
-        + math.cos(math.radians(lat1))
-        * math.cos(math.radians(lat2))
-        * math.sin(d_lon / 2) ** 2
-    )
-    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return haversine_km(lat1, lon1, lat2, lon2)
 
 
 def _to_int(value) -> Optional[int]:
@@ -1026,6 +1026,12 @@ def _translate_listing_text(value: Optional[str]) -> Optional[str]:
     return out
 
 
+# Safety cap on rows pulled from the geohash index for one radius search.
+# The index already restricts candidates to the search area, so this only
+# bites for enormous radii over a dense region.
+_GEO_CANDIDATE_LIMIT = 5000
+
+
 async def _run(sync_fn):
     """Run a blocking SQLAlchemy function in a thread."""
     return await asyncio.get_event_loop().run_in_executor(None, sync_fn)
@@ -1065,16 +1071,26 @@ async def _search_food_near_user(
                 except ValueError:
                     pass
 
-            listings = q.order_by(FoodResource.created_at.desc()).limit(200).all()
+            if user_lat is not None and user_lng is not None:
+                # Geohash-indexed radius lookup: every available listing in
+                # range is a candidate, not just the newest few hundred.
+                # Listings without coordinates can't be placed inside the
+                # radius and are left out.
+                rows = (
+                    q.filter(radius_filter(FoodResource, user_lat, user_lng, radius_km))
+                    .limit(_GEO_CANDIDATE_LIMIT)
+                    .all()
+                )
+                located = within_radius(rows, user_lat, user_lng, radius_km)
+            else:
+                # No home location on file: fall back to the newest listings,
+                # unranked by distance.
+                rows = q.order_by(FoodResource.created_at.desc()).limit(200).all()
+                located = [(l, None) for l in rows]
 
             results = []
-            for l in listings:
+            for l, dist in located:
                 lat, lng = l.coords_lat, l.coords_lng
-                dist = None
-                if lat is not None and lng is not None and user_lat is not None and user_lng is not None:
-                    dist = _haversine(user_lat, user_lng, float(lat), float(lng))
-                    if dist > radius_km:
-                        continue
                 results.append({
                     "id": l.id,
                     "title": l.title,
@@ -1291,6 +1307,34 @@ async def _create_reminder(
     return await _run(_sync)
 
 
+def _duration_text(duration_sec: float) -> str:
+    if duration_sec < 60:
+        return f"{int(duration_sec)} seconds"
+    if duration_sec < 3600:
+        return f"{int(duration_sec // 60)} minutes"
+    h = int(duration_sec // 3600)
+    m = int((duration_sec % 3600) // 60)
+    return f"{h}h {m}min"
+
+
+def _estimated_route(origin_lat: float, origin_lng: float, dest_lat: float, dest_lng: float,
+                     profile: str, reason: str) -> dict:
+    """Offline answer for get_mapbox_route when Mapbox can't be used."""
+    distance_m, duration_sec = estimate_route(origin_lat, origin_lng, dest_lat, dest_lng, profile)
+    dist_km = distance_m / 1000
+    time_str = _duration_text(duration_sec)
+    return {
+        "profile": profile,
+        "distance_km": round(dist_km, 2),
+        "duration_minutes": round(duration_sec / 60, 1),
+        "duration_text": time_str,
+        "steps": [],
+        "approximate": True,
+        "note": reason,
+        "summary": f"Route by {profile}: roughly {dist_km:.1f} km, about {time_str} (estimate, no turn-by-turn).",
+    }
+
+
 async def _get_mapbox_route(
     origin_lng: float,
     origin_lat: float,
@@ -1298,15 +1342,18 @@ async def _get_mapbox_route(
     dest_lat: float,
     profile: str = "driving",
 ) -> dict:
-    if not MAPBOX_TOKEN:
-        return {
-            "error": "Mapbox token not configured",
-            "fallback": f"Straight-line distance: ~{_haversine(origin_lat, origin_lng, dest_lat, dest_lng):.1f} km.",
-        }
-
     if profile not in ("driving", "walking", "cycling"):
         profile = "driving"
 
+    if not MAPBOX_TOKEN:
+        return _estimated_route(origin_lat, origin_lng, dest_lat, dest_lng, profile,
+                                "Mapbox token not configured")
+
+    cache_key = route_key(profile, [(origin_lat, origin_lng), (dest_lat, dest_lng)], "steps")
+    cached = route_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached, cached=True)
+
     coords = f"{origin_lng},{origin_lat};{dest_lng},{dest_lat}"
     url = f"{MAPBOX_DIRECTIONS_URL}/{profile}/{coords}"
 
@@ -1322,9 +1369,11 @@ async def _get_mapbox_route(
             resp.raise_for_status()
             data = resp.json()
     except httpx.HTTPStatusError as exc:
-        return {"error": f"Mapbox API error: HTTP {exc.response.status_code}"}
+        return _estimated_route(origin_lat, origin_lng, dest_lat, dest_lng, profile,
+                                f"Mapbox API error: HTTP {exc.response.status_code}")
     except Exception as exc:
-        return {"error": f"Mapbox request failed: {exc}"}
+        return _estimated_route(origin_lat, origin_lng, dest_lat, dest_lng, profile,
+                                f"Mapbox request failed: {exc}")
 
     routes = data.get("routes", [])
     if not routes:
@@ -1345,16 +1394,9 @@ async def _get_mapbox_route(
                 })
 
     dist_km = distance_m / 1000
-    if duration_sec < 60:
-        time_str = f"{int(duration_sec)} seconds"
-    elif duration_sec < 3600:
-        time_str = f"{int(duration_sec // 60)} minutes"
-    else:
-        h = int(duration_sec // 3600)
-        m = int((duration_sec % 3600) // 60)
-        time_str = f"{h}h {m}min"
+    time_str = _duration_text(duration_sec)
 
-    return {
+    result = {
         "profile": profile,
         "distance_km": round(dist_km, 2),
         "duration_minutes": round(duration_sec / 60, 1),
@@ -1362,14 +1404,17 @@ async def _get_mapbox_route(
         "steps": steps[:20],
         "summary": f"Route by {profile}: {dist_km:.1f} km, about {time_str}.",
     }
+    route_cache.put(cache_key, result)
+    return result
 
 
 async def _query_distribution_centers(
     max_results: int = 10,
     user_id: Optional[str] = None,
+    listing_id: Optional[int] = None,
 ) -> dict:
     from backend.app import SessionLocal
-    from backend.models import DistributionCenter, User
+    from backend.models import DistributionCenter, FoodResource, User
 
     def _sync() -> dict:
         db = SessionLocal()
@@ -1388,6 +1433,22 @@ async def _query_distribution_centers(
                 .limit(50)
                 .all()
             )
+
+            # From a listing: stored road times (backend.routing's
+            # route_matrix), with an offline estimate for centers the last
+            # matrix refresh has not reached.
+            listing = travel = None
+            lid = _to_int(listing_id) if listing_id is not None else None
+            if lid is not None:
+                listing = (
+                    db.query(FoodResource.coords_lat, FoodResource.coords_lng)
+                    .filter(FoodResource.id == lid)
+                    .first()
+                )
+                if listing is None:
+                    return {"error": "Listing not found"}
+                travel = {row["center_id"]: row for row in nearest_centers(db, lid, limit=len(centers) or 1)}
+
             results = []
             for c in centers:
                 entry = {
@@ -1400,7 +1461,18 @@ async def _query_distribution_centers(
                     "verified_by_aglf": c.verified_by_aglf,
                     "school_partner": c.school_partner,
                 }
-                if (
+                if travel is not None:
+                    row = travel.get(c.id)
+                    if row is None and None not in (listing.coords_lat, listing.coords_lng,
+                                                     c.coords_lat, c.coords_lng):
+                        distance_m, duration_s = estimate_route(
+                            listing.coords_lat, listing.coords_lng, c.coords_lat, c.coords_lng)
+                        row = {"distance_m": distance_m, "duration_s": duration_s, "source": "estimate"}
+                    if row is not None:
+                        entry["distance_km"] = round(row["distance_m"] / 1000.0, 1)
+                        entry["travel_minutes"] = round(row["duration_s"] / 60.0, 1)
+                        entry["approximate"] = row["source"] != "mapbox"
+                elif (
                     user_lat is not None and user_lng is not None
                     and c.coords_lat is not None and c.coords_lng is not None
                 ):
@@ -1408,7 +1480,9 @@ async def _query_distribution_centers(
                     entry["distance_km"] = round(dist, 1)
                 results.append(entry)
 
-            if user_lat is not None:
+            if travel is not None:
+                results.sort(key=lambda r: r.get("travel_minutes", float("inf")))
+            elif user_lat is not None:
                 results.sort(key=lambda r: r.get("distance_km", 9999))
             else:
                 results.sort(key=lambda r: r["name"] or "")
@@ -1417,7 +1491,8 @@ async def _query_distribution_centers(
             if results:
                 parts = [
                     f"{i}. **{r['name']}** — {r.get('address', 'N/A')}"
-                    + (f" ({r['distance_km']} km away)" if 'distance_km' in r else "")
+                    + (f" (~{r['travel_minutes']} min drive)" if 'travel_minutes' in r
+                       else f" ({r['distance_km']} km away)" if 'distance_km' in r else "")
                     for i, r in enumerate(results, 1)
                 ]
                 summary = f"Found {len(results)} distribution center(s):\n" + "\n".join(parts)
@@ -1815,6 +1890,55 @@ async def _get_donor_expiring_listings(user_id: str, hours_ahead: int = 48) -> d
     return await _run(_sync)
 
 
+def _plan_stops(origin: tuple, stops: list[dict], capacity_kg: Optional[float]) -> dict:
+    """Order stop dicts with backend.route_planner.
+
+    Each stop needs ``lat``/``lng`` and may carry ``_deadline`` (datetime)
+    and ``_weight_kg``; those private keys are removed. Returns ``ordered``
+    (with ``leg_km``, ``eta`` and ``late``), ``deferred`` (over capacity),
+    the ``plan``, and the ``route_stops`` / ``start`` it was solved with so
+    another order can be judged the same way.
+    """
+    from backend.route_planner import RouteStop, plan_route
+
+    route_stops = [
+        RouteStop(i, float(s["lat"]), float(s["lng"]), s.pop("_deadline", None), s.pop("_weight_kg", None))
+        for i, s in enumerate(stops)
+    ]
+    start = datetime.utcnow()
+    plan = plan_route(origin, route_stops, capacity_kg=capacity_kg, start=start)
+    return {
+        "ordered": _annotate_stops(stops, plan),
+        "deferred": [stops[i] for i in plan.deferred],
+        "plan": plan,
+        "route_stops": route_stops,
+        "start": start,
+    }
+
+
+def _annotate_stops(stops: list[dict], plan) -> list[dict]:
+    """``stops`` in ``plan.order`` with ``leg_km`` / ``eta`` / ``late`` set."""
+    late = set(plan.late)
+    ordered = []
+    for i, leg, eta in zip(plan.order, plan.legs_km, plan.arrivals):
+        stop = stops[i]
+        stop["leg_km"] = leg
+        stop["eta"] = eta.isoformat()
+        stop["late"] = i in late
+        ordered.append(stop)
+    return ordered
+
+
+def _route_notes(ordered: list[dict], deferred: list[dict]) -> str:
+    notes = []
+    late = sum(1 for s in ordered if s.get("late"))
+    if late:
+        notes.append(f"{late} stop(s) can't be reached before their pickup deadline.")
+    if deferred:
+        notes.append(f"{len(deferred)} stop(s) don't fit the vehicle and need a second trip.")
+    return ("\n" + " ".join(notes)) if notes else ""
+
+
 async def _get_driver_route_plan(user_id: str, max_stops: int = 8) -> dict:
     """Volunteer/Driver: route plan across claimed pickups for today."""
     from backend.app import SessionLocal
@@ -1852,28 +1976,30 @@ async def _get_driver_route_plan(user_id: str, max_stops: int = 8) -> dict:
                     "lng": r.coords_lng,
                     "pickup_by": r.pickup_window_end.isoformat() if r.pickup_window_end else None,
                     "distance_km_from_start": round(dist, 2) if dist is not None else None,
+                    "_deadline": r.pickup_window_end,
+                    "_weight_kg": r.est_weight_kg,
                 })
-            # Simple nearest-neighbour ordering from user's current location
+            # Deadline- and capacity-aware order from the user's location
+            deferred: list[dict] = []
             if user.coords_lat is not None and user.coords_lng is not None and stops:
-                ordered: list[dict] = []
-                remaining = list(stops)
-                cur_lat, cur_lng = user.coords_lat, user.coords_lng
-                while remaining and len(ordered) < max_stops:
-                    remaining.sort(key=lambda s: _haversine(
-                        cur_lat, cur_lng, float(s["lat"]), float(s["lng"])))
-                    nxt = remaining.pop(0)
-                    ordered.append(nxt)
-                    cur_lat, cur_lng = float(nxt["lat"]), float(nxt["lng"])
-                stops = ordered
+                planned = _plan_stops(
+                    (float(user.coords_lat), float(user.coords_lng)), stops, user.vehicle_capacity_kg,
+                )
+                deferred = planned["deferred"]
+                stops = planned["ordered"][:max_stops]
             else:
+                for s in stops:
+                    s.pop("_deadline", None)
+                    s.pop("_weight_kg", None)
                 stops = stops[:max_stops]
 
             if stops:
                 parts = [f"{i+1}. {s['title']} — {s['address']}" for i, s in enumerate(stops)]
                 summary = f"Optimized route with {len(stops)} stop(s):\n" + "\n".join(parts)
+                summary += _route_notes(stops, deferred)
             else:
                 summary = "No active pickups assigned to you right now."
-            return {"count": len(stops), "stops": stops, "summary": summary}
+            return {"count": len(stops), "stops": stops, "deferred": deferred, "summary": summary}
         finally:
             db.close()
 
@@ -1947,9 +2073,19 @@ async def _get_dispatch_queue(user_id: str, max_items: int = 20) -> dict:
             } for l in unclaimed_listings]
             summary = (f"Dispatch queue: {len(reqs)} open request(s) and "
                        f"{len(lst)} unclaimed listing(s) need attention.")
+            # Server-side matching, shared with /api/dispatch/matches.
+            suggested: list[dict] = []
+            try:
+                from backend.dispatch_matching import dispatch_matcher
+                suggested = dispatch_matcher.matches(SessionLocal)["matches"][:max_items]
+            except Exception as e:
+                logger.warning("dispatch matching failed: %s", e)
+            if suggested:
+                summary += f" {len(suggested)} suggested match(es) are ready."
             return {
                 "open_requests": reqs,
                 "unclaimed_listings": lst,
+                "suggested_matches": suggested,
                 "summary": summary,
             }
         finally:
@@ -2142,16 +2278,15 @@ async def _search_food_by_location(
                     q = q.filter(FoodResource.category == cat)
                 except ValueError:
                     pass
-            rows = q.order_by(FoodResource.created_at.desc()).limit(500).all()
+            rows = (
+                q.filter(radius_filter(FoodResource, lat, lng, radius_km))
+                .limit(_GEO_CANDIDATE_LIMIT)
+                .all()
+            )
 
             candidates = []
             now = _utcnow()
-            for r in rows:
-                if r.coords_lat is None or r.coords_lng is None:
-                    continue
-                dist = _haversine(lat, lng, float(r.coords_lat), float(r.coords_lng))
-                if dist > radius_km:
-                    continue
+            for r, dist in within_radius(rows, lat, lng, radius_km):
                 # urgency: combine stored urgency_score with a time-to-expire bonus
                 stored = float(r.urgency_score or 0)  # 0..100
                 deadline = r.pickup_window_end or r.expiration_date
@@ -2275,8 +2410,15 @@ async def _optimize_pickup_route(
                     "lat": float(r.coords_lat),
                     "lng": float(r.coords_lng),
                     "pickup_by": r.pickup_window_end.isoformat() if r.pickup_window_end else None,
+                    "_deadline": r.pickup_window_end,
+                    "_weight_kg": r.est_weight_kg,
                 })
-            return {"origin": (float(o_lat), float(o_lng)), "stops": stops, "profile": profile}
+            return {
+                "origin": (float(o_lat), float(o_lng)),
+                "stops": stops,
+                "profile": profile,
+                "capacity_kg": user.vehicle_capacity_kg if user else None,
+            }
         finally:
             db.close()
 
@@ -2290,58 +2432,58 @@ async def _optimize_pickup_route(
     if not stops:
         return {"count": 0, "stops": [], "summary": "No eligible pickups to route."}
 
-    # Nearest-neighbour order from origin
-    ordered: list[dict] = []
-    remaining = list(stops)
-    cur_lat, cur_lng = origin_tuple
-    total_km = 0.0
-    while remaining:
-        remaining.sort(key=lambda s: _haversine(cur_lat, cur_lng, s["lat"], s["lng"]))
-        nxt = remaining.pop(0)
-        leg = _haversine(cur_lat, cur_lng, nxt["lat"], nxt["lng"])
-        nxt["leg_km"] = round(leg, 2)
-        total_km += leg
-        ordered.append(nxt)
-        cur_lat, cur_lng = nxt["lat"], nxt["lng"]
-
-    # Optional: hit Mapbox Optimization for a better order (up to 12 waypoints).
+    # Deadline- and capacity-aware order, solved locally (no network).
+    planned = await _run(lambda: _plan_stops(origin_tuple, stops, prep["capacity_kg"]))
+    ordered = planned["ordered"]
+    deferred = planned["deferred"]
+    plan = planned["plan"]
+    total_km = plan.total_km
+
+    # Optional: hit Mapbox Optimization for a road-aware order (up to 12
+    # waypoints). It knows nothing about deadlines, so its order is only
+    # kept when it makes no more stops late than the local one.
     mapbox_order: Optional[list[int]] = None
-    if MAPBOX_TOKEN and len(ordered) <= 11:
+    if MAPBOX_TOKEN and 1 < len(ordered) <= 11:
         try:
-            coords = f"{origin_tuple[1]},{origin_tuple[0]};" + ";".join(
-                f"{s['lng']},{s['lat']}" for s in ordered
-            )
-            url = f"https://api.mapbox.com/optimized-trips/v1/mapbox/{profile}/{coords}"
-            async with httpx.AsyncClient(timeout=20) as client:
-                resp = await client.get(url, params={
-                    "access_token": MAPBOX_TOKEN,
-                    "source": "first",
-                    "roundtrip": "false",
-                    "overview": "simplified",
-                })
+            trip_key = route_key(profile, [origin_tuple] + [(s["lat"], s["lng"]) for s in ordered], "trip")
+            candidate_order = route_cache.get(trip_key)
+            if candidate_order is None:
+                coords = f"{origin_tuple[1]},{origin_tuple[0]};" + ";".join(
+                    f"{s['lng']},{s['lat']}" for s in ordered
+                )
+                url = f"https://api.mapbox.com/optimized-trips/v1/mapbox/{profile}/{coords}"
+                async with httpx.AsyncClient(timeout=20) as client:
+                    resp = await client.get(url, params={
+                        "access_token": MAPBOX_TOKEN,
+                        "source": "first",
+                        "roundtrip": "false",
+                        "overview": "simplified",
+                    })
                 if resp.status_code == 200:
                     data = resp.json()
                     trips = data.get("trips") or []
                     waypoints = data.get("waypoints") or []
                     if trips and waypoints:
                         # waypoints[0] is the origin; 1..N map back to the input stops.
-                        mapbox_order = [wp.get("waypoint_index") for wp in waypoints[1:]]
-                        # Re-order using Mapbox's optimised sequence
-                        pairs = sorted(
-                            enumerate(ordered),
-                            key=lambda iv: mapbox_order.index(iv[0]) if iv[0] in mapbox_order else iv[0],
-                        )
-                        ordered = [p[1] for p in pairs]
-                        # Recompute cumulative leg distances
-                        cur_lat, cur_lng = origin_tuple
-                        total_km = 0.0
-                        for s in ordered:
-                            leg = _haversine(cur_lat, cur_lng, s["lat"], s["lng"])
-                            s["leg_km"] = round(leg, 2)
-                            total_km += leg
-                            cur_lat, cur_lng = s["lat"], s["lng"]
+                        candidate_order = [wp.get("waypoint_index") for wp in waypoints[1:]]
+                        route_cache.put(trip_key, candidate_order)
+            if candidate_order:
+                # candidate_order indexes ``ordered``; map it back to input stops.
+                ranked = sorted(
+                    range(len(ordered)),
+                    key=lambda k: candidate_order.index(k) if k in candidate_order else k,
+                )
+                order = [plan.order[k] for k in ranked]
+                route_stops, start = planned["route_stops"], planned["start"]
+                _, local_late, _ = evaluate_order(origin_tuple, route_stops, plan.order, start=start)
+                _, mapbox_late, _ = evaluate_order(origin_tuple, route_stops, order, start=start)
+                if mapbox_late <= local_late:
+                    mapbox_plan = describe_order(origin_tuple, route_stops, order, start=start)
+                    mapbox_order = candidate_order
+                    ordered = _annotate_stops(stops, mapbox_plan)
+                    total_km = mapbox_plan.total_km
         except Exception as exc:  # pragma: no cover
-            logger.warning("Mapbox Optimization failed, using nearest-neighbour: %s", exc)
+            logger.warning("Mapbox Optimization failed, using local solver: %s", exc)
 
     summary_lines = [
         f"{i+1}. {s['title'] or 'stop'} — {s['leg_km']} km leg, pickup by {s.get('pickup_by') or 'no deadline'}"
@@ -2349,6 +2491,7 @@ async def _optimize_pickup_route(
     ]
     summary = (f"Optimized route: {len(ordered)} stop(s), ~{round(total_km, 1)} km total "
                f"(profile={profile}).\n" + "\n".join(summary_lines))
+    summary += _route_notes(ordered, deferred)
 
     return {
         "count": len(ordered),
@@ -2356,6 +2499,9 @@ async def _optimize_pickup_route(
         "profile": profile,
         "total_km": round(total_km, 2),
         "stops": ordered,
+        "deferred": deferred,
+        "load_kg": plan.load_kg,
+        "capacity_kg": prep["capacity_kg"],
         "mapbox_optimized": mapbox_order is not None,
         "frontend_hint": {
             "component": "RouteOptimizer",
@@ -2560,9 +2706,11 @@ def _parse_iso(value) -> Optional[datetime]:
 
 async def _claim_listing(user_id: str, listing_id: int) -> dict:
     """Initiate a listing claim (SMS confirmation flow is handled elsewhere)."""
-    from backend.app import SessionLocal, pending_confirmations, send_sms, generate_reset_code, auto_release_claim
+    from backend.app import (
+        SessionLocal, claim_confirmations, claim_release_scheduler, send_sms, generate_reset_code,
+    )
+    from backend.claim_confirmations import CONFIRMATION_TTL
     from backend.models import User, FoodResource
-    from threading import Timer
 
     uid = _to_int(user_id)
     if uid is None:
@@ -2652,11 +2800,8 @@ async def _claim_listing(user_id: str, listing_id: int) -> dict:
             db.commit()
             item = db.query(FoodResource).filter(FoodResource.id == lid).first()
             code = generate_reset_code(4)
-            pending_confirmations[item.id] = {
-                "code": code,
-                "recipient_id": uid,
-                "expires_at": now + timedelta(minutes=5),
-            }
+            expires_at = now + CONFIRMATION_TTL
+            claim_confirmations.put(item.id, code, uid, expires_at)
 
             sms_ok = False
             try:
@@ -2673,9 +2818,7 @@ async def _claim_listing(user_id: str, listing_id: int) -> dict:
                 logger.warning("claim SMS delivery failed: %s", exc)
 
             try:
-                t = Timer(300.0, auto_release_claim, args=[item.id])
-                t.daemon = True  # do not block interpreter shutdown
-                t.start()
+                claim_release_scheduler.schedule(item.id, expires_at)
             except Exception:
                 pass
 
@@ -2731,7 +2874,7 @@ async def _confirm_claim(user_id: str, listing_id: int = None, code: str = "") -
     recent pending confirmation by code. This lets the user simply reply
     "1234" without remembering the listing id.
     """
-    from backend.app import SessionLocal, pending_confirmations, send_sms
+    from backend.app import SessionLocal, claim_confirmations, send_sms
     from backend.models import FoodResource, User
 
     uid = _to_int(user_id)
@@ -2741,13 +2884,10 @@ async def _confirm_claim(user_id: str, listing_id: int = None, code: str = "") -
     if not code_clean:
         return {"error": "Confirmation code required"}
 
-    # Resolve listing_id from the in-memory pending map when not provided.
+    # Resolve listing_id from the pending confirmations when not provided.
     lid = _to_int(listing_id) if listing_id is not None else None
     if lid is None:
-        candidates = [
-            (k, v) for k, v in pending_confirmations.items()
-            if v.get("recipient_id") == uid and v.get("code") == code_clean
-        ]
+        candidates = await _run(lambda: claim_confirmations.find(uid, code_clean))
         if not candidates:
             return {
                 "error": (
@@ -2756,7 +2896,7 @@ async def _confirm_claim(user_id: str, listing_id: int = None, code: str = "") -
                 )
             }
         # Pick the most recent (largest id wins as a proxy for newest).
-        lid = max(c[0] for c in candidates)
+        lid = max(candidates)
 
     # Snapshot the resolved listing id for the inner sync closure.
     resolved_lid = lid
@@ -2765,7 +2905,7 @@ async def _confirm_claim(user_id: str, listing_id: int = None, code: str = "") -
         db = SessionLocal()
         try:
             lid = int(resolved_lid)
-            confirmation = pending_confirmations.get(lid)
+            confirmation = claim_confirmations.get(lid)
             if not confirmation:
                 # Maybe already confirmed or auto-released.
                 item = db.query(FoodResource).filter(FoodResource.id == lid).first()
@@ -2784,7 +2924,6 @@ async def _confirm_claim(user_id: str, listing_id: int = None, code: str = "") -
                 return {"error": "Invalid confirmation code"}
             expires_at = confirmation.get("expires_at")
             if expires_at is None or _utcnow() > expires_at:
-                pending_confirmations.pop(lid, None)
                 return {"error": "Confirmation code expired. Please claim again."}
 
             item = db.query(FoodResource).filter(FoodResource.id == lid).first()
@@ -2793,8 +2932,8 @@ async def _confirm_claim(user_id: str, listing_id: int = None, code: str = "") -
 
             # Atomic flip: only succeed if the listing is still
             # pending_confirmation for THIS recipient. Prevents the race
-            # where auto_release_claim's Timer flips status back to
-            # 'available' between our pending_confirmations lookup above
+            # where the auto-release sweep flips status back to
+            # 'available' between our confirmation lookup above
             # and the commit below — which previously could have produced
             # a 'claimed' listing with a null recipient.
             updated = (
@@ -2807,17 +2946,19 @@ async def _confirm_claim(user_id: str, listing_id: int = None, code: str = "") -
                 .update({FoodResource.status: "claimed"}, synchronize_session=False)
             )
             if not updated:
-                pending_confirmations.pop(lid, None)
+                claim_confirmations.pop(lid)
                 db.rollback()
                 return {"error": "Claim is no longer pending — it may have been auto-released. Please claim again."}
+            # Bulk UPDATEs skip the ORM listeners; count the claim in this transaction.
+            listing_claimed(db, lid)
             db.commit()
             db.refresh(item)
-            pending_confirmations.pop(lid, None)
+            claim_confirmations.pop(lid)
 
             # ----------------------------------------------------------
             # Post-write verification: re-query the row and confirm the
             # status flip actually persisted with this user as recipient.
-            # If a parallel auto-release Timer fired between our atomic
+            # If a parallel auto-release sweep ran between our atomic
             # update and the commit, or a different process raced us,
             # we'd otherwise tell the user "claim confirmed" while the
             # row sits at status='available'. The atomic UPDATE above
@@ -2894,7 +3035,7 @@ async def _confirm_claim(user_id: str, listing_id: int = None, code: str = "") -
 
 
 async def _cancel_claim(user_id: str, listing_id: int) -> dict:
-    from backend.app import SessionLocal, pending_confirmations
+    from backend.app import SessionLocal, claim_confirmations
     from backend.models import FoodResource
 
     uid = _to_int(user_id)
@@ -2907,7 +3048,7 @@ async def _cancel_claim(user_id: str, listing_id: int) -> dict:
             lid = int(listing_id)
             # Read the row once for the title / error-classification.
             # The actual release is done as an atomic UPDATE below so a
-            # parallel auto-release Timer or a confirm_claim from another
+            # parallel auto-release sweep or a confirm_claim from another
             # session can't race us into clobbering a freshly-changed row.
             pre = db.query(FoodResource).filter(FoodResource.id == lid).first()
             if not pre:
@@ -2952,10 +3093,13 @@ async def _cancel_claim(user_id: str, listing_id: int) -> dict:
                              "(possibly auto-released or claimed by you elsewhere). "
                              "Refresh and try again.",
                 }
+            if pre_status == "claimed":
+                # Only a confirmed claim was counted in the impact totals.
+                listing_unclaimed(db, pre)
             db.commit()
             # Drop any pending SMS-confirmation code so an old code can't
             # re-confirm the listing after release.
-            pending_confirmations.pop(lid, None)
+            claim_confirmations.pop(lid)
 
             # ----------------------------------------------------------
             # Post-write verification: re-query and confirm the row is
@@ -3741,13 +3885,17 @@ async def _bulk_import_listings(
         from backend.models import User
         uid_int = _to_int(user_id)
         if uid_int is not None:
-            db = SessionLocal()
-            try:
-                u = db.query(User).filter(User.id == uid_int).first()
-                if u and u.address and str(u.address).strip():
-                    profile_address = str(u.address).strip()
-            finally:
-                db.close()
+            def _profile_address() -> Optional[str]:
+                db = SessionLocal()
+                try:
+                    u = db.query(User).filter(User.id == uid_int).first()
+                    if u and u.address and str(u.address).strip():
+                        return str(u.address).strip()
+                    return None
+                finally:
+                    db.close()
+
+            profile_address = await _run(_profile_address)
     except Exception:
         profile_address = None
 
@@ -3997,6 +4145,7 @@ async def _send_user_message(
     """
     from backend.app import SessionLocal
     from backend.models import Message, User, UserRole
+    from backend.realtime import conversation_topics, hub as push_hub
 
     uid = _to_int(user_id)
     if uid is None:
@@ -4035,6 +4184,19 @@ async def _send_user_message(
             db.add(msg)
             db.commit()
             db.refresh(msg)
+            push_hub.publish(conversation_topics(conv) + [f"user:{uid}"], "message", {
+                "conversation_id": conv,
+                "message": {
+                    "id": msg.id,
+                    "sender_id": uid,
+                    "sender_name": u.name,
+                    "conversation_id": conv,
+                    "content": msg.content,
+                    "is_from_admin": msg.is_from_admin,
+                    "is_read": msg.is_read,
+                    "created_at": msg.created_at.isoformat() if msg.created_at else None,
+                },
+            })
             return {
                 "success": True,
                 "message_id": msg.id,
@@ -4196,7 +4358,15 @@ async def _show_route_to_listing(
     steps: list = []
     fallback = True
 
-    if MAPBOX_TOKEN:
+    cache_key = route_key(profile, [(o_lat, o_lng), (d_lat, d_lng)], "full")
+    cached = route_cache.get(cache_key) if MAPBOX_TOKEN else None
+    if cached is not None:
+        geometry = cached["geometry"]
+        distance_m = cached["distance_m"]
+        duration_s = cached["duration_s"]
+        steps = list(cached["steps"])
+        fallback = False
+    elif MAPBOX_TOKEN:
         url = (
             f"{MAPBOX_DIRECTIONS_URL}/{profile}/"
             f"{o_lng},{o_lat};{d_lng},{d_lat}"
@@ -4257,6 +4427,16 @@ async def _show_route_to_listing(
                 )
         except Exception as exc:
             logger.warning("Mapbox Directions failed for listing %s: %s", l_id, exc)
+        if not fallback:
+            route_cache.put(cache_key, {
+                "geometry": geometry,
+                "distance_m": distance_m,
+                "duration_s": duration_s,
+                "steps": list(steps),
+            })
+    if fallback:
+        # Straight line on the map; the summary is marked "(approximate)".
+        distance_m, duration_s = estimate_route(o_lat, o_lng, d_lat, d_lng, profile)
 
     def _fmt_step(step: dict) -> str:
         """One human line, e.g. 'Turn right onto Elm Ave (0.4 mi)'."""
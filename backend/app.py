@@ -1,14 +1,17 @@
-from fastapi import FastAPI, HTTPException, Depends, Request, Response
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi import FastAPI, HTTPException, Depends, File, Request, Response, UploadFile
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import text, func, case, inspect as sa_inspect
-from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session, selectinload, undefer_group
+from sqlalchemy import text, func, case, and_, or_
+from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 from backend.aws_secrets import load_aws_secrets
 from dotenv import load_dotenv
+import asyncio
+import base64
 import hmac
 import jwt
 import json
@@ -32,17 +35,37 @@ from backend.schemas import (
     ResetPasswordRequest,
 )
 from backend.models import (
-    Base, FoodResource, User, UserRole, FoodCategory, PerishabilityLevel,
+    Base, FoodResource, FoodRequest, User, UserRole, FoodCategory, PerishabilityLevel,
     DistributionCenter, CenterInventory, Message, DonationSchedule, 
     DonationReminder, RecurrenceFrequency, ReminderStatus, Feedback,
     FeedbackType, FeedbackStatus, SafetyReport, ReportType,
-    FavoriteLocation, ListingCategory, PageContent, NewsletterSubscription
+    FavoriteLocation, ListingCategory, PageContent, NewsletterSubscription,
+    ConversationSummary, conversation_user_id,
 )
 # Register AI models on the shared Base so create_all() picks them up
 from backend.ai import models as ai_models  # noqa: F401
-from threading import Timer, Lock
 from twilio.rest import Client
 from backend.db import engine, SessionLocal, get_db
+from backend.geocoding import geocoder
+from backend.dispatch_matching import dispatch_matcher, watch_dispatch_changes
+from backend.geo_index import radius_filter, bbox_filter, take_within_radius, backfill_geohashes
+from backend.rate_limits import RateLimiter, retry_minutes
+from backend.input_pipeline import SanitizeInputMiddleware, SanitizedRoute, sanitized_json
+from backend.photo_store import MAX_PHOTO_BYTES, PhotoError, photo_store, store_photo
+from backend.listing_reads import detail_options, summary_options
+from backend.migrations import upgrade as upgrade_schema
+from backend.impact_stats import PublicStatsCache, impact_reconcile_loop, listing_claimed, read_totals, reconcile as reconcile_impact_totals
+from backend.recommendations import (
+    RecommendationCache, RecommendationProfile, backfill_listing_features,
+    listing_features, rank, watch_listing_changes,
+)
+from backend.realtime import (
+    hub as push_hub, stream as push_stream, subscriber_topics, conversation_topics,
+)
+from backend.claim_confirmations import (
+    CONFIRMATION_TTL, InMemoryConfirmationStore, DatabaseConfirmationStore,
+    ClaimExpiryScheduler, release_expired_claims, release_orphaned_claims,
+)
 
 pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
 
@@ -53,6 +76,8 @@ def generate_referral_code():
     return ''.join(secrets.choice(alphabet) for _ in range(8))
 
 app = FastAPI(title="Food Maps Agentic API", version="1.0.0")
+# Routes read JSON bodies from the sanitizer instead of parsing them again.
+app.router.route_class = SanitizedRoute
 load_aws_secrets()
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
@@ -80,6 +105,7 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -149,10 +175,20 @@ UPLOAD_PATH_LIMITS = {
     "/api/ai/voice": 26 * 1024 * 1024,        # handler caps at 25MB
     "/api/ai/upload_image": 9 * 1024 * 1024,  # handler caps at 8MB
 }
+# Same, for upload paths that carry an id.
+UPLOAD_PATH_PATTERNS = [
+    (re.compile(r"^/api/listings/\d+/verification-photo$"), 9 * 1024 * 1024),  # photo_store caps at 8MB
+]
 
 
 def _max_body_bytes_for(path: str) -> int:
-    return UPLOAD_PATH_LIMITS.get(path.rstrip("/"), MAX_API_BODY_BYTES)
+    path = path.rstrip("/")
+    if path in UPLOAD_PATH_LIMITS:
+        return UPLOAD_PATH_LIMITS[path]
+    for pattern, limit in UPLOAD_PATH_PATTERNS:
+        if pattern.match(path):
+            return limit
+    return MAX_API_BODY_BYTES
 
 
 MAX_QUERY_STRING_BYTES = 2048
@@ -220,86 +256,84 @@ def _validate_query_params(request: Request) -> None:
         _sanitize_text(value, max_chars=MAX_QUERY_PARAM_VALUE_CHARS, label="Query parameter value")
 
 
-async def _set_request_body(request: Request, body: bytes) -> None:
-    async def receive() -> dict:
-        return {"type": "http.request", "body": body, "more_body": False}
+# Validate and sanitize user-provided API input before endpoint handlers run.
+# JSON bodies are parsed and sanitized once and handed to handlers through
+# request.state; uploads are size-checked as they stream (input_pipeline.py).
+app.add_middleware(
+    SanitizeInputMiddleware,
+    body_limit=_max_body_bytes_for,
+    validate_query=_validate_query_params,
+    sanitize_json=_sanitize_json_payload,
+)
+
 
-    request._receive = receive
+# -----------------------------
+# Execution model
+# -----------------------------
+# Handlers that touch the database are plain `def` functions. FastAPI runs
+# those (and the sync `get_db` / `verify_admin` dependencies) in its worker
+# threadpool, so a slow query only occupies one thread instead of stalling
+# the event loop and every other in-flight request with it. Keep new
+# DB-bound routes sync; `async def` is for handlers that only await I/O.
+#
+# The one thing a sync handler cannot do is `await request.json()`, so the
+# body is read on the event loop by the `read_request_body` dependency and
+# parsed inside the handler, at the same point the old await sat, so
+# malformed-JSON errors still surface through each handler's own try/except.
+
+class RequestBody:
+    """Raw request body, read asynchronously and parsed on demand.
+
+    JSON bodies arrive already parsed and sanitized by the input middleware;
+    ``json()`` returns that object instead of parsing ``raw`` again.
+    """
 
+    __slots__ = ("raw", "_parsed")
 
-@app.middleware("http")
-async def sanitize_api_input(request: Request, call_next):
-    """Validate and sanitize user-provided API input before endpoint handlers run."""
-    path = request.url.path.lower()
+    _UNPARSED = object()
 
-    if path.startswith("/api"):
-        _validate_query_params(request)
+    def __init__(self, raw: bytes, parsed: Any = _UNPARSED):
+        self.raw = raw
+        self._parsed = parsed
 
-        max_body_bytes = _max_body_bytes_for(path)
+    def json(self) -> Any:
+        """Same contract as Starlette's `Request.json()`."""
+        if self._parsed is RequestBody._UNPARSED:
+            self._parsed = json.loads(self.raw)
+        return self._parsed
 
-        content_length = request.headers.get("content-length")
-        if content_length:
-            try:
-                if int(content_length) > max_body_bytes:
-                    raise HTTPException(status_code=413, detail="Request body is too large")
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid Content-Length header")
-
-        if request.method.upper() in {"POST", "PUT", "PATCH", "DELETE"}:
-            body = await request.body()
-            if len(body) > max_body_bytes:
-                raise HTTPException(status_code=413, detail="Request body is too large")
-
-            if body:
-                content_type = request.headers.get("content-type", "").lower()
-
-                if "application/json" in content_type:
-                    try:
-                        parsed = json.loads(body.decode("utf-8"))
-                    except UnicodeDecodeError:
-                        raise HTTPException(status_code=400, detail="Request body must be valid UTF-8")
-                    except json.JSONDecodeError:
-                        raise HTTPException(status_code=400, detail="Malformed JSON request body")
-
-                    sanitized_payload = _sanitize_json_payload(parsed)
-                    sanitized_body = json.dumps(sanitized_payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
-                    await _set_request_body(request, sanitized_body)
-                elif "application/x-www-form-urlencoded" in content_type:
-                    try:
-                        body.decode("utf-8")
-                    except UnicodeDecodeError:
-                        raise HTTPException(status_code=400, detail="Request body must be valid UTF-8")
-                    # We consumed the body via request.body(); put it back so
-                    # downstream form parsers can read it.
-                    await _set_request_body(request, body)
-                else:
-                    # multipart/form-data, application/octet-stream, etc.
-                    # We've already consumed the body; re-inject it so the
-                    # endpoint's UploadFile / Form parsers can read it.
-                    await _set_request_body(request, body)
 
-    return await call_next(request)
+async def read_request_body(request: Request) -> RequestBody:
+    return RequestBody(await request.body(), sanitized_json(request, RequestBody._UNPARSED))
 
 
-# Login rate limiting: max 5 attempts per 10-minute window.
+# Auth rate limits (sliding window, see backend/rate_limits.py).
+# Login: max 5 attempts per 10-minute window.
 LOGIN_RATE_LIMIT_MAX_ATTEMPTS = 5
 LOGIN_RATE_LIMIT_WINDOW = timedelta(minutes=10)
-login_attempts_by_key: Dict[str, List[datetime]] = {}
-login_attempts_lock = Lock()
+login_rate_limiter = RateLimiter(
+    "login", LOGIN_RATE_LIMIT_MAX_ATTEMPTS, LOGIN_RATE_LIMIT_WINDOW.total_seconds()
+)
 
-# Signup rate limiting: max 3 attempts per 30-minute window.
+# Signup: max 3 attempts per 30-minute window.
 SIGNUP_RATE_LIMIT_MAX_ATTEMPTS = 3
 SIGNUP_RATE_LIMIT_WINDOW = timedelta(minutes=30)
-signup_attempts_by_ip: Dict[str, List[datetime]] = {}
-signup_attempts_lock = Lock()
+signup_rate_limiter = RateLimiter(
+    "signup", SIGNUP_RATE_LIMIT_MAX_ATTEMPTS, SIGNUP_RATE_LIMIT_WINDOW.total_seconds()
+)
 
-# Password reset flow rate limiting.
+# Password reset flow.
 FORGOT_PASSWORD_RATE_LIMIT_MAX_ATTEMPTS = 5
 RESET_PASSWORD_RATE_LIMIT_MAX_ATTEMPTS = 5
 PASSWORD_RESET_RATE_LIMIT_WINDOW = timedelta(minutes=30)
-forgot_password_attempts_by_key: Dict[str, List[datetime]] = {}
-reset_password_attempts_by_key: Dict[str, List[datetime]] = {}
-password_reset_attempts_lock = Lock()
+forgot_password_rate_limiter = RateLimiter(
+    "forgot_password", FORGOT_PASSWORD_RATE_LIMIT_MAX_ATTEMPTS,
+    PASSWORD_RESET_RATE_LIMIT_WINDOW.total_seconds(),
+)
+reset_password_rate_limiter = RateLimiter(
+    "reset_password", RESET_PASSWORD_RATE_LIMIT_MAX_ATTEMPTS,
+    PASSWORD_RESET_RATE_LIMIT_WINDOW.total_seconds(),
+)
 
 
 def _client_ip(request: Request) -> str:
@@ -322,52 +356,28 @@ def _login_rate_limit_key(request: Request, email: Optional[str]) -> str:
 
 def enforce_login_rate_limit(request: Request, email: Optional[str]) -> None:
     """Allow up to LOGIN_RATE_LIMIT_MAX_ATTEMPTS login attempts in LOGIN_RATE_LIMIT_WINDOW."""
-    now = datetime.utcnow()
-    cutoff = now - LOGIN_RATE_LIMIT_WINDOW
-    key = _login_rate_limit_key(request, email)
-
-    with login_attempts_lock:
-        attempts = [ts for ts in login_attempts_by_key.get(key, []) if ts > cutoff]
-
-        if len(attempts) >= LOGIN_RATE_LIMIT_MAX_ATTEMPTS:
-            retry_after_seconds = int((attempts[0] + LOGIN_RATE_LIMIT_WINDOW - now).total_seconds())
-            if retry_after_seconds < 1:
-                retry_after_seconds = 1
-            raise HTTPException(
-                status_code=429,
-                detail=(
-                    "Too many login attempts. "
-                    f"Please try again in about {retry_after_seconds // 60 + (1 if retry_after_seconds % 60 else 0)} minute(s)."
-                )
+    allowed, retry_after = login_rate_limiter.hit(_login_rate_limit_key(request, email))
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=(
+                "Too many login attempts. "
+                f"Please try again in about {retry_minutes(retry_after)} minute(s)."
             )
-
-        attempts.append(now)
-        login_attempts_by_key[key] = attempts
+        )
 
 
 def enforce_signup_rate_limit(request: Request) -> None:
     """Allow up to SIGNUP_RATE_LIMIT_MAX_ATTEMPTS signup attempts in SIGNUP_RATE_LIMIT_WINDOW."""
-    now = datetime.utcnow()
-    cutoff = now - SIGNUP_RATE_LIMIT_WINDOW
-    ip = _client_ip(request)
-
-    with signup_attempts_lock:
-        attempts = [ts for ts in signup_attempts_by_ip.get(ip, []) if ts > cutoff]
-
-        if len(attempts) >= SIGNUP_RATE_LIMIT_MAX_ATTEMPTS:
-            retry_after_seconds = int((attempts[0] + SIGNUP_RATE_LIMIT_WINDOW - now).total_seconds())
-            if retry_after_seconds < 1:
-                retry_after_seconds = 1
-            raise HTTPException(
-                status_code=429,
-                detail=(
-                    "Too many signup attempts. "
-                    f"Please try again in about {retry_after_seconds // 60 + (1 if retry_after_seconds % 60 else 0)} minute(s)."
-                )
+    allowed, retry_after = signup_rate_limiter.hit(_client_ip(request))
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=(
+                "Too many signup attempts. "
+                f"Please try again in about {retry_minutes(retry_after)} minute(s)."
             )
-
-        attempts.append(now)
-        signup_attempts_by_ip[ip] = attempts
+        )
 
 
 def _ip_email_key(request: Request, email: Optional[str]) -> str:
@@ -377,36 +387,25 @@ def _ip_email_key(request: Request, email: Optional[str]) -> str:
 
 
 def _enforce_attempt_rate_limit(
-    attempts_store: Dict[str, List[datetime]],
-    max_attempts: int,
+    limiter: RateLimiter,
     request: Request,
     email: Optional[str],
     action_label: str,
 ) -> None:
-    now = datetime.utcnow()
-    cutoff = now - PASSWORD_RESET_RATE_LIMIT_WINDOW
-    key = _ip_email_key(request, email)
-
-    with password_reset_attempts_lock:
-        attempts = [ts for ts in attempts_store.get(key, []) if ts > cutoff]
-        if len(attempts) >= max_attempts:
-            retry_after_seconds = int((attempts[0] + PASSWORD_RESET_RATE_LIMIT_WINDOW - now).total_seconds())
-            if retry_after_seconds < 1:
-                retry_after_seconds = 1
-            retry_minutes = retry_after_seconds // 60 + (1 if retry_after_seconds % 60 else 0)
-            raise HTTPException(
-                status_code=429,
-                detail=f"Too many {action_label} attempts. Please try again in about {retry_minutes} minute(s).",
-            )
-
-        attempts.append(now)
-        attempts_store[key] = attempts
+    allowed, retry_after = limiter.hit(_ip_email_key(request, email))
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=(
+                f"Too many {action_label} attempts. "
+                f"Please try again in about {retry_minutes(retry_after)} minute(s)."
+            ),
+        )
 
 
 def enforce_forgot_password_rate_limit(request: Request, email: Optional[str]) -> None:
     _enforce_attempt_rate_limit(
-        forgot_password_attempts_by_key,
-        FORGOT_PASSWORD_RATE_LIMIT_MAX_ATTEMPTS,
+        forgot_password_rate_limiter,
         request,
         email,
         "password reset request",
@@ -415,8 +414,7 @@ def enforce_forgot_password_rate_limit(request: Request, email: Optional[str]) -
 
 def enforce_reset_password_rate_limit(request: Request, email: Optional[str]) -> None:
     _enforce_attempt_rate_limit(
-        reset_password_attempts_by_key,
-        RESET_PASSWORD_RATE_LIMIT_MAX_ATTEMPTS,
+        reset_password_rate_limiter,
         request,
         email,
         "password reset",
@@ -660,7 +658,7 @@ def _normalize_page_content_payload(raw: Any) -> Dict[str, str]:
 
 
 @app.get("/api/pages/{page_id}/content")
-async def get_page_content(page_id: str, db: Session = Depends(get_db)):
+def get_page_content(page_id: str, db: Session = Depends(get_db)):
     """Public read of saved editable fields for a marketing/content page."""
     if page_id not in ALLOWED_PAGE_IDS:
         raise HTTPException(status_code=404, detail="Unknown page")
@@ -681,16 +679,17 @@ async def get_page_content(page_id: str, db: Session = Depends(get_db)):
 
 
 @app.put("/api/pages/{page_id}/content")
-async def put_page_content(
+def put_page_content(
     page_id: str,
     request: Request,
+    request_body: RequestBody = Depends(read_request_body),
     admin_user: User = Depends(verify_admin),
     db: Session = Depends(get_db),
 ):
     """Admin-only upsert of editable page fields. Merges into existing content."""
     if page_id not in ALLOWED_PAGE_IDS:
         raise HTTPException(status_code=404, detail="Unknown page")
-    body = await request.json()
+    body = request_body.json()
     incoming = _normalize_page_content_payload(body.get("content", body))
 
     row = db.query(PageContent).filter(PageContent.page_id == page_id).first()
@@ -738,7 +737,7 @@ async def put_page_content(
 # -----------------------------
 
 @app.get("/api/user/me")
-async def get_me(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def get_me(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id = int(payload.get("sub")) if payload and payload.get("sub") is not None else None
@@ -771,7 +770,7 @@ async def get_me(credentials: HTTPAuthorizationCredentials = Depends(security),
 
 @app.get("/api/user/profile")
 @app.get("/user/profile")
-async def get_user_profile(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def get_user_profile(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Backward-compatible profile read endpoint used by frontend and some deployments.
 
     Includes both /api/user/profile and /user/profile to tolerate proxies that strip /api.
@@ -808,13 +807,13 @@ async def get_user_profile(credentials: HTTPAuthorizationCredentials = Depends(s
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/user/phone")
-async def update_phone(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def update_phone(request: Request, request_body: RequestBody = Depends(read_request_body), credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id = int(payload.get("sub")) if payload and payload.get("sub") is not None else None
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        body = await request.json()
+        body = request_body.json()
         phone = (body or {}).get("phone") if isinstance(body, dict) else None
         if not phone or not isinstance(phone, str) or len(phone.strip()) < 7:
             raise HTTPException(status_code=422, detail="Please provide a valid phone number")
@@ -832,14 +831,14 @@ async def update_phone(request: Request, credentials: HTTPAuthorizationCredentia
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/user/profile")
-async def update_profile(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def update_profile(request: Request, request_body: RequestBody = Depends(read_request_body), credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id = int(payload.get("sub")) if payload and payload.get("sub") is not None else None
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        body = await request.json()
+        body = request_body.json()
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
@@ -894,14 +893,14 @@ async def update_profile(request: Request, credentials: HTTPAuthorizationCredent
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/user/change-password")
-async def change_password(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def change_password(request: Request, request_body: RequestBody = Depends(read_request_body), credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id = int(payload.get("sub")) if payload and payload.get("sub") is not None else None
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        body = await request.json()
+        body = request_body.json()
         current_password = body.get('current_password')
         new_password = body.get('new_password')
         
@@ -927,10 +926,10 @@ async def change_password(request: Request, credentials: HTTPAuthorizationCreden
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/admin/make-admin")
-async def make_user_admin(request: Request, db: Session = Depends(get_db)):
+def make_user_admin(request: Request, request_body: RequestBody = Depends(read_request_body), db: Session = Depends(get_db)):
     """Make a user an admin by email - temporary endpoint for setup"""
     try:
-        body = await request.json()
+        body = request_body.json()
         email = body.get('email')
         secret = body.get('secret')
 
@@ -970,89 +969,54 @@ async def make_user_admin(request: Request, db: Session = Depends(get_db)):
 from backend.ai.routes import router as ai_router, start_background_jobs as ai_start_jobs, stop_background_jobs as ai_stop_jobs
 app.include_router(ai_router)
 
-def _add_missing_model_columns(*models):
-    """Add columns a model declares but its existing table is missing.
-
-    `create_all()` creates absent tables but never alters ones that already
-    exist, so a database predating a column needs it patched in. Column types
-    are compiled for the connected dialect rather than hardcoded, since dev
-    runs Postgres and production runs MySQL.
-
-    Each statement gets its own transaction. Postgres aborts an entire
-    transaction after any failed statement, so sharing one connection means a
-    single rejected ALTER silently discards every migration behind it.
-    """
-    inspector = sa_inspect(engine)
-    for model in models:
-        table = model.__table__
-        if not inspector.has_table(table.name):
-            continue  # create_all() just built it, columns included
-        present = {col["name"] for col in inspector.get_columns(table.name)}
-        for column in table.columns:
-            if column.name in present:
-                continue
-            if not column.nullable:
-                # Adding NOT NULL to a populated table needs a default or a
-                # backfill; that is a decision, not something to guess at.
-                print(
-                    f"⚠️  Schema drift: {table.name}.{column.name} is missing and "
-                    "NOT NULL - add it manually with a backfill"
-                )
-                continue
-            col_type = column.type.compile(dialect=engine.dialect)
-            try:
-                with engine.begin() as conn:
-                    conn.execute(text(
-                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type} NULL"
-                    ))
-                print(f"✅ Schema: added {table.name}.{column.name}")
-            except Exception as exc:
-                print(f"⚠️  Schema: could not add {table.name}.{column.name}: {exc}")
-
-
 @app.on_event("startup")
 async def startup_event():
     # Ensure tables exist
     Base.metadata.create_all(bind=engine)
-    # Recover any listings stuck in 'pending_confirmation' from a previous
-    # process. The confirmation code lives only in the in-memory
-    # pending_confirmations dict, which is wiped on restart, so those
-    # listings would otherwise be unclaimable AND unreleasable until the
-    # donor manually deletes them. Reset them so other recipients can claim.
+    # Release claims whose confirmation window ran out while no process was
+    # running, then hand expiry over to the scheduler thread.
     try:
-        recovery_db = SessionLocal()
-        try:
-            recovered = (
-                recovery_db.query(FoodResource)
-                .filter(FoodResource.status == "pending_confirmation")
-                .update(
-                    {
-                        FoodResource.status: "available",
-                        FoodResource.recipient_id: None,
-                        FoodResource.claimed_at: None,
-                    },
-                    synchronize_session=False,
-                )
-            )
-            recovery_db.commit()
-            if recovered:
-                print(f"\u23f0 Released {recovered} stale 'pending_confirmation' listings on startup")
-        finally:
-            recovery_db.close()
+        sweep_expired_claims()
     except Exception as _recover_exc:
         print(f"Stale-claim recovery skipped: {_recover_exc}")
+    claim_release_scheduler.start()
+    # Sync handlers geocode on this loop so they share its cache and client.
+    geocoder.attach(asyncio.get_running_loop())
     # Start AI background reminder loop
     try:
         await ai_start_jobs()
     except Exception as _ai_exc:
         print(f"AI background jobs failed to start: {_ai_exc}")
-    # Patch columns onto tables that predate them. create_all() above creates
-    # any missing table for the connected dialect, so the raw MySQL CREATE
-    # TABLE statements that used to live here were redundant - and on Postgres
-    # they never did anything but raise a syntax error on AUTO_INCREMENT.
-    _add_missing_model_columns(
-        FoodResource, DistributionCenter, FavoriteLocation, ListingCategory
-    )
+    # Columns, indexes and backfills for tables that predate the models;
+    # each numbered migration runs once (backend/migrations.py).
+    upgrade_schema(engine)
+    # Rows that predate the geohash column are invisible to radius search
+    # until hashed; batch-fill them (a no-op once the table is caught up).
+    try:
+        hashed = backfill_geohashes(SessionLocal, FoodResource)
+        if hashed:
+            print(f"✅ Geo index: hashed {hashed} existing listings")
+    except Exception as _geo_exc:
+        print(f"Geo index backfill skipped: {_geo_exc}")
+    # Same for the recommendation feature bitmask.
+    try:
+        featured = backfill_listing_features(SessionLocal, FoodResource)
+        if featured:
+            print(f"✅ Recommendations: indexed {featured} existing listings")
+    except Exception as _feat_exc:
+        print(f"Recommendation feature backfill skipped: {_feat_exc}")
+    # Conversations from before conversation_summaries existed would be
+    # missing from the inbox until their next message; summarize them once.
+    try:
+        summarized = _backfill_conversation_summaries()
+        if summarized:
+            print(f"✅ Messaging: summarized {summarized} existing conversations")
+    except Exception as _conv_exc:
+        print(f"Conversation summary backfill skipped: {_conv_exc}")
+    # Impact totals: rebuilt now (the first pass of the loop) and on a
+    # schedule after that, to repair any drift in the incremental counters.
+    global _impact_reconcile_task
+    _impact_reconcile_task = asyncio.create_task(impact_reconcile_loop(SessionLocal))
 
     # Seed reference data
     try:
@@ -1150,7 +1114,7 @@ async def startup_event():
             pass
 
 @app.get("/api/dbtest")
-async def db_test():
+def db_test():
     db = SessionLocal()
     try:
         # Try a simple query (works for any SQLAlchemy model, e.g., User)
@@ -1208,7 +1172,7 @@ def _ensure_listing_categories(db: Session) -> None:
 
 
 @app.get("/api/categories")
-async def get_listing_categories(db: Session = Depends(get_db)):
+def get_listing_categories(db: Session = Depends(get_db)):
     """Public: active listing categories for the main-page left sidebar filters."""
     try:
         _ensure_listing_categories(db)
@@ -1229,7 +1193,7 @@ async def get_listing_categories(db: Session = Depends(get_db)):
 
 
 @app.get("/api/admin/categories")
-async def admin_get_listing_categories(admin_user: User = Depends(verify_admin), db: Session = Depends(get_db)):
+def admin_get_listing_categories(admin_user: User = Depends(verify_admin), db: Session = Depends(get_db)):
     """Admin: all listing categories including inactive."""
     try:
         _ensure_listing_categories(db)
@@ -1244,9 +1208,10 @@ async def admin_get_listing_categories(admin_user: User = Depends(verify_admin),
 
 
 @app.put("/api/admin/categories/{category_id}")
-async def admin_update_listing_category(
+def admin_update_listing_category(
     category_id: int,
     request: Request,
+    request_body: RequestBody = Depends(read_request_body),
     admin_user: User = Depends(verify_admin),
     db: Session = Depends(get_db),
 ):
@@ -1255,7 +1220,7 @@ async def admin_update_listing_category(
         row = db.query(ListingCategory).filter(ListingCategory.id == category_id).first()
         if not row:
             raise HTTPException(status_code=404, detail="Category not found")
-        body = await request.json()
+        body = request_body.json()
         if "label" in body:
             label = str(body.get("label") or "").strip()
             if not label:
@@ -1282,14 +1247,15 @@ async def admin_update_listing_category(
 
 
 @app.put("/api/admin/categories")
-async def admin_bulk_update_listing_categories(
+def admin_bulk_update_listing_categories(
     request: Request,
+    request_body: RequestBody = Depends(read_request_body),
     admin_user: User = Depends(verify_admin),
     db: Session = Depends(get_db),
 ):
     """Admin: bulk-save label / active / sort_order for sidebar categories."""
     try:
-        body = await request.json()
+        body = request_body.json()
         items = body.get("categories") if isinstance(body, dict) else None
         if not isinstance(items, list):
             raise HTTPException(status_code=400, detail="Expected { categories: [...] }")
@@ -1332,18 +1298,153 @@ async def admin_bulk_update_listing_categories(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Statuses a recipient may still see when the listing is theirs.
+_RECIPIENT_OWN_STATUSES = ("claimed", "pending_confirmation")
+
+
+def _listing_expired_clause(now: datetime):
+    """SQL: an 'available' listing whose pickup window or expiration has passed.
+
+    Stored datetimes are naive UTC, so `now` must be naive UTC too.
+    """
+    return and_(
+        _listing_open_status_clause(),
+        or_(FoodResource.pickup_window_end <= now, FoodResource.expiration_date <= now),
+    )
+
+
+def _listing_open_status_clause():
+    # NULL / '' status predates the column default and reads as available.
+    return or_(FoodResource.status == "available", FoodResource.status.is_(None), FoodResource.status == "")
+
+
+def _listing_status_clause(status: str, now: datetime):
+    """SQL filter matching `_listing_effective_status(item, now) == status`."""
+    if status == "expired":
+        return or_(FoodResource.status == "expired", _listing_expired_clause(now))
+    if status == "available":
+        return and_(
+            _listing_open_status_clause(),
+            or_(FoodResource.pickup_window_end.is_(None), FoodResource.pickup_window_end > now),
+            or_(FoodResource.expiration_date.is_(None), FoodResource.expiration_date > now),
+        )
+    return FoodResource.status == status
+
+
+def _listing_effective_status(item: FoodResource, now: datetime) -> str:
+    """Stored status, except an 'available' listing past its deadline reads 'expired'."""
+    raw_status = str(item.status or "").lower()
+    if raw_status and raw_status != "available":
+        return raw_status
+    deadlines = [d for d in (item.pickup_window_end, item.expiration_date) if isinstance(d, datetime)]
+    if deadlines and min(deadlines) <= now:
+        return "expired"
+    return raw_status or "available"
+
+
+def _encode_listing_cursor(item: FoodResource) -> str:
+    raw = json.dumps([item.created_at.isoformat() if item.created_at else None, item.id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_listing_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, listing_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return (datetime.fromisoformat(created_at) if created_at else None), int(listing_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _listing_after_cursor_clause(created_at: Optional[datetime], listing_id: int):
+    """Rows after (created_at, id) in `created_at DESC, id DESC` order (NULL dates sort last)."""
+    if created_at is None:
+        return and_(FoodResource.created_at.is_(None), FoodResource.id < listing_id)
+    return or_(
+        FoodResource.created_at < created_at,
+        and_(FoodResource.created_at == created_at, FoodResource.id < listing_id),
+        FoodResource.created_at.is_(None),
+    )
+
+
+def _listing_order(db: Session) -> tuple:
+    """`created_at DESC, id DESC` with NULL dates last, as the cursor clause assumes."""
+    created = FoodResource.created_at.desc()
+    if db.get_bind().dialect.name == "postgresql":
+        # Postgres puts NULLs first under DESC. MySQL and SQLite already put
+        # them last, and MySQL has no NULLS LAST syntax.
+        created = created.nullslast()
+    return created, FoodResource.id.desc()
+
+
 @app.get("/api/listings/get")
 def get_listings(
+    response: Response,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    donor_id: Optional[int] = None,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_km: Optional[float] = None,
+    min_lat: Optional[float] = None,
+    min_lng: Optional[float] = None,
+    max_lat: Optional[float] = None,
+    max_lng: Optional[float] = None,
     db: Session = Depends(get_db),
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
 ):
     """
-    Returns ALL food resources for authenticated users to filter on frontend.
+    Returns food resources, newest first, for the frontend to render.
     - Recipients see: all available + their claimed listings
     - Donors see: all their listings (available, claimed, expired)
     - Unauthenticated: only available listings
+
+    Paging: results are ordered by (created_at, id) descending. When more
+    rows exist the response carries an `X-Next-Cursor` header; pass it back
+    as `cursor` for the next page.
+
+    Filters (all applied in SQL, so pages stay full):
+    - `category`: comma-separated category values.
+    - `status`: comma-separated effective statuses; 'expired' includes
+      available listings whose pickup window / expiration has passed.
+    - `donor_id`: listings by one donor.
+    - `lat`, `lng`, `radius_km`: only listings within the radius, from the
+      geohash index; each result gains a `distance_km` field.
+    - `min_lat`, `min_lng`, `max_lat`, `max_lng`: only listings inside the
+      bounding box (e.g. the current map viewport).
     """
+    limit = max(1, min(limit, 1000))
+    radius_query = lat is not None or lng is not None or radius_km is not None
+    bbox_values = (min_lat, min_lng, max_lat, max_lng)
+    bbox_query = any(v is not None for v in bbox_values)
+    if radius_query:
+        if lat is None or lng is None or radius_km is None:
+            raise HTTPException(status_code=400, detail="lat, lng and radius_km must be provided together")
+        if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0):
+            raise HTTPException(status_code=400, detail="lat must be in [-90,90] and lng in [-180,180]")
+        if not (0 < radius_km <= 500):
+            raise HTTPException(status_code=400, detail="radius_km must be between 0 and 500")
+    elif bbox_query:
+        if any(v is None for v in bbox_values):
+            raise HTTPException(status_code=400, detail="min_lat, min_lng, max_lat and max_lng must be provided together")
+        if not (-90.0 <= min_lat <= max_lat <= 90.0 and -180.0 <= min_lng <= 180.0 and -180.0 <= max_lng <= 180.0):
+            raise HTTPException(status_code=400, detail="Invalid bounding box")
+
+    categories: List[FoodCategory] = []
+    if category:
+        for value in category.split(","):
+            value = value.strip().lower()
+            if not value:
+                continue
+            try:
+                categories.append(FoodCategory(value))
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Unknown category: {value}")
+    statuses = [v.strip().lower() for v in (status or "").split(",") if v.strip()]
+    after = _decode_listing_cursor(cursor) if cursor else None
+
     payload = None
     if credentials is not None:
         try:
@@ -1366,64 +1467,58 @@ def get_listings(
             user_id = str(payload.get("sub")) if payload else None
             user_role = str(payload.get("role") or "").lower() if payload else None
 
-        # Return ALL listings - let frontend filter
-        # This allows proper filtering for donors to see expired/claimed items
-        listings = (
-            db.query(FoodResource)
-            .order_by(FoodResource.created_at.desc())
-            .limit(limit)
-        ).all()
-
-        def _to_timestamp(value):
-            if not value:
-                return None
-            try:
-                ts = datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
-                return ts
-            except Exception:
-                return None
-
-        def _effective_status(serialized_listing):
-            raw_status = str(serialized_listing.get('status') or '').lower()
-            if raw_status and raw_status != 'available':
-                return raw_status
-
-            deadlines = [
-                _to_timestamp(serialized_listing.get('pickup_window_end')),
-                _to_timestamp(serialized_listing.get('expiration_date')),
-            ]
-            deadlines = [d for d in deadlines if d is not None]
-
-            # _to_timestamp normalizes 'Z' / explicit offsets to UTC, so
-            # we must compare against a UTC `now` too. The previous
-            # `datetime.now().timestamp()` returned a local-time POSIX
-            # value: on any host where TZ != UTC the comparison was
-            # skewed by the offset, marking listings expired hours
-            # early (or late). `datetime.now(timezone.utc).timestamp()`
-            # is unambiguous regardless of the server's local TZ.
-            if deadlines and min(deadlines) <= datetime.now(timezone.utc).timestamp():
-                return 'expired'
+        # One `now` for the SQL filters and the per-row status below.
+        now = datetime.utcnow()
+        query = db.query(FoodResource).options(*summary_options())
+        if categories:
+            query = query.filter(FoodResource.category.in_(categories))
+        if statuses:
+            query = query.filter(or_(*(_listing_status_clause(st, now) for st in statuses)))
+        if donor_id is not None:
+            query = query.filter(FoodResource.donor_id == donor_id)
+        if user_role == 'recipient':
+            # Recipients may only see available listings and listings claimed by themselves.
+            visible = _listing_status_clause("available", now)
+            if user_id is not None and user_id.isdigit():
+                visible = or_(visible, and_(
+                    FoodResource.status.in_(_RECIPIENT_OWN_STATUSES),
+                    FoodResource.recipient_id == int(user_id),
+                ))
+            query = query.filter(visible)
+        if after is not None:
+            query = query.filter(_listing_after_cursor_clause(*after))
+
+        # Fetch one extra row to learn whether another page exists.
+        distances: Dict[int, float] = {}
+        if radius_query:
+            query = query.filter(radius_filter(FoodResource, lat, lng, radius_km))
+            ordered = query.order_by(*_listing_order(db))
+            pairs = take_within_radius(ordered, lat, lng, radius_km, limit + 1)
+            listings = [row for row, _ in pairs]
+            distances = {row.id: dist for row, dist in pairs}
+        else:
+            if bbox_query:
+                # A viewport spanning the antimeridian arrives with
+                # min_lng > max_lng; unwrap it for the geohash cover.
+                east = max_lng if max_lng >= min_lng else max_lng + 360.0
+                query = query.filter(bbox_filter(FoodResource, min_lat, min_lng, max_lat, east))
+            listings = (
+                query
+                .order_by(*_listing_order(db))
+                .limit(limit + 1)
+            ).all()
 
-            return raw_status or 'available'
+        if len(listings) > limit:
+            listings = listings[:limit]
+            response.headers["X-Next-Cursor"] = _encode_listing_cursor(listings[-1])
 
-        # Serialize listings and apply role-aware visibility rules.
         result = []
         for listing in listings:
             try:
                 serialized = serialize_listing(listing, include_donor=True, include_donor_contact=False)
-
-                effective_status = _effective_status(serialized)
-                serialized['status'] = effective_status
-
-                if user_role == 'recipient':
-                    recipient_id = serialized.get('recipient_id')
-                    is_claimed = effective_status in ('claimed', 'pending_confirmation')
-                    is_mine = user_id is not None and recipient_id is not None and str(recipient_id) == str(user_id)
-
-                    # Recipients may only see available listings and listings claimed by themselves.
-                    if not (effective_status == 'available' or (is_claimed and is_mine)):
-                        continue
-
+                serialized['status'] = _listing_effective_status(listing, now)
+                if listing.id in distances:
+                    serialized['distance_km'] = round(distances[listing.id], 2)
                 result.append(serialized)
             except Exception as e:
                 print(f"Error serializing listing {listing.id}: {e}")
@@ -1439,7 +1534,7 @@ def get_listings(
         raise HTTPException(status_code=500, detail="Failed to fetch listings")
 
 @app.delete("/api/listings/get/{listing_id}")
-async def delete_listing(listing_id: int, db: Session = Depends(get_db), credentials: HTTPAuthorizationCredentials = Depends(security)):
+def delete_listing(listing_id: int, db: Session = Depends(get_db), credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Delete a listing. Donor who created it or admin can delete."""
     try:
         item = db.query(FoodResource).filter(FoodResource.id == listing_id).first()
@@ -1508,8 +1603,15 @@ async def delete_listing(listing_id: int, db: Session = Depends(get_db), credent
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Per-user recommendation results; any listing write in this process drops them.
+recommendation_cache = RecommendationCache()
+watch_listing_changes(FoodResource, recommendation_cache)
+# Request/listing/driver writes mark their rows dirty for the dispatch matcher.
+watch_dispatch_changes(dispatch_matcher, FoodRequest, FoodResource, User)
+
+
 @app.get("/api/listings/recommended")
-async def get_recommended_listings(
+def get_recommended_listings(
     db: Session = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
@@ -1553,129 +1655,57 @@ async def get_recommended_listings(
         except:
             pass
         
-        # Get all available listings
-        listings = db.query(FoodResource).filter(FoodResource.status == "available").all()
-        
-        # Score each listing based on dietary compatibility
-        scored_listings = []
-        for listing in listings:
-            score = 0
-            skip = False
-            
-            # Load mock data to check dietary_info and allergens
-            # In real app, this would be stored in database
-            # For now, we'll use basic category matching
-            
-            # Preferred category bonus (high priority)
-            if listing.category and listing.category.value in preferred_categories:
-                score += 50
-            
-            # Dietary restrictions matching
-            # Check listing description/title for keywords
-            listing_text = (listing.title or '').lower() + ' ' + (listing.description or '').lower()
-            
-            for restriction in dietary_restrictions:
-                restriction_lower = restriction.lower()
-                if restriction_lower == 'vegetarian':
-                    # Avoid meat keywords
-                    if any(word in listing_text for word in ['meat', 'chicken', 'beef', 'pork', 'fish', 'salmon']):
-                        score -= 30
-                    if any(word in listing_text for word in ['vegetarian', 'vegan', 'veggie', 'produce', 'fruit']):
-                        score += 20
-                elif restriction_lower == 'vegan':
-                    if any(word in listing_text for word in ['vegan', 'plant-based']):
-                        score += 30
-                    if any(word in listing_text for word in ['dairy', 'cheese', 'milk', 'egg', 'meat', 'chicken', 'fish']):
-                        score -= 40
-                elif restriction_lower == 'gluten-free':
-                    if 'gluten' in listing_text or 'bread' in listing_text or 'pasta' in listing_text:
-                        score -= 20
-                    if 'gluten-free' in listing_text:
-                        score += 25
-                elif restriction_lower == 'halal':
-                    if 'halal' in listing_text:
-                        score += 30
-                    if 'pork' in listing_text:
-                        skip = True
-                elif restriction_lower == 'kosher':
-                    if 'kosher' in listing_text:
-                        score += 30
-                    if 'pork' in listing_text or 'shellfish' in listing_text:
-                        skip = True
-            
-            # Allergy filtering (critical - skip if allergen present)
-            for allergy in allergies:
-                allergy_lower = allergy.lower()
-                # Check for common allergen keywords
-                if allergy_lower in ['peanuts', 'tree nuts', 'nuts']:
-                    if any(word in listing_text for word in ['peanut', 'almond', 'walnut', 'cashew', 'nut']):
-                        skip = True
-                        break
-                elif allergy_lower in ['dairy', 'milk']:
-                    if any(word in listing_text for word in ['dairy', 'milk', 'cheese', 'yogurt', 'cream']):
-                        skip = True
-                        break
-                elif allergy_lower in ['eggs', 'egg']:
-                    if 'egg' in listing_text:
-                        skip = True
-                        break
-                elif allergy_lower == 'soy':
-                    if 'soy' in listing_text or 'tofu' in listing_text:
-                        skip = True
-                        break
-                elif allergy_lower in ['wheat/gluten', 'wheat', 'gluten']:
-                    if any(word in listing_text for word in ['wheat', 'gluten', 'bread', 'pasta']):
-                        skip = True
-                        break
-                elif allergy_lower in ['fish', 'shellfish', 'seafood']:
-                    if any(word in listing_text for word in ['fish', 'salmon', 'tuna', 'shellfish', 'shrimp', 'crab', 'lobster']):
-                        skip = True
-                        break
-            
-            if not skip:
-                # Household size matching (bonus for appropriate quantities)
-                household_size = user.household_size or 1
-                if listing.qty:
-                    # Ideal portion: 1-3 servings per person
-                    ideal_qty = household_size * 2
-                    qty_diff = abs(listing.qty - ideal_qty)
-                    if qty_diff < 5:
-                        score += 10
-                
-                # Proximity bonus (if user has location)
-                if user.coords_lat and user.coords_lng and listing.coords_lat and listing.coords_lng:
-                    # Simple distance calculation (rough approximation)
-                    import math
-                    lat_diff = user.coords_lat - listing.coords_lat
-                    lng_diff = user.coords_lng - listing.coords_lng
-                    distance = math.sqrt(lat_diff**2 + lng_diff**2) * 69  # Rough miles
-                    
-                    if distance < 2:
-                        score += 30
-                    elif distance < 5:
-                        score += 20
-                    elif distance < 10:
-                        score += 10
-                
-                # Freshness/urgency bonus
-                if listing.perishability and listing.perishability.value == 'high':
-                    score += 5  # Slight bonus for fresh food
-                
-                scored_listings.append({
-                    'listing': listing,
-                    'score': score
-                })
-        
-        # Sort by score (highest first)
-        scored_listings.sort(key=lambda x: x['score'], reverse=True)
-        
-        # Return top recommendations
-        top_listings = [item['listing'] for item in scored_listings[:20]]
-        
-        # Ensure donor relationship is loaded
-        for listing in top_listings:
-            _ = listing.donor
-        
+        profile_key = json.dumps(
+            [dietary_restrictions, allergies, preferred_categories,
+             user.household_size, user.coords_lat, user.coords_lng],
+            sort_keys=True, default=str,
+        )
+
+        cached = recommendation_cache.get(user.id, profile_key)
+        if cached is not None:
+            top_ids, total_matches = cached
+        else:
+            version = recommendation_cache.version
+            profile = RecommendationProfile(
+                dietary_restrictions, allergies, preferred_categories,
+                household_size=user.household_size, lat=user.coords_lat, lng=user.coords_lng,
+            )
+            # Score from a narrow projection; only the winners are loaded whole.
+            candidates = (
+                db.query(
+                    FoodResource.id, FoodResource.category, FoodResource.qty,
+                    FoodResource.coords_lat, FoodResource.coords_lng,
+                    FoodResource.perishability, FoodResource.diet_features,
+                )
+                .filter(FoodResource.status == "available")
+                .order_by(FoodResource.id)
+                .all()
+            )
+            missing = [row.id for row in candidates if row.diet_features is None]
+            if missing:
+                # Rows the startup backfill has not reached yet.
+                features = {
+                    row.id: listing_features(row.title, row.description, row.allergens, row.dietary_tags)
+                    for row in db.query(
+                        FoodResource.id, FoodResource.title, FoodResource.description,
+                        FoodResource.allergens, FoodResource.dietary_tags,
+                    ).filter(FoodResource.id.in_(missing))
+                }
+                candidates = [
+                    (*row[:6], features.get(row.id, 0)) if row.diet_features is None else row
+                    for row in candidates
+                ]
+            top_ids, total_matches = rank(profile, candidates)
+            recommendation_cache.put(user.id, profile_key, version, top_ids, total_matches)
+
+        by_id = {
+            listing.id: listing
+            for listing in db.query(FoodResource)
+            .options(selectinload(FoodResource.donor))
+            .filter(FoodResource.id.in_(top_ids), FoodResource.status == "available")
+        } if top_ids else {}
+        top_listings = [by_id[i] for i in top_ids if i in by_id]
+
         return {
             'listings': top_listings,
             'user_preferences': {
@@ -1684,7 +1714,7 @@ async def get_recommended_listings(
                 'preferred_categories': preferred_categories,
                 'household_size': user.household_size
             },
-            'total_matches': len(scored_listings)
+            'total_matches': total_matches
         }
         
     except HTTPException:
@@ -1697,10 +1727,10 @@ async def get_recommended_listings(
 
 
 @app.put("/api/listings/get/{listing_id}")
-async def update_listing(listing_id: int, request: Request, db: Session = Depends(get_db), credentials: HTTPAuthorizationCredentials = Depends(security)):
+def update_listing(listing_id: int, request: Request, request_body: RequestBody = Depends(read_request_body), db: Session = Depends(get_db), credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Update a listing's editable fields. Attempts server-side geocoding if address is provided and coords missing."""
     try:
-        item = db.query(FoodResource).filter(FoodResource.id == listing_id).first()
+        item = db.query(FoodResource).options(*detail_options()).filter(FoodResource.id == listing_id).first()
         if not item:
             raise HTTPException(status_code=404, detail="Listing not found")
 
@@ -1728,7 +1758,7 @@ async def update_listing(listing_id: int, request: Request, db: Session = Depend
 
         body = {}
         try:
-            body = await request.json()
+            body = request_body.json()
         except Exception:
             body = {}
 
@@ -1838,22 +1868,9 @@ async def update_listing(listing_id: int, request: Request, db: Session = Depend
         # If coords missing or address changed, attempt geocoding
         try:
             if (item.coords_lat is None or item.coords_lng is None or address_changed) and item.address:
-                MAPBOX_TOKEN = os.getenv("MAPBOX_TOKEN")
-                if MAPBOX_TOKEN:
-                    from urllib.parse import quote as urlquote
-                    import httpx
-                    geocode_url = "https://api.mapbox.com/geocoding/v5/mapbox.places/{}.json".format(urlquote(item.address))
-                    params = {"access_token": MAPBOX_TOKEN, "limit": 1, "type": "address"}
-                    with httpx.Client(timeout=10.0) as client:
-                        resp = client.get(geocode_url, params=params)
-                        if resp.status_code == 200:
-                            data = resp.json()
-                            features = data.get("features") or []
-                            if len(features) > 0:
-                                center = features[0].get("center")
-                                if center and len(center) >= 2:
-                                    item.coords_lng = float(center[0])
-                                    item.coords_lat = float(center[1])
+                coords = geocoder.geocode_blocking(item.address)
+                if coords is not None:
+                    item.coords_lat, item.coords_lng = coords
         except Exception as ge:
             try:
                 print(f"Geocoding error for address {item.address}: {ge}")
@@ -1872,7 +1889,7 @@ async def update_listing(listing_id: int, request: Request, db: Session = Depend
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/user/create")
-async def create_user(payload: UserRegisterRequest, request: Request, db: Session = Depends(get_db)):
+def create_user(payload: UserRegisterRequest, request: Request, db: Session = Depends(get_db)):
     try:    
         enforce_signup_rate_limit(request)
 
@@ -1924,7 +1941,7 @@ async def create_user(payload: UserRegisterRequest, request: Request, db: Sessio
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/user/login")
-async def login_user(payload: UserLoginRequest, request: Request, db: Session = Depends(get_db)):
+def login_user(payload: UserLoginRequest, request: Request, db: Session = Depends(get_db)):
     try:
         email = payload.email
         password = payload.password
@@ -1970,7 +1987,7 @@ async def login_user(payload: UserLoginRequest, request: Request, db: Session =
 password_reset_codes = {}
 
 @app.post("/api/user/forgot-password")
-async def forgot_password(payload: ForgotPasswordRequest, request: Request, db: Session = Depends(get_db)):
+def forgot_password(payload: ForgotPasswordRequest, request: Request, db: Session = Depends(get_db)):
     """Send password reset code to user's email"""
     try:
         email = payload.email
@@ -2004,7 +2021,7 @@ async def forgot_password(payload: ForgotPasswordRequest, request: Request, db:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/user/reset-password")
-async def reset_password(payload: ResetPasswordRequest, request: Request, db: Session = Depends(get_db)):
+def reset_password(payload: ResetPasswordRequest, request: Request, db: Session = Depends(get_db)):
     """Reset user password with verification code"""
     try:
         email = payload.email
@@ -2052,7 +2069,7 @@ async def reset_password(payload: ResetPasswordRequest, request: Request, db: Se
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/user/referrals")
-async def get_user_referrals(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def get_user_referrals(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Get user's referral stats"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -2086,10 +2103,10 @@ async def get_user_referrals(credentials: HTTPAuthorizationCredentials = Depends
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/referral/validate")
-async def validate_referral_code(request: Request, db: Session = Depends(get_db)):
+def validate_referral_code(request: Request, request_body: RequestBody = Depends(read_request_body), db: Session = Depends(get_db)):
     """Validate a referral code in real-time"""
     try:
-        body = await request.json()
+        body = request_body.json()
         code = body.get('code', '').strip().upper()
         
         if not code:
@@ -2110,7 +2127,7 @@ async def validate_referral_code(request: Request, db: Session = Depends(get_db)
         return {"valid": False, "referrer_name": None}
 
 @app.get("/api/admin/referrals")
-async def get_referral_analytics(admin_user: User = Depends(verify_admin), db: Session = Depends(get_db)):
+def get_referral_analytics(admin_user: User = Depends(verify_admin), db: Session = Depends(get_db)):
     """Get referral analytics for admin (Admin only)"""
     try:
         # Get all users with their referral data
@@ -2149,7 +2166,7 @@ async def get_referral_analytics(admin_user: User = Depends(verify_admin), db: S
 
 
 @app.get("/api/admin/users")
-async def get_admin_users(
+def get_admin_users(
     role: Optional[str] = None,
     q: Optional[str] = None,
     admin_user: User = Depends(verify_admin),
@@ -2218,7 +2235,7 @@ async def get_admin_users(
 
 
 @app.get("/api/admin/stats")
-async def get_admin_stats(admin_user: User = Depends(verify_admin), db: Session = Depends(get_db)):
+def get_admin_stats(admin_user: User = Depends(verify_admin), db: Session = Depends(get_db)):
     """Get admin dashboard aggregate stats from the primary database."""
     try:
         total_users = db.query(User).count()
@@ -2239,9 +2256,25 @@ async def get_admin_stats(admin_user: User = Depends(verify_admin), db: Session
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _load_public_stats() -> dict:
+    db = SessionLocal()
+    try:
+        totals = read_totals(db)
+    finally:
+        db.close()
+    # No totals row until the first reconcile (fresh database, or a worker
+    # that has not finished startup yet).
+    return totals if totals is not None else reconcile_impact_totals(SessionLocal)
+
+
+# Served from memory; see backend/impact_stats.py for how the totals are kept.
+public_stats_cache = PublicStatsCache(_load_public_stats)
+_impact_reconcile_task: Optional[asyncio.Task] = None
+
+
 @app.get("/api/public/stats")
 @app.get("/public/stats")
-async def get_public_stats(response: Response, db: Session = Depends(get_db)):
+def get_public_stats(response: Response):
     """Lightweight, cache-friendly impact totals for the public landing page."""
     fallback = {
         "pounds_donated_lbs": 85000,
@@ -2251,44 +2284,21 @@ async def get_public_stats(response: Response, db: Session = Depends(get_db)):
     }
 
     try:
-        normalized_unit = func.lower(func.coalesce(FoodResource.unit, ""))
-        pounds_expr = case(
-            (FoodResource.est_weight_kg.isnot(None), FoodResource.est_weight_kg * 2.20462),
-            (normalized_unit.in_(["lb", "lbs", "pound", "pounds"]), FoodResource.qty),
-            else_=FoodResource.qty * 0.5,
-        )
-
-        totals = db.query(
-            func.count(FoodResource.id).label("claimed_listings"),
-            func.coalesce(func.sum(pounds_expr), 0.0).label("pounds_donated_lbs"),
-            func.count(func.distinct(FoodResource.recipient_id)).label("families_helped"),
-            func.max(FoodResource.claimed_at).label("updated_at"),
-        ).filter(
-            FoodResource.status == "claimed"
-        ).first()
-
-        pounds_donated = int(round(float(totals.pounds_donated_lbs or 0)))
-        families_helped = int(totals.families_helped or 0)
-
+        totals = public_stats_cache.get()
         response.headers["Cache-Control"] = "public, max-age=1800"
-        return {
-            "pounds_donated_lbs": max(0, pounds_donated),
-            "families_helped": max(0, families_helped),
-            "claimed_listings": int(totals.claimed_listings or 0),
-            "updated_at": totals.updated_at.isoformat() if totals.updated_at else None,
-        }
+        return dict(totals)
     except Exception:
         response.headers["Cache-Control"] = "public, max-age=300"
         return fallback
 
-# Store for pending confirmations.
-# auto_release_claim runs on a threading.Timer (separate OS thread) while
-# claim_listing / confirm_claim run on FastAPI's async worker. Concurrent
-# access to a plain dict can race (the `if key in d ... del d[key]`
-# pattern below in auto_release_claim is a classic TOCTOU). A single
-# module-level Lock is enough — contention is low and operations are O(1).
-pending_confirmations: dict = {}
-_pending_confirmations_lock = Lock()
+# Pending claim confirmation codes. The database store is shared by every
+# worker process, so confirm can land on a different worker than the claim.
+# CLAIM_CONFIRMATION_STORE=memory keeps them in-process instead (tests,
+# single-worker dev) — see backend/claim_confirmations.py.
+if os.getenv("CLAIM_CONFIRMATION_STORE", "database").strip().lower() == "memory":
+    claim_confirmations = InMemoryConfirmationStore()
+else:
+    claim_confirmations = DatabaseConfirmationStore(SessionLocal)
 
 def generate_reset_code(length: int = 6) -> str:
     """Generate a random numeric code for SMS confirmation"""
@@ -2332,45 +2342,29 @@ def send_sms(phone: str, message: str) -> bool:
         print(f"📱 SMS to {phone}: {message}")
         return False
 
-def auto_release_claim(listing_id: int):
-    """Auto-release a claim if not confirmed within time limit"""
-    db = None
-    try:
-        db = SessionLocal()
-        # Atomic check-and-remove under the lock so a concurrent
-        # confirm_claim can't race us into a KeyError on `del`.
-        with _pending_confirmations_lock:
-            still_pending = listing_id in pending_confirmations
-            if still_pending:
-                pending_confirmations.pop(listing_id, None)
-        if still_pending:
-            item = db.query(FoodResource).filter(FoodResource.id == listing_id).first()
-            if item and item.status == "pending_confirmation":
-                item.status = "available"
-                item.recipient_id = None
-                item.claimed_at = None
-                db.commit()
-                print(f"\u23f0 Auto-released listing {listing_id} due to timeout")
-    except Exception as e:
-        print(f"Error in auto_release_claim: {e}")
-        if db is not None:
-            try:
-                db.rollback()
-            except Exception:
-                pass
-    finally:
-        if db is not None:
-            try:
-                db.close()
-            except Exception:
-                pass
+def sweep_expired_claims(now: Optional[datetime] = None) -> int:
+    """Release listings whose confirmation window has passed (batched)."""
+    now = now or datetime.utcnow()
+    released = release_expired_claims(SessionLocal, claim_confirmations, now)
+    released += release_orphaned_claims(SessionLocal, claim_confirmations, now)
+    for listing_id in released:
+        push_hub.publish(["listings"], "listing.updated", {"listing_id": listing_id, "status": "available"})
+    if released:
+        print(f"\u23f0 Auto-released {len(released)} unconfirmed claim(s)")
+    return len(released)
+
+
+# One thread per process wakes at the earliest pending expiry and releases
+# everything due in one pass; the periodic sweep also catches claims made
+# on other workers.
+claim_release_scheduler = ClaimExpiryScheduler(sweep_expired_claims)
 
 # ============================================
 # DISTRIBUTION CENTER ENDPOINTS
 # ============================================
 
 @app.get("/api/centers", response_model=List[DistributionCenterResponse])
-async def get_distribution_centers(db: Session = Depends(get_db)):
+def get_distribution_centers(db: Session = Depends(get_db)):
     """Get all distribution centers"""
     try:
         centers = db.query(DistributionCenter).all()
@@ -2379,10 +2373,10 @@ async def get_distribution_centers(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/centers")
-async def create_distribution_center(request: Request, admin_user: User = Depends(verify_admin), db: Session = Depends(get_db)):
+def create_distribution_center(request: Request, request_body: RequestBody = Depends(read_request_body), admin_user: User = Depends(verify_admin), db: Session = Depends(get_db)):
     """Create a new distribution center (Admin only)"""
     try:
-        body = await request.json()
+        body = request_body.json()
         center = DistributionCenter(
             owner_id=admin_user.id,
             name=body.get('name'),
@@ -2410,14 +2404,14 @@ async def create_distribution_center(request: Request, admin_user: User = Depend
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/centers/{center_id}")
-async def update_distribution_center(center_id: int, request: Request, admin_user: User = Depends(verify_admin), db: Session = Depends(get_db)):
+def update_distribution_center(center_id: int, request: Request, request_body: RequestBody = Depends(read_request_body), admin_user: User = Depends(verify_admin), db: Session = Depends(get_db)):
     """Update a distribution center (Admin only)"""
     try:
         center = db.query(DistributionCenter).filter(DistributionCenter.id == center_id).first()
         if not center:
             raise HTTPException(status_code=404, detail="Center not found")
         
-        body = await request.json()
+        body = request_body.json()
         
         # Update fields if provided
         if 'name' in body:
@@ -2464,7 +2458,7 @@ async def update_distribution_center(center_id: int, request: Request, admin_use
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/centers/{center_id}")
-async def delete_distribution_center(center_id: int, admin_user: User = Depends(verify_admin), db: Session = Depends(get_db)):
+def delete_distribution_center(center_id: int, admin_user: User = Depends(verify_admin), db: Session = Depends(get_db)):
     """Delete a distribution center and its inventory (Admin only)"""
     try:
         center = db.query(DistributionCenter).filter(DistributionCenter.id == center_id).first()
@@ -2486,7 +2480,7 @@ async def delete_distribution_center(center_id: int, admin_user: User = Depends(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/centers/{center_id}", response_model=DistributionCenterWithInventory)
-async def get_distribution_center(center_id: int, db: Session = Depends(get_db)):
+def get_distribution_center(center_id: int, db: Session = Depends(get_db)):
     """Get a specific distribution center with inventory"""
     try:
         center = db.query(DistributionCenter).filter(
@@ -2503,7 +2497,7 @@ async def get_distribution_center(center_id: int, db: Session = Depends(get_db))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/centers/{center_id}/inventory", response_model=List[CenterInventoryResponse])
-async def get_center_inventory(center_id: int, db: Session = Depends(get_db)):
+def get_center_inventory(center_id: int, db: Session = Depends(get_db)):
     """Get inventory for a specific distribution center"""
     try:
         center = db.query(DistributionCenter).filter(
@@ -2523,10 +2517,37 @@ async def get_center_inventory(center_id: int, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/dispatch/matches")
+def get_dispatch_matches(
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Suggested request/listing/driver matches (dispatchers and admins).
+
+    Computed once per process by ``backend.dispatch_matching`` and reused by
+    every caller until a request, listing or driver changes.
+    """
+    try:
+        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        user_id = int(payload.get("sub")) if payload and payload.get("sub") is not None else None
+    except (jwt.PyJWTError, ValueError, TypeError):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    user = db.query(User).filter(User.id == user_id).first() if user_id is not None else None
+    if not user or user.role not in (UserRole.DISPATCHER, UserRole.ADMIN):
+        raise HTTPException(status_code=403, detail="Dispatcher or admin access required")
+    try:
+        result = dispatch_matcher.matches(SessionLocal)
+    except Exception as e:
+        print(f"GET /api/dispatch/matches error: {e}")
+        raise HTTPException(status_code=500, detail="Could not compute dispatch matches")
+    limit = max(1, min(int(limit or 100), 500))
+    return {**result, "matches": result["matches"][:limit]}
+
 # Support both legacy and canonical claim routes.
 @app.patch("/api/listings/get/{listing_id}")
 @app.post("/api/listings/claim/{listing_id}")
-async def claim_listing(listing_id: int, db: Session = Depends(get_db), credentials: HTTPAuthorizationCredentials = Depends(security)):
+def claim_listing(listing_id: int, db: Session = Depends(get_db), credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Claim a listing with SMS confirmation requirement."""
     try:
         # Authorization first — no point hitting the DB without a valid user.
@@ -2577,7 +2598,7 @@ async def claim_listing(listing_id: int, db: Session = Depends(get_db), credenti
         # second user race in and claim the same listing.
         db.commit()
 
-        item = db.query(FoodResource).filter(FoodResource.id == listing_id).first()
+        item = db.query(FoodResource).options(*detail_options()).filter(FoodResource.id == listing_id).first()
         # Get user details (claimant must have a phone for SMS confirmation).
         claimant = db.query(User).filter(User.id == uid_int).first()
         if not claimant or not claimant.phone:
@@ -2597,19 +2618,15 @@ async def claim_listing(listing_id: int, db: Session = Depends(get_db), credenti
             db.commit()
             raise HTTPException(status_code=400, detail="Phone number required")
 
-        donor = db.query(User).filter(User.id == item.donor_id).first()
+        donor = item.donor
         
         # Generate confirmation code
         confirmation_code = generate_reset_code(4)
 
         # Store confirmation code (the listing was already moved to
         # pending_confirmation by the atomic update above).
-        with _pending_confirmations_lock:
-            pending_confirmations[listing_id] = {
-                'code': confirmation_code,
-                'recipient_id': uid_int,
-                'expires_at': datetime.utcnow() + timedelta(minutes=5)
-            }
+        expires_at = datetime.utcnow() + CONFIRMATION_TTL
+        claim_confirmations.put(listing_id, confirmation_code, uid_int, expires_at)
         
         # Send SMS to recipient. Capture the delivery result — if Twilio
         # is unconfigured or the send fails, we need to surface the code
@@ -2624,9 +2641,9 @@ async def claim_listing(listing_id: int, db: Session = Depends(get_db), credenti
             donor_msg = f"Your listing '{item.title}' was claimed by {claimant.name}. Waiting for confirmation."
             send_sms(donor.phone, donor_msg)
 
-        # Set auto-release timer
-        timer = Timer(300.0, auto_release_claim, args=[listing_id])  # 5 minutes
-        timer.start()
+        # Release the listing if it is still unconfirmed at expires_at.
+        claim_release_scheduler.schedule(listing_id, expires_at)
+        push_hub.publish(["listings"], "listing.updated", {"listing_id": listing_id, "status": "pending_confirmation"})
 
         response: dict = {
             "success": True,
@@ -2652,21 +2669,18 @@ async def claim_listing(listing_id: int, db: Session = Depends(get_db), credenti
 
 
 @app.post("/api/listings/confirm/{listing_id}")
-async def confirm_claim(listing_id: int, request: Request, db: Session = Depends(get_db), credentials: HTTPAuthorizationCredentials = Depends(security)):
+def confirm_claim(listing_id: int, request: Request, request_body: RequestBody = Depends(read_request_body), db: Session = Depends(get_db), credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Confirm a claim with SMS code."""
     try:
-        body = await request.json()
+        body = request_body.json()
         code = body.get('code', '').strip()
         
         if not code:
             raise HTTPException(status_code=400, detail="Confirmation code required")
         
-        # Atomically pop-and-validate so the auto-release Timer can't
-        # race us into a KeyError or a double-confirm.
-        with _pending_confirmations_lock:
-            confirmation = pending_confirmations.get(listing_id)
-            if confirmation is None:
-                raise HTTPException(status_code=400, detail="No pending confirmation for this listing")
+        confirmation = claim_confirmations.get(listing_id)
+        if confirmation is None:
+            raise HTTPException(status_code=400, detail="No pending confirmation for this listing")
 
         # Check if code matches. Use a constant-time compare so a
         # remote attacker can't infer the code from response timing.
@@ -2675,8 +2689,6 @@ async def confirm_claim(listing_id: int, request: Request, db: Session = Depends
 
         # Check if expired
         if datetime.utcnow() > confirmation['expires_at']:
-            with _pending_confirmations_lock:
-                pending_confirmations.pop(listing_id, None)
             raise HTTPException(status_code=400, detail="Confirmation code expired")
         
         # Verify user authorization
@@ -2689,16 +2701,33 @@ async def confirm_claim(listing_id: int, request: Request, db: Session = Depends
             raise HTTPException(status_code=401, detail="Invalid token")
         
         # Update listing status to claimed
-        item = db.query(FoodResource).filter(FoodResource.id == listing_id).first()
+        item = db.query(FoodResource).options(*detail_options()).filter(FoodResource.id == listing_id).first()
         if not item:
             raise HTTPException(status_code=404, detail="Listing not found")
         
-        item.status = "claimed"
+        # Only flip a listing that is still pending for this recipient: the
+        # auto-release sweep may run on another worker at the same moment.
+        updated = (
+            db.query(FoodResource)
+            .filter(
+                FoodResource.id == listing_id,
+                FoodResource.status == "pending_confirmation",
+                FoodResource.recipient_id == user_id,
+            )
+            .update({FoodResource.status: "claimed"}, synchronize_session=False)
+        )
+        if not updated:
+            db.rollback()
+            claim_confirmations.pop(listing_id)
+            raise HTTPException(status_code=400, detail="Claim is no longer pending")
+        # Bulk UPDATEs skip the ORM listeners; count the claim in this transaction.
+        listing_claimed(db, listing_id)
         db.commit()
+        db.refresh(item)
         
         # Clean up confirmation
-        with _pending_confirmations_lock:
-            pending_confirmations.pop(listing_id, None)
+        claim_confirmations.pop(listing_id)
+        push_hub.publish(["listings"], "listing.updated", {"listing_id": listing_id, "status": "claimed"})
         
         # Get user details for notification
         claimant = db.query(User).filter(User.id == user_id).first()
@@ -2724,10 +2753,49 @@ async def confirm_claim(listing_id: int, request: Request, db: Session = Depends
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/listings/{listing_id}/verification-photo")
+async def upload_verification_photo(
+    listing_id: int,
+    photo: UploadFile = File(...),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Store a pickup verification photo and return its URL.
+
+    The photo is kept as a content-addressed file (backend/photo_store.py);
+    the client then sends the URL to verify-before / verify-after.
+    """
+    try:
+        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        user_id = int(payload.get("sub"))
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    def _listing():
+        db = SessionLocal()
+        try:
+            return db.query(FoodResource.recipient_id).filter(FoodResource.id == listing_id).first()
+        finally:
+            db.close()
+
+    listing = await run_in_threadpool(_listing)
+    if listing is None:
+        raise HTTPException(status_code=404, detail="Listing not found")
+    # Same rule as verify-before / verify-after: only the recipient.
+    if listing.recipient_id != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    data = await photo.read(MAX_PHOTO_BYTES + 1)
+    try:
+        url = await run_in_threadpool(photo_store.put, data)
+    except PhotoError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"url": url, "size": len(data)}
+
 @app.post("/api/listings/{listing_id}/verify-before")
-async def verify_before_pickup(
+def verify_before_pickup(
     listing_id: int,
     request: Request,
+    request_body: RequestBody = Depends(read_request_body),
     db: Session = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
@@ -2738,7 +2806,7 @@ async def verify_before_pickup(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        body = await request.json()
+        body = request_body.json()
         photo_data = body.get('photo')
         notes = body.get('notes', '')
         
@@ -2753,8 +2821,13 @@ async def verify_before_pickup(
         if listing.recipient_id != user_id:
             raise HTTPException(status_code=403, detail="Not authorized")
         
+        try:
+            photo_ref = store_photo(photo_data)
+        except PhotoError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
         # Update listing
-        listing.before_photo = photo_data
+        listing.before_photo = photo_ref
         listing.before_verified_at = datetime.utcnow()
         listing.verification_status = "before_verified"
         if notes:
@@ -2774,9 +2847,10 @@ async def verify_before_pickup(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/listings/{listing_id}/verify-after")
-async def verify_after_pickup(
+def verify_after_pickup(
     listing_id: int,
     request: Request,
+    request_body: RequestBody = Depends(read_request_body),
     db: Session = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
@@ -2787,7 +2861,7 @@ async def verify_after_pickup(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        body = await request.json()
+        body = request_body.json()
         photo_data = body.get('photo')
         notes = body.get('notes', '')
         
@@ -2802,8 +2876,13 @@ async def verify_after_pickup(
         if listing.recipient_id != user_id:
             raise HTTPException(status_code=403, detail="Not authorized")
         
+        try:
+            photo_ref = store_photo(photo_data)
+        except PhotoError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
         # Update listing
-        listing.after_photo = photo_data
+        listing.after_photo = photo_ref
         listing.after_verified_at = datetime.utcnow()
         listing.verification_status = "completed"
         listing.status = "completed"
@@ -2824,7 +2903,7 @@ async def verify_after_pickup(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/listings/{listing_id}/verification")
-async def get_verification_status(
+def get_verification_status(
     listing_id: int,
     db: Session = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
@@ -2836,7 +2915,7 @@ async def get_verification_status(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        listing = db.query(FoodResource).filter(FoodResource.id == listing_id).first()
+        listing = db.query(FoodResource).options(undefer_group("verification")).filter(FoodResource.id == listing_id).first()
         if not listing:
             raise HTTPException(status_code=404, detail="Listing not found")
         
@@ -2859,7 +2938,7 @@ async def get_verification_status(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/user/send-verification-email")
-async def send_verification_email(
+def send_verification_email(
     db: Session = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
@@ -2902,7 +2981,7 @@ async def send_verification_email(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/verify-email")
-async def verify_email_endpoint(token: str, db: Session = Depends(get_db)):
+def verify_email_endpoint(token: str, db: Session = Depends(get_db)):
     """Verify email with token from link"""
     try:
         # Decode token
@@ -3049,7 +3128,7 @@ async def verify_email_endpoint(token: str, db: Session = Depends(get_db)):
 # ============================================================================
 
 @app.get("/api/user/trust-score")
-async def get_trust_score(
+def get_trust_score(
     db: Session = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
@@ -3087,8 +3166,9 @@ async def get_trust_score(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/safety/report")
-async def submit_safety_report(
+def submit_safety_report(
     request: Request,
+    request_body: RequestBody = Depends(read_request_body),
     db: Session = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
@@ -3099,7 +3179,7 @@ async def submit_safety_report(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        data = await request.json()
+        data = request_body.json()
         report_type = data.get('type')
         description = data.get('description')
         listing_id = data.get('listingId')
@@ -3146,8 +3226,9 @@ async def submit_safety_report(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/user/update-trust-score")
-async def update_trust_score(
+def update_trust_score(
     request: Request,
+    request_body: RequestBody = Depends(read_request_body),
     db: Session = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
@@ -3158,7 +3239,7 @@ async def update_trust_score(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        data = await request.json()
+        data = request_body.json()
         action = data.get('action')  # 'completed_exchange', 'positive_feedback', 'verified_pickup', etc.
         
         user = db.query(User).filter(User.id == user_id).first()
@@ -3201,7 +3282,7 @@ async def update_trust_score(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/listings/create")
-async def create_listing(donor_id: int, title: str, desc: str, category: FoodCategory, qty: float, unit: str, perishability: PerishabilityLevel, address: str,  pickup_start: str, pickup_end: str, est_w: float = 0, images: Optional[str] = None, db: Session = Depends(get_db), credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
+def create_listing(donor_id: int, title: str, desc: str, category: FoodCategory, qty: float, unit: str, perishability: PerishabilityLevel, address: str,  pickup_start: str, pickup_end: str, est_w: float = 0, images: Optional[str] = None, db: Session = Depends(get_db), credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
     """
     Create a FoodResource and attempt server-side geocoding using Mapbox when an address is provided
     and coords are not supplied. Returns the created listing as JSON.
@@ -3288,29 +3369,12 @@ async def create_listing(donor_id: int, title: str, desc: str, category: FoodCat
             created_at=datetime.utcnow()
         )
 
-        # If coords are missing and address provided, attempt Mapbox geocoding
+        # If coords are missing and address provided, attempt geocoding
         try:
             if (item.coords_lat is None or item.coords_lng is None) and item.address:
-                MAPBOX_TOKEN = os.getenv('MAPBOX_TOKEN')
-                if MAPBOX_TOKEN:
-                    from urllib.parse import quote as urlquote
-                    import httpx
-                    geocode_url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{urlquote(item.address)}.json"
-                    params = {"access_token": MAPBOX_TOKEN, "limit": 1}
-                    with httpx.Client(timeout=10.0) as client:
-                        resp = client.get(geocode_url, params=params)
-                        if resp.status_code == 200:
-                            data = resp.json()
-                            features = data.get('features') or []
-                            if len(features) > 0:
-                                center = features[0].get('center')
-                                if center and len(center) >= 2:
-                                    # Mapbox returns [lng, lat]
-                                    item.coords_lng = float(center[0])
-                                    item.coords_lat = float(center[1])
-                else:
-                    # No MAPBOX token configured - skip geocoding
-                    pass
+                coords = geocoder.geocode_blocking(item.address)
+                if coords is not None:
+                    item.coords_lat, item.coords_lng = coords
         except Exception as ge:
             # Don't fail the request if geocoding fails; log and continue
             try:
@@ -3321,13 +3385,15 @@ async def create_listing(donor_id: int, title: str, desc: str, category: FoodCat
         db.add(item)
         db.commit()
         db.refresh(item)
+        listing_out = serialize_listing(item)
+        push_hub.publish(["listings"], "listing.created", {"listing": listing_out})
         # Return the created item
-        return {"success": True, "listing": serialize_listing(item)}
+        return {"success": True, "listing": listing_out}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/listings/user-details/{listing_id}")
-async def get_user_details(
+def get_user_details(
     listing_id: int,
     db: Session = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
@@ -3386,7 +3452,7 @@ async def get_user_details(
 
 # Food Safety Checklist Endpoints
 @app.post("/api/food/safety-check")
-async def submit_safety_check(
+def submit_safety_check(
     listing_id: int,
     storage_temperature: Optional[float] = None,
     is_refrigerated: bool = False,
@@ -3410,7 +3476,7 @@ async def submit_safety_check(
             raise HTTPException(status_code=401, detail="Authentication required")
         
         # Get the listing
-        listing = db.query(FoodResource).filter(FoodResource.id == listing_id).first()
+        listing = db.query(FoodResource).options(*detail_options()).filter(FoodResource.id == listing_id).first()
         if not listing:
             raise HTTPException(status_code=404, detail="Listing not found")
         
@@ -3456,7 +3522,7 @@ async def submit_safety_check(
 
 
 @app.get("/api/food/{listing_id}/safety-status")
-async def get_safety_status(
+def get_safety_status(
     listing_id: int,
     db: Session = Depends(get_db)
 ):
@@ -3487,7 +3553,7 @@ async def get_safety_status(
 
 
 @app.patch("/api/food/{listing_id}/safety-update")
-async def update_safety_info(
+def update_safety_info(
     listing_id: int,
     storage_temperature: Optional[float] = None,
     is_refrigerated: Optional[bool] = None,
@@ -3510,7 +3576,7 @@ async def update_safety_info(
             raise HTTPException(status_code=401, detail="Authentication required")
         
         # Get the listing
-        listing = db.query(FoodResource).filter(FoodResource.id == listing_id).first()
+        listing = db.query(FoodResource).options(*detail_options()).filter(FoodResource.id == listing_id).first()
         if not listing:
             raise HTTPException(status_code=404, detail="Listing not found")
         
@@ -3553,7 +3619,7 @@ async def update_safety_info(
 
 # Pickup Reminder Endpoints
 @app.get("/api/pickup-reminders/list")
-async def get_pickup_reminders(
+def get_pickup_reminders(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -3568,10 +3634,16 @@ async def get_pickup_reminders(
             PickupReminder.user_id == user_id
         ).order_by(PickupReminder.scheduled_time).all()
         
-        # Enhance with listing details
+        # Enhance with listing details, fetched for all reminders at once
+        listing_ids = {r.listing_id for r in reminders if r.listing_id is not None}
+        listings_by_id = {
+            row.id: row
+            for row in db.query(FoodResource.id, FoodResource.title, FoodResource.address)
+            .filter(FoodResource.id.in_(listing_ids))
+        } if listing_ids else {}
         reminder_list = []
         for reminder in reminders:
-            listing = db.query(FoodResource).filter(FoodResource.id == reminder.listing_id).first()
+            listing = listings_by_id.get(reminder.listing_id)
             reminder_list.append({
                 "id": reminder.id,
                 "listing_id": reminder.listing_id,
@@ -3594,7 +3666,7 @@ async def get_pickup_reminders(
 
 
 @app.get("/api/pickup-reminders/settings")
-async def get_reminder_settings(
+def get_reminder_settings(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -3640,7 +3712,7 @@ async def get_reminder_settings(
 
 
 @app.post("/api/pickup-reminders/settings")
-async def update_reminder_settings(
+def update_reminder_settings(
     enabled: bool = True,
     advance_notice_hours: float = 2.0,
     sms_enabled: bool = True,
@@ -3682,7 +3754,7 @@ async def update_reminder_settings(
 
 
 @app.post("/api/pickup-reminders/schedule")
-async def schedule_pickup_reminder(
+def schedule_pickup_reminder(
     listing_id: int,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -3755,7 +3827,7 @@ async def schedule_pickup_reminder(
 
 
 @app.post("/api/pickup-reminders/{reminder_id}/cancel")
-async def cancel_pickup_reminder(
+def cancel_pickup_reminder(
     reminder_id: int,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -3789,7 +3861,7 @@ async def cancel_pickup_reminder(
 
 
 @app.post("/api/pickup-reminders/{reminder_id}/snooze")
-async def snooze_pickup_reminder(
+def snooze_pickup_reminder(
     reminder_id: int,
     minutes: int = 30,
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -3835,7 +3907,7 @@ async def snooze_pickup_reminder(
 
 # Referral System Endpoints
 @app.get("/api/referrals/stats")
-async def get_referral_stats(
+def get_referral_stats(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -3910,7 +3982,7 @@ async def get_referral_stats(
 
 
 @app.get("/api/referrals/user/{user_id}")
-async def get_user_referrals(
+def get_user_referrals(
     user_id: int,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -3975,7 +4047,7 @@ async def get_user_referrals(
 
 
 @app.get("/api/user/referral-code")
-async def get_my_referral_code(
+def get_my_referral_code(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -4022,8 +4094,111 @@ async def get_my_referral_code(
 # MESSAGING ENDPOINTS
 # ============================================
 
+@app.get("/api/events/stream")
+async def event_stream(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Server-push channel (text/event-stream) replacing client-side polling.
+
+    Emits `message`, `listing.created` and `listing.updated` events for the
+    caller's user id, role and the public listings feed; see
+    backend/realtime.py. Clients read it with fetch() so the JWT stays in
+    the Authorization header rather than the URL.
+    """
+    try:
+        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        user_id = int(payload.get("sub"))
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    def _role() -> Optional[str]:
+        # Role from the DB, not the token: a demoted admin's unexpired token
+        # must not keep receiving the admin inbox feed.
+        db = SessionLocal()
+        try:
+            user = db.query(User.role).filter(User.id == user_id).first()
+            return user.role.value if user and user.role else None
+        finally:
+            db.close()
+
+    role = await run_in_threadpool(_role)
+    if role is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return StreamingResponse(
+        push_stream(subscriber_topics(user_id, role)),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # nginx: flush each event instead of buffering the stream.
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+def _mark_conversation_read(db: Session, conversation_id: str, reader_is_admin: bool, message_ids: List[int]) -> int:
+    """Flag messages read and take the same number off the summary's unread counter.
+
+    Only rows this UPDATE actually flips are counted, so two tabs opening
+    the same conversation can't decrement twice. Caller commits.
+    """
+    if not message_ids:
+        return 0
+    marked = (
+        db.query(Message)
+        .filter(Message.id.in_(message_ids), Message.is_read == False)  # noqa: E712
+        .update({Message.is_read: True}, synchronize_session="evaluate")
+    )
+    if marked:
+        counter = ConversationSummary.unread_for_admin if reader_is_admin else ConversationSummary.unread_for_user
+        (
+            db.query(ConversationSummary)
+            .filter(ConversationSummary.conversation_id == conversation_id)
+            .update(
+                {counter: case((counter > marked, counter - marked), else_=0)},
+                synchronize_session=False,
+            )
+        )
+    return marked
+
+
+def _backfill_conversation_summaries() -> int:
+    """Create conversation_summaries rows for conversations that predate the table."""
+    db = SessionLocal()
+    try:
+        unread_user_msgs = func.sum(case(((Message.is_from_admin == False) & (Message.is_read == False), 1), else_=0))  # noqa: E712
+        unread_admin_msgs = func.sum(case(((Message.is_from_admin == True) & (Message.is_read == False), 1), else_=0))  # noqa: E712
+        missing = (
+            db.query(
+                Message.conversation_id,
+                func.max(Message.id),
+                func.max(Message.created_at),
+                unread_user_msgs,
+                unread_admin_msgs,
+            )
+            .outerjoin(ConversationSummary, ConversationSummary.conversation_id == Message.conversation_id)
+            .filter(Message.conversation_id != None, ConversationSummary.conversation_id == None)  # noqa: E711
+            .group_by(Message.conversation_id)
+            .all()
+        )
+        for conv_id, last_id, last_at, unread_for_admin, unread_for_user in missing:
+            db.add(ConversationSummary(
+                conversation_id=conv_id,
+                user_id=conversation_user_id(conv_id),
+                last_message_id=last_id,
+                last_message_at=last_at,
+                unread_for_admin=int(unread_for_admin or 0),
+                unread_for_user=int(unread_for_user or 0),
+            ))
+        db.commit()
+        return len(missing)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
 @app.post("/api/messages/send")
-async def send_message(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def send_message(request: Request, request_body: RequestBody = Depends(read_request_body), credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Send a message to admin or reply as admin"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -4035,7 +4210,7 @@ async def send_message(request: Request, credentials: HTTPAuthorizationCredentia
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        body = await request.json()
+        body = request_body.json()
         content = body.get('content', '').strip()
         conversation_id = body.get('conversation_id')
         
@@ -4061,18 +4236,24 @@ async def send_message(request: Request, credentials: HTTPAuthorizationCredentia
         db.commit()
         db.refresh(message)
         
+        message_out = {
+            "id": message.id,
+            "sender_id": message.sender_id,
+            "sender_name": user.name,
+            "conversation_id": message.conversation_id,
+            "content": message.content,
+            "is_from_admin": message.is_from_admin,
+            "is_read": message.is_read,
+            "created_at": message.created_at.isoformat()
+        }
+        push_hub.publish(
+            conversation_topics(message.conversation_id) + [f"user:{user_id}"],
+            "message",
+            {"conversation_id": message.conversation_id, "message": message_out},
+        )
         return {
             "success": True,
-            "message": {
-                "id": message.id,
-                "sender_id": message.sender_id,
-                "sender_name": user.name,
-                "conversation_id": message.conversation_id,
-                "content": message.content,
-                "is_from_admin": message.is_from_admin,
-                "is_read": message.is_read,
-                "created_at": message.created_at.isoformat()
-            }
+            "message": message_out
         }
     except HTTPException:
         raise
@@ -4080,7 +4261,7 @@ async def send_message(request: Request, credentials: HTTPAuthorizationCredentia
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/messages/conversations")
-async def get_conversations(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def get_conversations(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Get all conversations (admin only) or user's conversation"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -4092,62 +4273,50 @@ async def get_conversations(credentials: HTTPAuthorizationCredentials = Depends(
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
+        # One query over conversation_summaries (maintained on message insert
+        # and on read), joined to the last message and the conversation's user.
+        query = (
+            db.query(
+                ConversationSummary,
+                Message.content,
+                Message.is_from_admin,
+                User.id.label("conv_user_id"),
+                User.name.label("conv_user_name"),
+            )
+            .outerjoin(Message, Message.id == ConversationSummary.last_message_id)
+            .outerjoin(User, User.id == ConversationSummary.user_id)
+        )
+
         if user.role == UserRole.ADMIN:
             # Admin sees all conversations
-            conversations = db.query(Message.conversation_id).distinct().all()
-            conversation_list = []
-            
-            for (conv_id,) in conversations:
-                # Get latest message and unread count for each conversation
-                latest_msg = db.query(Message).filter(
-                    Message.conversation_id == conv_id
-                ).order_by(Message.created_at.desc()).first()
-                
-                unread_count = db.query(Message).filter(
-                    Message.conversation_id == conv_id,
-                    Message.is_from_admin == False,
-                    Message.is_read == False
-                ).count()
-                
-                # Get user info from conversation_id
-                user_id_from_conv = conv_id.replace("user_", "")
-                conv_user = db.query(User).filter(User.id == int(user_id_from_conv)).first() if user_id_from_conv.isdigit() else None
-                
-                conversation_list.append({
-                    "conversation_id": conv_id,
-                    "user_name": conv_user.name if conv_user else "Unknown",
-                    "user_id": conv_user.id if conv_user else None,
-                    "latest_message": latest_msg.content if latest_msg else "",
-                    "latest_message_time": latest_msg.created_at.isoformat() if latest_msg else None,
-                    "unread_count": unread_count,
-                    "is_from_admin": latest_msg.is_from_admin if latest_msg else False
-                })
-            
-            # Sort by latest message time
-            conversation_list.sort(key=lambda x: x['latest_message_time'] or '', reverse=True)
-            return conversation_list
+            rows = query.order_by(ConversationSummary.last_message_at.desc()).all()
+            return [
+                {
+                    "conversation_id": row.ConversationSummary.conversation_id,
+                    "user_name": row.conv_user_name if row.conv_user_id else "Unknown",
+                    "user_id": row.conv_user_id,
+                    "latest_message": row.content or "",
+                    "latest_message_time": (
+                        row.ConversationSummary.last_message_at.isoformat()
+                        if row.ConversationSummary.last_message_at else None
+                    ),
+                    "unread_count": row.ConversationSummary.unread_for_admin or 0,
+                    "is_from_admin": bool(row.is_from_admin),
+                }
+                for row in rows
+            ]
         else:
             # Regular user sees only their conversation
             conversation_id = f"user_{user_id}"
-            messages = db.query(Message).filter(
-                Message.conversation_id == conversation_id
-            ).order_by(Message.created_at.desc()).limit(1).all()
-            
-            if messages:
-                latest_msg = messages[0]
-                unread_count = db.query(Message).filter(
-                    Message.conversation_id == conversation_id,
-                    Message.is_from_admin == True,
-                    Message.is_read == False
-                ).count()
-                
+            row = query.filter(ConversationSummary.conversation_id == conversation_id).first()
+            if row and row.ConversationSummary.last_message_id:
                 return [{
                     "conversation_id": conversation_id,
                     "user_name": "Admin Support",
-                    "latest_message": latest_msg.content,
-                    "latest_message_time": latest_msg.created_at.isoformat(),
-                    "unread_count": unread_count,
-                    "is_from_admin": latest_msg.is_from_admin
+                    "latest_message": row.content,
+                    "latest_message_time": row.ConversationSummary.last_message_at.isoformat(),
+                    "unread_count": row.ConversationSummary.unread_for_user or 0,
+                    "is_from_admin": row.is_from_admin
                 }]
             return []
     except HTTPException:
@@ -4156,7 +4325,7 @@ async def get_conversations(credentials: HTTPAuthorizationCredentials = Depends(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/messages/{conversation_id}")
-async def get_messages(conversation_id: str, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def get_messages(conversation_id: str, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Get all messages in a conversation"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -4176,18 +4345,13 @@ async def get_messages(conversation_id: str, credentials: HTTPAuthorizationCrede
             Message.conversation_id == conversation_id
         ).order_by(Message.created_at.asc()).all()
         
-        # Mark messages as read
-        if user.role == UserRole.ADMIN:
-            # Admin reading user messages
-            for msg in messages:
-                if not msg.is_from_admin and not msg.is_read:
-                    msg.is_read = True
-        else:
-            # User reading admin messages
-            for msg in messages:
-                if msg.is_from_admin and not msg.is_read:
-                    msg.is_read = True
-        
+        # Mark messages as read: admins read user messages, users read
+        # admin messages.
+        reader_is_admin = user.role == UserRole.ADMIN
+        _mark_conversation_read(db, conversation_id, reader_is_admin, [
+            msg.id for msg in messages
+            if bool(msg.is_from_admin) != reader_is_admin and not msg.is_read
+        ])
         db.commit()
         
         result = []
@@ -4215,7 +4379,7 @@ async def get_messages(conversation_id: str, credentials: HTTPAuthorizationCrede
 # ============================================
 
 @app.post("/api/schedules/donations")
-async def create_donation_schedule(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def create_donation_schedule(request: Request, request_body: RequestBody = Depends(read_request_body), credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Create a recurring donation schedule"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -4227,7 +4391,7 @@ async def create_donation_schedule(request: Request, credentials: HTTPAuthorizat
         if not user or user.role != UserRole.DONOR:
             raise HTTPException(status_code=403, detail="Only donors can create donation schedules")
         
-        body = await request.json()
+        body = request_body.json()
         
         # Calculate next donation date based on frequency
         next_date = calculate_next_donation_date(
@@ -4279,7 +4443,7 @@ async def create_donation_schedule(request: Request, credentials: HTTPAuthorizat
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/schedules/donations")
-async def get_donation_schedules(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def get_donation_schedules(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Get all donation schedules for the current user"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -4318,7 +4482,7 @@ async def get_donation_schedules(credentials: HTTPAuthorizationCredentials = Dep
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/schedules/donations/{schedule_id}")
-async def update_donation_schedule(schedule_id: int, request: Request, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def update_donation_schedule(schedule_id: int, request: Request, request_body: RequestBody = Depends(read_request_body), credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Update a donation schedule"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -4330,7 +4494,7 @@ async def update_donation_schedule(schedule_id: int, request: Request, credentia
         if not schedule:
             raise HTTPException(status_code=404, detail="Schedule not found")
         
-        body = await request.json()
+        body = request_body.json()
         
         # Update fields
         if 'title' in body:
@@ -4381,7 +4545,7 @@ async def update_donation_schedule(schedule_id: int, request: Request, credentia
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/schedules/donations/{schedule_id}")
-async def delete_donation_schedule(schedule_id: int, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def delete_donation_schedule(schedule_id: int, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Delete a donation schedule"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -4403,7 +4567,7 @@ async def delete_donation_schedule(schedule_id: int, credentials: HTTPAuthorizat
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/reminders")
-async def get_reminders(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def get_reminders(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Get all pending reminders for the current user"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -4436,7 +4600,7 @@ async def get_reminders(credentials: HTTPAuthorizationCredentials = Depends(secu
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/reminders/{reminder_id}/dismiss")
-async def dismiss_reminder(reminder_id: int, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def dismiss_reminder(reminder_id: int, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Dismiss a reminder"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -4459,7 +4623,7 @@ async def dismiss_reminder(reminder_id: int, credentials: HTTPAuthorizationCrede
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/reminders/{reminder_id}/complete")
-async def complete_reminder(reminder_id: int, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def complete_reminder(reminder_id: int, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Mark a reminder as completed and update the schedule"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -4610,10 +4774,10 @@ _EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 
 
 @app.post("/api/newsletter/subscribe")
-async def newsletter_subscribe(request: Request, db: Session = Depends(get_db)):
+def newsletter_subscribe(request: Request, request_body: RequestBody = Depends(read_request_body), db: Session = Depends(get_db)):
     """Public newsletter signup. Dedupes by email (case-insensitive)."""
     try:
-        data = await request.json()
+        data = request_body.json()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON body")
 
@@ -4668,7 +4832,7 @@ async def newsletter_subscribe(request: Request, db: Session = Depends(get_db)):
 
 
 @app.get("/api/newsletter/subscribers")
-async def list_newsletter_subscribers(
+def list_newsletter_subscribers(
     active_only: bool = True,
     limit: int = 500,
     admin_user: User = Depends(verify_admin),
@@ -4699,7 +4863,7 @@ async def list_newsletter_subscribers(
 
 
 @app.delete("/api/newsletter/subscribers/{subscriber_id}")
-async def deactivate_newsletter_subscriber(
+def deactivate_newsletter_subscriber(
     subscriber_id: int,
     admin_user: User = Depends(verify_admin),
     db: Session = Depends(get_db),
@@ -4721,13 +4885,14 @@ async def deactivate_newsletter_subscriber(
 # -----------------------------
 
 @app.post("/api/feedback/submit")
-async def submit_feedback(
+def submit_feedback(
     request: Request,
+    request_body: RequestBody = Depends(read_request_body),
     db: Session = Depends(get_db)
 ):
     """Submit user feedback, error report, or feature request (auth optional)"""
     try:
-        data = await request.json()
+        data = request_body.json()
         
         # Try to get user if authenticated
         user_id = None
@@ -4775,7 +4940,7 @@ async def submit_feedback(
 
 
 @app.get("/api/feedback/list")
-async def list_feedback(
+def list_feedback(
     status: Optional[str] = None,
     type: Optional[str] = None,
     limit: int = 50,
@@ -4836,9 +5001,10 @@ async def list_feedback(
 
 
 @app.put("/api/feedback/{feedback_id}/status")
-async def update_feedback_status(
+def update_feedback_status(
     feedback_id: int,
     request: Request,
+    request_body: RequestBody = Depends(read_request_body),
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -4853,7 +5019,7 @@ async def update_feedback_status(
         if not user or user.role != UserRole.ADMIN:
             raise HTTPException(status_code=403, detail="Admin access required")
         
-        data = await request.json()
+        data = request_body.json()
         new_status = data.get("status")
         admin_notes = data.get("admin_notes")
         
@@ -4886,7 +5052,7 @@ async def update_feedback_status(
 # -----------------------------
 
 @app.get("/api/donor/impact")
-async def get_donor_impact(
+def get_donor_impact(
     timeframe: str = "all",
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -5018,7 +5184,7 @@ async def get_donor_impact(
 # =====================================================
 
 @app.get("/api/favorites")
-async def get_favorites(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def get_favorites(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Get all favorite locations for the authenticated user"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -5082,12 +5248,12 @@ async def get_favorites(credentials: HTTPAuthorizationCredentials = Depends(secu
 
 
 @app.post("/api/favorites")
-async def add_favorite(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def add_favorite(request: Request, request_body: RequestBody = Depends(read_request_body), credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Add a new favorite location for the authenticated user"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id = int(payload.get("sub"))
-        body = await request.json()
+        body = request_body.json()
 
         # Donors cannot favorite their own listings.
         if body.get('location_type') == 'donor':
@@ -5185,12 +5351,12 @@ async def add_favorite(request: Request, credentials: HTTPAuthorizationCredentia
 
 
 @app.put("/api/favorites/{favorite_id}")
-async def update_favorite(favorite_id: int, request: Request, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def update_favorite(favorite_id: int, request: Request, request_body: RequestBody = Depends(read_request_body), credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Update a favorite location (notes, tags, notifications)"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id = int(payload.get("sub"))
-        body = await request.json()
+        body = request_body.json()
         
         favorite = db.query(FavoriteLocation).filter(
             FavoriteLocation.id == favorite_id,
@@ -5240,7 +5406,7 @@ async def update_favorite(favorite_id: int, request: Request, credentials: HTTPA
 
 
 @app.post("/api/favorites/{favorite_id}/visit")
-async def record_visit(favorite_id: int, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def record_visit(favorite_id: int, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Record a visit to a favorite location"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -5278,7 +5444,7 @@ async def record_visit(favorite_id: int, credentials: HTTPAuthorizationCredentia
 
 
 @app.delete("/api/favorites/{favorite_id}")
-async def remove_favorite(favorite_id: int, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def remove_favorite(favorite_id: int, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Remove a favorite location (soft delete)"""
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -5315,9 +5481,10 @@ async def remove_favorite(favorite_id: int, credentials: HTTPAuthorizationCreden
 # =====================================================
 
 @app.put("/api/admin/users/{user_id}/trust-badges")
-async def update_user_trust_badges(
+def update_user_trust_badges(
     user_id: int,
     request: Request,
+    request_body: RequestBody = Depends(read_request_body),
     admin_user: User = Depends(verify_admin),
     db: Session = Depends(get_db)
 ):
@@ -5327,7 +5494,7 @@ async def update_user_trust_badges(
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        body = await request.json()
+        body = request_body.json()
         
         # Update trust badge fields
         if 'verified_by_aglf' in body:
@@ -5356,9 +5523,10 @@ async def update_user_trust_badges(
 
 
 @app.put("/api/admin/centers/{center_id}/trust-badges")
-async def update_center_trust_badges(
+def update_center_trust_badges(
     center_id: int,
     request: Request,
+    request_body: RequestBody = Depends(read_request_body),
     admin_user: User = Depends(verify_admin),
     db: Session = Depends(get_db)
 ):
@@ -5368,7 +5536,7 @@ async def update_center_trust_badges(
         if not center:
             raise HTTPException(status_code=404, detail="Center not found")
         
-        body = await request.json()
+        body = request_body.json()
         
         # Update trust badge fields
         if 'verified_by_aglf' in body:
@@ -5408,7 +5576,7 @@ async def update_center_trust_badges(
 
 
 @app.post("/api/users/{user_id}/activity")
-async def update_user_activity(
+def update_user_activity(
     user_id: int,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -5447,7 +5615,7 @@ async def update_user_activity(
 # ============================================================================
 
 @app.get("/api/notification-preferences")
-async def get_notification_preferences(
+def get_notification_preferences(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -5490,7 +5658,7 @@ async def get_notification_preferences(
 
 
 @app.put("/api/notification-preferences")
-async def update_notification_preferences(
+def update_notification_preferences(
     preferences: dict,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -5521,7 +5689,7 @@ async def update_notification_preferences(
 
 
 @app.get("/api/notification-behavior")
-async def get_notification_behavior(
+def get_notification_behavior(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -5560,7 +5728,7 @@ async def get_notification_behavior(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/notification-sent")
-async def track_notification_sent(
+def track_notification_sent(
     notification: dict,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -5585,7 +5753,7 @@ async def track_notification_sent(
 
 
 @app.post("/api/notification-clicked")
-async def track_notification_clicked(
+def track_notification_clicked(
     click_data: dict,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -5644,7 +5812,7 @@ async def track_notification_clicked(
 
 
 @app.get("/api/listings/recent")
-async def get_recent_listings(
+def get_recent_listings(
     minutes: int = 30,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -5657,9 +5825,9 @@ async def get_recent_listings(
         time_threshold = datetime.utcnow() - timedelta(minutes=minutes)
         
         # Get recent listings
-        listings = db.query(FoodResource).filter(
+        listings = db.query(FoodResource).options(*summary_options()).filter(
             FoodResource.created_at >= time_threshold,
-            FoodResource.available == True
+            FoodResource.status == "available"
         ).all()
         
         # Serialize listings
@@ -5690,7 +5858,7 @@ async def get_recent_listings(
 
 
 @app.get("/api/sms-consent")
-async def get_sms_consent(
+def get_sms_consent(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -5730,8 +5898,9 @@ async def get_sms_consent(
 
 
 @app.put("/api/sms-consent")
-async def update_sms_consent(
+def update_sms_consent(
     request: Request,
+    request_body: RequestBody = Depends(read_request_body),
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -5740,7 +5909,7 @@ async def update_sms_consent(
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id = int(payload.get("sub"))
         
-        consent_data = await request.json()
+        consent_data = request_body.json()
         
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
@@ -5793,6 +5962,10 @@ async def shutdown_event():
         await ai_stop_jobs()
     except Exception as _ai_exc:
         print(f"AI shutdown error: {_ai_exc}")
+    claim_release_scheduler.stop()
+    if _impact_reconcile_task is not None:
+        _impact_reconcile_task.cancel()
+    await geocoder.aclose()
 
 # Mount static files at the end to allow API routes to take precedence
 # /uploads serves user-uploaded photos (chat attachments, listing images)
@@ -0,0 +1,366 @@
+"""
+Pending claim confirmations and the claim auto-release scheduler.
+
+Claiming a listing moves it to ``pending_confirmation`` and texts the
+recipient a short code. If the code is not confirmed within
+``CONFIRMATION_TTL`` the listing goes back to ``available``.
+
+The codes used to live in a module-level dict with one ``threading.Timer``
+(one OS thread) per claim, which pinned production to a single uvicorn
+worker: a confirm request routed to another worker found no code. Now:
+
+* the codes live in a store. ``DatabaseConfirmationStore`` keeps them in
+  ``pending_claim_confirmations`` so every worker/node sees the same state
+  and a restart loses nothing; ``InMemoryConfirmationStore`` has the same
+  interface for tests and single-process dev setups.
+* expiry is handled by one ``ClaimExpiryScheduler`` thread per process. It
+  keeps a heap of known expiry times, sleeps until the earliest one and then
+  releases everything that is due in batched UPDATEs. It also sweeps on a
+  fixed interval, which picks up claims made by other workers and claims
+  that were pending when this process started.
+
+Releases are guarded on ``status == 'pending_confirmation'``, so several
+workers sweeping the same rows is harmless.
+"""
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+
+from backend.models import FoodResource, PendingClaimConfirmation
+
+CONFIRMATION_TTL = timedelta(minutes=5)
+
+# Listings released per UPDATE statement.
+RELEASE_BATCH_SIZE = 200
+
+
+class InMemoryConfirmationStore:
+    """Process-local store. Only correct with a single worker process."""
+
+    def __init__(self):
+        self._entries: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+
+    def put(self, listing_id: int, code: str, recipient_id: int, expires_at: datetime) -> None:
+        with self._lock:
+            self._entries[int(listing_id)] = {
+                "code": str(code),
+                "recipient_id": int(recipient_id),
+                "expires_at": expires_at,
+            }
+
+    def get(self, listing_id: int) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(int(listing_id))
+            return dict(entry) if entry else None
+
+    def existing(self, listing_ids: List[int]) -> Set[int]:
+        """The subset of ``listing_ids`` that have a stored code."""
+        with self._lock:
+            return {int(lid) for lid in listing_ids if int(lid) in self._entries}
+
+    def pop(self, listing_id: int) -> Optional[dict]:
+        with self._lock:
+            return self._entries.pop(int(listing_id), None)
+
+    def find(self, recipient_id: int, code: str) -> List[int]:
+        """Listing ids with a pending confirmation for this recipient and code."""
+        with self._lock:
+            return [
+                lid for lid, entry in self._entries.items()
+                if entry["recipient_id"] == recipient_id and entry["code"] == code
+            ]
+
+    def pop_expired(self, now: datetime, limit: int = RELEASE_BATCH_SIZE) -> List[int]:
+        with self._lock:
+            due = sorted(
+                (entry["expires_at"], lid)
+                for lid, entry in self._entries.items()
+                if entry["expires_at"] <= now
+            )[:limit]
+            for _, lid in due:
+                del self._entries[lid]
+            return [lid for _, lid in due]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class DatabaseConfirmationStore:
+    """Store backed by the ``pending_claim_confirmations`` table."""
+
+    def __init__(self, session_factory: Callable):
+        self._session_factory = session_factory
+
+    @staticmethod
+    def _as_dict(row: PendingClaimConfirmation) -> dict:
+        return {
+            "code": row.code,
+            "recipient_id": row.recipient_id,
+            "expires_at": row.expires_at,
+        }
+
+    def put(self, listing_id: int, code: str, recipient_id: int, expires_at: datetime) -> None:
+        db = self._session_factory()
+        try:
+            db.merge(PendingClaimConfirmation(
+                listing_id=int(listing_id),
+                code=str(code),
+                recipient_id=int(recipient_id),
+                expires_at=expires_at,
+                created_at=datetime.utcnow(),
+            ))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def get(self, listing_id: int) -> Optional[dict]:
+        db = self._session_factory()
+        try:
+            row = db.get(PendingClaimConfirmation, int(listing_id))
+            return self._as_dict(row) if row else None
+        finally:
+            db.close()
+
+    def existing(self, listing_ids: List[int]) -> Set[int]:
+        """The subset of ``listing_ids`` that have a stored code."""
+        ids = [int(lid) for lid in listing_ids]
+        found: Set[int] = set()
+        db = self._session_factory()
+        try:
+            for start in range(0, len(ids), RELEASE_BATCH_SIZE):
+                found.update(
+                    r.listing_id for r in
+                    db.query(PendingClaimConfirmation.listing_id)
+                    .filter(PendingClaimConfirmation.listing_id.in_(ids[start:start + RELEASE_BATCH_SIZE]))
+                )
+            return found
+        finally:
+            db.close()
+
+    def pop(self, listing_id: int) -> Optional[dict]:
+        db = self._session_factory()
+        try:
+            row = db.get(PendingClaimConfirmation, int(listing_id))
+            if row is None:
+                return None
+            entry = self._as_dict(row)
+            db.delete(row)
+            db.commit()
+            return entry
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def find(self, recipient_id: int, code: str) -> List[int]:
+        db = self._session_factory()
+        try:
+            rows = (
+                db.query(PendingClaimConfirmation.listing_id)
+                .filter(
+                    PendingClaimConfirmation.recipient_id == recipient_id,
+                    PendingClaimConfirmation.code == code,
+                )
+                .all()
+            )
+            return [r.listing_id for r in rows]
+        finally:
+            db.close()
+
+    def pop_expired(self, now: datetime, limit: int = RELEASE_BATCH_SIZE) -> List[int]:
+        db = self._session_factory()
+        try:
+            ids = [
+                r.listing_id for r in (
+                    db.query(PendingClaimConfirmation.listing_id)
+                    .filter(PendingClaimConfirmation.expires_at <= now)
+                    .order_by(PendingClaimConfirmation.expires_at.asc())
+                    .limit(limit)
+                    .all()
+                )
+            ]
+            if ids:
+                (
+                    db.query(PendingClaimConfirmation)
+                    .filter(
+                        PendingClaimConfirmation.listing_id.in_(ids),
+                        PendingClaimConfirmation.expires_at <= now,
+                    )
+                    .delete(synchronize_session=False)
+                )
+                db.commit()
+            return ids
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+def _release_listings(session_factory: Callable, listing_ids: List[int]) -> List[int]:
+    if not listing_ids:
+        return []
+    db = session_factory()
+    try:
+        pending = [
+            r.id for r in
+            db.query(FoodResource.id)
+            .filter(
+                FoodResource.id.in_(listing_ids),
+                FoodResource.status == "pending_confirmation",
+            )
+            .with_for_update()
+            .all()
+        ]
+        if pending:
+            db.query(FoodResource).filter(
+                FoodResource.id.in_(pending),
+                FoodResource.status == "pending_confirmation",
+            ).update(
+                {
+                    FoodResource.status: "available",
+                    FoodResource.recipient_id: None,
+                    FoodResource.claimed_at: None,
+                },
+                synchronize_session=False,
+            )
+        db.commit()
+        return pending
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def release_expired_claims(session_factory: Callable, store, now: Optional[datetime] = None,
+                           batch_size: int = RELEASE_BATCH_SIZE) -> List[int]:
+    """Release every listing whose confirmation code has expired. Returns their ids."""
+    now = now or datetime.utcnow()
+    released: List[int] = []
+    while True:
+        ids = store.pop_expired(now, batch_size)
+        released += _release_listings(session_factory, ids)
+        if len(ids) < batch_size:
+            return released
+
+
+def release_orphaned_claims(session_factory: Callable, store, now: Optional[datetime] = None) -> List[int]:
+    """Release listings stuck in 'pending_confirmation' with no code in the store.
+
+    Covers claims whose code was lost (an in-memory store across a restart,
+    a crash between the claim commit and storing the code). Only rows older
+    than ``CONFIRMATION_TTL`` are touched so an in-flight claim is never
+    released before its code is written. Returns the released ids.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - CONFIRMATION_TTL
+    db = session_factory()
+    try:
+        rows = (
+            db.query(FoodResource.id)
+            .filter(
+                FoodResource.status == "pending_confirmation",
+                (FoodResource.claimed_at == None) | (FoodResource.claimed_at <= cutoff),  # noqa: E711
+            )
+            .all()
+        )
+    finally:
+        db.close()
+    tracked = store.existing([r.id for r in rows]) if rows else set()
+    orphaned = [r.id for r in rows if r.id not in tracked]
+    released: List[int] = []
+    for start in range(0, len(orphaned), RELEASE_BATCH_SIZE):
+        released += _release_listings(session_factory, orphaned[start:start + RELEASE_BATCH_SIZE])
+    return released
+
+
+class ClaimExpiryScheduler:
+    """Single background thread that runs ``sweep(now)`` when claims expire.
+
+    ``schedule()`` pushes an expiry time onto a heap; the thread sleeps until
+    the earliest one (or ``poll_interval``, whichever comes first), drops
+    every heap entry that is due and calls ``sweep`` once for all of them.
+    Entries for claims that were confirmed in the meantime just cause a
+    no-op sweep, so nothing has to be cancelled.
+    """
+
+    def __init__(self, sweep: Callable[[datetime], object], poll_interval: float = 30.0):
+        self._sweep = sweep
+        self.poll_interval = poll_interval
+        self._heap: list = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def schedule(self, listing_id: int, expires_at: datetime) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (expires_at, int(listing_id)))
+            self._cond.notify()
+        self.start()
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._loop, name="claim-expiry", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stopping = True
+            thread = self._thread
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def _loop(self) -> None:
+        next_poll = time.monotonic() + self.poll_interval
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    now = datetime.utcnow()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    wait = next_poll - time.monotonic()
+                    if wait <= 0:
+                        break
+                    if self._heap:
+                        wait = min(wait, (self._heap[0][0] - now).total_seconds())
+                    self._cond.wait(max(wait, 0.01))
+                if self._stopping:
+                    return
+                now = datetime.utcnow()
+                while self._heap and self._heap[0][0] <= now:
+                    heapq.heappop(self._heap)
+            next_poll = time.monotonic() + self.poll_interval
+            try:
+                self._sweep(now)
+            except Exception as exc:
+                print(f"Claim auto-release sweep failed: {exc}")
+
+
+__all__ = [
+    "CONFIRMATION_TTL",
+    "RELEASE_BATCH_SIZE",
+    "InMemoryConfirmationStore",
+    "DatabaseConfirmationStore",
+    "release_expired_claims",
+    "release_orphaned_claims",
+    "ClaimExpiryScheduler",
+]
@@ -0,0 +1,614 @@
+"""
+Server-side dispatch matching: open requests -> available listings -> drivers.
+
+``AIMatching.js`` and ``AutonomousCoordinator.js`` used to "auto-assign" in
+every dispatcher's browser tab every 30-60 seconds, each with its own
+scoring and no shared view of who was already matched. ``_get_dispatch_queue``
+only listed the two sides. This module computes the pairing once per
+process and serves it to every caller:
+
+1. **Request -> listing.** Each feasible pair gets a cost in km-equivalents.
+   The base is the straight-line distance. A listing whose ``qty`` falls
+   short of the request's ``household_size`` pays up to ``SHORTFALL_KM``, and
+   a listing far larger than the household pays up to ``OVERSIZE_KM``, so
+   big donations go to big households. A pair is infeasible when the
+   categories differ (a request with no category takes anything), when the
+   two are more than ``MAX_MATCH_KM`` apart, when the listing's pickup
+   window has closed, or when the window opens after the request's
+   ``latest_by``.
+2. **Listing -> driver.** Each matched pair costs the driver's drive to the
+   listing plus the drive to the request. It is infeasible past
+   ``DRIVER_RADIUS_KM`` or when the listing's ``est_weight_kg`` exceeds what
+   is left of the driver's ``vehicle_capacity_kg`` after their current
+   pickups.
+
+Both stages are solved with ``assign()``, a Hungarian (Kuhn-Munkres) solver
+for rectangular matrices. Every row also gets a private "leave unmatched"
+column. Its price is above any feasible match and rises with the request's
+``urgency_score`` and waiting time. So when listings or drivers are scarce,
+the solver serves the most urgent requests first instead of whichever
+loaded first.
+
+``DispatchMatcher`` keeps the open requests, available listings and pair
+costs between solves. The ORM listeners installed by
+``watch_dispatch_changes`` note the rows touched by each flush and mark them
+dirty once the transaction commits; marking them at flush would let a
+concurrent solve reload the old rows and then forget they changed. The
+next ``matches()`` call reloads only those rows and recomputes only their
+pair costs, then re-solves. The dirty sets have their own small lock, so a
+flush never waits for a solve in progress. An unchanged snapshot is served from memory
+until ``ttl_seconds`` pass; the TTL bounds staleness from writes made by
+other workers, and each expiry does a full reload.
+
+Like ``backend.geo_index``, the scoring and solver know nothing about the
+ORM: they work on the plain ``RequestSnap`` / ``ListingSnap`` / ``DriverSnap``
+tuples that ``DispatchMatcher`` loads.
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.geo_index import haversine_km
+from backend.route_planner import AVG_SPEED_KMH, SERVICE_MINUTES
+
+MAX_MATCH_KM = float(os.getenv("DISPATCH_MAX_MATCH_KM", "25"))
+DRIVER_RADIUS_KM = float(os.getenv("DISPATCH_DRIVER_RADIUS_KM", "40"))
+# Requests considered per solve, most urgent first. The solver is
+# O(rows^2 * columns) in pure Python; this keeps a solve well under a second.
+MAX_REQUESTS = int(os.getenv("DISPATCH_MAX_REQUESTS", "200"))
+
+SHORTFALL_KM = 10.0
+OVERSIZE_KM = 3.0
+# Leaving a request unmatched always costs more than the worst feasible match.
+SKIP_BASE_KM = MAX_MATCH_KM + SHORTFALL_KM + OVERSIZE_KM + 1.0
+URGENCY_KM_PER_POINT = 0.5
+WAITING_KM_PER_HOUR = 0.25
+MAX_WAITING_HOURS = 72.0
+
+DRIVER_ROLES = ("driver", "volunteer")
+# Listing statuses that still occupy space in a driver's vehicle.
+ACTIVE_PICKUP_STATUSES = ("claimed", "approved", "pending", "en_route")
+
+# Stands in for "infeasible" inside the solver; any pair at or above it is dropped.
+FORBIDDEN = 1e9
+
+
+class RequestSnap(NamedTuple):
+    id: int
+    category: Optional[str]
+    household_size: int
+    lat: Optional[float]
+    lng: Optional[float]
+    urgency: int
+    latest_by: Optional[datetime]
+    created_at: Optional[datetime]
+
+
+class ListingSnap(NamedTuple):
+    id: int
+    category: Optional[str]
+    qty: float
+    weight_kg: Optional[float]
+    lat: Optional[float]
+    lng: Optional[float]
+    pickup_start: Optional[datetime]
+    pickup_by: Optional[datetime]
+
+
+class DriverSnap(NamedTuple):
+    id: int
+    lat: float
+    lng: float
+    capacity_kg: Optional[float]
+    load_kg: float
+
+
+# ---------------------------------------------------------------------------
+# Assignment solver
+# ---------------------------------------------------------------------------
+
+def assign(cost: Sequence[Sequence[float]]) -> List[Tuple[int, int]]:
+    """Minimum-cost ``(row, col)`` pairs; every row is matched if rows <= cols.
+
+    Shortest augmenting path form of the Hungarian algorithm with row/column
+    potentials, O(rows^2 * cols). A matrix with more rows than columns is
+    solved transposed, so every column is matched instead. Mark infeasible
+    cells with ``FORBIDDEN`` and drop those pairs from the result.
+    """
+    n = len(cost)
+    if n == 0 or not cost[0]:
+        return []
+    m = len(cost[0])
+    if n > m:
+        transposed = [[cost[i][j] for i in range(n)] for j in range(m)]
+        return sorted((i, j) for j, i in assign(transposed))
+
+    inf = math.inf
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    match = [0] * (m + 1)  # match[j] = 1-based row assigned to column j
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            row = cost[i0 - 1]
+            ui0 = u[i0]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if used[j]:
+                    continue
+                cur = row[j - 1] - ui0 - v[j]
+                if cur < minv[j]:
+                    minv[j] = cur
+                    way[j] = j0
+                if minv[j] < delta:
+                    delta = minv[j]
+                    j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+    return sorted((match[j] - 1, j - 1) for j in range(1, m + 1) if match[j])
+
+
+def _solve_with_skips(cost: List[List[float]], skip: Sequence[float]) -> Dict[int, int]:
+    """``{row: col}`` for rows worth matching; a row may stay unmatched at ``skip[row]``."""
+    n = len(cost)
+    if n == 0:
+        return {}
+    m = len(cost[0]) if cost else 0
+    padded = []
+    for i, row in enumerate(cost):
+        dummies = [FORBIDDEN] * n
+        dummies[i] = skip[i]
+        padded.append(list(row) + dummies)
+    return {i: j for i, j in assign(padded) if j < m and cost[i][j] < FORBIDDEN}
+
+
+# ---------------------------------------------------------------------------
+# Scoring
+# ---------------------------------------------------------------------------
+
+def _distance_km(a_lat, a_lng, b_lat, b_lng) -> Optional[float]:
+    if None in (a_lat, a_lng, b_lat, b_lng):
+        return None
+    return haversine_km(a_lat, a_lng, b_lat, b_lng)
+
+
+def pair_cost(req: RequestSnap, lst: ListingSnap) -> Optional[float]:
+    """Cost of serving ``req`` from ``lst``, or None when the pair is infeasible.
+
+    Independent of the clock, so it can be cached until either row changes;
+    ``_listing_open`` applies the time-dependent checks at solve time.
+    """
+    if req.category and lst.category and req.category != lst.category:
+        return None
+    if req.latest_by and lst.pickup_start and lst.pickup_start > req.latest_by:
+        return None
+    dist = _distance_km(req.lat, req.lng, lst.lat, lst.lng)
+    if dist is None:
+        # Ungeocoded: matchable, but only after every located candidate.
+        dist = MAX_MATCH_KM
+    elif dist > MAX_MATCH_KM:
+        return None
+    household = max(1, req.household_size or 1)
+    qty = max(0.0, lst.qty or 0.0)
+    shortfall = max(0.0, household - qty) / household
+    oversize = min(1.0, max(0.0, qty - 2 * household) / (4.0 * household))
+    return dist + shortfall * SHORTFALL_KM + oversize * OVERSIZE_KM
+
+
+def skip_cost(req: RequestSnap, now: datetime) -> float:
+    """Price of leaving ``req`` unmatched this round."""
+    waited_h = 0.0
+    if req.created_at:
+        waited_h = min(MAX_WAITING_HOURS, max(0.0, (now - req.created_at).total_seconds() / 3600.0))
+    return SKIP_BASE_KM + (req.urgency or 0) * URGENCY_KM_PER_POINT + waited_h * WAITING_KM_PER_HOUR
+
+
+def match_score(cost: float) -> int:
+    """0-100 score for display; 100 is a same-block, right-sized match."""
+    worst = MAX_MATCH_KM + SHORTFALL_KM + OVERSIZE_KM
+    return max(0, min(100, int(round(100.0 * (1.0 - cost / worst)))))
+
+
+def _listing_open(lst: ListingSnap, now: datetime) -> bool:
+    return lst.pickup_by is None or lst.pickup_by > now
+
+
+def _driver_cost(drv: DriverSnap, req: RequestSnap, lst: ListingSnap) -> Optional[Tuple[float, float, float]]:
+    """``(cost, pickup_km, delivery_km)`` for ``drv`` running ``lst`` to ``req``."""
+    pickup = _distance_km(drv.lat, drv.lng, lst.lat, lst.lng)
+    if pickup is None or pickup > DRIVER_RADIUS_KM:
+        return None
+    if drv.capacity_kg is not None and drv.capacity_kg > 0:
+        if (lst.weight_kg or 0.0) > drv.capacity_kg - drv.load_kg:
+            return None
+    delivery = _distance_km(lst.lat, lst.lng, req.lat, req.lng) or 0.0
+    return pickup + delivery, pickup, delivery
+
+
+def solve(
+    requests: Sequence[RequestSnap],
+    listings: Sequence[ListingSnap],
+    drivers: Sequence[DriverSnap],
+    now: datetime,
+    costs: Optional[Dict[Tuple[int, int], Optional[float]]] = None,
+) -> dict:
+    """Match ``requests`` to ``listings``, then drivers to the matched pairs.
+
+    ``costs`` is an optional ``{(request_id, listing_id): pair_cost}`` cache;
+    missing entries are computed (and stored back into it).
+    """
+    costs = {} if costs is None else costs
+    open_listings = [l for l in listings if _listing_open(l, now)]
+    ranked = sorted(requests, key=lambda r: (-skip_cost(r, now), r.id))[:MAX_REQUESTS]
+
+    # Drop rows and columns with no feasible partner before the O(n^3) solve.
+    feasible: Dict[Tuple[int, int], float] = {}
+    for r in ranked:
+        for l in open_listings:
+            key = (r.id, l.id)
+            if key not in costs:
+                costs[key] = pair_cost(r, l)
+            c = costs[key]
+            if c is not None:
+                feasible[key] = c
+    rows = [r for r in ranked if any((r.id, l.id) in feasible for l in open_listings)]
+    cols = [l for l in open_listings if any((r.id, l.id) in feasible for r in rows)]
+    matrix = [[feasible.get((r.id, l.id), FORBIDDEN) for l in cols] for r in rows]
+    paired = _solve_with_skips(matrix, [skip_cost(r, now) for r in rows])
+
+    matches = []
+    for i, j in sorted(paired.items(), key=lambda kv: matrix[kv[0]][kv[1]]):
+        r, l = rows[i], cols[j]
+        dist = _distance_km(r.lat, r.lng, l.lat, l.lng)
+        matches.append({
+            "request_id": r.id,
+            "listing_id": l.id,
+            "cost": round(matrix[i][j], 3),
+            "match_score": match_score(matrix[i][j]),
+            "distance_km": round(dist, 2) if dist is not None else None,
+            "driver": None,
+            "_req": r,
+            "_lst": l,
+        })
+
+    # Stage two: one pair per driver this round.
+    driver_matrix, driver_legs = [], []
+    for m in matches:
+        row, legs = [], []
+        for d in drivers:
+            priced = _driver_cost(d, m["_req"], m["_lst"])
+            row.append(priced[0] if priced else FORBIDDEN)
+            legs.append(priced)
+        driver_matrix.append(row)
+        driver_legs.append(legs)
+    assigned: Dict[int, int] = {}
+    if drivers and matches:
+        assigned = _solve_with_skips(
+            driver_matrix,
+            [2 * DRIVER_RADIUS_KM + skip_cost(m["_req"], now) for m in matches],
+        )
+    minutes_per_km = 60.0 / AVG_SPEED_KMH
+    for i, m in enumerate(matches):
+        r, l = m.pop("_req"), m.pop("_lst")
+        if i not in assigned:
+            continue
+        d = drivers[assigned[i]]
+        _, pickup, delivery = driver_legs[i][assigned[i]]
+        pickup_at = now + timedelta(minutes=pickup * minutes_per_km)
+        if l.pickup_start and pickup_at < l.pickup_start:
+            pickup_at = l.pickup_start
+        deliver_at = pickup_at + timedelta(minutes=SERVICE_MINUTES + delivery * minutes_per_km)
+        m["driver"] = {
+            "driver_id": d.id,
+            "pickup_km": round(pickup, 2),
+            "delivery_km": round(delivery, 2),
+            "estimated_pickup": pickup_at.isoformat(),
+            "estimated_delivery": deliver_at.isoformat(),
+            "late": bool(r.latest_by and deliver_at > r.latest_by),
+        }
+
+    matched_requests = {m["request_id"] for m in matches}
+    busy = {m["driver"]["driver_id"] for m in matches if m["driver"]}
+    return {
+        "matches": matches,
+        "unmatched_requests": sorted(r.id for r in requests if r.id not in matched_requests),
+        "idle_drivers": sorted(d.id for d in drivers if d.id not in busy),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Incremental matcher
+# ---------------------------------------------------------------------------
+
+def _enum_value(value) -> Optional[str]:
+    if value is None:
+        return None
+    return getattr(value, "value", value)
+
+
+def _request_snap(r) -> RequestSnap:
+    return RequestSnap(
+        id=r.id,
+        category=_enum_value(r.category),
+        household_size=r.household_size or 1,
+        lat=float(r.coords_lat) if r.coords_lat is not None else None,
+        lng=float(r.coords_lng) if r.coords_lng is not None else None,
+        urgency=r.urgency_score or 0,
+        latest_by=r.latest_by,
+        created_at=r.created_at,
+    )
+
+
+def _listing_snap(l) -> ListingSnap:
+    return ListingSnap(
+        id=l.id,
+        category=_enum_value(l.category),
+        qty=float(l.qty or 0.0),
+        weight_kg=float(l.est_weight_kg) if l.est_weight_kg is not None else None,
+        lat=float(l.coords_lat) if l.coords_lat is not None else None,
+        lng=float(l.coords_lng) if l.coords_lng is not None else None,
+        pickup_start=l.pickup_window_start,
+        pickup_by=l.pickup_window_end,
+    )
+
+
+class DispatchMatcher:
+    """Request/listing/driver matching, recomputed only for what changed."""
+
+    def __init__(self, ttl_seconds: float = 60.0):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()        # held for a whole reload + solve
+        self._dirty_lock = threading.Lock()  # guards only the dirty sets and flags
+        self._factory = None
+        self._requests: Dict[int, RequestSnap] = {}
+        self._listings: Dict[int, ListingSnap] = {}
+        self._costs: Dict[Tuple[int, int], Optional[float]] = {}
+        self._dirty_requests: Set[int] = set()
+        self._dirty_listings: Set[int] = set()
+        self._stale = True       # result must be re-solved
+        self._full_reload = True  # snapshots must be reloaded from scratch
+        self._loaded_at = 0.0
+        self._result: Optional[dict] = None
+        self.solves = 0
+        self.full_reloads = 0
+
+    def mark_dirty(self, requests: Iterable[int] = (), listings: Iterable[int] = (),
+                   drivers: bool = False, full: bool = False) -> None:
+        with self._dirty_lock:
+            self._dirty_requests.update(requests)
+            self._dirty_listings.update(listings)
+            if full:
+                self._full_reload = True
+            if full or drivers or self._dirty_requests or self._dirty_listings:
+                self._stale = True
+
+    def _take_dirty(self, force_full: bool) -> Tuple[Set[int], Set[int], bool]:
+        """Dirty ids and the full-reload flag, cleared for marks that arrive from now on."""
+        with self._dirty_lock:
+            requests, listings = self._dirty_requests, self._dirty_listings
+            full = self._full_reload or force_full
+            self._dirty_requests, self._dirty_listings = set(), set()
+            self._full_reload = False
+            self._stale = False
+            return requests, listings, full
+
+    def _restore_dirty(self, requests: Set[int], listings: Set[int], full: bool) -> None:
+        self.mark_dirty(requests, listings, drivers=True, full=full)
+
+    def matches(self, session_factory: Callable, now: Optional[datetime] = None) -> dict:
+        """Current matching; recomputed when something changed or the TTL ran out.
+
+        Concurrent callers wait on the lock and share the one recomputation.
+        """
+        with self._lock:
+            expired = time.monotonic() - self._loaded_at > self.ttl_seconds
+            if session_factory is not self._factory:
+                self._factory = session_factory
+                self.mark_dirty(full=True)
+            with self._dirty_lock:
+                fresh = not (self._stale or self._full_reload or expired)
+            if self._result is not None and fresh:
+                return self._result
+            now = now or datetime.utcnow()
+            requests, listings, full = self._take_dirty(expired)
+            db = session_factory()
+            try:
+                if full:
+                    self._reload_all(db)
+                else:
+                    self._reload_dirty(db, requests, listings)
+                drivers = self._load_drivers(db)
+            except BaseException:
+                self._restore_dirty(requests, listings, full)
+                raise
+            finally:
+                db.close()
+            result = solve(list(self._requests.values()), list(self._listings.values()), drivers, now, self._costs)
+            result["computed_at"] = now.isoformat()
+            result["stats"] = {
+                "open_requests": len(self._requests),
+                "available_listings": len(self._listings),
+                "drivers": len(drivers),
+                "cached_pairs": len(self._costs),
+                "solves": self.solves + 1,
+                "full_reloads": self.full_reloads,
+            }
+            self.solves += 1
+            self._result = result
+            return result
+
+    # -- loading -----------------------------------------------------------
+
+    @staticmethod
+    def _request_query(db):
+        from backend.models import FoodRequest
+        return db.query(FoodRequest).filter(FoodRequest.status == "open")
+
+    @staticmethod
+    def _listing_query(db):
+        from backend.models import FoodResource
+        return (
+            db.query(FoodResource)
+            .filter(FoodResource.status == "available")
+            .filter(FoodResource.recipient_id.is_(None))
+        )
+
+    def _reload_all(self, db) -> None:
+        self._requests = {r.id: _request_snap(r) for r in self._request_query(db)}
+        self._listings = {l.id: _listing_snap(l) for l in self._listing_query(db)}
+        self._costs = {}
+        self._loaded_at = time.monotonic()
+        self.full_reloads += 1
+
+    def _reload_dirty(self, db, requests: Set[int], listings: Set[int]) -> None:
+        from backend.models import FoodRequest, FoodResource
+
+        if requests:
+            ids = list(requests)
+            fresh = {r.id: _request_snap(r) for r in self._request_query(db).filter(FoodRequest.id.in_(ids))}
+            for rid in ids:
+                self._requests.pop(rid, None)
+                if rid in fresh:
+                    self._requests[rid] = fresh[rid]
+            self._costs = {k: c for k, c in self._costs.items() if k[0] not in requests}
+        if listings:
+            ids = list(listings)
+            fresh = {l.id: _listing_snap(l) for l in self._listing_query(db).filter(FoodResource.id.in_(ids))}
+            for lid in ids:
+                self._listings.pop(lid, None)
+                if lid in fresh:
+                    self._listings[lid] = fresh[lid]
+            self._costs = {k: c for k, c in self._costs.items() if k[1] not in listings}
+
+    @staticmethod
+    def _load_drivers(db) -> List[DriverSnap]:
+        from sqlalchemy import func
+        from backend.models import FoodResource, User, UserRole
+
+        roles = [UserRole(r) for r in DRIVER_ROLES]
+        loads = dict(
+            db.query(FoodResource.recipient_id, func.coalesce(func.sum(FoodResource.est_weight_kg), 0.0))
+            .filter(FoodResource.status.in_(ACTIVE_PICKUP_STATUSES))
+            .filter(FoodResource.recipient_id.isnot(None))
+            .group_by(FoodResource.recipient_id)
+            .all()
+        )
+        rows = (
+            db.query(User.id, User.coords_lat, User.coords_lng, User.vehicle_capacity_kg)
+            .filter(User.role.in_(roles))
+            .filter(User.coords_lat.isnot(None), User.coords_lng.isnot(None))
+            .order_by(User.id)
+            .all()
+        )
+        return [
+            DriverSnap(u.id, float(u.coords_lat), float(u.coords_lng), u.vehicle_capacity_kg,
+                       float(loads.get(u.id) or 0.0))
+            for u in rows
+        ]
+
+
+# User columns that change what ``_load_drivers`` returns.
+DRIVER_FIELDS = ("role", "coords_lat", "coords_lng", "vehicle_capacity_kg")
+_PENDING_KEY = "dispatch_dirty"
+
+
+def _driver_changed(obj, new: bool) -> bool:
+    from sqlalchemy import inspect as sa_inspect
+
+    if new:
+        return _enum_value(obj.role) in DRIVER_ROLES
+    state = sa_inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in DRIVER_FIELDS)
+
+
+def watch_dispatch_changes(matcher: DispatchMatcher, request_model, listing_model, user_model=None) -> None:
+    """Mark rows dirty in ``matcher`` when a transaction that touched them commits.
+
+    Flushes and bulk statements only record what they touched in
+    ``session.info``; ``after_commit`` hands it to ``mark_dirty`` and a
+    rollback drops it. Bulk statements force a full reload.
+    """
+
+    def _pending(session) -> dict:
+        return session.info.setdefault(
+            _PENDING_KEY, {"requests": set(), "listings": set(), "drivers": False, "full": False})
+
+    def _after_flush(session, flush_context):
+        requests, listings, drivers = set(), set(), False
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, request_model) and obj.id is not None:
+                requests.add(obj.id)
+            elif isinstance(obj, listing_model) and obj.id is not None:
+                listings.add(obj.id)
+            elif user_model is not None and isinstance(obj, user_model) and not drivers:
+                drivers = obj in session.deleted or _driver_changed(obj, obj in session.new)
+        if requests or listings or drivers:
+            pending = _pending(session)
+            pending["requests"] |= requests
+            pending["listings"] |= listings
+            # A listing write can change a driver's load too.
+            pending["drivers"] = pending["drivers"] or drivers or bool(listings)
+
+    def _after_bulk(context):
+        mapper = getattr(context, "mapper", None)
+        if mapper is not None and mapper.class_ in (request_model, listing_model, user_model):
+            _pending(context.session)["full"] = True
+
+    def _after_commit(session):
+        pending = session.info.pop(_PENDING_KEY, None)
+        if pending:
+            matcher.mark_dirty(pending["requests"], pending["listings"],
+                               drivers=pending["drivers"], full=pending["full"])
+
+    def _after_rollback(session):
+        session.info.pop(_PENDING_KEY, None)
+
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "after_bulk_update", _after_bulk)
+    event.listen(Session, "after_bulk_delete", _after_bulk)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+
+
+dispatch_matcher = DispatchMatcher(ttl_seconds=float(os.getenv("DISPATCH_MATCH_TTL_SECONDS", "60")))
+
+
+__all__ = [
+    "RequestSnap",
+    "ListingSnap",
+    "DriverSnap",
+    "assign",
+    "pair_cost",
+    "skip_cost",
+    "match_score",
+    "solve",
+    "DispatchMatcher",
+    "watch_dispatch_changes",
+    "dispatch_matcher",
+]
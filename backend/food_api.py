@@ -3,7 +3,6 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 import os
-import httpx
 from backend.models import FoodResource, ConsumptionLog
 from backend.schemas import FoodResourceCreate, FoodResourceResponse, ConsumptionLogCreate, ConsumptionLogResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -11,6 +10,7 @@ from backend.aws_secrets import load_aws_secrets
 from dotenv import load_dotenv
 import jwt
 from backend.db import get_db
+from backend.geocoding import geocoder
 
 load_aws_secrets()
 load_dotenv()
@@ -53,29 +53,12 @@ async def create_food_resource(
         coords_lng=resource_data.coords_lng,
         images=str(resource_data.images) if resource_data.images else None
     )
-    # If coords are not provided, attempt server-side geocoding using Mapbox
+    # If coords are not provided, attempt server-side geocoding
     try:
         if (db_resource.coords_lat is None or db_resource.coords_lng is None) and db_resource.address:
-            MAPBOX_TOKEN = os.getenv("MAPBOX_TOKEN")
-            if MAPBOX_TOKEN:
-                # Call Mapbox Geocoding API
-                from urllib.parse import quote as urlquote
-                geocode_url = "https://api.mapbox.com/geocoding/v5/mapbox.places/{}.json".format(urlquote(db_resource.address))
-                params = {"access_token": MAPBOX_TOKEN, "limit": 1}
-                with httpx.Client(timeout=10.0) as client:
-                    resp = client.get(geocode_url, params=params)
-                    if resp.status_code == 200:
-                        data = resp.json()
-                        features = data.get("features") or []
-                        if len(features) > 0:
-                            center = features[0].get("center")
-                            if center and len(center) >= 2:
-                                # Mapbox returns [lng, lat]
-                                db_resource.coords_lng = float(center[0])
-                                db_resource.coords_lat = float(center[1])
-            else:
-                # No MAPBOX token provided; skip geocoding
-                pass
+            coords = await geocoder.geocode(db_resource.address)
+            if coords is not None:
+                db_resource.coords_lat, db_resource.coords_lng = coords
     except Exception as e:
         # Don't fail the whole request if geocoding errors; log and continue
         try:
@@ -0,0 +1,344 @@
+"""
+Geohash spatial index for food listings.
+
+Every ``FoodResource`` row carries a ``geohash`` string computed from its
+``coords_lat`` / ``coords_lng`` (see the ORM listeners in
+``backend/models.py``). A geohash prefix is a rectangular grid cell, and
+all points inside a cell share that prefix, so "listings near X" becomes a
+handful of indexed string range scans on ``geohash`` instead of
+loading the newest few hundred rows and running haversine over each of
+them in Python.
+
+The column lives on the row itself rather than in an in-process tree, so it
+stays correct across uvicorn workers and through every write path (REST,
+AI tools, bulk import) without any explicit cache invalidation.
+
+This module is deliberately model-agnostic: the query helpers take the
+mapped class as an argument so ``backend.models`` can import the encoder
+without an import cycle.
+"""
+from __future__ import annotations
+
+import math
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy import and_, or_, select
+
+EARTH_RADIUS_KM = 6371.0
+
+# Stored precision. 9 characters is a ~5m x 5m cell, far finer than any
+# query needs; queries use shorter prefixes of it.
+GEOHASH_PRECISION = 9
+
+# Upper bound on the number of prefix ranges one query may expand into.
+# Larger bounding boxes fall back to coarser (shorter) prefixes.
+MAX_COVER_CELLS = 16
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {ch: i for i, ch in enumerate(_BASE32)}
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    d_lat = math.radians(lat2 - lat1)
+    d_lon = math.radians(lon2 - lon1)
+    a = (
+        math.sin(d_lat / 2) ** 2
+        + math.cos(math.radians(lat1))
+        * math.cos(math.radians(lat2))
+        * math.sin(d_lon / 2) ** 2
+    )
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _normalize_lng(lng: float) -> float:
+    lng = ((lng + 180.0) % 360.0) - 180.0
+    # % maps +180 to -180; both are the same meridian, keep it stable.
+    return lng
+
+
+def encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode a coordinate as a geohash string of ``precision`` characters."""
+    lat = max(-90.0, min(90.0, float(lat)))
+    lng = _normalize_lng(float(lng))
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # geohash interleaves bits starting with longitude
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_lo = mid
+            else:
+                bits <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_lo = mid
+            else:
+                bits <<= 1
+                lat_hi = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def encode_or_none(lat: Optional[float], lng: Optional[float]) -> Optional[str]:
+    """``encode`` for nullable columns; returns None when either coord is missing or invalid."""
+    if lat is None or lng is None:
+        return None
+    try:
+        lat_f, lng_f = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(lat_f) or math.isnan(lng_f) or not -90.0 <= lat_f <= 90.0:
+        return None
+    return encode(lat_f, lng_f)
+
+
+def cell_size_deg(precision: int) -> tuple[float, float]:
+    """(lat_degrees, lng_degrees) spanned by one cell at ``precision``."""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> tuple[float, float, float, float]:
+    """Return ``(min_lat, min_lng, max_lat, max_lng)`` enclosing a radius around a point.
+
+    Longitude bounds are not normalized, so a box crossing the antimeridian
+    has ``min_lng < -180`` or ``max_lng > 180``; ``covering_prefixes`` and
+    ``bbox_filter`` both handle that.
+    """
+    radius_km = max(0.0, float(radius_km))
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat = max(-90.0, lat - d_lat)
+    max_lat = min(90.0, lat + d_lat)
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat < 1e-6 or radius_km >= EARTH_RADIUS_KM * math.pi / 2:
+        return min_lat, -180.0, max_lat, 180.0
+    d_lng = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat))
+    if d_lng >= 180.0:
+        return min_lat, -180.0, max_lat, 180.0
+    return min_lat, lng - d_lng, max_lat, lng + d_lng
+
+
+def _steps(lo: float, hi: float, step: float) -> list[float]:
+    n = int(math.floor((hi - lo) / step)) + 1
+    values = [lo + i * step for i in range(n)]
+    values.append(hi)
+    return values
+
+
+def covering_prefixes(
+    min_lat: float,
+    min_lng: float,
+    max_lat: float,
+    max_lng: float,
+    max_cells: int = MAX_COVER_CELLS,
+) -> list[str]:
+    """Geohash prefixes whose cells together cover the bounding box.
+
+    Picks the longest prefix length whose cover stays within ``max_cells``
+    cells, so small boxes get tight cells and huge ones degrade to a few
+    coarse ranges rather than hundreds of tiny ones. Returns ``[""]``
+    (match everything) only for boxes spanning most of the globe.
+    """
+    if max_lng - min_lng >= 360.0:
+        min_lng, max_lng = -180.0, 180.0
+    span_lat = max(0.0, max_lat - min_lat)
+    span_lng = max(0.0, max_lng - min_lng)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cell_lat, cell_lng = cell_size_deg(precision)
+        est = (math.floor(span_lat / cell_lat) + 2) * (math.floor(span_lng / cell_lng) + 2)
+        if est > max_cells * 2:
+            continue
+        cells = {
+            encode(la, ln, precision)
+            for la in _steps(min_lat, max_lat, cell_lat)
+            for ln in _steps(min_lng, max_lng, cell_lng)
+        }
+        if len(cells) <= max_cells:
+            return sorted(cells)
+    return [""]
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest geohash string that sorts after every string starting with ``prefix``.
+
+    Uses the geohash alphabet rather than a sentinel like ``'~'`` so the
+    range stays correct under non-C collations (MySQL/Postgres defaults),
+    where punctuation does not necessarily sort after letters.
+    Returns None when the prefix is all ``z`` (no upper bound needed).
+    """
+    chars = list(prefix)
+    while chars:
+        idx = _BASE32_INDEX[chars[-1]]
+        if idx + 1 < len(_BASE32):
+            chars[-1] = _BASE32[idx + 1]
+            return "".join(chars)
+        chars.pop()
+    return None
+
+
+def bbox_filter(model, min_lat: float, min_lng: float, max_lat: float, max_lng: float):
+    """SQLAlchemy criterion selecting ``model`` rows inside the bounding box.
+
+    Combines the geohash prefix ranges (index-backed) with an exact
+    coordinate check so cell edges never leak rows outside the box.
+    ``model`` must expose ``id``, ``geohash``, ``coords_lat`` and ``coords_lng``.
+    """
+    prefixes = covering_prefixes(min_lat, min_lng, max_lat, max_lng)
+    ranges = []
+    for prefix in prefixes:
+        if not prefix:
+            ranges = []
+            break
+        upper = _prefix_upper_bound(prefix)
+        if upper is None:
+            ranges.append(model.geohash >= prefix)
+        else:
+            ranges.append(and_(model.geohash >= prefix, model.geohash < upper))
+
+    if max_lng - min_lng >= 360.0:
+        lng_clause = model.coords_lng.isnot(None)
+    elif min_lng < -180.0:
+        lng_clause = or_(model.coords_lng >= min_lng + 360.0, model.coords_lng <= max_lng)
+    elif max_lng > 180.0:
+        lng_clause = or_(model.coords_lng >= min_lng, model.coords_lng <= max_lng - 360.0)
+    else:
+        lng_clause = model.coords_lng.between(min_lng, max_lng)
+
+    clauses = [model.coords_lat.between(min_lat, max_lat), lng_clause]
+    if not ranges:
+        return and_(model.geohash.isnot(None), *clauses)
+    # Matched through ``id IN (...)``: with the ranges inline, a query that
+    # also orders by created_at lets the planner walk the created_at index
+    # over the whole table to skip the sort. The subquery has no ORDER BY,
+    # so its ranges are answered from ix_food_resources_geohash and only
+    # the candidates in the box are sorted.
+    return model.id.in_(select(model.id).where(or_(*ranges), *clauses))
+
+
+def radius_filter(model, lat: float, lng: float, radius_km: float):
+    """``bbox_filter`` for the box enclosing ``radius_km`` around a point.
+
+    The box is a superset of the circle; pair with ``within_radius`` to
+    drop the corners.
+    """
+    return bbox_filter(model, *bounding_box(lat, lng, radius_km))
+
+
+def within_radius(rows: Iterable, lat: float, lng: float, radius_km: float) -> list[tuple]:
+    """Exact haversine pass over candidate rows.
+
+    Returns ``(row, distance_km)`` pairs within ``radius_km``, nearest first.
+    Rows without coordinates are skipped.
+    """
+    out = []
+    for row in rows:
+        r_lat, r_lng = getattr(row, "coords_lat", None), getattr(row, "coords_lng", None)
+        if r_lat is None or r_lng is None:
+            continue
+        dist = haversine_km(lat, lng, float(r_lat), float(r_lng))
+        if dist <= radius_km:
+            out.append((row, dist))
+    out.sort(key=lambda pair: pair[1])
+    return out
+
+
+def take_within_radius(query, lat: float, lng: float, radius_km: float, limit: int, chunk_size: int = 200) -> list[tuple]:
+    """Collect up to ``limit`` ``(row, distance_km)`` pairs from an ordered query.
+
+    ``query`` should already carry ``radius_filter`` and an ORDER BY. The box
+    corners lie outside the circle, so a plain LIMIT could come back short
+    even though matching rows exist further down; this pages through the
+    candidates until ``limit`` rows survive the exact distance check.
+    Results keep the query's order.
+    """
+    out: list[tuple] = []
+    offset = 0
+    chunk_size = max(chunk_size, limit)
+    while len(out) < limit:
+        rows = query.offset(offset).limit(chunk_size).all()
+        if not rows:
+            break
+        for row in rows:
+            r_lat, r_lng = getattr(row, "coords_lat", None), getattr(row, "coords_lng", None)
+            if r_lat is None or r_lng is None:
+                continue
+            dist = haversine_km(lat, lng, float(r_lat), float(r_lng))
+            if dist <= radius_km:
+                out.append((row, dist))
+                if len(out) >= limit:
+                    break
+        if len(rows) < chunk_size:
+            break
+        offset += chunk_size
+    return out
+
+
+def backfill_geohashes(session_factory, model, batch_size: int = 500) -> int:
+    """Populate ``geohash`` for rows that have coordinates but no hash yet.
+
+    Rows written before the column existed (or by raw SQL that bypassed the
+    ORM listeners) are picked up here. Runs in batches, committing each one,
+    so it is safe to call on every startup. Returns the number of rows updated.
+    """
+    updated = 0
+    last_id = 0
+    db = session_factory()
+    try:
+        while True:
+            batch: Sequence = (
+                db.query(model.id, model.coords_lat, model.coords_lng)
+                .filter(
+                    model.id > last_id,
+                    model.geohash.is_(None),
+                    model.coords_lat.isnot(None),
+                    model.coords_lng.isnot(None),
+                )
+                .order_by(model.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+            for row_id, lat, lng in batch:
+                gh = encode_or_none(lat, lng)
+                if gh is not None:
+                    db.query(model).filter(model.id == row_id).update(
+                        {model.geohash: gh}, synchronize_session=False
+                    )
+                    updated += 1
+            db.commit()
+            last_id = batch[-1][0]
+    finally:
+        db.close()
+    return updated
+
+
+__all__ = [
+    "GEOHASH_PRECISION",
+    "haversine_km",
+    "encode",
+    "encode_or_none",
+    "bounding_box",
+    "covering_prefixes",
+    "bbox_filter",
+    "radius_filter",
+    "within_radius",
+    "take_within_radius",
+    "backfill_geohashes",
+]
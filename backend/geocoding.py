@@ -0,0 +1,386 @@
+"""
+Shared forward geocoder with a two-level address cache.
+
+Listing creation (``/api/listings/create``, ``PUT /api/listings/get/{id}``,
+``POST /food/resources``) and the AI tools used to each carry their own
+copy of the Mapbox call, opening a fresh synchronous ``httpx.Client`` per
+lookup and caching nothing, even though donors post from the same handful
+of addresses over and over. Everything now goes through ``geocoder``:
+
+* addresses are normalized (case, whitespace, comma spacing) and looked up
+  in a process-local LRU, then in the ``geocode_cache`` table, which every
+  worker shares and which survives restarts. Hits are kept for
+  ``GEOCODE_TTL``; addresses the provider could not place are remembered
+  for the shorter ``GEOCODE_MISS_TTL``. Provider errors are never cached.
+* identical lookups that are already in flight are coalesced onto one
+  provider request.
+* provider I/O is async. Sync handlers call ``geocode_blocking()``, which
+  runs the lookup on the application event loop (bound at startup with
+  ``attach()``) so they share its cache, coalescing and HTTP connections.
+* the provider is pluggable. ``MapboxProvider`` is the production one;
+  ``StaticProvider`` answers from a dict, for tests and offline setups.
+
+With no Mapbox token configured, lookups return ``None`` without touching
+the cache, as before.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import quote as urlquote
+
+import httpx
+
+logger = logging.getLogger("geocoding")
+
+GEOCODE_TTL = timedelta(days=int(os.getenv("GEOCODE_CACHE_TTL_DAYS", "30")))
+GEOCODE_MISS_TTL = timedelta(hours=int(os.getenv("GEOCODE_MISS_TTL_HOURS", "24")))
+# Normalized addresses held in the per-process LRU.
+GEOCODE_LRU_SIZE = int(os.getenv("GEOCODE_LRU_SIZE", "2048"))
+# Seconds a sync caller waits for a lookup on the event loop.
+GEOCODE_TIMEOUT = 15.0
+
+MAPBOX_GEOCODE_URL = "https://api.mapbox.com/geocoding/v5/mapbox.places/{}.json"
+
+# Place types too coarse to pin a pickup on a delivery map.
+_COARSE_PLACE_TYPES = frozenset({"country", "region"})
+# Below this Mapbox relevance a hit is a guess, not a match.
+MIN_STRICT_RELEVANCE = 0.5
+
+_MISSING = object()
+
+
+class GeocodeHit(NamedTuple):
+    lat: float
+    lng: float
+    relevance: float = 1.0
+    place_types: Tuple[str, ...] = ()
+
+    def is_precise(self) -> bool:
+        """False for low-relevance matches and country/region centroids."""
+        if self.relevance < MIN_STRICT_RELEVANCE:
+            return False
+        return not (self.place_types and set(self.place_types) <= _COARSE_PLACE_TYPES)
+
+
+def normalize_address(address: Optional[str]) -> str:
+    """Cache key form of an address: casefolded, single-spaced, ', '-separated."""
+    text = (address or "").casefold()
+    text = re.sub(r"\s*,\s*", ", ", text)
+    text = " ".join(text.split())
+    return text.strip(" ,.;")
+
+
+def _cache_key(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Providers
+# ---------------------------------------------------------------------------
+
+class StaticProvider:
+    """Answers from a fixed ``{address: (lat, lng)}`` map; counts its calls."""
+
+    name = "static"
+
+    def __init__(self, places: Optional[Dict[str, Tuple[float, float]]] = None, delay: float = 0.0):
+        self.places = {normalize_address(k): v for k, v in (places or {}).items()}
+        self.delay = delay
+        self.calls = 0
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    async def forward(self, address: str) -> Optional[GeocodeHit]:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        place = self.places.get(normalize_address(address))
+        return GeocodeHit(float(place[0]), float(place[1])) if place else None
+
+    async def aclose(self) -> None:
+        pass
+
+
+class MapboxProvider:
+    """Mapbox forward geocoding over a shared ``httpx.AsyncClient``.
+
+    The token is read from the environment on each call unless given, so
+    secrets loaded after import (dotenv, AWS) are picked up.
+    """
+
+    name = "mapbox"
+
+    def __init__(self, token: Optional[str] = None, timeout: float = 10.0, attempts: int = 2):
+        self._token = token
+        self.timeout = timeout
+        self.attempts = attempts
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def token(self) -> str:
+        return self._token or os.getenv("MAPBOX_TOKEN") or os.getenv("VITE_MAPBOX_TOKEN", "")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token)
+
+    async def forward(self, address: str) -> Optional[GeocodeHit]:
+        """Best feature for ``address``, ``None`` when Mapbox has no match.
+
+        Raises on transport errors and non-200 responses (after retrying),
+        so a Mapbox outage is not cached as "address not found".
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            # Sync callers outside the application loop get a one-off client.
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                return await self._forward(client, address)
+        return await self._forward(self._client, address)
+
+    async def _forward(self, client: httpx.AsyncClient, address: str) -> Optional[GeocodeHit]:
+        url = MAPBOX_GEOCODE_URL.format(urlquote(address))
+        last_exc: Exception = RuntimeError("no attempts")
+        for _ in range(max(1, self.attempts)):
+            try:
+                resp = await client.get(url, params={"access_token": self.token, "limit": 1})
+                if resp.status_code != 200:
+                    last_exc = RuntimeError(f"mapbox status {resp.status_code}")
+                    continue
+                features = (resp.json() or {}).get("features") or []
+            except Exception as exc:
+                last_exc = exc
+                continue
+            if not features:
+                return None
+            feat = features[0]
+            center = feat.get("center")
+            if not center or len(center) < 2:
+                return None
+            # Mapbox returns [lng, lat]
+            return GeocodeHit(
+                float(center[1]), float(center[0]),
+                float(feat.get("relevance") or 0),
+                tuple(feat.get("place_type") or ()),
+            )
+        raise last_exc
+
+    def open(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        self._client_loop = loop
+
+    async def aclose(self) -> None:
+        client, self._client, self._client_loop = self._client, None, None
+        if client is not None:
+            await client.aclose()
+
+
+# ---------------------------------------------------------------------------
+# Geocoder
+# ---------------------------------------------------------------------------
+
+def _default_session_factory():
+    from backend.db import SessionLocal
+    return SessionLocal()
+
+
+class Geocoder:
+    """Cached, coalescing front end for a geocoding provider."""
+
+    def __init__(
+        self,
+        provider,
+        session_factory: Optional[Callable] = _default_session_factory,
+        maxsize: int = GEOCODE_LRU_SIZE,
+        ttl: timedelta = GEOCODE_TTL,
+        miss_ttl: timedelta = GEOCODE_MISS_TTL,
+    ):
+        self.provider = provider
+        self.session_factory = session_factory
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self._lru: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"memory_hits": 0, "db_hits": 0, "provider_calls": 0, "coalesced": 0, "errors": 0}
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Run sync callers' lookups on ``loop`` (the application loop)."""
+        self._loop = loop
+        if hasattr(self.provider, "open"):
+            self.provider.open(loop)
+
+    async def aclose(self) -> None:
+        self._loop = None
+        await self.provider.aclose()
+
+    # -- lookups -----------------------------------------------------------
+
+    async def geocode(self, address: Optional[str], strict: bool = False) -> Optional[Tuple[float, float]]:
+        """``(lat, lng)`` for ``address`` or ``None``.
+
+        ``strict`` also rejects low-relevance and country/region matches.
+        """
+        hit = await self.lookup(address)
+        if hit is None or (strict and not hit.is_precise()):
+            return None
+        return hit.lat, hit.lng
+
+    def geocode_blocking(self, address: Optional[str], strict: bool = False,
+                         timeout: float = GEOCODE_TIMEOUT) -> Optional[Tuple[float, float]]:
+        """``geocode()`` for sync code running off the event loop."""
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                raise RuntimeError("geocode_blocking() called on the event loop; await geocode() instead")
+            future = asyncio.run_coroutine_threadsafe(self.geocode(address, strict), loop)
+            return future.result(timeout)
+        return asyncio.run(self.geocode(address, strict))
+
+    async def lookup(self, address: Optional[str]) -> Optional[GeocodeHit]:
+        """Cached provider result for ``address``; ``None`` for a miss or an error."""
+        normalized = normalize_address(address)
+        if not normalized or not self.provider.enabled:
+            return None
+        key = _cache_key(normalized)
+        cached = self._memory_get(key)
+        if cached is not _MISSING:
+            self.stats["memory_hits"] += 1
+            return cached
+
+        loop = asyncio.get_running_loop()
+        slot = (loop, key)
+        pending = self._inflight.get(slot)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        future = loop.create_future()
+        self._inflight[slot] = future
+        hit = None
+        try:
+            hit = await self._resolve(key, normalized)
+        finally:
+            self._inflight.pop(slot, None)
+            future.set_result(hit)
+        return hit
+
+    async def _resolve(self, key: str, normalized: str) -> Optional[GeocodeHit]:
+        loop = asyncio.get_running_loop()
+        if self.session_factory is not None:
+            stored = await loop.run_in_executor(None, self._db_get, key)
+            if stored is not _MISSING:
+                self.stats["db_hits"] += 1
+                hit, expires_at = stored
+                self._memory_put(key, hit, expires_at)
+                return hit
+
+        self.stats["provider_calls"] += 1
+        try:
+            hit = await self.provider.forward(normalized)
+        except Exception as exc:
+            self.stats["errors"] += 1
+            logger.warning("Geocode failed for %r: %s", normalized, exc)
+            return None
+
+        expires_at = datetime.utcnow() + (self.ttl if hit is not None else self.miss_ttl)
+        self._memory_put(key, hit, expires_at)
+        if self.session_factory is not None:
+            await loop.run_in_executor(None, self._db_put, key, normalized, hit, expires_at)
+        return hit
+
+    # -- memory tier -------------------------------------------------------
+
+    def _memory_get(self, key: str):
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is None:
+                return _MISSING
+            hit, expires_at = entry
+            if expires_at <= datetime.utcnow():
+                del self._lru[key]
+                return _MISSING
+            self._lru.move_to_end(key)
+            return hit
+
+    def _memory_put(self, key: str, hit: Optional[GeocodeHit], expires_at: datetime) -> None:
+        with self._lock:
+            self._lru[key] = (hit, expires_at)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._lru.clear()
+
+    # -- database tier -----------------------------------------------------
+
+    def _db_get(self, key: str):
+        from backend.models import GeocodeCacheEntry
+
+        try:
+            db = self.session_factory()
+        except Exception as exc:
+            logger.warning("Geocode cache unavailable: %s", exc)
+            return _MISSING
+        try:
+            row = db.get(GeocodeCacheEntry, key)
+            if row is None or row.expires_at <= datetime.utcnow():
+                return _MISSING
+            if row.lat is None or row.lng is None:
+                return None, row.expires_at
+            types = tuple(t for t in (row.place_types or "").split(",") if t)
+            return GeocodeHit(row.lat, row.lng, row.relevance if row.relevance is not None else 1.0, types), row.expires_at
+        except Exception as exc:
+            logger.warning("Geocode cache read failed: %s", exc)
+            return _MISSING
+        finally:
+            db.close()
+
+    def _db_put(self, key: str, normalized: str, hit: Optional[GeocodeHit], expires_at: datetime) -> None:
+        from backend.models import GeocodeCacheEntry
+
+        try:
+            db = self.session_factory()
+        except Exception as exc:
+            logger.warning("Geocode cache unavailable: %s", exc)
+            return
+        try:
+            db.merge(GeocodeCacheEntry(
+                key=key,
+                address=normalized[:512],
+                lat=hit.lat if hit else None,
+                lng=hit.lng if hit else None,
+                relevance=hit.relevance if hit else None,
+                place_types=",".join(hit.place_types)[:128] if hit else None,
+                provider=getattr(self.provider, "name", None),
+                expires_at=expires_at,
+            ))
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.warning("Geocode cache write failed: %s", exc)
+        finally:
+            db.close()
+
+
+geocoder = Geocoder(MapboxProvider())
@@ -0,0 +1,318 @@
+"""
+Running impact totals for ``/api/public/stats``.
+
+The landing page asks for three numbers on every visit: pounds donated,
+families helped and claimed listings. The endpoint used to work them out
+with ``SUM`` / ``COUNT(DISTINCT recipient_id)`` over every claimed listing
+each time it was hit, so its cost grew with the whole claim history.
+
+Now the numbers live in one ``impact_totals`` row, moved by small deltas in
+the same transaction as the listing change that causes them:
+
+* ORM writes to a ``FoodResource`` (edits, verify-after, deletes, seeding)
+  are caught by the mapper listeners in ``backend/models.py``. Before the
+  row is written they compare the listing's contribution before and after
+  the flush and apply the difference with ``apply_change``.
+* The atomic ``query.update()`` calls that confirm or cancel a claim skip
+  those listeners. The code next to each one calls ``listing_claimed`` or
+  ``listing_unclaimed`` itself.
+
+"Families helped" is a distinct count, so it cannot be kept as a plain
+counter. ``impact_recipients`` holds one row per recipient with at least one
+claimed listing. The family counter goes up when a recipient's row is
+created and down when their count drops to zero and the row is removed.
+
+``updated_at`` (the newest claim) only moves forward between reconciles;
+releasing the newest claim leaves it in place until the next one.
+
+If the totals row does not exist yet, deltas are skipped. ``reconcile()``
+creates it by recomputing everything from ``food_resources``. It runs at
+startup and every ``IMPACT_RECONCILE_INTERVAL_S`` seconds (default 15
+minutes). That also repairs drift from writes that bypass both paths, such
+as raw SQL or a cancel that races another write between its SELECT and
+UPDATE.
+
+Each worker keeps the response in a ``PublicStatsCache``. A cached value is
+fresh for ``IMPACT_STATS_FRESH_S`` seconds. For ``IMPACT_STATS_STALE_S``
+seconds after that it is still served, while one background thread reloads
+it. A request therefore costs one primary-key read at most, and usually no
+query at all.
+
+Like ``backend.geo_index``, this module does not import ``backend.models``
+at import time, so the listeners in ``backend.models`` can import it.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy import case, func, select
+
+TOTALS_KEY = "public"
+POUND_UNITS = ("lb", "lbs", "pound", "pounds")
+KG_TO_LBS = 2.20462
+
+IMPACT_STATS_FRESH_S = float(os.getenv("IMPACT_STATS_FRESH_S", "60"))
+IMPACT_STATS_STALE_S = float(os.getenv("IMPACT_STATS_STALE_S", "600"))
+IMPACT_RECONCILE_INTERVAL_S = float(os.getenv("IMPACT_RECONCILE_INTERVAL_S", "900"))
+
+# (pounds, recipient_id) for a claimed listing; None for any other listing.
+Contribution = Optional[Tuple[float, Optional[int]]]
+
+
+def listing_pounds(qty, unit, est_weight_kg) -> float:
+    """Pounds a listing counts for; same rules as ``pounds_expression``."""
+    if est_weight_kg is not None:
+        return float(est_weight_kg) * KG_TO_LBS
+    if qty is None:
+        return 0.0
+    if (unit or "").lower() in POUND_UNITS:
+        return float(qty)
+    return float(qty) * 0.5
+
+
+def pounds_expression(model):
+    """SQL version of ``listing_pounds`` for ``reconcile``."""
+    normalized_unit = func.lower(func.coalesce(model.unit, ""))
+    return case(
+        (model.est_weight_kg.isnot(None), model.est_weight_kg * KG_TO_LBS),
+        (normalized_unit.in_(POUND_UNITS), model.qty),
+        else_=model.qty * 0.5,
+    )
+
+
+def contribution(status, qty, unit, est_weight_kg, recipient_id) -> Contribution:
+    status = status.value if hasattr(status, "value") else status
+    if status != "claimed":
+        return None
+    return listing_pounds(qty, unit, est_weight_kg), recipient_id
+
+
+def _upsert_recipient(connection, table, recipient_id: int) -> None:
+    values = {"recipient_id": recipient_id, "claimed_listings": 1}
+    changes = {"claimed_listings": table.c.claimed_listings + 1}
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        connection.execute(mysql_insert(table).values(**values).on_duplicate_key_update(**changes))
+    elif dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert_insert
+        connection.execute(
+            upsert_insert(table).values(**values)
+            .on_conflict_do_update(index_elements=[table.c.recipient_id], set_=changes)
+        )
+    else:
+        updated = connection.execute(
+            table.update().where(table.c.recipient_id == recipient_id).values(**changes)
+        )
+        if not updated.rowcount:
+            connection.execute(table.insert().values(**values))
+
+
+def _apply(connection, item: Tuple[float, Optional[int]], sign: int, claimed_at=None) -> None:
+    from backend.models import ImpactRecipient, ImpactTotals
+
+    totals = ImpactTotals.__table__
+    recipients = ImpactRecipient.__table__
+    pounds, recipient_id = item
+    families = 0
+    if recipient_id is not None:
+        if sign > 0:
+            _upsert_recipient(connection, recipients, recipient_id)
+            count = connection.execute(
+                select(recipients.c.claimed_listings).where(recipients.c.recipient_id == recipient_id)
+            ).scalar()
+            families = 1 if count == 1 else 0
+        else:
+            connection.execute(
+                recipients.update()
+                .where(recipients.c.recipient_id == recipient_id, recipients.c.claimed_listings > 0)
+                .values(claimed_listings=recipients.c.claimed_listings - 1)
+            )
+            removed = connection.execute(
+                recipients.delete()
+                .where(recipients.c.recipient_id == recipient_id, recipients.c.claimed_listings <= 0)
+            )
+            families = -int(removed.rowcount or 0)
+
+    changes = {
+        "claimed_listings": totals.c.claimed_listings + sign,
+        "pounds_lbs": totals.c.pounds_lbs + sign * pounds,
+        "families_helped": totals.c.families_helped + families,
+        "updated_at": datetime.utcnow(),
+    }
+    if sign > 0 and claimed_at is not None:
+        greatest = func.max if connection.dialect.name == "sqlite" else func.greatest
+        changes["last_claimed_at"] = greatest(func.coalesce(totals.c.last_claimed_at, claimed_at), claimed_at)
+    connection.execute(totals.update().where(totals.c.key == TOTALS_KEY).values(**changes))
+
+
+def apply_change(connection, before: Contribution, after: Contribution, claimed_at=None) -> None:
+    """Move the totals from a listing's ``before`` contribution to ``after``."""
+    if before == after:
+        return
+    if before is not None:
+        _apply(connection, before, -1)
+    if after is not None:
+        _apply(connection, after, +1, claimed_at)
+
+
+def listing_claimed(db, listing_id: int) -> None:
+    """Count a listing that a bulk UPDATE in ``db``'s transaction just set to claimed."""
+    from backend.models import FoodResource
+
+    row = db.execute(
+        select(FoodResource.status, FoodResource.qty, FoodResource.unit,
+               FoodResource.est_weight_kg, FoodResource.recipient_id, FoodResource.claimed_at)
+        .where(FoodResource.id == listing_id)
+    ).first()
+    if row is None:
+        return
+    apply_change(db.connection(), None, contribution(*row[:5]), row.claimed_at)
+
+
+def listing_unclaimed(db, listing) -> None:
+    """Stop counting ``listing`` (as loaded before a bulk UPDATE released it)."""
+    apply_change(db.connection(), contribution(listing.status, listing.qty, listing.unit,
+                                               listing.est_weight_kg, listing.recipient_id), None)
+
+
+def _serialize(row) -> dict:
+    return {
+        "pounds_donated_lbs": max(0, int(round(float(row.pounds_lbs or 0)))),
+        "families_helped": max(0, int(row.families_helped or 0)),
+        "claimed_listings": max(0, int(row.claimed_listings or 0)),
+        "updated_at": row.last_claimed_at.isoformat() if row.last_claimed_at else None,
+    }
+
+
+def read_totals(db) -> Optional[dict]:
+    """The public stats payload from the totals row, or None before the first reconcile."""
+    from backend.models import ImpactTotals
+
+    row = db.get(ImpactTotals, TOTALS_KEY)
+    return _serialize(row) if row is not None else None
+
+
+def reconcile(session_factory, now: Optional[datetime] = None) -> dict:
+    """Recompute the totals and per-recipient counts from ``food_resources``."""
+    from backend.models import FoodResource, ImpactRecipient, ImpactTotals
+
+    now = now or datetime.utcnow()
+    db = session_factory()
+    try:
+        claimed = FoodResource.status == "claimed"
+        totals = db.query(
+            func.count(FoodResource.id),
+            func.coalesce(func.sum(pounds_expression(FoodResource)), 0.0),
+            func.count(func.distinct(FoodResource.recipient_id)),
+            func.max(FoodResource.claimed_at),
+        ).filter(claimed).one()
+        per_recipient = (
+            db.query(FoodResource.recipient_id, func.count(FoodResource.id))
+            .filter(claimed, FoodResource.recipient_id.isnot(None))
+            .group_by(FoodResource.recipient_id)
+            .all()
+        )
+
+        db.query(ImpactRecipient).delete(synchronize_session=False)
+        if per_recipient:
+            db.execute(ImpactRecipient.__table__.insert(), [
+                {"recipient_id": rid, "claimed_listings": count} for rid, count in per_recipient
+            ])
+        row = db.get(ImpactTotals, TOTALS_KEY)
+        if row is None:
+            row = ImpactTotals(key=TOTALS_KEY)
+            db.add(row)
+        row.claimed_listings = int(totals[0] or 0)
+        row.pounds_lbs = float(totals[1] or 0)
+        row.families_helped = int(totals[2] or 0)
+        row.last_claimed_at = totals[3]
+        row.reconciled_at = now
+        row.updated_at = now
+        db.commit()
+        return _serialize(row)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def impact_reconcile_loop(session_factory, interval: float = IMPACT_RECONCILE_INTERVAL_S) -> None:
+    """Reconcile now and then every ``interval`` seconds until cancelled."""
+    while True:
+        try:
+            await asyncio.to_thread(reconcile, session_factory)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️  Impact stats reconcile failed: {e}")
+        await asyncio.sleep(interval)
+
+
+class PublicStatsCache:
+    """In-process stats response with stale-while-revalidate.
+
+    ``get()`` returns the cached value while it is fresh. Once it is stale,
+    it keeps returning the old value and starts at most one background
+    reload. Only a cold or fully expired cache makes the caller wait for
+    ``loader``.
+    """
+
+    def __init__(self, loader: Callable[[], dict], fresh_s: float = IMPACT_STATS_FRESH_S,
+                 stale_s: float = IMPACT_STATS_STALE_S, clock: Callable[[], float] = time.monotonic):
+        self._loader = loader
+        self._fresh_s = fresh_s
+        self._stale_s = stale_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._value: Optional[dict] = None
+        self._loaded_at = 0.0
+        self._refreshing = False
+
+    def get(self) -> dict:
+        with self._lock:
+            if self._value is not None:
+                age = self._clock() - self._loaded_at
+                if age < self._fresh_s:
+                    return self._value
+                if age < self._fresh_s + self._stale_s:
+                    if not self._refreshing:
+                        self._refreshing = True
+                        threading.Thread(target=self._refresh, name="public-stats-refresh",
+                                         daemon=True).start()
+                    return self._value
+        with self._load_lock:
+            # Another caller may have loaded it while this one waited.
+            with self._lock:
+                if self._value is not None and self._clock() - self._loaded_at < self._fresh_s:
+                    return self._value
+            return self._store(self._loader())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._value = None
+
+    def _store(self, value: dict) -> dict:
+        with self._lock:
+            self._value = value
+            self._loaded_at = self._clock()
+        return value
+
+    def _refresh(self) -> None:
+        try:
+            self._store(self._loader())
+        except Exception as e:
+            print(f"⚠️  Public stats refresh failed, serving the previous value: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
@@ -0,0 +1,190 @@
+"""
+Single-pass request body handling for the API input sanitizer.
+
+``sanitize_api_input`` used to be an ``@app.middleware("http")`` function
+that awaited ``request.body()`` for every POST/PUT/PATCH/DELETE. For JSON it
+then ran ``json.loads``, sanitized the result, ran ``json.dumps`` and put the
+bytes back, so FastAPI could parse the same payload a second time. Uploads
+(25 MB voice clips, 8 MB images) were buffered whole in the middleware and
+then again by the route's multipart parser.
+
+``SanitizeInputMiddleware`` is a plain ASGI middleware that handles each
+body once:
+
+* JSON is read chunk by chunk and rejected as soon as it passes the size
+  limit. It is parsed once and sanitized once, and the result is stored in
+  ``request.state`` under ``SANITIZED_JSON``. The raw bytes are replayed
+  downstream, so ``request.body()`` still works, but nothing re-encodes
+  them.
+* Form-urlencoded bodies are small and are read and checked for UTF-8 as
+  before.
+* Any other body (multipart uploads, octet-stream) is never read here.
+  The ``receive`` channel is wrapped so the byte count is checked as the
+  route's parser consumes it, and a 413 is raised as soon as the limit is
+  crossed.
+
+``SanitizedRoute`` is the route class for the app and the AI router. Its
+``Request.json()`` returns the stored object, so FastAPI's body parameters
+and the ``read_request_body`` dependency never call ``json.loads`` a second
+time.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Callable
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+# request.state attribute holding the parsed, sanitized JSON body.
+SANITIZED_JSON = "sanitized_json"
+
+BODY_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def sanitized_json(request: Request, default: Any = None) -> Any:
+    return (request.scope.get("state") or {}).get(SANITIZED_JSON, default)
+
+
+async def read_limited(receive: Callable, limit: int) -> bytes:
+    """Whole request body, refusing it as soon as it passes ``limit`` bytes."""
+    chunks: list[bytes] = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail="Request body is too large")
+        if chunk:
+            chunks.append(chunk)
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def replay_receive(body: bytes, receive: Callable) -> Callable:
+    """``receive`` that yields ``body`` once, then defers to the real channel.
+
+    Later calls go to the client's channel, so a streaming response still
+    sees ``http.disconnect``.
+    """
+    sent = False
+
+    async def _receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return _receive
+
+
+def limited_receive(receive: Callable, limit: int) -> Callable:
+    """``receive`` that raises 413 once more than ``limit`` bytes arrive."""
+    size = 0
+
+    async def _receive():
+        nonlocal size
+        message = await receive()
+        if message["type"] == "http.request":
+            size += len(message.get("body", b""))
+            if size > limit:
+                raise HTTPException(status_code=413, detail="Request body is too large")
+        return message
+
+    return _receive
+
+
+class SanitizeInputMiddleware:
+    """Validate query strings and bodies of ``/api`` requests (see module doc)."""
+
+    def __init__(
+        self,
+        app,
+        *,
+        body_limit: Callable[[str], int],
+        validate_query: Callable[[Request], None],
+        sanitize_json: Callable[[Any], Any],
+    ):
+        self.app = app
+        self.body_limit = body_limit
+        self.validate_query = validate_query
+        self.sanitize_json = sanitize_json
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].lower().startswith("/api"):
+            await self.app(scope, receive, send)
+            return
+        try:
+            receive = await self._prepare(scope, receive)
+        except HTTPException as exc:
+            response = JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    async def _prepare(self, scope, receive) -> Callable:
+        request = Request(scope)
+        self.validate_query(request)
+
+        max_body_bytes = self.body_limit(scope["path"].lower())
+        content_length = request.headers.get("content-length")
+        if content_length:
+            try:
+                if int(content_length) > max_body_bytes:
+                    raise HTTPException(status_code=413, detail="Request body is too large")
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+
+        if request.method.upper() not in BODY_METHODS:
+            return receive
+
+        content_type = request.headers.get("content-type", "").lower()
+        if "application/json" in content_type:
+            body = await read_limited(receive, max_body_bytes)
+            if body:
+                try:
+                    parsed = json.loads(body)
+                except UnicodeDecodeError:
+                    raise HTTPException(status_code=400, detail="Request body must be valid UTF-8")
+                except json.JSONDecodeError:
+                    raise HTTPException(status_code=400, detail="Malformed JSON request body")
+                scope.setdefault("state", {})[SANITIZED_JSON] = self.sanitize_json(parsed)
+            return replay_receive(body, receive)
+
+        if "application/x-www-form-urlencoded" in content_type:
+            body = await read_limited(receive, max_body_bytes)
+            try:
+                body.decode("utf-8")
+            except UnicodeDecodeError:
+                raise HTTPException(status_code=400, detail="Request body must be valid UTF-8")
+            return replay_receive(body, receive)
+
+        # multipart/form-data, application/octet-stream, etc.: counted as the
+        # route's parser streams it, never buffered here.
+        return limited_receive(receive, max_body_bytes)
+
+
+class SanitizedRequest(Request):
+    async def json(self) -> Any:
+        state = self.scope.get("state") or {}
+        if SANITIZED_JSON in state:
+            return state[SANITIZED_JSON]
+        return await super().json()
+
+
+class SanitizedRoute(APIRoute):
+    """APIRoute whose requests hand out the middleware's parsed JSON."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def sanitized_handler(request: Request):
+            return await handler(SanitizedRequest(request.scope, request.receive, request._send))
+
+        return sanitized_handler
@@ -0,0 +1,54 @@
+"""
+Loader options for FoodResource rows that are returned through
+``serialize_listing``.
+
+``serialize_listing`` reads ``item.donor``, a lazy many-to-one. A plain
+``db.query(FoodResource)`` therefore ran one extra ``SELECT users`` for
+every listing on a page. That added 50 round trips to a 50-row
+``/api/listings/get``. It also loaded every column, including the
+verification and safety columns that no listing response contains.
+
+Endpoints pick one of two projections:
+
+* ``summary_options()`` - list endpoints. Only the columns the serializer
+  reads (``SUMMARY_COLUMNS``) are selected, and the donors of the whole page
+  come from one ``SELECT ... WHERE id IN (...)`` (``selectinload``). A page
+  costs two statements, however many rows it has.
+* ``detail_options()`` - a single listing that the endpoint may go on to
+  read or modify. The full row is loaded, with the donor joined into the
+  same SELECT.
+
+``backend/ai/tests/test_listing_reads.py`` counts the statements each list
+endpoint issues at two page sizes and fails if the count grows with the
+page. If ``serialize_listing`` starts reading a new column, add it to
+``SUMMARY_COLUMNS``. Otherwise every row lazy-loads it and that test fails.
+"""
+from __future__ import annotations
+
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+from backend.models import FoodResource
+
+# Every FoodResource column serialize_listing, _listing_effective_status and
+# the keyset cursor read.
+SUMMARY_COLUMNS = (
+    "id", "donor_id", "recipient_id", "title", "description", "category", "qty", "unit",
+    "perishability", "expiration_date", "date_label_type", "address", "coords_lat", "coords_lng",
+    "pickup_window_start", "pickup_window_end", "status", "claimed_at", "urgency_score",
+    "created_at", "updated_at", "verification_status", "is_refrigerated", "is_frozen",
+    "safety_checklist_passed", "packaging_condition", "allergens", "contamination_warning",
+    "dietary_tags", "ingredients_list", "images",
+)
+
+
+def summary_options() -> tuple:
+    """Options for a page of listings: serializer columns, donors batched."""
+    return (
+        load_only(*(getattr(FoodResource, name) for name in SUMMARY_COLUMNS)),
+        selectinload(FoodResource.donor),
+    )
+
+
+def detail_options() -> tuple:
+    """Options for one listing: full row, donor in the same query."""
+    return (joinedload(FoodResource.donor),)
@@ -0,0 +1,248 @@
+"""
+Versioned schema migrations, applied once each at startup.
+
+Schema changes used to happen in two places. One was
+``_add_missing_model_columns`` / ``_add_missing_model_indexes`` in
+backend/app.py, which re-inspected a hand-picked list of tables on every
+boot. The other was about fifteen ``migrate_*.py`` scripts, each run by hand
+against MySQL with its own hardcoded DDL. Nothing recorded which of them a
+database had seen.
+
+Each migration here is a numbered function. ``upgrade(engine)`` runs every
+migration whose number is not yet in the ``schema_migrations`` table, in
+order. It records each one after it succeeds and stops at the first
+failure, so a later step never runs on top of a missing one. Steps are
+written to be idempotent, so two workers booting at once can safely apply
+the same step.
+
+``create_all()`` still builds missing tables with their columns and indexes.
+Migrations cover what it does not: columns and indexes on tables that
+already exist, and data backfills. DDL is derived from the models and
+compiled for the connected dialect (Postgres in dev, MySQL in production,
+SQLite in tests).
+
+To change the schema, declare the column or index on the model and append a
+migration that calls ``add_missing_columns`` / ``create_missing_indexes``
+for its table. Never edit a migration that has shipped.
+
+``python -m backend.migrations`` applies pending migrations; ``--status``
+lists them.
+"""
+from __future__ import annotations
+
+import argparse
+from datetime import datetime
+from typing import Callable, Iterable, List, Tuple
+
+from sqlalchemy import (
+    JSON, Column, DateTime, Integer, LargeBinary, MetaData, String, Table, Text, inspect, literal, select, text,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from backend.models import Base
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _meta,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Engine], None]]] = []
+
+
+def migration(version: int, name: str):
+    """Register ``fn(engine)`` as migration ``version``."""
+    def register(fn: Callable[[Engine], None]):
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+
+def _tables(names: Iterable[str] = ()) -> list:
+    from backend.ai import models as _ai_models  # noqa: F401  (register AI tables)
+
+    names = set(names)
+    return [t for t in Base.metadata.sorted_tables if not names or t.name in names]
+
+
+def _scalar_default(column):
+    """The constant a column's Python-side ``default=`` inserts, or None."""
+    default = column.default
+    if default is None or not getattr(default, "is_scalar", False):
+        return None
+    return default.arg
+
+
+def _column_default_sql(column, dialect) -> str:
+    """`` DEFAULT ...`` for an ADD COLUMN, or "" when there is no constant default."""
+    if dialect.name == "mysql" and isinstance(column.type, (Text, LargeBinary, JSON)):
+        return ""  # MySQL rejects literal defaults on TEXT/BLOB/JSON columns
+    if column.server_default is not None:
+        rendered = dialect.ddl_compiler(dialect, None).get_column_default_string(column)
+        if rendered is not None:
+            return f" DEFAULT {rendered}"
+    value = _scalar_default(column)
+    if value is None:
+        return ""
+    compiled = literal(value, column.type).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    return f" DEFAULT {compiled}"
+
+
+def add_missing_columns(engine: Engine, tables: Iterable) -> None:
+    """Add columns a model declares but its existing table is missing.
+
+    A column with a server default or a constant ``default=`` is added with
+    that value as its DEFAULT, so rows that already exist get it too.
+
+    Each statement gets its own transaction. Postgres aborts an entire
+    transaction after any failed statement, so one rejected ALTER would
+    otherwise discard every statement after it.
+    """
+    inspector = inspect(engine)
+    for table in tables:
+        if not inspector.has_table(table.name):
+            continue  # create_all() builds it, columns included
+        present = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            if not column.nullable:
+                # Adding NOT NULL to a populated table needs a default or a
+                # backfill; that is a decision, not something to guess at.
+                print(f"⚠️  Schema drift: {table.name}.{column.name} is missing and "
+                      "NOT NULL - add it manually with a backfill")
+                continue
+            col_type = column.type.compile(dialect=engine.dialect)
+            # text() would read a colon in a string default as a bind parameter.
+            default = _column_default_sql(column, engine.dialect).replace(":", "\\:")
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}{default} NULL"
+                ))
+            print(f"✅ Schema: added {table.name}.{column.name}")
+
+
+def backfill_defaults(engine: Engine, table_name: str, column_names: Iterable[str]) -> None:
+    """Set NULLs in existing columns to the constant ``default=`` their model declares."""
+    table = Base.metadata.tables[table_name]
+    inspector = inspect(engine)
+    if not inspector.has_table(table_name):
+        return
+    present = {col["name"] for col in inspector.get_columns(table_name)}
+    with engine.begin() as conn:
+        for name in column_names:
+            column = table.c[name]
+            value = _scalar_default(column)
+            if name not in present or value is None:
+                continue
+            conn.execute(table.update().where(column.is_(None)).values({name: value}))
+
+
+def create_missing_indexes(engine: Engine, tables: Iterable) -> None:
+    """Create indexes a model declares but its existing table is missing."""
+    inspector = inspect(engine)
+    for table in tables:
+        if not inspector.has_table(table.name):
+            continue
+        present = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in present:
+                continue
+            index.create(bind=engine, checkfirst=True)
+            print(f"✅ Schema: added index {index.name}")
+
+
+@migration(1, "add columns that predate the models")
+def _model_columns(engine: Engine) -> None:
+    # Covers what the migrate_*.py scripts and _add_missing_model_columns did.
+    add_missing_columns(engine, _tables())
+
+
+@migration(2, "backfill updated_at, last_active and trust_score")
+def _backfills(engine: Engine) -> None:
+    # Same backfills the migrate_updated_at / migrate_trust_signals /
+    # migrate_safety_trust scripts ran after adding these columns.
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE food_resources SET updated_at = created_at WHERE updated_at IS NULL"))
+        conn.execute(text("UPDATE users SET last_active = created_at WHERE last_active IS NULL"))
+        conn.execute(text("UPDATE users SET trust_score = 50 WHERE trust_score IS NULL"))
+
+
+@migration(3, "indexes for listing, message, reminder and favorite queries")
+def _hot_path_indexes(engine: Engine) -> None:
+    # Also creates ix_food_resources_status_geohash on databases that
+    # predate it.
+    create_missing_indexes(engine, _tables((
+        "food_resources", "messages", "pickup_reminders", "donation_reminders",
+        "donation_schedules", "favorite_locations",
+    )))
+
+
+@migration(4, "standalone geohash index for radius and bbox searches")
+def _geohash_index(engine: Engine) -> None:
+    create_missing_indexes(engine, _tables(("food_resources",)))
+
+
+@migration(5, "backfill column defaults migration 1 left NULL")
+def _default_backfills(engine: Engine) -> None:
+    # Migration 1 added these without a DEFAULT, so rows that predate it
+    # read NULL where the app expects 0 / False / a status.
+    backfill_defaults(engine, "users", (
+        "household_size", "sms_consent_given", "completed_exchanges", "positive_feedback",
+        "email_verified", "phone_verified", "id_verified", "address_verified",
+    ))
+    backfill_defaults(engine, "food_resources", ("packaging_condition", "verification_status"))
+    backfill_defaults(engine, "food_requests", ("household_size",))
+
+
+def applied_versions(engine: Engine) -> set:
+    _meta.create_all(bind=engine)
+    with engine.connect() as conn:
+        return {row.version for row in conn.execute(select(schema_migrations.c.version))}
+
+
+def upgrade(engine: Engine, migrations=None) -> List[int]:
+    """Apply pending migrations in order; returns the versions applied."""
+    migrations = sorted(MIGRATIONS if migrations is None else migrations, key=lambda m: m[0])
+    done = applied_versions(engine)
+    applied: List[int] = []
+    for version, name, fn in migrations:
+        if version in done:
+            continue
+        try:
+            fn(engine)
+        except Exception as exc:
+            print(f"⚠️  Schema: migration {version} ({name}) failed, later migrations not applied: {exc}")
+            break
+        try:
+            with engine.begin() as conn:
+                conn.execute(schema_migrations.insert().values(
+                    version=version, name=name, applied_at=datetime.utcnow()))
+        except IntegrityError:
+            pass  # another worker recorded it first
+        print(f"✅ Schema: migration {version} ({name}) applied")
+        applied.append(version)
+    return applied
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations.")
+    parser.add_argument("--status", action="store_true", help="list migrations without applying")
+    args = parser.parse_args()
+
+    from backend.db import engine
+
+    if args.status:
+        done = applied_versions(engine)
+        for version, name, _ in sorted(MIGRATIONS, key=lambda m: m[0]):
+            print(f"{'applied' if version in done else 'pending':<8} {version:>4}  {name}")
+        return
+    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+
+
+if __name__ == "__main__":
+    main()
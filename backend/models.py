@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Index, Enum as SQLEnum, event, func, select
+from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
 import enum
 
+from backend.geo_index import encode_or_none as _geohash_or_none
+from backend.impact_stats import apply_change as _apply_impact_change, contribution as _impact_contribution
+from backend.recommendations import listing_features as _listing_features
+
 Base = declarative_base()
 
 class UserRole(enum.Enum):
@@ -116,6 +121,9 @@ class FoodResource(Base):
     address = Column(String(255))
     coords_lat = Column(Float, nullable=True)
     coords_lng = Column(Float, nullable=True)
+    # Spatial index key derived from coords_lat/coords_lng; maintained by the
+    # listeners below, queried through backend.geo_index.
+    geohash = Column(String(12), nullable=True)
     status = Column(String(255), default="available")
     claimed_at = Column(DateTime, nullable=True)
     images = Column(Text, nullable=True)  # JSON array of image URLs
@@ -131,11 +139,14 @@ class FoodResource(Base):
     
     # Pickup Verification
     verification_status = Column(String(50), default='not_required', nullable=True)
-    before_photo = Column(Text, nullable=True)  # Base64 or URL to photo before pickup
-    after_photo = Column(Text, nullable=True)  # Base64 or URL to photo after pickup
+    # Photo URLs from backend.photo_store. Rows not yet migrated may still hold
+    # base64, so these and the free-text notes are deferred: listing queries
+    # never read them, and get_verification_status loads the group at once.
+    before_photo = deferred(Column(Text, nullable=True), group="verification")  # URL to photo before pickup
+    after_photo = deferred(Column(Text, nullable=True), group="verification")  # URL to photo after pickup
     before_verified_at = Column(DateTime, nullable=True)
     after_verified_at = Column(DateTime, nullable=True)
-    pickup_notes = Column(Text, nullable=True)  # Notes from recipient about pickup
+    pickup_notes = deferred(Column(Text, nullable=True), group="verification")  # Notes from recipient about pickup
     
     # Food Safety Checklist
     storage_temperature = Column(Float, nullable=True)  # Temperature in Fahrenheit
@@ -144,7 +155,7 @@ class FoodResource(Base):
     packaging_condition = Column(String(50), default='good')  # excellent, good, fair, poor
     safety_checklist_passed = Column(Boolean, default=False)  # Overall safety check status
     safety_score = Column(Integer, default=0)  # 0-100 safety score
-    safety_notes = Column(Text, nullable=True)  # Additional safety observations
+    safety_notes = deferred(Column(Text, nullable=True))  # Additional safety observations
     safety_last_checked = Column(DateTime, nullable=True)  # When safety check was performed
     
     # Allergen and Dietary Information
@@ -152,11 +163,107 @@ class FoodResource(Base):
     contamination_warning = Column(String(100), nullable=True)  # 'shared-kitchen', 'shared-equipment', 'may-contain', 'home-kitchen'
     dietary_tags = Column(Text, nullable=True)  # JSON array: ['vegetarian', 'vegan', 'halal', 'kosher', 'gluten-free', 'dairy-free', 'nut-free']
     ingredients_list = Column(Text, nullable=True)  # Full ingredients list text
+    # Allergen/diet keyword bitmask derived from title, description, allergens
+    # and dietary_tags; maintained by the listeners below, scored by
+    # backend.recommendations.
+    diet_features = Column(Integer, nullable=True)
     
     # Relationships
     donor = relationship("User", foreign_keys=[donor_id], back_populates="donations")
     consumption_logs = relationship("ConsumptionLog", back_populates="food_resource")
 
+    __table_args__ = (
+        # Radius / bbox searches filter on status and scan geohash prefix ranges.
+        Index("ix_food_resources_status_geohash", "status", "geohash"),
+        # Radius / bbox searches without a status filter (the default) scan
+        # geohash prefix ranges on their own.
+        Index("ix_food_resources_geohash", "geohash"),
+        # Listing pages: filter on status, newest first with id as tiebreak.
+        Index("ix_food_resources_status_created", "status", "created_at", "id"),
+        # Unfiltered pages (admins) walk the same keyset order.
+        Index("ix_food_resources_created", "created_at", "id"),
+        # Donor dashboards and impact stats.
+        Index("ix_food_resources_donor_created", "donor_id", "created_at"),
+        # A recipient's claims.
+        Index("ix_food_resources_recipient_status", "recipient_id", "status"),
+        # Claim-release sweep: pending_confirmation older than the TTL.
+        Index("ix_food_resources_status_claimed", "status", "claimed_at"),
+        # Expiry: available listings past their pickup window.
+        Index("ix_food_resources_status_window_end", "status", "pickup_window_end"),
+    )
+
+
+@event.listens_for(FoodResource, "before_insert")
+@event.listens_for(FoodResource, "before_update")
+def _sync_food_resource_geohash(mapper, connection, target):
+    """Keep FoodResource.geohash in step with its coordinates on every ORM write."""
+    geohash = _geohash_or_none(target.coords_lat, target.coords_lng)
+    if target.geohash != geohash:
+        target.geohash = geohash
+
+
+@event.listens_for(FoodResource, "before_insert")
+@event.listens_for(FoodResource, "before_update")
+def _sync_food_resource_diet_features(mapper, connection, target):
+    """Re-derive FoodResource.diet_features from the listing text on every ORM write."""
+    features = _listing_features(target.title, target.description, target.allergens, target.dietary_tags)
+    if target.diet_features != features:
+        target.diet_features = features
+
+
+_IMPACT_FIELDS = ("status", "qty", "unit", "est_weight_kg", "recipient_id")
+
+
+def _listing_impact(connection, target, old):
+    """The listing's impact contribution before (``old``) or after this flush.
+
+    Must run while the row still holds its pre-flush values. Columns that
+    were never loaded, or were overwritten without their old value being
+    loaded, are read from the row.
+    """
+    state = sa_inspect(target)
+    values = {}
+    for name in _IMPACT_FIELDS:
+        history = state.attrs[name].history
+        if old and history.added:
+            if history.deleted:
+                values[name] = history.deleted[0]
+        elif name in state.dict:
+            values[name] = state.dict[name]
+    if "status" in values and values["status"] != "claimed":
+        return None
+    missing = [name for name in _IMPACT_FIELDS if name not in values]
+    if missing:
+        table = FoodResource.__table__
+        row = connection.execute(
+            select(*(table.c[name] for name in missing)).where(table.c.id == target.id)
+        ).first()
+        if row is None:
+            return None
+        values.update(zip(missing, row))
+    return _impact_contribution(**values)
+
+
+@event.listens_for(FoodResource, "after_insert")
+def _count_inserted_listing(mapper, connection, target):
+    """Add a listing created as claimed to the impact totals."""
+    after = _listing_impact(connection, target, old=False)
+    _apply_impact_change(connection, None, after, target.__dict__.get("claimed_at"))
+
+
+@event.listens_for(FoodResource, "before_update")
+def _count_updated_listing(mapper, connection, target):
+    """Move the impact totals when a listing is claimed, completed or re-weighed."""
+    before = _listing_impact(connection, target, old=True)
+    after = _listing_impact(connection, target, old=False)
+    _apply_impact_change(connection, before, after, target.__dict__.get("claimed_at"))
+
+
+@event.listens_for(FoodResource, "before_delete")
+def _count_deleted_listing(mapper, connection, target):
+    """Drop a deleted claimed listing from the impact totals."""
+    _apply_impact_change(connection, _listing_impact(connection, target, old=True), None)
+
 class FoodRequest(Base):
     __tablename__ = "food_requests"
     
@@ -211,6 +318,86 @@ class Message(Base):
     
     sender = relationship("User", foreign_keys=[sender_id])
 
+    __table_args__ = (
+        # A conversation's thread in order.
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+    )
+
+
+class ConversationSummary(Base):
+    """One row per Message.conversation_id, kept current on every message insert.
+
+    Lets the inbox list conversations with a single query instead of
+    scanning messages per conversation. Written by the Message listener
+    below and by the read-marking in backend/app.py.
+    """
+    __tablename__ = "conversation_summaries"
+
+    conversation_id = Column(String(255), primary_key=True)
+    # Parsed from 'user_<id>' conversations; NULL for other schemes (pair_a_b).
+    user_id = Column(Integer, nullable=True, index=True)
+    last_message_id = Column(Integer, nullable=True)
+    last_message_at = Column(DateTime, nullable=True, index=True)
+    unread_for_admin = Column(Integer, default=0, nullable=False)  # user -> admin messages not yet read
+    unread_for_user = Column(Integer, default=0, nullable=False)   # admin -> user messages not yet read
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+def conversation_user_id(conversation_id):
+    """User id encoded in a 'user_<id>' conversation id, else None."""
+    value = str(conversation_id or "")
+    if value.startswith("user_") and value[5:].isdigit():
+        return int(value[5:])
+    return None
+
+
+@event.listens_for(Message, "after_insert")
+def _record_conversation_message(mapper, connection, target):
+    """Upsert the conversation's summary row in the same transaction as the message."""
+    if not target.conversation_id:
+        return
+    table = ConversationSummary.__table__
+    from_admin = bool(target.is_from_admin)
+    unread = 0 if target.is_read else 1
+    created_at = target.created_at or datetime.utcnow()
+    values = {
+        "conversation_id": target.conversation_id,
+        "user_id": conversation_user_id(target.conversation_id),
+        "last_message_id": target.id,
+        "last_message_at": created_at,
+        "unread_for_admin": 0 if from_admin else unread,
+        "unread_for_user": unread if from_admin else 0,
+        "updated_at": datetime.utcnow(),
+    }
+    dialect = connection.dialect.name
+    # Ids and timestamps only move forward, even if two inserts commit out of order.
+    greatest = func.max if dialect == "sqlite" else func.greatest
+    changes = {
+        "last_message_id": greatest(func.coalesce(table.c.last_message_id, 0), target.id),
+        "last_message_at": greatest(func.coalesce(table.c.last_message_at, created_at), created_at),
+        "unread_for_admin": table.c.unread_for_admin + values["unread_for_admin"],
+        "unread_for_user": table.c.unread_for_user + values["unread_for_user"],
+        "updated_at": values["updated_at"],
+    }
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        connection.execute(mysql_insert(table).values(**values).on_duplicate_key_update(**changes))
+    elif dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert_insert
+        connection.execute(
+            upsert_insert(table).values(**values)
+            .on_conflict_do_update(index_elements=[table.c.conversation_id], set_=changes)
+        )
+    else:
+        updated = connection.execute(
+            table.update().where(table.c.conversation_id == target.conversation_id).values(**changes)
+        )
+        if not updated.rowcount:
+            connection.execute(table.insert().values(**values))
+
 class DistributionCenter(Base):
     __tablename__ = "distribution_centers"
     
@@ -345,6 +532,11 @@ class FavoriteLocation(Base):
     donor = relationship("User", foreign_keys=[donor_id])
     center = relationship("DistributionCenter", foreign_keys=[center_id])
 
+    __table_args__ = (
+        # A user's active saved places.
+        Index("ix_favorite_locations_user_active", "user_id", "is_active"),
+    )
+
 class RecurrenceFrequency(enum.Enum):
     DAILY = "daily"
     WEEKLY = "weekly"
@@ -392,6 +584,11 @@ class DonationSchedule(Base):
     user = relationship("User", foreign_keys=[user_id])
     reminders = relationship("DonationReminder", back_populates="schedule")
 
+    __table_args__ = (
+        # A donor's schedules by next date.
+        Index("ix_donation_schedules_user_next", "user_id", "next_donation_date"),
+    )
+
 class ReminderStatus(enum.Enum):
     PENDING = "pending"
     SENT = "sent"
@@ -428,6 +625,11 @@ class DonationReminder(Base):
     # Relationships
     schedule = relationship("DonationSchedule", back_populates="reminders")
 
+    __table_args__ = (
+        # A donor's open reminders in send order.
+        Index("ix_donation_reminders_user_scheduled", "user_id", "scheduled_for"),
+    )
+
 class ReportType(enum.Enum):
     UNSAFE_FOOD = "unsafe_food"
     NO_SHOW = "no_show"
@@ -506,6 +708,12 @@ class PickupReminder(Base):
     user = relationship("User", foreign_keys=[user_id])
     listing = relationship("FoodResource", foreign_keys=[listing_id])
 
+    __table_args__ = (
+        # A user's reminders in time order; one per listing per user.
+        Index("ix_pickup_reminders_user_scheduled", "user_id", "scheduled_time"),
+        Index("ix_pickup_reminders_listing_user", "listing_id", "user_id"),
+    )
+
 class ReminderSettings(Base):
     __tablename__ = "reminder_settings"
     
@@ -564,3 +772,98 @@ class NewsletterSubscription(Base):
     is_active = Column(Boolean, default=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class PendingClaimConfirmation(Base):
+    """SMS code for a listing in 'pending_confirmation'; one row per listing.
+
+    Managed by backend.claim_confirmations, which deletes the row on
+    confirm, cancel or expiry.
+    """
+    __tablename__ = "pending_claim_confirmations"
+
+    listing_id = Column(Integer, primary_key=True, autoincrement=False)
+    recipient_id = Column(Integer, nullable=False, index=True)
+    code = Column(String(16), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class RateLimitCounter(Base):
+    """Sliding-window counter for one rate-limited key.
+
+    Used by backend.rate_limits when RATE_LIMIT_BACKEND=database so every
+    worker shares the same counts. ``bucket`` is ``<limiter>:<sha256 of key>``,
+    so emails and IPs are not stored in clear.
+    """
+    __tablename__ = "rate_limit_counters"
+
+    bucket = Column(String(96), primary_key=True)
+    window = Column(Integer, nullable=False)  # now // window length
+    count = Column(Integer, nullable=False, default=0)
+    prev_count = Column(Integer, nullable=False, default=0)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class GeocodeCacheEntry(Base):
+    """Forward-geocoding result for one normalized address.
+
+    Managed by backend.geocoding. ``key`` is the SHA-256 of the normalized
+    address; ``lat``/``lng`` are NULL when the provider found no match.
+    """
+    __tablename__ = "geocode_cache"
+
+    key = Column(String(64), primary_key=True)
+    address = Column(String(512), nullable=False)
+    lat = Column(Float, nullable=True)
+    lng = Column(Float, nullable=True)
+    relevance = Column(Float, nullable=True)
+    place_types = Column(String(128), nullable=True)
+    provider = Column(String(32), nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class RouteMatrixEntry(Base):
+    """Travel distance/time from a distribution center to a listing.
+
+    Managed by backend.routing.refresh_center_matrix. ``source`` is
+    'mapbox' for Matrix API results and 'estimate' for the offline guess.
+    """
+    __tablename__ = "route_matrix"
+
+    center_id = Column(Integer, ForeignKey("distribution_centers.id"), primary_key=True, autoincrement=False)
+    listing_id = Column(Integer, ForeignKey("food_resources.id"), primary_key=True, autoincrement=False, index=True)
+    profile = Column(String(16), primary_key=True, default="driving")
+    distance_m = Column(Float, nullable=False)
+    duration_s = Column(Float, nullable=False)
+    source = Column(String(16), nullable=False, default="mapbox")
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class ImpactTotals(Base):
+    """Running totals behind /api/public/stats; a single row keyed 'public'.
+
+    Moved by the FoodResource listeners above and by backend.impact_stats,
+    which also rebuilds it from food_resources on a schedule.
+    """
+    __tablename__ = "impact_totals"
+
+    key = Column(String(32), primary_key=True)
+    claimed_listings = Column(Integer, nullable=False, default=0)
+    pounds_lbs = Column(Float, nullable=False, default=0.0)
+    families_helped = Column(Integer, nullable=False, default=0)
+    last_claimed_at = Column(DateTime, nullable=True)
+    reconciled_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ImpactRecipient(Base):
+    """Claimed listings per recipient; a row exists while the count is above zero.
+
+    Lets ImpactTotals.families_helped (a distinct count) be kept incrementally.
+    """
+    __tablename__ = "impact_recipients"
+
+    recipient_id = Column(Integer, primary_key=True, autoincrement=False)
+    claimed_listings = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,210 @@
+"""
+Content-addressed file storage for pickup verification photos.
+
+``verify_before_pickup`` / ``verify_after_pickup`` used to write the photo
+the recipient took straight into ``FoodResource.before_photo`` /
+``after_photo`` as a base64 data URL. Every ``db.query(FoodResource)`` -
+listings, search, notifications, the AI tools - then pulled those
+multi-megabyte strings over the wire for rows it only needed a title from.
+
+Photos are now files named by the SHA-256 of their bytes under
+``uploads/verification/`` (``VERIFICATION_PHOTO_DIR``), served by the
+existing ``/uploads`` mount. The row keeps only the short URL. Uploading the
+same image twice stores it once, and writes go to a temp file that is
+renamed into place, so a reader never sees half an image.
+
+``photo_store`` is the store the app writes to. Anything with the same
+``put(data) -> url`` method (an object-storage bucket, say) can replace it.
+
+``migrate_inline_photos`` moves rows that still hold base64 into the store
+in small batches (see ``backend/scripts/migrate_verification_photos.py``).
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from typing import Callable, Optional
+
+from sqlalchemy import and_, or_
+
+logger = logging.getLogger("photo_store")
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHOTO_DIR = os.getenv("VERIFICATION_PHOTO_DIR", os.path.join(_PROJECT_ROOT, "uploads", "verification"))
+PHOTO_URL_PREFIX = "/uploads/verification/"
+MAX_PHOTO_BYTES = 8 * 1024 * 1024
+
+IMAGE_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/gif": ".gif", "image/webp": ".webp"}
+
+_DATA_URL_RE = re.compile(r"^data:(?P<type>[\w.+-]+/[\w.+-]+)?(?:;[^,]*)?;base64,", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class PhotoError(ValueError):
+    """The value is not a photo the store accepts."""
+
+
+def sniff_image_type(buf: bytes) -> Optional[str]:
+    """Image type from the leading magic bytes, or None."""
+    if len(buf) < 12:
+        return None
+    if buf[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if buf[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if buf[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if buf[:4] == b"RIFF" and buf[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def is_photo_reference(value: str) -> bool:
+    """True for values that already point at a stored image rather than hold one."""
+    return value.startswith("/uploads/") or value.startswith("http://") or value.startswith("https://")
+
+
+def decode_inline_photo(value: str) -> bytes:
+    """Bytes of a ``data:image/...;base64,`` URL or a bare base64 string."""
+    match = _DATA_URL_RE.match(value)
+    payload = value[match.end():] if match else value
+    try:
+        return base64.b64decode(_WHITESPACE_RE.sub("", payload), validate=True)
+    except (binascii.Error, ValueError):
+        raise PhotoError("Photo is not valid base64 image data")
+
+
+class LocalPhotoStore:
+    """Images on local disk, one file per content hash."""
+
+    def __init__(self, directory: str = PHOTO_DIR, url_prefix: str = PHOTO_URL_PREFIX,
+                 max_bytes: int = MAX_PHOTO_BYTES):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.max_bytes = max_bytes
+
+    def put(self, data: bytes) -> str:
+        """Store ``data`` (if it is not stored already) and return its URL."""
+        if not data:
+            raise PhotoError("Empty photo")
+        if len(data) > self.max_bytes:
+            raise PhotoError(f"Photo too large (max {self.max_bytes // (1024 * 1024)}MB)")
+        image_type = sniff_image_type(data)
+        if image_type is None:
+            raise PhotoError("Photo is not a supported image format")
+
+        filename = hashlib.sha256(data).hexdigest() + IMAGE_EXTENSIONS[image_type]
+        path = os.path.join(self.directory, filename)
+        if not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                raise
+        return self.url_prefix + filename
+
+    def path(self, url: str) -> Optional[str]:
+        """Local file behind a URL this store returned, or None."""
+        if not url.startswith(self.url_prefix):
+            return None
+        name = os.path.basename(url[len(self.url_prefix):])
+        return os.path.join(self.directory, name) if name else None
+
+
+photo_store = LocalPhotoStore()
+
+
+def store_photo(value: str, store=None) -> str:
+    """URL to keep on the row for a photo given as inline base64 or a store URL.
+
+    A URL is only accepted when it names a file this store already holds,
+    as returned by an earlier upload. External URLs and other ``/uploads/``
+    paths are rejected: they would skip the size and format checks.
+    """
+    store = store or photo_store
+    value = (value or "").strip()
+    if not value:
+        raise PhotoError("Photo data required")
+    if is_photo_reference(value):
+        path = store.path(value) if hasattr(store, "path") else None
+        if path is None or not os.path.isfile(path):
+            raise PhotoError("Photo must be uploaded, not linked")
+        return store.url_prefix + os.path.basename(path)
+    return store.put(decode_inline_photo(value))
+
+
+def _inline(column):
+    return and_(
+        column.isnot(None),
+        column != "",
+        ~column.like("/uploads/%"),
+        ~column.like("http://%"),
+        ~column.like("https://%"),
+    )
+
+
+def migrate_inline_photos(session_factory: Callable, batch_size: int = 50, store=None,
+                          dry_run: bool = False) -> dict:
+    """Move base64 verification photos from food_resources into the store.
+
+    Walks the table by id, ``batch_size`` rows per transaction, loading only
+    the id and the two photo columns. A row whose photo cannot be decoded is
+    left as it was and counted under ``failed``. Safe to re-run: rows that
+    already hold a URL are not selected. ``dry_run`` decodes and checks every
+    photo but writes nothing.
+    """
+    from backend.models import FoodResource
+
+    columns = (FoodResource.before_photo, FoodResource.after_photo)
+    counts = {"rows": 0, "photos": 0, "failed": 0}
+    last_id = 0
+    while True:
+        db = session_factory()
+        try:
+            batch = (
+                db.query(FoodResource.id, *columns)
+                .filter(FoodResource.id > last_id, or_(*(_inline(c) for c in columns)))
+                .order_by(FoodResource.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                return counts
+            for row_id, *photos in batch:
+                last_id = row_id
+                changes = {}
+                for column, value in zip(columns, photos):
+                    if not value or is_photo_reference(value):
+                        continue
+                    try:
+                        if dry_run:
+                            if sniff_image_type(decode_inline_photo(value)) is None:
+                                raise PhotoError("Photo is not a supported image format")
+                        else:
+                            changes[column.key] = store_photo(value, store)
+                        counts["photos"] += 1
+                    except PhotoError as exc:
+                        counts["failed"] += 1
+                        logger.warning("Listing %s %s left inline: %s", row_id, column.key, exc)
+                if changes and not dry_run:
+                    # Moving storage is not an edit; keep updated_at as it was.
+                    changes["updated_at"] = FoodResource.updated_at
+                    db.query(FoodResource).filter(FoodResource.id == row_id).update(
+                        changes, synchronize_session=False)
+                counts["rows"] += 1
+            if not dry_run:
+                db.commit()
+        finally:
+            db.close()
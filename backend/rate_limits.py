@@ -0,0 +1,274 @@
+"""
+Sliding-window rate limiting shared by the auth and AI endpoints.
+
+Rate limits used to be hand-rolled five times over. Login, signup and the
+two password-reset flows in app.py kept a list of attempt timestamps per
+key and rebuilt it on every call. The AI per-IP and per-user caps did the
+same and, once 10,000 keys were stored, scanned all of them with ``min()``
+to pick one to evict. Every store was per-process, so each uvicorn worker
+enforced its own copy of the limit.
+
+``RateLimiter`` replaces all of them with a sliding-window counter. Each key
+stores only the attempt count of the current and previous fixed window. A
+check estimates the rolling count as
+``previous * (1 - elapsed fraction) + current``, which is O(1) in time and
+memory regardless of the limit or the number of keys.
+
+Two backends share the same ``acquire`` interface:
+
+* ``InMemoryRateBackend`` - an ``OrderedDict`` in last-touched order.
+  Entries whose windows have both passed are dropped from the front a few at
+  a time, and ``max_keys`` caps the size by evicting the least recently
+  touched key. Every operation is O(1). It is per-process.
+* ``DatabaseRateBackend`` - one ``rate_limit_counters`` row per key, updated
+  under ``SELECT ... FOR UPDATE``, so every worker and node shares the same
+  counts. Expired rows are purged periodically. If the database is
+  unreachable it fails open, because a broken rate limiter should not lock
+  everyone out.
+
+``RATE_LIMIT_BACKEND=database`` selects the shared backend. The default,
+``memory``, is correct for a single worker.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from backend.models import RateLimitCounter
+
+logger = logging.getLogger("rate_limits")
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").strip().lower()
+# Keys kept per in-memory limiter before the least recently used is evicted.
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Database backend: delete expired rows every this many checks per process.
+PURGE_EVERY = 1000
+
+
+def _roll(window: int, count: int, prev: int, now_window: int) -> Tuple[int, int]:
+    """``(count, prev)`` as seen from ``now_window``."""
+    if now_window == window:
+        return count, prev
+    if now_window == window + 1:
+        return 0, count
+    return 0, 0
+
+
+def decide(prev: int, count: int, elapsed: float, limit: int, window_s: float) -> Tuple[bool, float]:
+    """Sliding-window verdict: ``(allowed, retry_after_seconds)``.
+
+    ``elapsed`` is the fraction of the current window that has passed.
+    A hit is allowed if the estimated count including it stays <= ``limit``.
+    """
+    if limit <= 0:
+        return False, window_s
+    estimate = prev * (1.0 - elapsed) + count
+    if estimate + 1 <= limit:
+        return True, 0.0
+    room = limit - 1
+    if count <= room:
+        # Only the previous window's tail is in the way.
+        wait = (1.0 - (room - count) / prev) - elapsed
+    else:
+        # Wait for the next window, then for this window's share to decay.
+        wait = (1.0 - elapsed) + (1.0 - room / count)
+    return False, max(wait * window_s, 0.0)
+
+
+class InMemoryRateBackend:
+    """Process-local counters. Only correct with a single worker process."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        # bucket -> [window index, count, prev count, window length]
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def acquire(self, bucket: str, limit: int, window_s: float, now: float) -> Tuple[bool, float]:
+        now_window = int(now // window_s)
+        with self._lock:
+            entry = self._entries.get(bucket)
+            if entry is None:
+                entry = [now_window, 0, 0, window_s]
+                self._entries[bucket] = entry
+            else:
+                self._entries.move_to_end(bucket)
+                entry[1], entry[2] = _roll(entry[0], entry[1], entry[2], now_window)
+                entry[0] = now_window
+            allowed, retry_after = decide(
+                entry[2], entry[1], now / window_s - now_window, limit, window_s,
+            )
+            if allowed:
+                entry[1] += 1
+            self._expire(now)
+        return allowed, retry_after
+
+    def _expire(self, now: float) -> None:
+        # Last-touched order puts idle keys at the front; drop a couple that
+        # can no longer affect a decision, then enforce the size cap.
+        for _ in range(2):
+            if not self._entries:
+                break
+            bucket, (window, _, _, window_s) = next(iter(self._entries.items()))
+            if (window + 2) * window_s > now:
+                break
+            self._entries.popitem(last=False)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def reset(self, prefix: str = "") -> None:
+        with self._lock:
+            if not prefix:
+                self._entries.clear()
+                return
+            for bucket in [b for b in self._entries if b.startswith(prefix)]:
+                del self._entries[bucket]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _default_session_factory():
+    from backend.db import SessionLocal
+    return SessionLocal()
+
+
+class DatabaseRateBackend:
+    """Counters in ``rate_limit_counters``, shared by every worker."""
+
+    def __init__(self, session_factory: Callable = _default_session_factory):
+        self._session_factory = session_factory
+        self._checks = 0
+
+    @staticmethod
+    def _row_key(bucket: str) -> str:
+        name, _, key = bucket.partition(":")
+        return f"{name}:{hashlib.sha256(key.encode('utf-8')).hexdigest()}"
+
+    def acquire(self, bucket: str, limit: int, window_s: float, now: float) -> Tuple[bool, float]:
+        key = self._row_key(bucket)
+        now_window = int(now // window_s)
+        expires_at = datetime.utcfromtimestamp((now_window + 2) * window_s)
+        self._checks += 1
+        if self._checks % PURGE_EVERY == 0:
+            self.purge(now)
+        # Two tries: a concurrent first hit on the same key can win the INSERT.
+        for _ in range(2):
+            db = self._session_factory()
+            try:
+                row = (
+                    db.query(RateLimitCounter)
+                    .filter(RateLimitCounter.bucket == key)
+                    .with_for_update()
+                    .one_or_none()
+                )
+                if row is None:
+                    row = RateLimitCounter(bucket=key, window=now_window, count=0, prev_count=0,
+                                           expires_at=expires_at)
+                    db.add(row)
+                else:
+                    row.count, row.prev_count = _roll(row.window, row.count, row.prev_count, now_window)
+                    row.window = now_window
+                allowed, retry_after = decide(
+                    row.prev_count, row.count, now / window_s - now_window, limit, window_s,
+                )
+                if allowed:
+                    row.count += 1
+                    row.expires_at = expires_at
+                db.commit()
+                return allowed, retry_after
+            except IntegrityError:
+                db.rollback()
+            except Exception as exc:
+                db.rollback()
+                logger.warning("Rate limit check failed open for %s: %s", bucket.split(":", 1)[0], exc)
+                return True, 0.0
+            finally:
+                db.close()
+        return True, 0.0
+
+    def purge(self, now: Optional[float] = None) -> int:
+        cutoff = datetime.utcfromtimestamp(now if now is not None else time.time())
+        db = self._session_factory()
+        try:
+            n = (
+                db.query(RateLimitCounter)
+                .filter(RateLimitCounter.expires_at <= cutoff)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return n
+        except Exception as exc:
+            db.rollback()
+            logger.warning("Rate limit purge failed: %s", exc)
+            return 0
+        finally:
+            db.close()
+
+    def reset(self, prefix: str = "") -> None:
+        db = self._session_factory()
+        try:
+            query = db.query(RateLimitCounter)
+            if prefix:
+                query = query.filter(RateLimitCounter.bucket.startswith(prefix, autoescape=True))
+            query.delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+_shared_backend: Optional[DatabaseRateBackend] = None
+
+
+def default_backend():
+    """A fresh in-memory backend, or the process-wide database backend."""
+    global _shared_backend
+    if RATE_LIMIT_BACKEND == "database":
+        if _shared_backend is None:
+            _shared_backend = DatabaseRateBackend()
+        return _shared_backend
+    return InMemoryRateBackend()
+
+
+class RateLimiter:
+    """``limit`` hits per ``window_s`` seconds for each key."""
+
+    def __init__(self, name: str, limit: int, window_s: float, backend=None,
+                 clock: Callable[[], float] = time.time):
+        self.name = name
+        self.limit = limit
+        self.window_s = float(window_s)
+        self.backend = backend if backend is not None else default_backend()
+        self._clock = clock
+
+    def hit(self, key, limit: Optional[int] = None) -> Tuple[bool, float]:
+        """Count one attempt: ``(allowed, retry_after_seconds)``.
+
+        Blocked attempts are not counted.
+        """
+        return self.backend.acquire(
+            f"{self.name}:{key}", limit if limit is not None else self.limit,
+            self.window_s, self._clock(),
+        )
+
+    def allow(self, key, limit: Optional[int] = None) -> bool:
+        return self.hit(key, limit)[0]
+
+    def reset(self) -> None:
+        self.backend.reset(f"{self.name}:")
+
+
+def retry_minutes(retry_after_s: float) -> int:
+    """Whole minutes to show in a "try again in about N minute(s)" message."""
+    seconds = max(int(retry_after_s), 1)
+    return seconds // 60 + (1 if seconds % 60 else 0)
@@ -0,0 +1,186 @@
+"""
+In-process pub/sub hub behind the ``/api/events/stream`` server-push endpoint.
+
+Clients used to poll: the support chat and admin inbox every 5s, the
+listing notifier every few minutes, the dispatch dashboard every 30s. Each
+poll was a round of DB queries multiplied by every open tab. Now a client
+opens one streaming connection, and handlers publish small deltas after
+they commit:
+
+* ``message``         - a chat message was stored (``send_message`` routes,
+                        AI tool, notification delivery)
+* ``listing.created`` - a new listing (public listing payload)
+* ``listing.updated`` - a listing changed status (claim / confirm)
+
+Fan-out is keyed by topic. Every subscriber listens on ``user:<id>``,
+``role:<role>`` and ``listings``. Publishers pick the topics, e.g. a message
+in conversation ``user_7`` goes to ``user:7`` and ``role:admin``.
+
+``publish()`` is safe to call from any thread (sync route handlers run in
+the threadpool). Events are JSON-encoded once per publish and handed to each
+subscriber's event loop with ``call_soon_threadsafe``. A slow consumer never
+blocks the publisher: once its bounded queue is full the oldest events are
+dropped, and the client reconciles by refetching.
+
+The hub only reaches subscribers connected to the same worker process. With
+several uvicorn workers the frontend's slower fallback poll still covers
+events published on other workers.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import threading
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+# Events buffered per connection before the oldest are dropped.
+QUEUE_SIZE = 100
+
+# Seconds between keep-alive comments; keeps proxies from closing idle streams.
+HEARTBEAT_SECONDS = 25.0
+
+
+class Subscription:
+    """One connected client: a bounded queue fed from the hub."""
+
+    def __init__(self, hub: "PushHub", topics: Set[str], loop: asyncio.AbstractEventLoop):
+        self.id = next(hub._ids)
+        self.topics = topics
+        self.dropped = 0
+        self._hub = hub
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def _deliver(self, frame: str) -> None:
+        # Runs on the subscriber's loop.
+        if self._queue.full():
+            try:
+                self._queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self._queue.put_nowait(frame)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Next encoded frame, or None when ``timeout`` passes first."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self._hub.unsubscribe(self)
+
+
+class PushHub:
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._topics: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        """Register the calling event loop's client for ``topics``."""
+        sub = Subscription(self, set(topics), asyncio.get_running_loop())
+        with self._lock:
+            for topic in sub.topics:
+                self._topics.setdefault(topic, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            for topic in sub.topics:
+                subs = self._topics.get(topic)
+                if subs is None:
+                    continue
+                subs.discard(sub)
+                if not subs:
+                    del self._topics[topic]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len({s for subs in self._topics.values() for s in subs})
+
+    def publish(self, topics: Iterable[str], event: str, data: Any) -> int:
+        """Send ``event`` to every subscriber of any of ``topics``. Returns the fan-out.
+
+        Never raises: a push failure must not fail the write that triggered it.
+        """
+        try:
+            with self._lock:
+                targets: Set[Subscription] = set()
+                for topic in topics:
+                    targets.update(self._topics.get(topic, ()))
+            if not targets:
+                return 0
+            frame = encode_event(event, data)
+            for sub in targets:
+                try:
+                    sub._loop.call_soon_threadsafe(sub._deliver, frame)
+                except RuntimeError:
+                    # Loop already closed (worker shutting down).
+                    self.unsubscribe(sub)
+            return len(targets)
+        except Exception as exc:
+            print(f"Push publish failed for {event}: {exc}")
+            return 0
+
+
+def encode_event(event: str, data: Any) -> str:
+    """Server-Sent Events frame for ``event`` with a JSON payload."""
+    payload = json.dumps(data, default=str, separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def subscriber_topics(user_id: int, role: Optional[str]) -> List[str]:
+    topics = [f"user:{user_id}", "listings"]
+    if role:
+        topics.append(f"role:{role}")
+    return topics
+
+
+def conversation_topics(conversation_id: str) -> List[str]:
+    """Who should hear about a new message in ``conversation_id``.
+
+    ``user_<id>`` is a support thread between that user and the admins;
+    ``pair_<a>_<b>`` is a direct thread between two users.
+    """
+    conv = str(conversation_id or "")
+    if conv.startswith("user_") and conv[5:].isdigit():
+        return [f"user:{conv[5:]}", "role:admin"]
+    if conv.startswith("pair_"):
+        ids = [part for part in conv[5:].split("_") if part.isdigit()]
+        return [f"user:{uid}" for uid in ids]
+    return ["role:admin"]
+
+
+async def stream(topics: Iterable[str], heartbeat: float = HEARTBEAT_SECONDS,
+                 push_hub: Optional[PushHub] = None) -> AsyncIterator[str]:
+    """Subscribe to ``topics`` and yield SSE frames until the client goes away.
+
+    Subscribing inside the generator ties the subscription's lifetime to
+    the response body: it only exists while the stream is being sent.
+    """
+    sub = (push_hub or hub).subscribe(topics)
+    try:
+        yield f"retry: 5000\nevent: ready\ndata: {json.dumps({'subscription': sub.id})}\n\n"
+        while True:
+            frame = await sub.get(timeout=heartbeat)
+            yield frame if frame is not None else ": keep-alive\n\n"
+    finally:
+        sub.close()
+
+
+hub = PushHub()
+
+__all__ = [
+    "QUEUE_SIZE",
+    "HEARTBEAT_SECONDS",
+    "PushHub",
+    "Subscription",
+    "encode_event",
+    "subscriber_topics",
+    "conversation_topics",
+    "stream",
+    "hub",
+]
@@ -0,0 +1,350 @@
+"""
+Recommendation scoring for ``/api/listings/recommended``.
+
+The endpoint used to load every available listing as a full ORM object,
+lowercase its title and description, and run dozens of keyword substring
+scans per listing for each of the user's dietary restrictions and allergies
+on every request.
+
+Now the keyword scan happens once, at write time. ``listing_features()``
+folds a listing's text plus its structured ``allergens`` / ``dietary_tags``
+columns into a small bitmask stored on the row (``FoodResource.diet_features``,
+kept current by the ORM listeners in ``backend/models.py``). A user's
+restrictions and allergies compile into a ``RecommendationProfile``: a skip
+mask and a list of ``(bits, points)`` rules. Scoring a listing is then a
+couple of integer ANDs, memoized per distinct mask, plus the quantity and
+proximity bonuses.
+
+Per-user results are cached in ``RecommendationCache`` keyed on the user's
+preferences. Any committed listing write bumps the cache version (see
+``watch_listing_changes``), so a cached list never outlives a change made in
+this process; the TTL bounds staleness from writes made by other workers.
+
+This module is deliberately model-agnostic, like ``backend.geo_index``, so
+``backend.models`` can import the feature encoder without an import cycle.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Feature bits. Each is one keyword group from the original scoring loop.
+MEAT = 1 << 0         # vegetarian penalty
+VEGGIE = 1 << 1       # vegetarian bonus
+VEGAN = 1 << 2        # vegan bonus
+ANIMAL = 1 << 3       # vegan penalty
+GLUTEN = 1 << 4       # gluten-free penalty
+GLUTEN_FREE = 1 << 5  # gluten-free bonus
+HALAL = 1 << 6
+PORK = 1 << 7
+KOSHER = 1 << 8
+SHELLFISH = 1 << 9
+NUTS = 1 << 10
+DAIRY = 1 << 11
+EGG = 1 << 12
+SOY = 1 << 13
+WHEAT = 1 << 14
+SEAFOOD = 1 << 15
+
+# Substring groups, matched against "<title> <description>" lowercased.
+# Substring (not word) matching is kept on purpose: it is what the endpoint
+# always did, and it errs towards hiding a listing from an allergic user.
+KEYWORD_GROUPS: Tuple[Tuple[int, Tuple[str, ...]], ...] = (
+    (MEAT, ("meat", "chicken", "beef", "pork", "fish", "salmon")),
+    (VEGGIE, ("vegetarian", "vegan", "veggie", "produce", "fruit")),
+    (VEGAN, ("vegan", "plant-based")),
+    (ANIMAL, ("dairy", "cheese", "milk", "egg", "meat", "chicken", "fish")),
+    (GLUTEN, ("gluten", "bread", "pasta")),
+    (GLUTEN_FREE, ("gluten-free",)),
+    (HALAL, ("halal",)),
+    (PORK, ("pork",)),
+    (KOSHER, ("kosher",)),
+    (SHELLFISH, ("shellfish",)),
+    (NUTS, ("peanut", "almond", "walnut", "cashew", "nut")),
+    (DAIRY, ("dairy", "milk", "cheese", "yogurt", "cream")),
+    (EGG, ("egg",)),
+    (SOY, ("soy", "tofu")),
+    (WHEAT, ("wheat", "gluten", "bread", "pasta")),
+    (SEAFOOD, ("fish", "salmon", "tuna", "shellfish", "shrimp", "crab", "lobster")),
+)
+
+# Values the donor form writes to the structured columns. Mapped explicitly
+# rather than substring-matched: the tag 'nut-free' must not read as 'nut'.
+ALLERGEN_TAG_BITS: Dict[str, int] = {
+    "nuts": NUTS,
+    "peanuts": NUTS,
+    "tree nuts": NUTS,
+    "dairy": DAIRY | ANIMAL,
+    "milk": DAIRY | ANIMAL,
+    "eggs": EGG | ANIMAL,
+    "egg": EGG | ANIMAL,
+    "soy": SOY,
+    "gluten": GLUTEN | WHEAT,
+    "wheat": GLUTEN | WHEAT,
+    "fish": SEAFOOD | MEAT | ANIMAL,
+    "shellfish": SEAFOOD | SHELLFISH,
+}
+DIETARY_TAG_BITS: Dict[str, int] = {
+    "vegetarian": VEGGIE,
+    "vegan": VEGGIE | VEGAN,
+    "gluten-free": GLUTEN_FREE,
+    "halal": HALAL,
+    "kosher": KOSHER,
+}
+
+# restriction -> ([(bits, points), ...], skip bits)
+RESTRICTION_RULES: Dict[str, Tuple[Tuple[Tuple[int, int], ...], int]] = {
+    "vegetarian": (((MEAT, -30), (VEGGIE, 20)), 0),
+    "vegan": (((VEGAN, 30), (ANIMAL, -40)), 0),
+    "gluten-free": (((GLUTEN, -20), (GLUTEN_FREE, 25)), 0),
+    "halal": (((HALAL, 30),), PORK),
+    "kosher": (((KOSHER, 30),), PORK | SHELLFISH),
+}
+
+# allergy -> bits that hide a listing outright
+ALLERGY_SKIP_BITS: Dict[str, int] = {
+    "peanuts": NUTS, "tree nuts": NUTS, "nuts": NUTS,
+    "dairy": DAIRY, "milk": DAIRY,
+    "eggs": EGG, "egg": EGG,
+    "soy": SOY,
+    "wheat/gluten": WHEAT, "wheat": WHEAT, "gluten": WHEAT,
+    "fish": SEAFOOD, "shellfish": SEAFOOD, "seafood": SEAFOOD,
+}
+
+TOP_N = 20
+
+
+def _tag_list(value: Any) -> List[str]:
+    """Structured tag column (JSON array, or a plain comma list) as lowercase strings."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except (TypeError, ValueError):
+            value = value.split(",")
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, (list, tuple)):
+        return []
+    return [str(v).strip().lower() for v in value if str(v).strip()]
+
+
+def listing_features(title: Optional[str], description: Optional[str],
+                     allergens: Any = None, dietary_tags: Any = None) -> int:
+    """Feature bitmask for one listing."""
+    text = (title or "").lower() + " " + (description or "").lower()
+    mask = 0
+    for bit, words in KEYWORD_GROUPS:
+        if any(word in text for word in words):
+            mask |= bit
+    for tag in _tag_list(allergens):
+        mask |= ALLERGEN_TAG_BITS.get(tag, 0)
+    for tag in _tag_list(dietary_tags):
+        mask |= DIETARY_TAG_BITS.get(tag, 0)
+    return mask
+
+
+class RecommendationProfile:
+    """A user's preferences compiled into bit rules."""
+
+    def __init__(self, dietary_restrictions: Iterable[Any] = (), allergies: Iterable[Any] = (),
+                 preferred_categories: Iterable[Any] = (), household_size: Optional[int] = None,
+                 lat: Optional[float] = None, lng: Optional[float] = None):
+        self.rules: List[Tuple[int, int]] = []
+        self.skip_mask = 0
+        # One entry per listed restriction, duplicates included, so a
+        # repeated restriction still counts twice as it always has.
+        for restriction in dietary_restrictions or ():
+            rules, skip = RESTRICTION_RULES.get(str(restriction).lower(), ((), 0))
+            self.rules.extend(rules)
+            self.skip_mask |= skip
+        for allergy in allergies or ():
+            self.skip_mask |= ALLERGY_SKIP_BITS.get(str(allergy).lower(), 0)
+        self.preferred_categories = {c for c in preferred_categories or () if isinstance(c, str)}
+        self.ideal_qty = (household_size or 1) * 2
+        self.lat = lat
+        self.lng = lng
+        self._mask_scores: Dict[int, Optional[int]] = {}
+
+    def mask_score(self, mask: int) -> Optional[int]:
+        """Points from the feature rules, or None when the listing must be hidden."""
+        try:
+            return self._mask_scores[mask]
+        except KeyError:
+            pass
+        if mask & self.skip_mask:
+            score = None
+        else:
+            score = sum(points for bits, points in self.rules if mask & bits)
+        self._mask_scores[mask] = score
+        return score
+
+    def score(self, category: Any, qty: Optional[float], lat: Optional[float],
+              lng: Optional[float], perishability: Any, mask: int) -> Optional[int]:
+        score = self.mask_score(mask)
+        if score is None:
+            return None
+        if category is not None and getattr(category, "value", category) in self.preferred_categories:
+            score += 50
+        if qty and abs(qty - self.ideal_qty) < 5:
+            score += 10
+        if self.lat and self.lng and lat and lng:
+            # Rough miles, as before; only the 2/5/10 bands matter.
+            distance = math.sqrt((self.lat - lat) ** 2 + (self.lng - lng) ** 2) * 69
+            if distance < 2:
+                score += 30
+            elif distance < 5:
+                score += 20
+            elif distance < 10:
+                score += 10
+        if perishability is not None and getattr(perishability, "value", perishability) == "high":
+            score += 5
+        return score
+
+
+def rank(profile: RecommendationProfile, candidates: Iterable[Sequence[Any]],
+         top_n: int = TOP_N) -> Tuple[List[int], int]:
+    """Top ``top_n`` listing ids by score, and how many listings were not hidden.
+
+    ``candidates`` are ``(id, category, qty, lat, lng, perishability, mask)``
+    rows. Ties keep input order.
+    """
+    scored: List[Tuple[int, int]] = []
+    for listing_id, category, qty, lat, lng, perishability, mask in candidates:
+        score = profile.score(category, qty, lat, lng, perishability, mask or 0)
+        if score is not None:
+            scored.append((score, listing_id))
+    top = heapq.nlargest(top_n, scored, key=lambda pair: pair[0])
+    return [listing_id for _, listing_id in top], len(scored)
+
+
+class RecommendationCache:
+    """Per-user top-N results, dropped whenever a listing changes."""
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 2048):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[str, int, float, List[int], int]]" = OrderedDict()
+
+    def get(self, user_id: int, profile_key: str) -> Optional[Tuple[List[int], int]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            key, version, stored_at, ids, total = entry
+            if key != profile_key or version != self.version or time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return list(ids), total
+
+    def put(self, user_id: int, profile_key: str, version: int, ids: List[int], total: int) -> None:
+        """Store a result computed while the cache was at ``version``.
+
+        A listing change that landed mid-computation bumped the version, and
+        the now-stale result is discarded.
+        """
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[user_id] = (profile_key, version, time.monotonic(), list(ids), total)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def watch_listing_changes(model, cache: RecommendationCache) -> None:
+    """Invalidate ``cache`` when a transaction that touched ``model`` commits.
+
+    Bumping at flush would let a request that runs before the commit cache
+    the old listings under the new version for a whole TTL.
+    """
+    pending_key = f"recommendations_dirty:{id(cache)}"
+
+    def _after_flush(session, flush_context):
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, model):
+                session.info[pending_key] = True
+                return
+
+    def _after_bulk(context):
+        mapper = getattr(context, "mapper", None)
+        if mapper is not None and mapper.class_ is model:
+            context.session.info[pending_key] = True
+
+    def _after_commit(session):
+        if session.info.pop(pending_key, False):
+            cache.invalidate()
+
+    def _after_rollback(session):
+        session.info.pop(pending_key, None)
+
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "after_bulk_update", _after_bulk)
+    event.listen(Session, "after_bulk_delete", _after_bulk)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+
+
+def backfill_listing_features(session_factory, model, batch_size: int = 500) -> int:
+    """Populate ``diet_features`` for rows written before the column existed.
+
+    Same shape as ``backfill_geohashes``: batched, committed per batch, a
+    no-op once caught up. Returns the number of rows updated.
+    """
+    updated = 0
+    last_id = 0
+    db = session_factory()
+    try:
+        while True:
+            batch = (
+                db.query(model.id, model.title, model.description, model.allergens, model.dietary_tags)
+                .filter(model.id > last_id, model.diet_features.is_(None))
+                .order_by(model.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+            for row_id, title, description, allergens, dietary_tags in batch:
+                db.query(model).filter(model.id == row_id).update(
+                    {model.diet_features: listing_features(title, description, allergens, dietary_tags)},
+                    synchronize_session=False,
+                )
+                updated += 1
+            db.commit()
+            last_id = batch[-1][0]
+    finally:
+        db.close()
+    return updated
+
+
+__all__ = [
+    "TOP_N",
+    "listing_features",
+    "RecommendationProfile",
+    "rank",
+    "RecommendationCache",
+    "watch_listing_changes",
+    "backfill_listing_features",
+]
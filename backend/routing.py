@@ -0,0 +1,288 @@
+"""
+Directions cache, center-to-listing distance matrix and offline estimates.
+
+``get_mapbox_route``, ``show_route_to_listing`` and ``optimize_pickup_route``
+called Mapbox on every request, even when a driver asked for the same
+route again a few minutes later. This module gives them three things:
+
+* ``route_cache``: an in-process LRU of parsed Mapbox responses with a TTL.
+  It is keyed on the profile, the coordinates rounded to
+  ``COORD_PRECISION`` decimals (about 11 m) and a variant tag for the
+  request shape ("steps", "full", "trip"). A repeat question is answered
+  from memory. The TTL keeps traffic-dependent durations from going stale.
+* the ``route_matrix`` table: road distance and duration from every
+  active distribution center to every available listing.
+  ``refresh_center_matrix`` fills in missing or stale pairs with one Mapbox
+  Matrix request per center per ``MATRIX_BATCH`` listings, capped at
+  ``max_requests`` per run. It drops pairs whose listing is no longer
+  available. ``nearest_centers`` reads it for the
+  ``query_distribution_centers`` tool when it is given a ``listing_id``.
+* ``estimate()``: straight-line distance times ``DETOUR_FACTOR`` at a
+  per-profile average speed. It is used whenever Mapbox is unconfigured or
+  unreachable, so routing answers degrade to "approximately" instead of
+  failing.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import httpx
+from sqlalchemy import true
+
+from backend.geo_index import haversine_km
+
+logger = logging.getLogger("routing")
+
+ROUTE_CACHE_TTL_S = int(os.getenv("ROUTE_CACHE_TTL_MINUTES", "30")) * 60
+ROUTE_CACHE_SIZE = int(os.getenv("ROUTE_CACHE_SIZE", "1024"))
+COORD_PRECISION = 4
+
+# Road distance is rarely the crow-flies distance; 1.3 is the usual urban
+# circuity factor.
+DETOUR_FACTOR = 1.3
+PROFILE_SPEED_KMH = {"driving": 40.0, "cycling": 15.0, "walking": 5.0}
+
+MAPBOX_MATRIX_URL = "https://api.mapbox.com/directions-matrix/v1/mapbox/{profile}/{coords}"
+# The Matrix API takes 25 coordinates per request: one center + 24 listings.
+MATRIX_BATCH = 24
+# Pairs older than this are refetched on the next refresh.
+MATRIX_MAX_AGE = timedelta(days=int(os.getenv("ROUTE_MATRIX_MAX_AGE_DAYS", "7")))
+
+
+def estimate(o_lat: float, o_lng: float, d_lat: float, d_lng: float,
+             profile: str = "driving") -> Tuple[float, float]:
+    """Offline ``(distance_m, duration_s)`` guess between two points."""
+    distance_km = haversine_km(o_lat, o_lng, d_lat, d_lng) * DETOUR_FACTOR
+    speed = PROFILE_SPEED_KMH.get(profile, PROFILE_SPEED_KMH["driving"])
+    return distance_km * 1000.0, distance_km / speed * 3600.0
+
+
+def route_key(profile: str, points: Sequence[Tuple[float, float]], variant: str = "") -> tuple:
+    """Cache key for a request through ``points`` (``(lat, lng)`` pairs)."""
+    return (profile, variant) + tuple(
+        (round(float(lat), COORD_PRECISION), round(float(lng), COORD_PRECISION))
+        for lat, lng in points
+    )
+
+
+class RouteCache:
+    """Thread-safe LRU of routing results with a per-entry TTL."""
+
+    def __init__(self, ttl_s: float = ROUTE_CACHE_TTL_S, maxsize: int = ROUTE_CACHE_SIZE):
+        self.ttl_s = ttl_s
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+route_cache = RouteCache()
+
+
+# ---------------------------------------------------------------------------
+# Center -> listing matrix
+# ---------------------------------------------------------------------------
+
+async def fetch_matrix(
+    profile: str,
+    source: Tuple[float, float],
+    destinations: Sequence[Tuple[float, float]],
+    token: str,
+) -> List[Optional[Tuple[float, float]]]:
+    """One Mapbox Matrix call: ``(distance_m, duration_s)`` per destination."""
+    coords = ";".join(f"{lng},{lat}" for lat, lng in [source, *destinations])
+    url = MAPBOX_MATRIX_URL.format(profile=profile, coords=coords)
+    async with httpx.AsyncClient(timeout=20) as client:
+        resp = await client.get(url, params={
+            "access_token": token,
+            "sources": "0",
+            "destinations": ";".join(str(i) for i in range(1, len(destinations) + 1)),
+            "annotations": "distance,duration",
+        })
+    resp.raise_for_status()
+    data = resp.json() or {}
+    distances = (data.get("distances") or [[]])[0]
+    durations = (data.get("durations") or [[]])[0]
+    out: List[Optional[Tuple[float, float]]] = []
+    for i in range(len(destinations)):
+        d = distances[i] if i < len(distances) else None
+        t = durations[i] if i < len(durations) else None
+        out.append((float(d), float(t)) if d is not None and t is not None else None)
+    return out
+
+
+def _load_matrix_work(session_factory, profile: str, now: datetime, refetch_estimates: bool = False) -> dict:
+    """Centers, available listings and the pairs that are already fresh.
+
+    With ``refetch_estimates`` (a token is configured), ``estimate`` rows
+    never count as fresh, so a failed batch is retried on the next run
+    instead of standing for ``MATRIX_MAX_AGE``.
+    """
+    from backend.models import DistributionCenter, FoodResource, RouteMatrixEntry
+
+    db = session_factory()
+    try:
+        centers = (
+            db.query(DistributionCenter.id, DistributionCenter.coords_lat, DistributionCenter.coords_lng)
+            .filter(DistributionCenter.is_active == True)  # noqa: E712
+            .filter(DistributionCenter.coords_lat.isnot(None), DistributionCenter.coords_lng.isnot(None))
+            .order_by(DistributionCenter.id)
+            .all()
+        )
+        listings = (
+            db.query(FoodResource.id, FoodResource.coords_lat, FoodResource.coords_lng)
+            .filter(FoodResource.status == "available")
+            .filter(FoodResource.coords_lat.isnot(None), FoodResource.coords_lng.isnot(None))
+            .order_by(FoodResource.id)
+            .all()
+        )
+        fresh_rows = (
+            db.query(RouteMatrixEntry.center_id, RouteMatrixEntry.listing_id)
+            .filter(RouteMatrixEntry.profile == profile)
+            .filter(RouteMatrixEntry.updated_at > now - MATRIX_MAX_AGE)
+        )
+        if refetch_estimates:
+            fresh_rows = fresh_rows.filter(RouteMatrixEntry.source != "estimate")
+        fresh = {(r.center_id, r.listing_id) for r in fresh_rows}
+        return {
+            "centers": [(c.id, float(c.coords_lat), float(c.coords_lng)) for c in centers],
+            "listings": [(l.id, float(l.coords_lat), float(l.coords_lng)) for l in listings],
+            "fresh": fresh,
+        }
+    finally:
+        db.close()
+
+
+def _store_matrix_rows(session_factory, profile: str, rows: List[dict], listing_ids: List[int]) -> int:
+    """Upsert ``rows`` and drop pairs whose listing is no longer available."""
+    from backend.models import RouteMatrixEntry
+
+    db = session_factory()
+    try:
+        for row in rows:
+            db.merge(RouteMatrixEntry(profile=profile, **row))
+        pruned = (
+            db.query(RouteMatrixEntry)
+            .filter(RouteMatrixEntry.profile == profile)
+            .filter(~RouteMatrixEntry.listing_id.in_(listing_ids) if listing_ids else true())
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return pruned
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def refresh_center_matrix(
+    session_factory: Callable,
+    profile: str = "driving",
+    token: Optional[str] = None,
+    max_requests: int = 50,
+    fetch: Callable = fetch_matrix,
+) -> dict:
+    """Fill missing/stale center->listing pairs; returns counts for the run.
+
+    Without a token, or when a batch request fails, the batch is stored
+    with ``estimate()`` values (``source='estimate'``) so lookups still have
+    an answer. With a token those rows are refetched on the next run;
+    without one they are recomputed once they age out.
+    """
+    import asyncio
+
+    token = token if token is not None else (os.getenv("MAPBOX_TOKEN") or os.getenv("VITE_MAPBOX_TOKEN", ""))
+    loop = asyncio.get_running_loop()
+    now = datetime.utcnow()
+    work = await loop.run_in_executor(None, _load_matrix_work, session_factory, profile, now, bool(token))
+
+    rows: List[dict] = []
+    stats = {"requests": 0, "mapbox": 0, "estimated": 0, "pruned": 0, "skipped_batches": 0}
+    for center_id, c_lat, c_lng in work["centers"]:
+        missing = [l for l in work["listings"] if (center_id, l[0]) not in work["fresh"]]
+        for start in range(0, len(missing), MATRIX_BATCH):
+            batch = missing[start:start + MATRIX_BATCH]
+            results: List[Optional[Tuple[float, float]]] = [None] * len(batch)
+            source = "estimate"
+            if token and stats["requests"] < max_requests:
+                stats["requests"] += 1
+                try:
+                    results = await fetch(profile, (c_lat, c_lng), [(lat, lng) for _, lat, lng in batch], token)
+                    source = "mapbox"
+                except Exception as exc:
+                    logger.warning("Matrix request failed for center %s: %s", center_id, exc)
+            elif token:
+                # Out of request budget: leave these for the next run.
+                stats["skipped_batches"] += 1
+                continue
+            for (listing_id, l_lat, l_lng), result in zip(batch, results):
+                row_source = source
+                if result is None:
+                    result = estimate(c_lat, c_lng, l_lat, l_lng, profile)
+                    row_source = "estimate"
+                stats["mapbox" if row_source == "mapbox" else "estimated"] += 1
+                rows.append({
+                    "center_id": center_id,
+                    "listing_id": listing_id,
+                    "distance_m": round(result[0], 1),
+                    "duration_s": round(result[1], 1),
+                    "source": row_source,
+                    "updated_at": now,
+                })
+
+    stats["pruned"] = await loop.run_in_executor(
+        None, _store_matrix_rows, session_factory, profile, rows, [l[0] for l in work["listings"]],
+    )
+    return stats
+
+
+def nearest_centers(db, listing_id: int, profile: str = "driving", limit: int = 3) -> List[dict]:
+    """Centers closest to a listing by stored travel time."""
+    from backend.models import RouteMatrixEntry
+
+    rows = (
+        db.query(RouteMatrixEntry)
+        .filter(RouteMatrixEntry.listing_id == listing_id, RouteMatrixEntry.profile == profile)
+        .order_by(RouteMatrixEntry.duration_s)
+        .limit(limit)
+        .all()
+    )
+    return [
+        {"center_id": r.center_id, "distance_m": r.distance_m, "duration_s": r.duration_s, "source": r.source}
+        for r in rows
+    ]
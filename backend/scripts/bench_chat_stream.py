@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Latency benchmark: time-to-first-token of /chat versus /chat/stream.
+
+Drives ``ConversationEngine.chat`` and ``ConversationEngine.chat_stream``
+against a simulated OpenAI endpoint (``httpx.MockTransport``). The endpoint
+waits ``--first-token-ms`` before its first chunk and ``--token-ms`` between
+chunks. With ``--tool-round`` it first answers with a tool call, so the turn
+pays for two completions.
+
+* ``chat`` - the buffered endpoint: nothing reaches the client until every
+  round, persistence and the quick replies are done.
+* ``chat_stream`` - the SSE endpoint: the first ``delta`` event goes out as
+  soon as the model emits it.
+
+The profile, history and persistence lookups are stubbed out so that only the
+OpenAI round trips are measured.
+
+Usage::
+
+    python backend/scripts/bench_chat_stream.py --tokens 120 --token-ms 15 --tool-round
+
+Not part of the test suite; numbers depend on the machine.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import httpx  # noqa: E402
+
+from backend.ai import ai_engine  # noqa: E402
+
+
+def _sse(obj: dict) -> bytes:
+    return f"data: {json.dumps(obj)}\n\n".encode()
+
+
+class _Upstream:
+    """Fake chat completions endpoint with a fixed per-token cadence."""
+
+    def __init__(self, tokens: int, first_token_s: float, token_s: float, tool_round: bool):
+        self.tokens = tokens
+        self.first_token_s = first_token_s
+        self.token_s = token_s
+        self.tool_round = tool_round
+
+    def _wants_tool(self, payload: dict) -> bool:
+        return self.tool_round and not any(m.get("role") == "tool" for m in payload.get("messages", []))
+
+    async def _chunks(self, payload: dict):
+        await asyncio.sleep(self.first_token_s)
+        if self._wants_tool(payload):
+            yield _sse({"choices": [{"delta": {"tool_calls": [{
+                "index": 0, "id": "call_1",
+                "function": {"name": "get_user_dashboard", "arguments": "{}"},
+            }]}}]})
+        else:
+            for i in range(self.tokens):
+                if i:
+                    await asyncio.sleep(self.token_s)
+                yield _sse({"choices": [{"delta": {"content": f"tok{i} "}}]})
+        yield b"data: [DONE]\n\n"
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        if payload.get("stream"):
+            return httpx.Response(200, content=self._chunks(payload))
+        # Buffered completion: the whole generation happens before the reply.
+        await asyncio.sleep(self.first_token_s)
+        if self._wants_tool(payload):
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": "call_1", "type": "function",
+                "function": {"name": "get_user_dashboard", "arguments": "{}"},
+            }]}
+        else:
+            await asyncio.sleep(self.token_s * (self.tokens - 1))
+            message = {"role": "assistant", "content": "".join(f"tok{i} " for i in range(self.tokens))}
+        return httpx.Response(200, json={"choices": [{"message": message}]})
+
+
+def _engine() -> ai_engine.ConversationEngine:
+    engine = ai_engine.ConversationEngine()
+
+    async def build(user_id, message, lang_hint=None):
+        return [{"role": "user", "content": message}], "en", {"role": "recipient"}
+
+    async def execute(name, args):
+        return {"summary": "2 pickups today"}
+
+    async def persist(user_id, user_msg, assistant_msg, lang):
+        return 1
+
+    engine._build_turn = build
+    engine._execute_tool = execute
+    engine._persist_conversation = persist
+    return engine
+
+
+async def _time_chat(engine) -> tuple[float, float]:
+    t0 = time.perf_counter()
+    await engine.chat(1, "what's on today?")
+    total = time.perf_counter() - t0
+    return total, total
+
+
+async def _time_stream(engine) -> tuple[float, float]:
+    t0 = time.perf_counter()
+    first = None
+    async for kind, _ in engine.chat_stream(1, "what's on today?"):
+        if kind == "delta" and first is None:
+            first = time.perf_counter() - t0
+    total = time.perf_counter() - t0
+    return (first if first is not None else total), total
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=120, help="content chunks in the final answer")
+    parser.add_argument("--first-token-ms", type=float, default=400.0, help="model latency before the first chunk")
+    parser.add_argument("--token-ms", type=float, default=15.0, help="delay between chunks")
+    parser.add_argument("--tool-round", action="store_true", help="answer with one tool call first")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("ai_engine").setLevel(logging.WARNING)
+
+    upstream = _Upstream(args.tokens, args.first_token_ms / 1000.0, args.token_ms / 1000.0, args.tool_round)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(upstream.handler))
+    ai_engine._get_http_client = lambda timeout=30: client
+    ai_engine.OPENAI_API_KEY = "bench-key"
+    engine = _engine()
+
+    print(
+        f"{args.tokens} tokens, {args.first_token_ms:g} ms to first token, "
+        f"{args.token_ms:g} ms/token{', one tool round' if args.tool_round else ''}\n"
+    )
+    print(f"{'mode':<12} {'first token ms':>15} {'full turn ms':>13}")
+    for mode, run in (("chat", _time_chat), ("chat_stream", _time_stream)):
+        firsts, totals = [], []
+        for _ in range(args.runs):
+            first, total = await run(engine)
+            firsts.append(first)
+            totals.append(total)
+        print(f"{mode:<12} {statistics.median(firsts) * 1000:15.1f} {statistics.median(totals) * 1000:13.1f}")
+    await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
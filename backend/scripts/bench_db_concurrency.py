@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Load benchmark: request latency under concurrent clients with a slow database.
+
+Runs the real FastAPI app in-process against a throwaway SQLite file and
+adds a fixed delay to every SQL statement (``--db-latency-ms``), standing in
+for the round-trip to a remote MySQL/RDS instance. Each endpoint is hit
+twice by ``--clients`` concurrent clients:
+
+* ``threadpool`` - the route as shipped (sync handler, run by FastAPI in its
+  worker threadpool).
+* ``event-loop`` - the same handler wrapped in an ``async def`` shim, which
+  is how the routes used to run: every query blocks the event loop, so
+  concurrent requests queue behind each other. Once there are more
+  clients than pooled connections this mode can stall outright: a handler
+  blocks the loop waiting for a connection that another request's session
+  teardown (also needing the loop) would have returned.
+
+Usage::
+
+    python backend/scripts/bench_db_concurrency.py --clients 20 --requests 3 --db-latency-ms 5
+
+Not part of the test suite; numbers depend on the machine.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import inspect
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+_TMPDIR = tempfile.mkdtemp(prefix="foodmaps-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMPDIR, 'bench.db')}"
+os.environ.setdefault("JWT_SECRET", "bench-jwt-secret-not-for-production")
+os.environ.setdefault("PUBLIC_BASE_URL", "http://bench")
+os.environ.setdefault("OPENAI_API_KEY", "")
+os.environ.setdefault("MAPBOX_TOKEN", "")
+os.environ.setdefault("TWILIO_ACCOUNT_SID", "")
+
+import httpx  # noqa: E402
+import jwt  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from backend.app import app, JWT_SECRET, JWT_ALGORITHM  # noqa: E402
+from backend.db import engine, SessionLocal  # noqa: E402
+from backend.models import (  # noqa: E402
+    Base, FoodCategory, FoodResource, PerishabilityLevel, User, UserRole,
+)
+
+ENDPOINTS = [
+    "/api/categories",
+    "/api/listings/get?limit=50",
+    "/api/public/stats",
+    "/api/user/me",
+]
+
+
+def _seed() -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(email="bench@example.com", name="Bench", role=UserRole.RECIPIENT)
+        db.add(user)
+        db.flush()
+        for i in range(200):
+            db.add(FoodResource(
+                donor_id=user.id,
+                title=f"Listing {i}",
+                category=FoodCategory.PRODUCE,
+                perishability=PerishabilityLevel.LOW,
+                qty=1,
+                unit="box",
+                address="Oakland, CA",
+                coords_lat=37.80 + i * 1e-4,
+                coords_lng=-122.27,
+                status="available" if i % 3 else "claimed",
+                recipient_id=None if i % 3 else user.id,
+            ))
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def _install_db_latency(seconds: float) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _delay(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(seconds)
+
+
+def _event_loop_twin(endpoint):
+    """async def shim with the same signature: runs the handler on the loop."""
+    async def shim(*args, **kwargs):
+        return endpoint(*args, **kwargs)
+    shim.__signature__ = inspect.signature(endpoint)
+    shim.__name__ = f"{endpoint.__name__}_on_loop"
+    return shim
+
+
+def _mount_twins() -> dict[str, str]:
+    from fastapi.routing import APIRoute
+
+    twins = {}
+    for url in ENDPOINTS:
+        path = url.split("?")[0]
+        route = next(r for r in app.routes if isinstance(r, APIRoute) and r.path == path and "GET" in r.methods)
+        twin_path = "/api/bench-loop" + path
+        app.add_api_route(twin_path, _event_loop_twin(route.endpoint), methods=["GET"])
+        twins[url] = url.replace(path, twin_path, 1)
+    # Static mounts registered earlier would shadow routes appended after
+    # them; move the twins ahead of any catch-all mount.
+    added = app.router.routes[-len(twins):]
+    del app.router.routes[-len(twins):]
+    app.router.routes[0:0] = added
+    return twins
+
+
+async def _run_load(client: httpx.AsyncClient, url: str, clients: int, per_client: int, headers: dict) -> tuple[list[float], int]:
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for _ in range(per_client):
+            t0 = time.perf_counter()
+            resp = await client.get(url, headers=headers)
+            latencies.append(time.perf_counter() - t0)
+            if resp.status_code != 200:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    return latencies, errors
+
+
+def _pct(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20, help="concurrent clients per endpoint")
+    parser.add_argument("--requests", type=int, default=3, help="requests per client")
+    parser.add_argument("--db-latency-ms", type=float, default=5.0, help="delay added to every SQL statement")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    user_id = _seed()
+    _install_db_latency(args.db_latency_ms / 1000.0)
+    twins = _mount_twins()
+    token = jwt.encode({"sub": str(user_id), "role": "recipient"}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    print(
+        f"{args.clients} clients x {args.requests} requests, "
+        f"+{args.db_latency_ms:g} ms per SQL statement\n"
+    )
+    print(f"{'endpoint':<30} {'mode':<11} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8} {'errors':>7}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for url in ENDPOINTS:
+            for mode, target in (("threadpool", url), ("event-loop", twins[url])):
+                t0 = time.perf_counter()
+                lat, errors = await _run_load(client, target, args.clients, args.requests, headers)
+                wall = time.perf_counter() - t0
+                print(
+                    f"{url.split('?')[0]:<30} {mode:<11} "
+                    f"{statistics.median(lat) * 1000:8.1f} {_pct(lat, 99) * 1000:8.1f} "
+                    f"{len(lat) / wall:8.1f} {errors:7d}"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
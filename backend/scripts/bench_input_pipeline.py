@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Benchmark: CPU time and peak memory per request through the input sanitizer.
+
+Builds two minimal apps with the same sanitize helpers from backend/app.py
+and the same two routes: a pydantic JSON body and a multipart upload.
+
+* ``legacy`` - the old ``@app.middleware("http")`` function. It buffers every
+  body, parses and re-encodes JSON, and FastAPI then parses it again.
+* ``pipeline`` - ``SanitizeInputMiddleware`` with ``SanitizedRoute``. JSON is
+  parsed once and uploads stream through untouched.
+
+Each request's CPU time (``time.process_time``) and peak traced allocation
+(``tracemalloc``) are reported. The request payload is built before tracing
+starts, so it is not counted, and it is sent in 64 KB chunks the way a server
+delivers it.
+
+Usage::
+
+    python backend/scripts/bench_input_pipeline.py --upload-mb 20 --json-kb 60
+
+Not part of the test suite; numbers depend on the machine.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET", "bench-jwt-secret-not-for-production")
+os.environ.setdefault("PUBLIC_BASE_URL", "http://bench")
+os.environ.setdefault("OPENAI_API_KEY", "")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+
+from backend.app import _sanitize_json_payload, _validate_query_params  # noqa: E402
+from backend.input_pipeline import SanitizedRoute, SanitizeInputMiddleware  # noqa: E402
+
+LIMIT = 32 * 1024 * 1024
+
+
+class Item(BaseModel):
+    title: str
+    notes: list[str]
+
+
+def _routes(app: FastAPI) -> None:
+    @app.post("/api/items")
+    async def items(item: Item):
+        return {"notes": len(item.notes)}
+
+    @app.post("/api/upload")
+    async def upload(file: UploadFile = File(...)):
+        size = 0
+        while chunk := await file.read(1 << 20):
+            size += len(chunk)
+        return {"size": size}
+
+
+def legacy_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def sanitize_api_input(request: Request, call_next):
+        _validate_query_params(request)
+        if request.method.upper() in {"POST", "PUT", "PATCH", "DELETE"}:
+            body = await request.body()
+            if len(body) > LIMIT:
+                raise HTTPException(status_code=413, detail="Request body is too large")
+            if body and "application/json" in request.headers.get("content-type", "").lower():
+                parsed = json.loads(body.decode("utf-8"))
+                body = json.dumps(_sanitize_json_payload(parsed), separators=(",", ":"),
+                                  ensure_ascii=False).encode("utf-8")
+            request._body = body
+        return await call_next(request)
+
+    _routes(app)
+    return app
+
+
+def pipeline_app() -> FastAPI:
+    app = FastAPI()
+    app.router.route_class = SanitizedRoute
+    app.add_middleware(
+        SanitizeInputMiddleware,
+        body_limit=lambda path: LIMIT,
+        validate_query=_validate_query_params,
+        sanitize_json=_sanitize_json_payload,
+    )
+    _routes(app)
+    return app
+
+
+def _multipart(size: int) -> tuple[bytes, str]:
+    boundary = "benchboundary"
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"clip.webm\"\r\n"
+            "Content-Type: application/octet-stream\r\n\r\n").encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    return head + b"\x01" * size + tail, f"multipart/form-data; boundary={boundary}"
+
+
+async def _chunks(content: bytes, size: int = 64 * 1024):
+    # Delivered the way a server hands a body over: one ASGI message per chunk.
+    view = memoryview(content)
+    for i in range(0, len(content), size):
+        yield bytes(view[i:i + size])
+
+
+async def _measure(client: httpx.AsyncClient, url: str, content: bytes, content_type: str,
+                   runs: int) -> tuple[float, float]:
+    cpu, peak = [], []
+    for _ in range(runs):
+        tracemalloc.start()
+        t0 = time.process_time()
+        resp = await client.post(url, content=_chunks(content), headers={
+            "content-type": content_type, "content-length": str(len(content)),
+        })
+        cpu.append(time.process_time() - t0)
+        peak.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        resp.raise_for_status()
+    return statistics.median(cpu) * 1000, statistics.median(peak) / (1024 * 1024)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--upload-mb", type=float, default=20.0)
+    parser.add_argument("--json-kb", type=float, default=60.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    note = "lorem ipsum dolor sit amet " * 4
+    n_notes = max(1, int(args.json_kb * 1024 / (len(note) + 3)))
+    json_body = json.dumps({"title": "  Bench  ", "notes": [note] * min(n_notes, 500)}).encode()
+    upload_body, upload_type = _multipart(int(args.upload_mb * 1024 * 1024))
+
+    print(f"JSON {len(json_body) / 1024:.0f} KB, upload {len(upload_body) / (1024 * 1024):.1f} MB\n")
+    print(f"{'app':<10} {'request':<8} {'cpu ms':>9} {'peak MB':>9}")
+    for name, factory in (("legacy", legacy_app), ("pipeline", pipeline_app)):
+        transport = httpx.ASGITransport(app=factory())
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for label, url, body, ctype in (
+                ("json", "/api/items", json_body, "application/json"),
+                ("upload", "/api/upload", upload_body, upload_type),
+            ):
+                cpu_ms, peak_mb = await _measure(client, url, body, ctype, args.runs)
+                print(f"{name:<10} {label:<8} {cpu_ms:9.2f} {peak_mb:9.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Benchmark: /api/public/stats, full aggregate vs. running totals.
+
+Seeds a throwaway SQLite file with ``--listings`` listings. A third of them
+are claimed, spread over ``--recipients`` recipients, with mixed units and
+weights. Each request is then served three ways:
+
+* ``legacy`` - the query the endpoint used to run (kept verbatim below):
+  SUM / COUNT DISTINCT over every claimed listing.
+* ``row``    - ``backend.impact_stats.read_totals``: one primary-key read
+  of the ``impact_totals`` row, as on a cache miss.
+* ``cached`` - the shipped handler, served from ``public_stats_cache``.
+
+Before timing, the script checks that ``legacy`` and ``reconcile`` agree on
+every number.
+
+Usage::
+
+    python backend/scripts/bench_public_stats.py --listings 50000 --requests 200
+
+Not part of the test suite; numbers depend on the machine.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+_TMPDIR = tempfile.mkdtemp(prefix="foodmaps-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMPDIR, 'bench.db')}"
+os.environ.setdefault("JWT_SECRET", "bench-jwt-secret-not-for-production")
+os.environ.setdefault("PUBLIC_BASE_URL", "http://bench")
+os.environ.setdefault("OPENAI_API_KEY", "")
+os.environ.setdefault("MAPBOX_TOKEN", "")
+os.environ.setdefault("TWILIO_ACCOUNT_SID", "")
+
+from fastapi import Response  # noqa: E402
+from sqlalchemy import case, func  # noqa: E402
+
+from backend.app import get_public_stats  # noqa: E402
+from backend.db import SessionLocal, engine  # noqa: E402
+from backend.impact_stats import read_totals, reconcile  # noqa: E402
+from backend.models import Base, FoodResource, User, UserRole  # noqa: E402
+
+UNITS = ["lb", "lbs", "box", "bag", "pounds", "each", None]
+
+
+def _seed(listings: int, recipients: int, rng: random.Random) -> None:
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i + 1, "email": f"user{i}@bench", "name": f"User {i}",
+             "role": (UserRole.DONOR if i == 0 else UserRole.RECIPIENT).name}
+            for i in range(recipients + 1)
+        ])
+        # Core inserts: the seed is not what is being measured, and
+        # reconcile() below builds the totals from it.
+        rows = []
+        for i in range(listings):
+            claimed = i % 3 == 0
+            rows.append({
+                "donor_id": 1, "title": f"Item {i}", "address": "Oakland, CA",
+                "qty": rng.randint(1, 40), "unit": rng.choice(UNITS),
+                "est_weight_kg": round(rng.uniform(0.5, 30), 2) if i % 4 == 0 else None,
+                "status": "claimed" if claimed else rng.choice(["available", "completed", "expired"]),
+                "recipient_id": rng.randint(2, recipients + 1) if claimed else None,
+                "claimed_at": start + timedelta(minutes=i) if claimed else None,
+                "created_at": start,
+            })
+        conn.execute(FoodResource.__table__.insert(), rows)
+
+
+def legacy_stats(db) -> dict:
+    """The pre-counter aggregate, unchanged apart from the fallback."""
+    normalized_unit = func.lower(func.coalesce(FoodResource.unit, ""))
+    pounds_expr = case(
+        (FoodResource.est_weight_kg.isnot(None), FoodResource.est_weight_kg * 2.20462),
+        (normalized_unit.in_(["lb", "lbs", "pound", "pounds"]), FoodResource.qty),
+        else_=FoodResource.qty * 0.5,
+    )
+
+    totals = db.query(
+        func.count(FoodResource.id).label("claimed_listings"),
+        func.coalesce(func.sum(pounds_expr), 0.0).label("pounds_donated_lbs"),
+        func.count(func.distinct(FoodResource.recipient_id)).label("families_helped"),
+        func.max(FoodResource.claimed_at).label("updated_at"),
+    ).filter(
+        FoodResource.status == "claimed"
+    ).first()
+
+    pounds_donated = int(round(float(totals.pounds_donated_lbs or 0)))
+    families_helped = int(totals.families_helped or 0)
+    return {
+        "pounds_donated_lbs": max(0, pounds_donated),
+        "families_helped": max(0, families_helped),
+        "claimed_listings": int(totals.claimed_listings or 0),
+        "updated_at": totals.updated_at.isoformat() if totals.updated_at else None,
+    }
+
+
+def _with_session(fn):
+    def run():
+        db = SessionLocal()
+        try:
+            return fn(db)
+        finally:
+            db.close()
+    return run
+
+
+def _time(fn, requests: int) -> list[float]:
+    samples = []
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=50000, help="listings to seed (a third claimed)")
+    parser.add_argument("--recipients", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per mode")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    _seed(args.listings, args.recipients, random.Random(args.seed))
+    legacy = _with_session(legacy_stats)()
+    if reconcile(SessionLocal) != legacy:
+        sys.exit(f"mismatch: legacy {legacy} != reconciled totals")
+    print(f"{args.listings} listings, {args.requests} requests per mode; totals match\n")
+
+    print(f"{'mode':<8} {'p50 ms':>9} {'max ms':>9}")
+    for mode, fn in (
+        ("legacy", _with_session(legacy_stats)),
+        ("row", _with_session(read_totals)),
+        ("cached", lambda: get_public_stats(Response())),
+    ):
+        samples = _time(fn, args.requests)
+        print(f"{mode:<8} {statistics.median(samples) * 1000:9.3f} {max(samples) * 1000:9.3f}")
+
+
+if __name__ == "__main__":
+    main()
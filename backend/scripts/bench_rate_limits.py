@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: cost of one rate-limit check as the number of keys grows.
+
+Compares the limiter the AI endpoints used to run (a timestamp list per key
+plus ``_evict_oldest``, an O(n) ``min()`` over every key once the store is
+full) with ``backend.rate_limits.RateLimiter`` on the in-memory backend.
+
+For each key count the store is first filled to capacity. Then two loads are
+timed:
+
+* ``existing`` - checks on keys that are already stored.
+* ``new`` - checks on keys that are not stored yet, so every check has to
+  evict one, as happens under a spray of random IPs.
+
+``--db`` also times the database backend against a throwaway SQLite file.
+That measures one round trip per check, not the key count.
+
+Usage::
+
+    python backend/scripts/bench_rate_limits.py --keys 1000 10000 100000
+
+Not part of the test suite; numbers depend on the machine.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.rate_limits import DatabaseRateBackend, InMemoryRateBackend, RateLimiter  # noqa: E402
+
+LIMIT = 50
+WINDOW_S = 60
+
+
+class LegacyLimiter:
+    """The per-key timestamp-list limiter that ai_engine used before."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.store: dict[str, list[float]] = {}
+
+    def _evict_oldest(self) -> None:
+        oldest_key = min(self.store, key=lambda k: self.store[k][-1] if self.store[k] else 0)
+        self.store.pop(oldest_key, None)
+
+    def allow(self, key: str) -> bool:
+        now = time.time()
+        if key not in self.store and len(self.store) >= self.max_keys:
+            self._evict_oldest()
+        timestamps = self.store.setdefault(key, [])
+        self.store[key] = [t for t in timestamps if now - t < WINDOW_S]
+        if len(self.store[key]) >= LIMIT:
+            return False
+        self.store[key].append(now)
+        return True
+
+
+def _time_per_check(allow, keys) -> float:
+    t0 = time.perf_counter()
+    for key in keys:
+        allow(key)
+    return (time.perf_counter() - t0) / len(keys) * 1e6
+
+
+def _bench(name: str, make, n_keys: int, checks: int) -> None:
+    limiter = make(n_keys)
+    for i in range(n_keys):
+        limiter.allow(f"ip{i}")
+    existing = [f"ip{(i * 7919) % n_keys}" for i in range(checks)]
+    fresh = [f"new{i}" for i in range(checks)]
+    us_existing = _time_per_check(limiter.allow, existing)
+    us_new = _time_per_check(limiter.allow, fresh)
+    print(f"{name:<14} {n_keys:>8} {us_existing:>14.2f} {us_new:>14.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--checks", type=int, default=2_000, help="timed checks per load")
+    parser.add_argument("--db", action="store_true", help="also time the database backend (SQLite)")
+    args = parser.parse_args()
+
+    print(f"{'limiter':<14} {'keys':>8} {'existing us':>14} {'new key us':>14}")
+    for n in args.keys:
+        _bench("legacy", LegacyLimiter, n, args.checks)
+        _bench("sliding", lambda cap: RateLimiter(
+            "bench", LIMIT, WINDOW_S, backend=InMemoryRateBackend(max_keys=cap)), n, args.checks)
+
+    if args.db:
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+
+        from backend.models import Base
+
+        path = os.path.join(tempfile.mkdtemp(prefix="foodmaps-bench-"), "rate.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine, tables=[Base.metadata.tables["rate_limit_counters"]])
+        backend = DatabaseRateBackend(sessionmaker(bind=engine))
+        _bench("sliding (db)", lambda cap: RateLimiter("bench", LIMIT, WINDOW_S, backend=backend),
+               min(args.keys), min(args.checks, 500))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""Benchmark: /api/listings/recommended, old scoring loop vs. precomputed features.
+
+Seeds a throwaway SQLite file with ``--listings`` available listings whose
+titles/descriptions mix the allergen and diet keywords, plus a handful of
+users with different restrictions and allergies. Each user is then scored
+three ways:
+
+* ``legacy`` - the loop the endpoint used to run (kept verbatim below):
+  load every available listing as a full ORM object and substring-scan its
+  text per restriction and allergy.
+* ``cold``   - the shipped handler with its result cache emptied first:
+  projection query + per-mask scoring over stored ``diet_features``.
+* ``warm``   - the shipped handler again, served from the per-user cache.
+
+Before timing, the script checks that ``legacy`` and ``cold`` return the same
+listing ids in the same order for every user. The seeded rows leave the
+structured ``allergens`` / ``dietary_tags`` columns empty, since the legacy
+loop never read them.
+
+Usage::
+
+    python backend/scripts/bench_recommendations.py --listings 5000 --rounds 5
+
+Not part of the test suite; numbers depend on the machine.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+_TMPDIR = tempfile.mkdtemp(prefix="foodmaps-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMPDIR, 'bench.db')}"
+os.environ.setdefault("JWT_SECRET", "bench-jwt-secret-not-for-production")
+os.environ.setdefault("PUBLIC_BASE_URL", "http://bench")
+os.environ.setdefault("OPENAI_API_KEY", "")
+os.environ.setdefault("MAPBOX_TOKEN", "")
+os.environ.setdefault("TWILIO_ACCOUNT_SID", "")
+
+import jwt  # noqa: E402
+from fastapi.security import HTTPAuthorizationCredentials  # noqa: E402
+
+from backend.app import JWT_ALGORITHM, JWT_SECRET, get_recommended_listings, recommendation_cache  # noqa: E402
+from backend.db import SessionLocal, engine  # noqa: E402
+from backend.models import (  # noqa: E402
+    Base, FoodCategory, FoodResource, PerishabilityLevel, User, UserRole,
+)
+
+WORDS = [
+    "fresh", "organic", "bread", "pasta", "chicken", "beef", "pork", "salmon", "tuna", "shrimp",
+    "cheese", "milk", "yogurt", "egg", "tofu", "soy", "peanut", "almond", "walnut", "vegan",
+    "vegetarian", "produce", "fruit", "halal", "kosher", "gluten-free", "plant-based", "rice",
+    "beans", "soup", "canned", "apples", "carrots", "lettuce", "donuts", "cream", "wheat",
+]
+
+PROFILES = [
+    {"dietary_restrictions": ["vegetarian"], "allergies": [], "preferred_categories": ["produce"]},
+    {"dietary_restrictions": ["vegan", "gluten-free"], "allergies": ["soy"], "preferred_categories": []},
+    {"dietary_restrictions": ["halal"], "allergies": ["peanuts", "dairy"], "preferred_categories": ["bakery"]},
+    {"dietary_restrictions": ["kosher"], "allergies": ["shellfish"], "preferred_categories": ["prepared"]},
+    {"dietary_restrictions": [], "allergies": [], "preferred_categories": []},
+]
+
+
+def _seed(listings: int, rng: random.Random) -> list[int]:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        donor = User(email="donor@bench", name="Donor", role=UserRole.DONOR)
+        db.add(donor)
+        db.flush()
+        categories = list(FoodCategory)
+        perishability = list(PerishabilityLevel)
+        for i in range(listings):
+            db.add(FoodResource(
+                donor_id=donor.id,
+                title=" ".join(rng.sample(WORDS, 2)).title(),
+                description=" ".join(rng.sample(WORDS, 6)),
+                category=rng.choice(categories),
+                perishability=rng.choice(perishability),
+                qty=rng.randint(1, 20),
+                unit="box",
+                address="Oakland, CA",
+                coords_lat=37.80 + rng.uniform(-0.3, 0.3),
+                coords_lng=-122.27 + rng.uniform(-0.3, 0.3),
+                status="available" if i % 5 else "claimed",
+            ))
+        user_ids = []
+        for n, prefs in enumerate(PROFILES):
+            user = User(
+                email=f"user{n}@bench", name=f"User {n}", role=UserRole.RECIPIENT,
+                household_size=rng.randint(1, 6), coords_lat=37.80, coords_lng=-122.27,
+                **{k: json.dumps(v) for k, v in prefs.items()},
+            )
+            db.add(user)
+            db.flush()
+            user_ids.append(user.id)
+        db.commit()
+        return user_ids
+    finally:
+        db.close()
+
+
+def legacy_recommendations(db, user) -> tuple[list[int], int]:
+    """The pre-index scoring loop, unchanged apart from returning ids."""
+    dietary_restrictions = json.loads(user.dietary_restrictions or "[]")
+    allergies = json.loads(user.allergies or "[]")
+    preferred_categories = json.loads(user.preferred_categories or "[]")
+    listings = db.query(FoodResource).filter(FoodResource.status == "available").order_by(FoodResource.id).all()
+    scored_listings = []
+    for listing in listings:
+        score = 0
+        skip = False
+        if listing.category and listing.category.value in preferred_categories:
+            score += 50
+        listing_text = (listing.title or '').lower() + ' ' + (listing.description or '').lower()
+        for restriction in dietary_restrictions:
+            restriction_lower = restriction.lower()
+            if restriction_lower == 'vegetarian':
+                if any(word in listing_text for word in ['meat', 'chicken', 'beef', 'pork', 'fish', 'salmon']):
+                    score -= 30
+                if any(word in listing_text for word in ['vegetarian', 'vegan', 'veggie', 'produce', 'fruit']):
+                    score += 20
+            elif restriction_lower == 'vegan':
+                if any(word in listing_text for word in ['vegan', 'plant-based']):
+                    score += 30
+                if any(word in listing_text for word in ['dairy', 'cheese', 'milk', 'egg', 'meat', 'chicken', 'fish']):
+                    score -= 40
+            elif restriction_lower == 'gluten-free':
+                if 'gluten' in listing_text or 'bread' in listing_text or 'pasta' in listing_text:
+                    score -= 20
+                if 'gluten-free' in listing_text:
+                    score += 25
+            elif restriction_lower == 'halal':
+                if 'halal' in listing_text:
+                    score += 30
+                if 'pork' in listing_text:
+                    skip = True
+            elif restriction_lower == 'kosher':
+                if 'kosher' in listing_text:
+                    score += 30
+                if 'pork' in listing_text or 'shellfish' in listing_text:
+                    skip = True
+        for allergy in allergies:
+            allergy_lower = allergy.lower()
+            if allergy_lower in ['peanuts', 'tree nuts', 'nuts']:
+                if any(word in listing_text for word in ['peanut', 'almond', 'walnut', 'cashew', 'nut']):
+                    skip = True
+                    break
+            elif allergy_lower in ['dairy', 'milk']:
+                if any(word in listing_text for word in ['dairy', 'milk', 'cheese', 'yogurt', 'cream']):
+                    skip = True
+                    break
+            elif allergy_lower in ['eggs', 'egg']:
+                if 'egg' in listing_text:
+                    skip = True
+                    break
+            elif allergy_lower == 'soy':
+                if 'soy' in listing_text or 'tofu' in listing_text:
+                    skip = True
+                    break
+            elif allergy_lower in ['wheat/gluten', 'wheat', 'gluten']:
+                if any(word in listing_text for word in ['wheat', 'gluten', 'bread', 'pasta']):
+                    skip = True
+                    break
+            elif allergy_lower in ['fish', 'shellfish', 'seafood']:
+                if any(word in listing_text for word in ['fish', 'salmon', 'tuna', 'shellfish', 'shrimp', 'crab', 'lobster']):
+                    skip = True
+                    break
+        if not skip:
+            household_size = user.household_size or 1
+            if listing.qty:
+                ideal_qty = household_size * 2
+                if abs(listing.qty - ideal_qty) < 5:
+                    score += 10
+            if user.coords_lat and user.coords_lng and listing.coords_lat and listing.coords_lng:
+                lat_diff = user.coords_lat - listing.coords_lat
+                lng_diff = user.coords_lng - listing.coords_lng
+                distance = math.sqrt(lat_diff**2 + lng_diff**2) * 69
+                if distance < 2:
+                    score += 30
+                elif distance < 5:
+                    score += 20
+                elif distance < 10:
+                    score += 10
+            if listing.perishability and listing.perishability.value == 'high':
+                score += 5
+            scored_listings.append({'listing': listing, 'score': score})
+    scored_listings.sort(key=lambda x: x['score'], reverse=True)
+    top_listings = [item['listing'] for item in scored_listings[:20]]
+    for listing in top_listings:
+        _ = listing.donor
+    return [listing.id for listing in top_listings], len(scored_listings)
+
+
+def _shipped(user_id: int) -> tuple[list[int], int]:
+    token = jwt.encode({"sub": str(user_id)}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    db = SessionLocal()
+    try:
+        result = get_recommended_listings(
+            db=db, credentials=HTTPAuthorizationCredentials(scheme="Bearer", credentials=token),
+        )
+        return [listing.id for listing in result["listings"]], result["total_matches"]
+    finally:
+        db.close()
+
+
+def _legacy(user_id: int) -> tuple[list[int], int]:
+    db = SessionLocal()
+    try:
+        return legacy_recommendations(db, db.get(User, user_id))
+    finally:
+        db.close()
+
+
+def _time(fn, user_ids, rounds: int, before=None) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        for user_id in user_ids:
+            if before:
+                before()
+            t0 = time.perf_counter()
+            fn(user_id)
+            samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=5000, help="listings to seed (80%% available)")
+    parser.add_argument("--rounds", type=int, default=5, help="passes over the benchmark users")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    user_ids = _seed(args.listings, random.Random(args.seed))
+    for user_id in user_ids:
+        recommendation_cache.invalidate()
+        if _legacy(user_id) != _shipped(user_id):
+            sys.exit(f"mismatch for user {user_id}: legacy and precomputed rankings differ")
+    print(f"{args.listings} listings, {len(user_ids)} users x {args.rounds} rounds; rankings match\n")
+
+    print(f"{'mode':<8} {'p50 ms':>9} {'max ms':>9}")
+    for mode, fn, before in (
+        ("legacy", _legacy, None),
+        ("cold", _shipped, recommendation_cache.invalidate),
+        ("warm", _shipped, None),
+    ):
+        samples = _time(fn, user_ids, args.rounds, before)
+        print(f"{mode:<8} {statistics.median(samples) * 1000:9.2f} {max(samples) * 1000:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
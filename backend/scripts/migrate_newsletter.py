@@ -1,50 +0,0 @@
-"""
-Create newsletter_subscriptions table.
-Run: python -m backend.scripts.migrate_newsletter
-"""
-
-from sqlalchemy import create_engine, text
-from dotenv import load_dotenv
-import os
-from pathlib import Path
-
-env_path = Path(__file__).parent.parent.parent / ".env"
-load_dotenv(dotenv_path=env_path)
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL not found in .env file")
-
-DATABASE_URL = DATABASE_URL.strip().strip('"')
-
-
-def migrate():
-    engine = create_engine(DATABASE_URL)
-    migration_sql = """
-    CREATE TABLE IF NOT EXISTS newsletter_subscriptions (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        email VARCHAR(255) NOT NULL,
-        first_name VARCHAR(100) NULL,
-        last_name VARCHAR(100) NULL,
-        source VARCHAR(100) NULL,
-        is_active TINYINT(1) DEFAULT 1,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-        UNIQUE KEY uq_newsletter_email (email),
-        INDEX idx_newsletter_email (email),
-        INDEX idx_newsletter_active (is_active),
-        INDEX idx_newsletter_created (created_at)
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-    """
-    try:
-        with engine.connect() as conn:
-            conn.execute(text(migration_sql))
-            conn.commit()
-            print("newsletter_subscriptions table ready")
-    except Exception as e:
-        print(f"Migration failed: {e}")
-        raise
-
-
-if __name__ == "__main__":
-    migrate()
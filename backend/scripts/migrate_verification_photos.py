@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Move base64 pickup verification photos out of food_resources.
+
+Rows written before backend/photo_store.py hold the whole image in
+before_photo / after_photo. This writes each one to the photo store and
+replaces the column with the file's URL, --batch rows per transaction, so
+the table is never locked for long. Re-running it only picks up rows that
+still hold base64.
+
+Usage::
+
+    python backend/scripts/migrate_verification_photos.py --dry-run
+    python backend/scripts/migrate_verification_photos.py --batch 50
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+load_dotenv(PROJECT_ROOT / '.env')
+
+from backend.photo_store import PHOTO_DIR, migrate_inline_photos  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=50, help="rows per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="decode and check photos, write nothing")
+    args = parser.parse_args()
+
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        return False
+    database_url = database_url.strip().strip('"').strip("'")
+
+    engine = create_engine(database_url, pool_pre_ping=True)
+    print(f"📝 Moving inline verification photos to {PHOTO_DIR}"
+          f"{' (dry run)' if args.dry_run else ''}...")
+    counts = migrate_inline_photos(sessionmaker(bind=engine), batch_size=args.batch, dry_run=args.dry_run)
+    print(f"   ✓ {counts['rows']} rows, {counts['photos']} photos moved")
+    if counts["failed"]:
+        print(f"   ⚠ {counts['failed']} photos could not be decoded and were left in place")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -27,20 +27,15 @@ echo "Server will auto-restart on crashes and code changes"
 # Find uvicorn
 UVICORN=$(which uvicorn 2>/dev/null || echo "/home/ec2-user/.local/bin/uvicorn")
 
-# Run with uvicorn. NOTE: we deliberately stay on a SINGLE worker process.
-# The claim-confirmation flow keeps the pending 4-digit codes in an
-# in-process dict (`pending_confirmations` in backend/app.py) and uses an
-# in-process Timer to auto-release stale claims. Spawning multiple workers
-# would put the dict in process A while the confirm request gets routed to
-# process B, breaking the claim flow ~75% of the time. FastAPI's async
-# event loop comfortably handles concurrent requests on one worker for our
-# current load. If/when we need horizontal scaling, move pending claims
-# into the database (FoodResource already tracks status) or Redis BEFORE
-# bumping the worker count.
+# Run with uvicorn. Pending claim-confirmation codes live in the database
+# (pending_claim_confirmations) and each worker runs one auto-release
+# scheduler thread, so the claim flow works with any worker count. Other
+# per-process state (login/signup rate-limit counters, caches) is still
+# per worker, so the default stays at one; set UVICORN_WORKERS to scale.
 exec "$UVICORN" app:app \
     --host 0.0.0.0 \
     --port 8000 \
-    --workers 1 \
+    --workers "${UVICORN_WORKERS:-1}" \
     --log-level info \
     --access-log \
     --use-colors
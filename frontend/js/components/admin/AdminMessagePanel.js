@@ -7,11 +7,37 @@ function AdminMessagePanel({ user }) {
   const [sending, setSending] = React.useState(false);
   const messagesEndRef = React.useRef(null);
 
+  // Latest selection for the push handler below, which is registered once.
+  const selectedRef = React.useRef(null);
+  React.useEffect(() => {
+    selectedRef.current = selectedConversation;
+  }, [selectedConversation]);
+
   React.useEffect(() => {
     loadConversations();
-    // Poll for new messages every 5 seconds
-    const interval = setInterval(loadConversations, 5000);
-    return () => clearInterval(interval);
+    const realtime = window.FoodMapsRealtime;
+    if (!realtime) {
+      // Poll for new messages every 5 seconds
+      const interval = setInterval(loadConversations, 5000);
+      return () => clearInterval(interval);
+    }
+    // Coalesce bursts of pushed messages into one inbox refresh.
+    let refreshTimer = null;
+    const off = realtime.subscribe('message', (data) => {
+      const open = selectedRef.current;
+      if (open && data && data.conversation_id === open.conversation_id) {
+        loadMessages(open.conversation_id);
+        return;
+      }
+      clearTimeout(refreshTimer);
+      refreshTimer = setTimeout(loadConversations, 300);
+    });
+    const stopPoll = realtime.fallbackPoll(loadConversations);
+    return () => {
+      clearTimeout(refreshTimer);
+      off();
+      stopPoll();
+    };
   }, []);
 
   React.useEffect(() => {
@@ -175,6 +175,62 @@ function guessPendingLabel(text) {
   return guessPending(text).label;
 }
 
+// POST /api/ai/chat/stream and read its server-sent events. Calls
+// onDelta(text) per chunk and onTool(name) when a tool starts; resolves
+// with the 'done' payload (same shape as /api/ai/chat), or null when the
+// stream could not be opened so the caller can fall back.
+async function streamChat(token, payload, { onDelta, onTool } = {}) {
+  if (typeof ReadableStream === 'undefined' || typeof TextDecoder === 'undefined') return null;
+  let res;
+  try {
+    res = await fetch('/api/ai/chat/stream', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${token}`,
+        'Accept': 'text/event-stream',
+      },
+      body: JSON.stringify(payload),
+    });
+  } catch (e) {
+    return null;
+  }
+  if (res.status === 404 || res.status === 405) return null;
+  if (!res.ok) {
+    const err = await res.text();
+    throw new Error(`${res.status}: ${err}`);
+  }
+  if (!res.body) return null;
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let done = null;
+  for (;;) {
+    const { value, done: finished } = await reader.read();
+    if (finished) break;
+    buffer += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      let event = 'message';
+      let data = '';
+      for (const line of frame.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      let parsed = null;
+      try { parsed = data ? JSON.parse(data) : null; } catch (e) { continue; }
+      if (event === 'delta' && parsed && onDelta) onDelta(parsed.text || '');
+      else if (event === 'tool' && parsed && onTool) onTool(parsed.tool);
+      else if (event === 'done') done = parsed;
+      else if (event === 'error') throw new Error((parsed && parsed.detail) || 'stream error');
+    }
+  }
+  if (!done) throw new Error('stream ended early');
+  return done;
+}
+
 // Map server-side tool names to user-facing chip text + state. The chip
 // is rendered "done" when the tool succeeded and "error" if it returned
 // an error payload. We deliberately only surface the action-y tools;
@@ -1110,26 +1166,54 @@ function AIChatbot() {
     setPendingLabel(guess.label);
     setPendingTool(guess.tool);
     setSending(true);
+    const payload = { user_id: userId, message: trimmed, include_audio: false, lang: (window.i18n && window.i18n.getCurrentLanguage()) || 'en' };
+    // The streamed reply is rendered in place as deltas arrive; streamId
+    // tags that bubble so the final 'done' payload replaces it.
+    const streamId = `s${Date.now()}`;
     try {
-      const res = await fetch('/api/ai/chat', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'Authorization': `Bearer ${token}`,
+      let data = await streamChat(token, payload, {
+        onDelta: (text) => setMessages(m => {
+          const i = m.findIndex(x => x.streamId === streamId);
+          if (i === -1) return [...m, { role: 'assistant', text, streamId }];
+          const next = m.slice();
+          next[i] = { ...next[i], text: next[i].text + text };
+          return next;
+        }),
+        onTool: (tool) => {
+          const cfg = ACTION_CHIP_LABELS[tool];
+          setPendingTool(tool);
+          if (cfg) setPendingLabel(cfg.verb);
         },
-        body: JSON.stringify({ user_id: userId, message: trimmed, include_audio: false, lang: (window.i18n && window.i18n.getCurrentLanguage()) || 'en' }),
       });
-      if (!res.ok) {
-        const err = await res.text();
-        throw new Error(`${res.status}: ${err}`);
+      if (!data) {
+        // Streaming unavailable (old server, proxy, no ReadableStream).
+        const res = await fetch('/api/ai/chat', {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+            'Authorization': `Bearer ${token}`,
+          },
+          body: JSON.stringify(payload),
+        });
+        if (!res.ok) {
+          const err = await res.text();
+          throw new Error(`${res.status}: ${err}`);
+        }
+        data = await res.json();
       }
-      const data = await res.json();
-      setMessages(m => [...m, {
+      const finalMsg = {
         role: 'assistant',
         text: data.text || '(no response)',
         actions: Array.isArray(data.actions) ? data.actions : [],
         suggestions: Array.isArray(data.suggestions) ? data.suggestions : [],
-      }]);
+      };
+      setMessages(m => {
+        const i = m.findIndex(x => x.streamId === streamId);
+        if (i === -1) return [...m, finalMsg];
+        const next = m.slice();
+        next[i] = finalMsg;
+        return next;
+      });
       maybeBroadcastListingsChanged(data.actions);
       maybeBroadcastUIControl(data.actions);
     } catch (e) {
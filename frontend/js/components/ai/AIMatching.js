@@ -14,8 +14,20 @@ function AIMatching({ onClose }) {
   const loadMatches = async () => {
     try {
       setIsLoading(true);
-      const assignments = await window.agentAPI.autoAssignFood();
-      setMatches(assignments);
+      // Matching runs once on the server and is shared by every open tab;
+      // polling here only reads the latest result.
+      const res = await fetch(`/api/dispatch/matches?_t=${Date.now()}`, {
+        headers: { Authorization: `Bearer ${localStorage.getItem('auth_token')}` },
+        cache: 'no-store',
+      });
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      const data = await res.json();
+      setMatches((data.matches || []).map(m => ({
+        ...m,
+        donation_id: m.listing_id,
+        distance_km: m.distance_km || 0,
+        estimated_delivery: m.driver ? m.driver.estimated_delivery : null,
+      })));
     } catch (error) {
       console.error('Error loading matches:', error);
     } finally {
@@ -129,7 +141,9 @@ function AIMatching({ onClose }) {
                         {(assignment.distance_km * 0.621371).toFixed(1)} mi away
                       </span>
                       <span className="text-sm text-gray-500">
-                        ETA: {new Date(assignment.estimated_delivery).toLocaleString()}
+                        {assignment.driver
+                          ? `Driver #${assignment.driver.driver_id} - ETA: ${new Date(assignment.estimated_delivery).toLocaleString()}`
+                          : 'No driver available'}
                       </span>
                     </div>
                     
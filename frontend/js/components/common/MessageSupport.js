@@ -13,9 +13,21 @@ function MessageSupport({ user, onClose }) {
   React.useEffect(() => {
     if (user) {
       loadMessages();
-      // Poll for new messages every 5 seconds
-      const interval = setInterval(loadMessages, 5000);
-      return () => clearInterval(interval);
+      const realtime = window.FoodMapsRealtime;
+      if (!realtime) {
+        // Poll for new messages every 5 seconds
+        const interval = setInterval(loadMessages, 5000);
+        return () => clearInterval(interval);
+      }
+      // New messages are pushed; the poll is only a safety net.
+      const off = realtime.subscribe('message', (data) => {
+        if (data && data.conversation_id === conversationId) loadMessages();
+      });
+      const stopPoll = realtime.fallbackPoll(loadMessages);
+      return () => {
+        off();
+        stopPoll();
+      };
     }
   }, [user]);
 
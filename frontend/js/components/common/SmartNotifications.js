@@ -322,6 +322,17 @@ const SmartNotifications = () => {
   };
 
   const startNotificationListener = () => {
+    const realtime = window.FoodMapsRealtime;
+    if (realtime) {
+      // New listings are pushed as they are created.
+      return realtime.subscribe('listing.created', (data) => {
+        const listing = data && data.listing;
+        if (listing && shouldNotify(listing)) {
+          sendNotification(listing);
+        }
+      });
+    }
+
     // Poll for new listings every 5 minutes
     const interval = setInterval(async () => {
       try {
@@ -6,8 +6,20 @@ function DispatchDashboard({ user, onClose }) {
 
   React.useEffect(() => {
     loadDashboardData();
-    const interval = setInterval(loadDashboardData, 30000); // Refresh every 30s
-    return () => clearInterval(interval);
+    const realtime = window.FoodMapsRealtime;
+    if (!realtime) {
+      const interval = setInterval(loadDashboardData, 30000); // Refresh every 30s
+      return () => clearInterval(interval);
+    }
+    // Refresh when listings are created or change status; poll as a safety net.
+    const offCreated = realtime.subscribe('listing.created', loadDashboardData);
+    const offUpdated = realtime.subscribe('listing.updated', loadDashboardData);
+    const stopPoll = realtime.fallbackPoll(loadDashboardData, { disconnectedMs: 30000, connectedMs: 300000 });
+    return () => {
+      offCreated();
+      offUpdated();
+      stopPoll();
+    };
   }, []);
 
   const loadDashboardData = async () => {
@@ -93,6 +93,20 @@ function PickupVerification({ listing, onClose, verificationType, onSuccess }) {
         ? `/api/listings/${listing.id}/verify-before`
         : `/api/listings/${listing.id}/verify-after`;
 
+      // Upload the image file first; the verification call only carries its URL.
+      const blob = await (await fetch(photo)).blob();
+      const form = new FormData();
+      form.append('photo', blob, 'verification.jpg');
+      const upload = await fetch(`/api/listings/${listing.id}/verification-photo`, {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${token}` },
+        body: form
+      });
+      const uploaded = await upload.json();
+      if (!upload.ok) {
+        throw new Error(uploaded.detail || 'Photo upload failed');
+      }
+
       const response = await fetch(endpoint, {
         method: 'POST',
         headers: {
@@ -100,7 +114,7 @@ function PickupVerification({ listing, onClose, verificationType, onSuccess }) {
           'Content-Type': 'application/json'
         },
         body: JSON.stringify({
-          photo: photo,
+          photo: uploaded.url,
           notes: notes
         })
       });
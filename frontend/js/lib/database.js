@@ -3,22 +3,15 @@ window.databaseService = {
   listings: [],
   isConnected: true,
 
-  async getListings(limit = 100, include_claimed_for_me = false) {
-    try {
-      const params = new URLSearchParams();
-      params.append('limit', limit);
-      params.append('include_claimed_for_me', include_claimed_for_me);
-
-      const token = localStorage.getItem('auth_token') || localStorage.getItem('token');
-      const headers = token ? { 'Authorization': `Bearer ${token}` } : {};
-
-      const response = await fetch(`/api/listings/get?${params.toString()}`, {
-        method: 'GET',
-        headers
-      });
-
-      if (response.status === 401) {
-        const error = await response.json().catch(() => ({}));
+  // Every listing the caller may see, newest first. Follows the keyset
+  // cursor (X-Next-Cursor) page by page, up to maxPages pages of pageSize.
+  async getListings(pageSize = 100, maxPages = 10) {
+    const listings = [];
+    let cursor = null;
+    for (let page = 0; page < maxPages; page++) {
+      const result = await this.getListingsPage({ limit: pageSize, cursor });
+
+      if (result.status === 401) {
         console.log('401 Unauthorized - token expired or invalid');
         if (typeof window.handleTokenExpired === 'function') {
           window.handleTokenExpired();
@@ -34,22 +27,57 @@ window.databaseService = {
         return { success: false, error: 'Session expired' };
       }
 
+      if (!result.success) {
+        console.error('Failed to fetch listings:', result.error);
+        return { success: false, error: result.error };
+      }
+
+      listings.push(...result.listings);
+      cursor = result.nextCursor;
+      if (!cursor) break;
+    }
+    console.log('Fetched listings from API:', listings.length);
+
+    // Update local cache
+    this.listings = listings;
+
+    return { success: true, listings: this.listings };
+  },
+
+  // One page of listings, newest first. Pass the returned nextCursor back as
+  // `cursor` to continue; nextCursor is null on the last page. Filters
+  // (category, status, donorId) are applied server-side.
+  async getListingsPage({ limit = 100, cursor = null, category = null, status = null, donorId = null } = {}) {
+    try {
+      const params = new URLSearchParams();
+      params.append('limit', limit);
+      if (cursor) params.append('cursor', cursor);
+      if (category) params.append('category', Array.isArray(category) ? category.join(',') : category);
+      if (status) params.append('status', Array.isArray(status) ? status.join(',') : status);
+      if (donorId != null) params.append('donor_id', donorId);
+
+      const token = localStorage.getItem('auth_token') || localStorage.getItem('token');
+      const headers = token ? { 'Authorization': `Bearer ${token}` } : {};
+
+      const response = await fetch(`/api/listings/get?${params.toString()}`, {
+        method: 'GET',
+        headers
+      });
+
       if (!response.ok) {
         const error = await response.json().catch(() => ({}));
         const errorMessage = typeof error.detail === 'string' ? error.detail : 'Failed to fetch listings';
-        console.error('Failed to fetch listings:', errorMessage);
-        return { success: false, error: errorMessage };
+        return { success: false, status: response.status, error: errorMessage };
       }
 
       const data = await response.json();
-      console.log('Fetched listings from API:', data.length);
-
-      // Update local cache
-      this.listings = Array.isArray(data) ? data : [];
-
-      return { success: true, listings: this.listings };
+      return {
+        success: true,
+        listings: Array.isArray(data) ? data : [],
+        nextCursor: response.headers.get('X-Next-Cursor')
+      };
     } catch (error) {
-      console.error('Get listings error:', error);
+      console.error('Get listings page error:', error);
       const errorMessage = error && error.message ? String(error.message) : 'Network error';
       return { success: false, error: errorMessage };
     }
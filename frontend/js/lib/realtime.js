@@ -0,0 +1,172 @@
+/**
+ * Shared server-push connection (GET /api/events/stream, text/event-stream).
+ *
+ * One streaming fetch per tab, opened lazily on the first subscription and
+ * reconnected with backoff. fetch() is used instead of EventSource so the
+ * JWT travels in the Authorization header, not the URL.
+ *
+ *   const off = window.FoodMapsRealtime.subscribe('message', (data) => { ... });
+ *   off();  // unsubscribe
+ *   const stop = window.FoodMapsRealtime.fallbackPoll(reload);
+ *
+ * Events: 'message', 'listing.created', 'listing.updated', plus
+ * 'connected' / 'disconnected' for components that keep a fallback poll.
+ */
+(function () {
+  const STREAM_URL = '/api/events/stream';
+  const MAX_BACKOFF_MS = 60000;
+
+  const handlers = {};
+  let controller = null;
+  let connected = false;
+  let backoffMs = 2000;
+  let reconnectTimer = null;
+
+  function getToken() {
+    return localStorage.getItem('auth_token') || localStorage.getItem('token');
+  }
+
+  function emit(event, data) {
+    (handlers[event] || []).slice().forEach((fn) => {
+      try {
+        fn(data);
+      } catch (err) {
+        console.error(`realtime handler for ${event} failed:`, err);
+      }
+    });
+  }
+
+  function hasSubscribers() {
+    return Object.keys(handlers).some((k) => handlers[k].length > 0);
+  }
+
+  function setConnected(value) {
+    if (connected === value) return;
+    connected = value;
+    emit(value ? 'connected' : 'disconnected', {});
+  }
+
+  function scheduleReconnect() {
+    if (reconnectTimer || !hasSubscribers()) return;
+    reconnectTimer = setTimeout(() => {
+      reconnectTimer = null;
+      connect();
+    }, backoffMs);
+    backoffMs = Math.min(backoffMs * 2, MAX_BACKOFF_MS);
+  }
+
+  function dispatchFrame(frame) {
+    let event = 'message';
+    const dataLines = [];
+    frame.split('\n').forEach((line) => {
+      if (line.startsWith(':')) return; // keep-alive comment
+      if (line.startsWith('event:')) event = line.slice(6).trim();
+      else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+    });
+    if (!dataLines.length) return;
+    let data = null;
+    try {
+      data = JSON.parse(dataLines.join('\n'));
+    } catch (_) {
+      return;
+    }
+    if (event === 'ready') {
+      backoffMs = 2000;
+      setConnected(true);
+      return;
+    }
+    emit(event, data);
+  }
+
+  async function connect() {
+    const token = getToken();
+    if (controller || !token || !window.fetch || !window.TextDecoder) return;
+    controller = new AbortController();
+    try {
+      const res = await fetch(STREAM_URL, {
+        headers: { Authorization: `Bearer ${token}`, Accept: 'text/event-stream' },
+        signal: controller.signal,
+        cache: 'no-store',
+      });
+      if (!res.ok || !res.body) throw new Error(`stream HTTP ${res.status}`);
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let idx;
+        while ((idx = buffer.indexOf('\n\n')) !== -1) {
+          dispatchFrame(buffer.slice(0, idx));
+          buffer = buffer.slice(idx + 2);
+        }
+      }
+    } catch (err) {
+      if (err && err.name === 'AbortError') return;
+    } finally {
+      controller = null;
+      setConnected(false);
+    }
+    scheduleReconnect();
+  }
+
+  function disconnect() {
+    if (reconnectTimer) {
+      clearTimeout(reconnectTimer);
+      reconnectTimer = null;
+    }
+    if (controller) controller.abort();
+  }
+
+  function subscribe(event, fn) {
+    (handlers[event] = handlers[event] || []).push(fn);
+    connect();
+    return function unsubscribe() {
+      handlers[event] = (handlers[event] || []).filter((h) => h !== fn);
+      if (!hasSubscribers()) disconnect();
+    };
+  }
+
+  /**
+   * Safety-net poll: every `disconnectedMs` while the stream is down, every
+   * `connectedMs` while it is up (events published on another server
+   * worker do not reach this stream). Returns a stop function.
+   */
+  function fallbackPoll(fn, { disconnectedMs = 5000, connectedMs = 60000 } = {}) {
+    let timer = null;
+    let stopped = false;
+    const tick = () => {
+      if (stopped) return;
+      timer = setTimeout(() => {
+        fn();
+        tick();
+      }, connected ? connectedMs : disconnectedMs);
+    };
+    // Re-arm immediately on state changes so a dropped stream falls back
+    // to the fast interval without waiting out the slow one.
+    const rearm = () => {
+      clearTimeout(timer);
+      tick();
+    };
+    // Events sent while the stream was down are gone; refetch on (re)connect.
+    const offUp = subscribe('connected', () => {
+      fn();
+      rearm();
+    });
+    const offDown = subscribe('disconnected', rearm);
+    tick();
+    return function stop() {
+      stopped = true;
+      clearTimeout(timer);
+      offUp();
+      offDown();
+    };
+  }
+
+  window.FoodMapsRealtime = {
+    subscribe,
+    fallbackPoll,
+    isConnected: () => connected,
+  };
+})();